@@ -0,0 +1,172 @@
+"""
+Benchmark de image_processor: implementación por bandas vs bucle por pixel
+
+Compara remove_white_background y smart_background_removal con las
+implementaciones originales (bucle sobre getdata/putdata, copiadas aquí
+como referencia) sobre imágenes de ejemplo, verificando que el resultado
+sea idéntico byte a byte y midiendo el tiempo de cada una.
+
+Uso:
+    python benchmark_image_processor.py [--repeat N]
+"""
+
+import argparse
+import base64
+import io
+import time
+from typing import Callable, Dict, List, Tuple
+
+from PIL import Image, ImageDraw
+
+from image_processor import hex_to_rgb, remove_white_background, smart_background_removal
+
+
+# ============================================
+# IMPLEMENTACIONES ORIGINALES (referencia)
+# ============================================
+
+def _decode(image_base64: str) -> Image.Image:
+    if ',' in image_base64:
+        image_base64 = image_base64.split(',')[1]
+    img = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+    return img.convert('RGBA') if img.mode != 'RGBA' else img
+
+
+def _encode(img: Image.Image) -> str:
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+def legacy_remove_white_background(image_base64: str, bg_color_hex: str, threshold: int = 240) -> str:
+    """remove_white_background original (bucle por pixel)"""
+    img = _decode(image_base64)
+    bg_color = hex_to_rgb(bg_color_hex)
+    new_data = []
+    for item in img.getdata():
+        if item[0] > threshold and item[1] > threshold and item[2] > threshold:
+            alpha = item[3] if len(item) > 3 else 255
+            new_data.append((*bg_color, alpha))
+        else:
+            new_data.append(item)
+    img.putdata(new_data)
+    return _encode(img)
+
+
+def legacy_smart_background_removal(image_base64: str, bg_color_hex: str) -> str:
+    """smart_background_removal original (bucle por pixel)"""
+    img = _decode(image_base64)
+    bg_color = hex_to_rgb(bg_color_hex)
+    new_data = []
+    for item in img.getdata():
+        r, g, b = item[0], item[1], item[2]
+        alpha = item[3] if len(item) > 3 else 255
+        whiteness = (r + g + b) / 3
+        if whiteness > 240 and alpha > 200:
+            new_data.append((*bg_color, alpha))
+        else:
+            new_data.append(item)
+    img.putdata(new_data)
+    return _encode(img)
+
+
+# ============================================
+# IMÁGENES DE EJEMPLO
+# ============================================
+
+def _logo(size: Tuple[int, int]) -> Image.Image:
+    """Logo sobre fondo blanco con bordes suavizados y ruido cerca del umbral"""
+    width, height = size
+    img = Image.new('RGB', size, (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((width // 8, height // 8, width // 2, height * 7 // 8), fill=(200, 30, 60))
+    draw.rectangle((width // 2, height // 4, width * 7 // 8, height * 3 // 4), fill=(245, 243, 250))
+    draw.text((width // 10, height // 20), "LOGO", fill=(30, 30, 30))
+    # Degradado de grises alrededor del umbral 240
+    for x in range(0, width, max(1, width // 64)):
+        shade = 230 + (x * 26 // max(1, width))
+        draw.line((x, height - height // 10, x, height), fill=(shade, shade, min(255, shade + 1)))
+    return img.resize((width, height), Image.BILINEAR)
+
+
+def sample_images() -> Dict[str, str]:
+    """Imágenes de ejemplo (en base64, como las recibe el analizador)"""
+    samples = {}
+    
+    samples['logo_4k_rgb'] = _encode(_logo((3840, 2160)).convert('RGBA'))
+    
+    rgba = _logo((1200, 800)).convert('RGBA')
+    alpha = Image.linear_gradient('L').resize(rgba.size)
+    rgba.putalpha(alpha)
+    samples['logo_alpha_gradient'] = _encode(rgba)
+    
+    samples['logo_palette'] = _encode(_logo((800, 600)).convert('P', palette=Image.ADAPTIVE))
+    
+    buffer = io.BytesIO()
+    _logo((640, 480)).convert('L').save(buffer, format='PNG')
+    samples['logo_grayscale'] = base64.b64encode(buffer.getvalue()).decode()
+    
+    return samples
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+def _time(func: Callable[[], str], repeat: int) -> Tuple[str, float]:
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def run_benchmark(repeat: int = 1, bg_color_hex: str = '#1E3A5F') -> List[Dict]:
+    """
+    Ejecuta ambas implementaciones sobre cada imagen de ejemplo.
+    
+    Returns:
+        Lista de resultados con tiempos (segundos) y si la salida es idéntica
+    """
+    pairs = [
+        ('remove_white_background', remove_white_background, legacy_remove_white_background),
+        ('smart_background_removal', smart_background_removal, legacy_smart_background_removal),
+    ]
+    results = []
+    
+    for sample_name, image_base64 in sample_images().items():
+        for func_name, current, legacy in pairs:
+            new_output, new_time = _time(lambda: current(image_base64, bg_color_hex), repeat)
+            old_output, old_time = _time(lambda: legacy(image_base64, bg_color_hex), repeat)
+            results.append({
+                'image': sample_name,
+                'function': func_name,
+                'identical': new_output == old_output,
+                'legacy_seconds': old_time,
+                'banded_seconds': new_time,
+            })
+    
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=1, help='Repeticiones por caso (se toma el mejor tiempo)')
+    args = parser.parse_args()
+    
+    print(f"{'imagen':<22} {'función':<26} {'idéntico':<9} {'original':>10} {'bandas':>10} {'speedup':>8}")
+    all_identical = True
+    for row in run_benchmark(args.repeat):
+        all_identical &= row['identical']
+        speedup = row['legacy_seconds'] / max(row['banded_seconds'], 1e-9)
+        print(f"{row['image']:<22} {row['function']:<26} {str(row['identical']):<9} "
+              f"{row['legacy_seconds']:>9.3f}s {row['banded_seconds']:>9.3f}s {speedup:>7.1f}x")
+    
+    print("✅ Salidas idénticas" if all_identical else "❌ Hay diferencias en la salida")
+    return 0 if all_identical else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
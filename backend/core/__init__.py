@@ -1,5 +1,15 @@
 # Core package
 from .websocket_manager import ConnectionManager, manager
-from .task_queue import task_queue, TaskQueue, TaskStatus, Task
+from .task_queue import (
+    task_queue, TaskQueue, TaskStatus, Task,
+    ExecutorBackend, ThreadBackend, ProcessBackend
+)
+from .task_store import MemoryTaskStore, SQLiteTaskStore
+from .offload import offloader, Offloader, OffloadBusyError
 
-__all__ = ['ConnectionManager', 'manager', 'task_queue', 'TaskQueue', 'TaskStatus', 'Task']
+__all__ = [
+    'ConnectionManager', 'manager', 'task_queue', 'TaskQueue', 'TaskStatus', 'Task',
+    'ExecutorBackend', 'ThreadBackend', 'ProcessBackend',
+    'MemoryTaskStore', 'SQLiteTaskStore',
+    'offloader', 'Offloader', 'OffloadBusyError'
+]
@@ -0,0 +1,225 @@
+"""
+Offload layer for CPU-bound request handlers.
+
+Endpoints such as /api/analyze or /api/export/pptx parse and write whole
+presentations (python-pptx, lxml, PIL). Called inline from an `async def`
+handler they block the event loop, freezing every WebSocket and health
+check until they finish. `offload()` runs them on a dedicated executor
+instead (one worker per slot, separate from the task queue executor that
+runs background tasks, so a stage never waits unseen behind them), with:
+
+- a concurrency limit: at most OFFLOAD_MAX_CONCURRENT stages run at once;
+  a stage whose client disconnects keeps its slot until its worker is done
+- backpressure: at most OFFLOAD_MAX_QUEUED requests wait for a slot;
+  further requests are rejected with 429 and a Retry-After header
+- per-endpoint latency metrics (queue wait and run time percentiles),
+  reported by GET /api/queue/status
+"""
+import asyncio
+import functools
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from .task_queue import MAX_WORKERS, TASK_QUEUE_BACKEND, ExecutorBackend, create_backend
+
+# Offloaded stages running at once, and workers of the offload executor
+OFFLOAD_MAX_CONCURRENT = int(os.environ.get('OFFLOAD_MAX_CONCURRENT', MAX_WORKERS))
+
+# Kind of executor the stages run on: "thread" or "process"
+OFFLOAD_BACKEND = os.environ.get('OFFLOAD_BACKEND', TASK_QUEUE_BACKEND)
+
+# Requests allowed to wait for a slot before new ones get a 429
+OFFLOAD_MAX_QUEUED = int(os.environ.get('OFFLOAD_MAX_QUEUED', 16))
+
+# Retry-After sent with 429 responses (seconds)
+OFFLOAD_RETRY_AFTER = int(os.environ.get('OFFLOAD_RETRY_AFTER', 5))
+
+# Latency samples kept per endpoint for the percentiles
+LATENCY_WINDOW = 256
+
+
+class OffloadBusyError(Exception):
+    """Every slot is busy and the wait queue is full."""
+    
+    def __init__(self, endpoint: str, retry_after: int):
+        super().__init__(f"Server busy, {endpoint} rejected")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class EndpointMetrics:
+    """Counters and recent latencies (seconds) of one endpoint."""
+    
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.count = 0
+        self.errors = 0
+        self.rejected = 0
+        self.wait = deque(maxlen=window)
+        self.run = deque(maxlen=window)
+    
+    def record(self, wait: float, run: float, failed: bool) -> None:
+        self.count += 1
+        if failed:
+            self.errors += 1
+        self.wait.append(wait)
+        self.run.append(run)
+    
+    def snapshot(self) -> dict:
+        stats = {"count": self.count, "errors": self.errors, "rejected": self.rejected}
+        for name, samples in (("wait", self.wait), ("run", self.run)):
+            if samples:
+                stats[f"{name}_ms"] = {
+                    "avg": round(sum(samples) / len(samples) * 1000, 1),
+                    "p50": round(_percentile(samples, 0.5) * 1000, 1),
+                    "p95": round(_percentile(samples, 0.95) * 1000, 1),
+                    "max": round(max(samples) * 1000, 1),
+                }
+        return stats
+
+
+class Offloader:
+    """
+    Runs blocking request stages on an executor backend.
+    
+    By default the backend is private to the offloader and has exactly
+    max_concurrent workers, so a stage that holds a slot starts right away.
+    Passing `queue` runs the stages on that task queue's backend instead,
+    shared with its background tasks.
+    
+    Counters and the semaphore are only touched from the event loop, so no
+    lock is needed. The semaphore is rebuilt if the running loop changes
+    (tests run each request in a fresh loop).
+    """
+    
+    def __init__(self, max_concurrent: int = OFFLOAD_MAX_CONCURRENT,
+                 max_queued: int = OFFLOAD_MAX_QUEUED,
+                 retry_after: int = OFFLOAD_RETRY_AFTER,
+                 queue=None, backend: Optional[str] = None):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.retry_after = retry_after
+        self.backend = backend
+        self._queue = queue
+        self._running = 0
+        self._waiting = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._metrics: Dict[str, EndpointMetrics] = {}
+        self._backend: Optional[ExecutorBackend] = None
+    
+    def get_backend(self) -> ExecutorBackend:
+        """Backend that runs the stages, created on first use."""
+        if self._queue is not None:
+            return self._queue.get_backend(self.backend)
+        if self._backend is None:
+            self._backend = create_backend(self.backend or OFFLOAD_BACKEND, self.max_concurrent)
+        return self._backend
+    
+    def warm_up(self) -> None:
+        """Start the backend workers ahead of the first stage."""
+        self.get_backend().warm_up()
+    
+    def shutdown(self, wait: bool = True) -> None:
+        if self._backend is not None:
+            self._backend.shutdown(wait=wait)
+            self._backend = None
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+            self._running = self._waiting = 0
+        return self._semaphore
+    
+    def _endpoint(self, endpoint: str) -> EndpointMetrics:
+        if endpoint not in self._metrics:
+            self._metrics[endpoint] = EndpointMetrics()
+        return self._metrics[endpoint]
+    
+    async def run(self, endpoint: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) off the event loop and await the result.
+        
+        The stage is shielded: if the request is cancelled (client gone),
+        the call returns at once but the slot stays taken until the worker
+        actually finishes, so the executor never runs more than
+        max_concurrent stages.
+        
+        Raises:
+            OffloadBusyError: all slots are busy and the wait queue is full
+        """
+        metrics = self._endpoint(endpoint)
+        semaphore = self._get_semaphore()
+        
+        if self._running + self._waiting >= self.max_concurrent + self.max_queued:
+            metrics.rejected += 1
+            raise OffloadBusyError(endpoint, self.retry_after)
+        
+        queued_at = time.monotonic()
+        self._waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        
+        started = time.monotonic()
+        self._running += 1
+        try:
+            stage = asyncio.ensure_future(self.get_backend().run(func, *args, **kwargs))
+        except BaseException:
+            self._running -= 1
+            semaphore.release()
+            raise
+        stage.add_done_callback(functools.partial(
+            self._finish, semaphore, metrics, started - queued_at, started
+        ))
+        return await asyncio.shield(stage)
+    
+    def _finish(self, semaphore: asyncio.Semaphore, metrics: EndpointMetrics,
+                wait: float, started: float, stage: asyncio.Future) -> None:
+        """Free the slot of a stage once its worker is done."""
+        if semaphore is self._semaphore:
+            self._running -= 1
+        semaphore.release()
+        failed = stage.cancelled() or stage.exception() is not None
+        metrics.record(wait, time.monotonic() - started, failed)
+    
+    def get_stats(self) -> dict:
+        """Limits, current load and per-endpoint metrics."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "running": self._running,
+            "waiting": self._waiting,
+            "backend": self.get_backend().get_stats(),
+            "endpoints": {name: metrics.snapshot() for name, metrics in self._metrics.items()}
+        }
+
+
+# Singleton instance
+offloader = Offloader()
+
+
+async def offload(endpoint: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking stage of `endpoint` through the shared offloader.
+    A full wait queue becomes a 429 response with Retry-After.
+    """
+    try:
+        return await offloader.run(endpoint, func, *args, **kwargs)
+    except OffloadBusyError as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Server busy, retry in a few seconds",
+            headers={"Retry-After": str(e.retry_after)}
+        )
@@ -1,59 +1,355 @@
 """
 Lightweight async task queue for CPU/IO bound operations.
-Uses asyncio + ThreadPoolExecutor for heavy tasks without blocking the event loop.
+Runs heavy tasks on a pluggable executor backend without blocking the event loop:
+
+- "thread": ThreadPoolExecutor (default). Cheap, shares process caches,
+  but GIL-bound work (cloning, lxml, PIL) tops out at about one core.
+- "process": ProcessPoolExecutor with preloaded modules, warm-up and
+  worker recycling. Scales CPU-bound work across cores; each worker keeps
+  its own in-process caches (e.g. template_cache).
+
+Task state lives in a task store (core/task_store.py): in memory by
+default, or in SQLite so tasks survive restarts and are shared by several
+uvicorn workers.
 
 For 50-100 concurrent users. For 500+, migrate to Celery + Redis.
 """
 import asyncio
+import functools
+import importlib
+import inspect
+import multiprocessing
+import os
+import sys
+import threading
+import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass, field
-from datetime import datetime
-from enum import Enum
-from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
 import logging
 
+from .task_store import Task, TaskStatus, MemoryTaskStore, SQLiteTaskStore, worker_id
+
 logger = logging.getLogger(__name__)
 
-# Thread pool for CPU-bound tasks (PPTX generation, image processing)
+# Default executor backend: "thread" or "process"
+TASK_QUEUE_BACKEND = os.environ.get('TASK_QUEUE_BACKEND', 'thread')
+
+# Worker pool size for CPU-bound tasks (PPTX generation, image processing)
 # Limit to prevent resource exhaustion
-MAX_WORKERS = 4
-executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+MAX_WORKERS = int(os.environ.get('TASK_QUEUE_WORKERS', 4))
+
+# Task store: "memory" (single process) or "sqlite" (durable, shared by
+# every uvicorn worker, see core/task_store.py)
+TASK_QUEUE_STORE = os.environ.get('TASK_QUEUE_STORE', 'memory')
+
+# How often a worker polls the durable store for pending tasks (seconds)
+TASK_QUEUE_POLL_INTERVAL = float(os.environ.get('TASK_QUEUE_POLL_INTERVAL', 0.5))
+
+# How often a worker refreshes the heartbeat of its running tasks (seconds).
+# Sent from a dedicated thread, so a blocked event loop does not make live
+# tasks look stale (see TASK_STALE_SECONDS in core/task_store.py)
+TASK_HEARTBEAT_INTERVAL = float(os.environ.get('TASK_HEARTBEAT_INTERVAL', 10))
 
+# Process workers are replaced after this many tasks (0 = never)
+MAX_TASKS_PER_CHILD = int(os.environ.get('TASK_QUEUE_MAX_TASKS_PER_CHILD', 50))
 
-class TaskStatus(Enum):
-    PENDING = "pending"
-    RUNNING = "running"
-    COMPLETED = "completed"
-    FAILED = "failed"
+# Imported once per process worker so the first task doesn't pay for it
+PRELOAD_MODULES = (
+    'lxml.etree',
+    'PIL.Image',
+    'pptx',
+    'pptx_xml_cloner',
+    'pptx_generator',
+)
 
 
-@dataclass
-class Task:
-    id: str
-    status: TaskStatus = TaskStatus.PENDING
-    result: Any = None
-    error: Optional[str] = None
-    progress: int = 0
-    created_at: datetime = field(default_factory=datetime.utcnow)
-    started_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
+def _preload_worker(modules: Iterable[str]) -> None:
+    """Process pool initializer: import heavy modules up front."""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"⚠️ Worker {os.getpid()} could not preload {module}: {e}")
+
+
+def _warm_up_worker() -> int:
+    """No-op task used to spawn and initialize process workers."""
+    return os.getpid()
+
+
+class TaskProgress:
+    """
+    Progress callback handed to task functions as `progress_callback`.
     
-    def to_dict(self) -> dict:
-        return {
-            "id": self.id,
-            "status": self.status.value,
-            "progress": self.progress,
-            "error": self.error,
-            "created_at": self.created_at.isoformat(),
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None
+    The cloner and renderers call it as progress(current, total) once per
+    slide. It is picklable whenever its sink is, so it works in process
+    workers too. Reports at most 99%; 100% is set when the task completes.
+    """
+    
+    def __init__(self, task_id: str, sink: Callable[[str, int], None]):
+        self.task_id = task_id
+        self.sink = sink
+        self._last = -1
+    
+    def __call__(self, current: int, total: int) -> None:
+        if total <= 0:
+            return
+        percent = max(0, min(99, int(current * 100 / total)))
+        if percent == self._last:
+            return
+        self._last = percent
+        try:
+            self.sink(self.task_id, percent)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not report progress for task {self.task_id}: {e}")
+
+
+class QueueProgressSink:
+    """Sends progress from process workers back through a Manager queue."""
+    
+    def __init__(self, queue):
+        self.queue = queue
+    
+    def __call__(self, task_id: str, percent: int) -> None:
+        self.queue.put((task_id, percent))
+
+
+def accepts_progress(func: Callable) -> bool:
+    """Whether a task function takes a `progress_callback` argument."""
+    try:
+        return 'progress_callback' in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+class ExecutorBackend:
+    """
+    Wraps a concurrent.futures executor and tracks its utilization.
+    Subclasses only decide how the executor is built.
+    """
+    
+    name = "base"
+    
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.max_workers = max_workers
+        self.executor = self._create_executor()
+        self._lock = threading.Lock()
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+        self._started_at = time.monotonic()
+    
+    def _create_executor(self):
+        raise NotImplementedError
+    
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) on the executor and await the result."""
+        call = functools.partial(func, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        
+        with self._lock:
+            self._active += 1
+            self._submitted += 1
+        started = time.monotonic()
+        
+        try:
+            result = await loop.run_in_executor(self.executor, call)
+            with self._lock:
+                self._completed += 1
+            return result
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._busy_seconds += time.monotonic() - started
+    
+    def warm_up(self) -> None:
+        """Start workers ahead of the first task (no-op for threads)."""
+    
+    def progress_sink(self, store) -> Callable[[str, int], None]:
+        """Where task progress is written; threads update the store directly."""
+        return store.set_progress
+    
+    def get_stats(self) -> dict:
+        """Utilization snapshot for get_queue_status."""
+        with self._lock:
+            uptime = max(time.monotonic() - self._started_at, 1e-9)
+            return {
+                "workers": self.max_workers,
+                "active": self._active,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "utilization": round(self._active / self.max_workers, 3),
+                "busy_ratio": round(min(1.0, self._busy_seconds / (uptime * self.max_workers)), 3)
+            }
+    
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+
+
+class ThreadBackend(ExecutorBackend):
+    """Thread pool backend (shares memory and caches with the app)."""
+    
+    name = "thread"
+    
+    def _create_executor(self):
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task-queue")
+
+
+class ProcessBackend(ExecutorBackend):
+    """
+    Process pool backend for GIL-bound work.
+    
+    Workers are spawned (not forked, so no inherited locks or event loop),
+    preload PRELOAD_MODULES in their initializer and are recycled after
+    `max_tasks_per_child` tasks to cap memory growth. Task functions and
+    their arguments must be picklable (module-level functions).
+    """
+    
+    name = "process"
+    
+    def __init__(self, max_workers: int = MAX_WORKERS,
+                 max_tasks_per_child: int = MAX_TASKS_PER_CHILD,
+                 preload_modules: Iterable[str] = PRELOAD_MODULES):
+        self.max_tasks_per_child = max_tasks_per_child
+        self.preload_modules = tuple(preload_modules)
+        self._restarts = 0
+        self._manager = None
+        self._progress_queue = None
+        self._progress_store = None
+        super().__init__(max_workers)
+    
+    def _create_executor(self):
+        options = {
+            "max_workers": self.max_workers,
+            "mp_context": multiprocessing.get_context("spawn"),
+            "initializer": _preload_worker,
+            "initargs": (self.preload_modules,),
         }
+        # max_tasks_per_child is available from Python 3.11
+        if self.max_tasks_per_child and sys.version_info >= (3, 11):
+            options["max_tasks_per_child"] = self.max_tasks_per_child
+        return ProcessPoolExecutor(**options)
+    
+    def progress_sink(self, store) -> Callable[[str, int], None]:
+        """
+        The durable store is shared, so workers write to it directly; the
+        in-memory store lives in this process, so progress is relayed
+        through a Manager queue and applied while the task runs.
+        """
+        if store.durable:
+            return store.set_progress
+        with self._lock:
+            if self._progress_queue is None:
+                self._manager = multiprocessing.get_context("spawn").Manager()
+                self._progress_queue = self._manager.Queue()
+            self._progress_store = store
+        return QueueProgressSink(self._progress_queue)
+    
+    async def _relay_progress(self) -> None:
+        while True:
+            self._drain_progress()
+            await asyncio.sleep(0.2)
+    
+    def _drain_progress(self) -> None:
+        try:
+            while not self._progress_queue.empty():
+                task_id, percent = self._progress_queue.get_nowait()
+                self._progress_store.set_progress(task_id, percent)
+        except Exception as e:
+            logger.warning(f"⚠️ Progress relay error: {e}")
+    
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        relay = None
+        if self._progress_queue is not None:
+            relay = asyncio.create_task(self._relay_progress())
+        
+        try:
+            return await super().run(func, *args, **kwargs)
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault in a native lib): rebuild the pool
+            logger.error("❌ Process pool broken, restarting workers")
+            with self._lock:
+                old_executor = self.executor
+                self.executor = self._create_executor()
+                self._restarts += 1
+            old_executor.shutdown(wait=False)
+            raise
+        finally:
+            if relay:
+                relay.cancel()
+                self._drain_progress()
+    
+    def warm_up(self) -> None:
+        """Spawn every worker now so preloading happens before real tasks."""
+        futures = [self.executor.submit(_warm_up_worker) for _ in range(self.max_workers)]
+        pids = {future.result() for future in futures}
+        logger.info(f"🔥 Process pool warmed up: {len(pids)} workers")
+    
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        stats["max_tasks_per_child"] = self.max_tasks_per_child
+        stats["restarts"] = self._restarts
+        return stats
+    
+    def shutdown(self, wait: bool = True) -> None:
+        super().shutdown(wait=wait)
+        if self._manager:
+            self._manager.shutdown()
+            self._manager = None
+            self._progress_queue = None
+
+
+EXECUTOR_BACKENDS = {
+    ThreadBackend.name: ThreadBackend,
+    ProcessBackend.name: ProcessBackend,
+}
+
+
+def create_backend(name: str, max_workers: int = MAX_WORKERS) -> ExecutorBackend:
+    """Build an executor backend by name ("thread" or "process")."""
+    if name not in EXECUTOR_BACKENDS:
+        raise ValueError(f"Unknown task queue backend: {name!r}")
+    return EXECUTOR_BACKENDS[name](max_workers=max_workers)
+
+
+def create_store(name: str):
+    """Build a task store by name ("memory" or "sqlite")."""
+    if name == 'memory':
+        return MemoryTaskStore()
+    if name == 'sqlite':
+        return SQLiteTaskStore()
+    raise ValueError(f"Unknown task queue store: {name!r}")
+
+
+def callable_path(func: Callable) -> str:
+    """'module:qualname' reference that another process can import."""
+    if '<' in func.__qualname__:
+        raise ValueError(f"{func!r} is not importable; durable tasks need module-level functions")
+    return f"{func.__module__}:{func.__qualname__}"
+
+
+def resolve_callable(path: str) -> Callable:
+    """Inverse of callable_path."""
+    module_name, qualname = path.split(':', 1)
+    target = importlib.import_module(module_name)
+    for attr in qualname.split('.'):
+        target = getattr(target, attr)
+    return target
 
 
 class TaskQueue:
     """
-    In-memory task queue with async execution.
+    Task queue with async execution.
     
     Features:
     - Non-blocking execution of heavy tasks
@@ -61,105 +357,261 @@ class TaskQueue:
     - Task status polling
     - Automatic cleanup of old tasks
     - Concurrency limiting
+    - Optional durable store: with TASK_QUEUE_STORE=sqlite, submitted tasks
+      survive restarts and are claimed by whichever uvicorn worker is free
     """
     
-    def __init__(self, max_concurrent: int = MAX_WORKERS):
-        self.tasks: Dict[str, Task] = {}
+    def __init__(self, max_concurrent: int = MAX_WORKERS,
+                 backend: Optional[ExecutorBackend] = None,
+                 store=None):
+        self.store = store or create_store(TASK_QUEUE_STORE)
+        self.max_concurrent = max_concurrent
         self.semaphore = asyncio.Semaphore(max_concurrent)
         self._cleanup_interval = 300  # 5 minutes
         self._task_ttl = 3600  # 1 hour
+        
+        self.backends: Dict[str, ExecutorBackend] = {}
+        default = backend or create_backend(TASK_QUEUE_BACKEND, max_concurrent)
+        self.default_backend = default.name
+        self.register_backend(default)
+        
+        self.worker_id = worker_id()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._heartbeat: Optional[threading.Thread] = None
+        self._heartbeat_stop = threading.Event()
+        self._claimed = 0
+    
+    @property
+    def tasks(self) -> Dict[str, Task]:
+        """Tasks held in memory (empty for the durable store)."""
+        return getattr(self.store, 'tasks', {})
+    
+    def register_backend(self, backend: ExecutorBackend) -> None:
+        """Add (or replace) an executor backend, addressable by its name."""
+        previous = self.backends.get(backend.name)
+        self.backends[backend.name] = backend
+        if previous and previous is not backend:
+            previous.shutdown(wait=False)
+    
+    def get_backend(self, name: Optional[str] = None) -> ExecutorBackend:
+        """Return a backend by name, creating it on first use."""
+        name = name or self.default_backend
+        if name not in self.backends:
+            self.register_backend(create_backend(name, self.max_concurrent))
+        return self.backends[name]
+    
+    def warm_up(self) -> None:
+        """Start the workers of every registered backend."""
+        for backend in self.backends.values():
+            backend.warm_up()
+    
+    def shutdown(self, wait: bool = True) -> None:
+        for backend in self.backends.values():
+            backend.shutdown(wait=wait)
+    
+    async def start(self) -> None:
+        """Start claiming tasks from the durable store (no-op in memory mode)."""
+        if not self.store.durable or self._dispatcher:
+            return
+        recovered = self.store.requeue_stale()
+        if recovered:
+            logger.warning(f"♻️ Recovered {recovered} tasks from dead workers")
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        self._heartbeat_stop.clear()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="task-heartbeat", daemon=True)
+        self._heartbeat.start()
+        logger.info(f"📡 Task dispatcher started on worker {self.worker_id}")
+    
+    async def stop(self) -> None:
+        """Stop claiming new tasks. Tasks left running are requeued once stale."""
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if self._heartbeat:
+            self._heartbeat_stop.set()
+            await asyncio.to_thread(self._heartbeat.join)
+            self._heartbeat = None
     
     def create_task(self) -> Task:
         """Create a new task and return its ID."""
         task_id = str(uuid.uuid4())[:8]
         task = Task(id=task_id)
-        self.tasks[task_id] = task
+        self.store.add(task)
         logger.info(f"📋 Task created: {task_id}")
         return task
     
+    def submit(self, func: Callable, *args, backend: Optional[str] = None, **kwargs) -> Task:
+        """
+        Create a task for func(*args, **kwargs) and schedule it.
+        
+        With the durable store the call is persisted (func must be a
+        module-level function and the arguments JSON-serializable) and any
+        worker may run it; otherwise it runs on this worker's event loop.
+        """
+        task = Task(id=str(uuid.uuid4())[:8])
+        
+        if self.store.durable:
+            self.store.add(task, callable_path(func), args, kwargs, backend)
+            if self._wakeup:
+                self._wakeup.set()
+        else:
+            self.store.add(task)
+            asyncio.create_task(self.run_in_background(task.id, func, *args, backend=backend, **kwargs))
+        
+        logger.info(f"📋 Task submitted: {task.id}")
+        return task
+    
     def get_task(self, task_id: str) -> Optional[Task]:
         """Get task by ID."""
-        return self.tasks.get(task_id)
+        return self.store.get(task_id)
     
     def update_progress(self, task_id: str, progress: int):
         """Update task progress (0-100)."""
-        if task_id in self.tasks:
-            self.tasks[task_id].progress = min(100, max(0, progress))
+        self.store.set_progress(task_id, min(100, max(0, progress)))
     
     async def run_in_background(
         self, 
         task_id: str, 
         func: Callable, 
         *args, 
+        backend: Optional[str] = None,
         **kwargs
     ) -> None:
         """
-        Run a CPU-bound function in thread pool without blocking.
+        Run a CPU-bound function on an executor backend without blocking.
         
         Args:
             task_id: Task ID to track
-            func: Synchronous function to execute
+            func: Synchronous function to execute (module-level for "process")
             *args, **kwargs: Arguments to pass to func
+            backend: Backend name; defaults to TASK_QUEUE_BACKEND
         """
-        task = self.tasks.get(task_id)
+        task = self.store.get(task_id)
         if not task:
             logger.error(f"Task {task_id} not found")
             return
         
+        await self._execute(task, func, args, kwargs, backend)
+    
+    async def _execute(self, task: Task, func: Callable, args, kwargs, backend: Optional[str]) -> None:
         async with self.semaphore:  # Limit concurrent tasks
             try:
                 task.status = TaskStatus.RUNNING
-                task.started_at = datetime.utcnow()
-                logger.info(f"🚀 Task {task_id} started")
+                task.started_at = task.started_at or datetime.utcnow()
+                self.store.save(task)
+                logger.info(f"🚀 Task {task.id} started")
+                
+                runner = self.get_backend(backend)
                 
-                # Run CPU-bound work in thread pool
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(executor, func, *args)
+                # Task functions that take a progress_callback report per slide
+                if accepts_progress(func) and 'progress_callback' not in kwargs:
+                    progress = TaskProgress(task.id, runner.progress_sink(self.store))
+                    kwargs = dict(kwargs, progress_callback=progress)
+                
+                # Run CPU-bound work off the event loop
+                result = await runner.run(func, *args, **kwargs)
                 
                 task.result = result
                 task.status = TaskStatus.COMPLETED
                 task.progress = 100
                 task.completed_at = datetime.utcnow()
+                self.store.save(task)
                 
                 duration = (task.completed_at - task.started_at).total_seconds()
-                logger.info(f"✅ Task {task_id} completed in {duration:.2f}s")
+                logger.info(f"✅ Task {task.id} completed in {duration:.2f}s")
                 
             except Exception as e:
+                # Keep the last progress the task reported, not the value it started with
+                latest = self.store.get(task.id)
+                if latest is not None:
+                    task.progress = latest.progress
                 task.status = TaskStatus.FAILED
                 task.error = str(e)
                 task.completed_at = datetime.utcnow()
-                logger.error(f"❌ Task {task_id} failed: {e}")
+                self.store.save(task)
+                logger.error(f"❌ Task {task.id} failed: {e}")
+    
+    async def _dispatch_loop(self) -> None:
+        """Claim pending tasks from the durable store while there is capacity."""
+        last_maintenance = 0.0
+        
+        while True:
+            try:
+                if time.monotonic() - last_maintenance > self._cleanup_interval:
+                    self.store.requeue_stale()
+                    await self.cleanup_old_tasks()
+                    last_maintenance = time.monotonic()
+                
+                while self._claimed < self.max_concurrent:
+                    claimed = self.store.claim_next(self.worker_id)
+                    if not claimed:
+                        break
+                    self._claimed += 1
+                    asyncio.create_task(self._run_claimed(*claimed))
+            
+            except Exception as e:
+                logger.error(f"❌ Task dispatcher error: {e}")
+            
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), TASK_QUEUE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    
+    def _heartbeat_loop(self) -> None:
+        """Keep this worker's running tasks alive, independently of the event loop."""
+        while True:
+            try:
+                self.store.heartbeat(self.worker_id)
+            except Exception as e:
+                logger.error(f"❌ Task heartbeat error: {e}")
+            if self._heartbeat_stop.wait(TASK_HEARTBEAT_INTERVAL):
+                return
+    
+    async def _run_claimed(self, task: Task, func_path: str, args, kwargs, backend) -> None:
+        try:
+            func = resolve_callable(func_path)
+        except Exception as e:
+            task.status = TaskStatus.FAILED
+            task.error = f"Cannot load {func_path}: {e}"
+            task.completed_at = datetime.utcnow()
+            self.store.save(task)
+        else:
+            await self._execute(task, func, args, kwargs, backend)
+        finally:
+            self._claimed -= 1
+            self._wakeup.set()
     
     async def cleanup_old_tasks(self):
         """Remove completed tasks older than TTL."""
-        now = datetime.utcnow()
-        to_remove = []
-        
-        for task_id, task in self.tasks.items():
-            if task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
-                if task.completed_at:
-                    age = (now - task.completed_at).total_seconds()
-                    if age > self._task_ttl:
-                        to_remove.append(task_id)
+        cutoff = datetime.utcnow() - timedelta(seconds=self._task_ttl)
         
-        for task_id in to_remove:
-            del self.tasks[task_id]
+        for task_id in self.store.delete_finished_before(cutoff):
             logger.info(f"🗑️ Cleaned up old task: {task_id}")
     
     def get_queue_status(self) -> dict:
         """Get current queue statistics."""
-        pending = sum(1 for t in self.tasks.values() if t.status == TaskStatus.PENDING)
-        running = sum(1 for t in self.tasks.values() if t.status == TaskStatus.RUNNING)
-        completed = sum(1 for t in self.tasks.values() if t.status == TaskStatus.COMPLETED)
-        failed = sum(1 for t in self.tasks.values() if t.status == TaskStatus.FAILED)
+        counts = self.store.count_by_status()
         
         return {
-            "pending": pending,
-            "running": running,
-            "completed": completed,
-            "failed": failed,
-            "total": len(self.tasks),
-            "max_concurrent": MAX_WORKERS
+            "pending": counts[TaskStatus.PENDING.value],
+            "running": counts[TaskStatus.RUNNING.value],
+            "completed": counts[TaskStatus.COMPLETED.value],
+            "failed": counts[TaskStatus.FAILED.value],
+            "total": sum(counts.values()),
+            "max_concurrent": self.max_concurrent,
+            "store": "sqlite" if self.store.durable else "memory",
+            "worker_id": self.worker_id,
+            "default_backend": self.default_backend,
+            "backends": {
+                name: backend.get_stats() for name, backend in self.backends.items()
+            }
         }
 
 
@@ -168,27 +620,32 @@ task_queue = TaskQueue()
 
 
 # Convenience functions for common heavy operations
-def generate_pptx_sync(template_path: str, content: dict, output_path: str) -> str:
+def generate_pptx_sync(template_path: str, content: dict, output_path: str,
+                       progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
     """
-    Synchronous PPTX generation (runs in thread pool).
+    Synchronous PPTX generation (runs on the task queue backend).
     This is the CPU-bound work that would block the event loop.
     """
     from pptx_generator import generate_presentation
-    return generate_presentation(template_path, content)
+    return generate_presentation(template_path, content, progress_callback=progress_callback)
 
 
-def convert_slides_sync(pptx_path: str) -> list:
+def convert_slides_sync(pptx_path: str,
+                        progress_callback: Optional[Callable[[int, int], None]] = None,
+                        slide_indices: Optional[List[int]] = None) -> list:
     """
-    Synchronous slide conversion (runs in thread pool).
-    LibreOffice conversion is CPU-bound.
+    Synchronous slide conversion (runs on the task queue backend).
+    LibreOffice conversion is CPU-bound; pass slide_indices to render only
+    those slides.
     """
     from pptx_to_images import convert_pptx_to_images
-    return convert_pptx_to_images(pptx_path)
+    return convert_pptx_to_images(pptx_path, progress_callback=progress_callback,
+                                  slide_indices=slide_indices)
 
 
 def analyze_template_sync(pptx_path: str) -> dict:
     """
-    Synchronous template analysis (runs in thread pool).
+    Synchronous template analysis (runs on the task queue backend).
     """
     from pptx_analyzer import analyze_presentation
     return analyze_presentation(pptx_path)
@@ -0,0 +1,315 @@
+"""
+Task state storage for the task queue.
+
+- MemoryTaskStore: tasks live in a dict inside one process (original behaviour).
+- SQLiteTaskStore: tasks live in a separate SQLite file in WAL mode, so they
+  survive restarts and any uvicorn worker can enqueue, claim and report on them.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+# SQLite file for the durable store (kept apart from presentations.db so the
+# queue's frequent writes never contend with the mapping cache)
+TASK_QUEUE_DB = os.environ.get('TASK_QUEUE_DB', 'tasks.db')
+
+# Running tasks whose worker has not sent a heartbeat for this long are requeued
+# (workers send one every TASK_HEARTBEAT_INTERVAL seconds from a thread of
+# their own, see core/task_queue.py)
+TASK_STALE_SECONDS = int(os.environ.get('TASK_STALE_SECONDS', 120))
+
+# A task is failed instead of requeued after this many claims
+TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', 3))
+
+
+class TaskStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class Task:
+    id: str
+    status: TaskStatus = TaskStatus.PENDING
+    result: Any = None
+    error: Optional[str] = None
+    progress: int = 0
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status.value,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+def worker_id() -> str:
+    """Identify this process among all uvicorn workers."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class MemoryTaskStore:
+    """In-process task store. Tasks are only visible to this worker."""
+    
+    durable = False
+    
+    def __init__(self):
+        self.tasks: Dict[str, Task] = {}
+    
+    def add(self, task: Task, func: Optional[str] = None, args: Tuple = (),
+            kwargs: Optional[Dict[str, Any]] = None, backend: Optional[str] = None) -> None:
+        self.tasks[task.id] = task
+    
+    def get(self, task_id: str) -> Optional[Task]:
+        return self.tasks.get(task_id)
+    
+    def save(self, task: Task) -> None:
+        self.tasks[task.id] = task
+    
+    def set_progress(self, task_id: str, progress: int) -> None:
+        if task_id in self.tasks:
+            self.tasks[task_id].progress = progress
+    
+    def delete_finished_before(self, cutoff: datetime) -> List[str]:
+        removed = [
+            task_id for task_id, task in self.tasks.items()
+            if task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED)
+            and task.completed_at and task.completed_at < cutoff
+        ]
+        for task_id in removed:
+            del self.tasks[task_id]
+        return removed
+    
+    def count_by_status(self) -> Dict[str, int]:
+        counts = {status.value: 0 for status in TaskStatus}
+        for task in self.tasks.values():
+            counts[task.status.value] += 1
+        return counts
+
+
+class SQLiteTaskStore:
+    """
+    Durable task store shared by every worker process on the host.
+    
+    Pending tasks carry the dotted path of their function and JSON-encoded
+    arguments, so whichever worker claims them can run them. Claims happen
+    inside BEGIN IMMEDIATE transactions, so a task is claimed exactly once.
+    """
+    
+    durable = True
+    
+    def __init__(self, db_path: str = TASK_QUEUE_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._init_tables()
+    
+    def __getstate__(self):
+        # Picklable for process workers: they open their own connections
+        return {'db_path': self.db_path}
+    
+    def __setstate__(self, state):
+        self.db_path = state['db_path']
+        self._local = threading.local()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run alongside a writer."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def _init_tables(self) -> None:
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                func TEXT,
+                args TEXT,
+                kwargs TEXT,
+                backend TEXT,
+                result TEXT,
+                error TEXT,
+                progress INTEGER DEFAULT 0,
+                attempts INTEGER DEFAULT 0,
+                claimed_by TEXT,
+                heartbeat_at TIMESTAMP,
+                created_at TIMESTAMP NOT NULL,
+                started_at TIMESTAMP,
+                completed_at TIMESTAMP
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tasks_status_created
+            ON tasks(status, created_at)
+        ''')
+    
+    def add(self, task: Task, func: Optional[str] = None, args: Tuple = (),
+            kwargs: Optional[Dict[str, Any]] = None, backend: Optional[str] = None) -> None:
+        """Insert a new task; `func` is a 'module:qualname' path for remote workers."""
+        self._connect().execute('''
+            INSERT INTO tasks (id, status, func, args, kwargs, backend, progress, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            task.id,
+            task.status.value,
+            func,
+            json.dumps(list(args)),
+            json.dumps(kwargs or {}),
+            backend,
+            task.progress,
+            task.created_at.isoformat()
+        ))
+    
+    def get(self, task_id: str) -> Optional[Task]:
+        row = self._connect().execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
+        return self._row_to_task(row) if row else None
+    
+    def save(self, task: Task) -> None:
+        """Persist status, result and timestamps of a task."""
+        self._connect().execute('''
+            UPDATE tasks
+            SET status = ?, result = ?, error = ?, progress = ?, started_at = ?, completed_at = ?
+            WHERE id = ?
+        ''', (
+            task.status.value,
+            json.dumps(task.result) if task.result is not None else None,
+            task.error,
+            task.progress,
+            task.started_at.isoformat() if task.started_at else None,
+            task.completed_at.isoformat() if task.completed_at else None,
+            task.id
+        ))
+    
+    def set_progress(self, task_id: str, progress: int) -> None:
+        self._connect().execute('UPDATE tasks SET progress = ? WHERE id = ?', (progress, task_id))
+    
+    def claim_next(self, owner: str) -> Optional[Tuple[Task, str, list, dict, Optional[str]]]:
+        """
+        Atomically claim the oldest pending task.
+        
+        Returns:
+            (task, func_path, args, kwargs, backend) or None if nothing is pending
+        """
+        conn = self._connect()
+        now = datetime.utcnow().isoformat()
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('''
+                SELECT * FROM tasks
+                WHERE status = ? AND func IS NOT NULL
+                ORDER BY created_at
+                LIMIT 1
+            ''', (TaskStatus.PENDING.value,)).fetchone()
+            
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            
+            conn.execute('''
+                UPDATE tasks
+                SET status = ?, claimed_by = ?, heartbeat_at = ?, started_at = ?,
+                    attempts = attempts + 1
+                WHERE id = ?
+            ''', (TaskStatus.RUNNING.value, owner, now, now, row['id']))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        
+        task = self._row_to_task(row)
+        task.status = TaskStatus.RUNNING
+        task.started_at = datetime.fromisoformat(now)
+        return task, row['func'], json.loads(row['args']), json.loads(row['kwargs']), row['backend']
+    
+    def heartbeat(self, owner: str) -> None:
+        """Mark every task this worker is running as still alive."""
+        self._connect().execute('''
+            UPDATE tasks SET heartbeat_at = ?
+            WHERE claimed_by = ? AND status = ?
+        ''', (datetime.utcnow().isoformat(), owner, TaskStatus.RUNNING.value))
+    
+    def requeue_stale(self, stale_seconds: int = TASK_STALE_SECONDS,
+                      max_attempts: int = TASK_MAX_ATTEMPTS) -> int:
+        """
+        Recover tasks whose worker died (restart, crash, OOM kill).
+        
+        Returns:
+            Number of tasks requeued or failed
+        """
+        conn = self._connect()
+        cutoff = (datetime.utcnow() - timedelta(seconds=stale_seconds)).isoformat()
+        now = datetime.utcnow().isoformat()
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            failed = conn.execute('''
+                UPDATE tasks
+                SET status = ?, error = ?, completed_at = ?, claimed_by = NULL
+                WHERE status = ? AND heartbeat_at < ? AND attempts >= ?
+            ''', (TaskStatus.FAILED.value, 'Worker lost while running task', now,
+                  TaskStatus.RUNNING.value, cutoff, max_attempts)).rowcount
+            requeued = conn.execute('''
+                UPDATE tasks
+                SET status = ?, claimed_by = NULL, started_at = NULL, progress = 0
+                WHERE status = ? AND heartbeat_at < ? AND func IS NOT NULL
+            ''', (TaskStatus.PENDING.value, TaskStatus.RUNNING.value, cutoff)).rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        
+        return failed + requeued
+    
+    def delete_finished_before(self, cutoff: datetime) -> List[str]:
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT id FROM tasks
+            WHERE status IN (?, ?) AND completed_at < ?
+        ''', (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, cutoff.isoformat())).fetchall()
+        removed = [row['id'] for row in rows]
+        if removed:
+            conn.executemany('DELETE FROM tasks WHERE id = ?', [(task_id,) for task_id in removed])
+        return removed
+    
+    def count_by_status(self) -> Dict[str, int]:
+        counts = {status.value: 0 for status in TaskStatus}
+        for row in self._connect().execute('SELECT status, COUNT(*) AS n FROM tasks GROUP BY status'):
+            counts[row['status']] = row['n']
+        return counts
+    
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> Task:
+        def parse_time(value):
+            return datetime.fromisoformat(value) if value else None
+        
+        return Task(
+            id=row['id'],
+            status=TaskStatus(row['status']),
+            result=json.loads(row['result']) if row['result'] is not None else None,
+            error=row['error'],
+            progress=row['progress'] or 0,
+            created_at=parse_time(row['created_at']),
+            started_at=parse_time(row['started_at']),
+            completed_at=parse_time(row['completed_at'])
+        )
@@ -69,6 +69,7 @@ class PresentationDB:
             CREATE TABLE IF NOT EXISTS template_mappings (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 template_hash TEXT NOT NULL,
+                slide_index INTEGER DEFAULT 0,
                 element_id TEXT NOT NULL,
                 shape_id INTEGER,
                 purpose TEXT NOT NULL,
@@ -94,6 +95,16 @@ class PresentationDB:
             ON corporate_templates(hash)
         ''')
         
+        # Slides analizados de cada template (aunque no tengan detecciones)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS template_slides (
+                template_hash TEXT NOT NULL,
+                slide_index INTEGER NOT NULL,
+                analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (template_hash, slide_index)
+            )
+        ''')
+        
         conn.commit()
         conn.close()
         print("✅ Base de datos inicializada")
@@ -1,7 +1,7 @@
 """
 Procesador de imágenes para remover fondos blancos y aplicar color de fondo del slide
 """
-from PIL import Image, ImageChops
+from PIL import Image, ImageChops, ImageMath
 import io
 import base64
 from typing import Tuple
@@ -11,6 +11,30 @@ def hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
+
+def _replace_masked(img: Image.Image, mask: Image.Image, bg_color: Tuple[int, int, int]) -> Image.Image:
+    """
+    Reemplaza el RGB de los pixels donde mask == 255 por bg_color,
+    conservando el canal alpha original.
+    
+    La máscara solo tiene valores 0/255, así que composite copia los
+    pixels tal cual (sin mezclar) y el resultado es idéntico pixel a pixel
+    al reemplazo en un bucle de Python.
+    """
+    alpha = img.getchannel('A')
+    background = Image.merge('RGBA', (
+        Image.new('L', img.size, bg_color[0]),
+        Image.new('L', img.size, bg_color[1]),
+        Image.new('L', img.size, bg_color[2]),
+        alpha
+    ))
+    return Image.composite(background, img, mask)
+
+
+def _threshold_mask(band: Image.Image, threshold: int) -> Image.Image:
+    """Máscara L con 255 donde band > threshold y 0 en el resto"""
+    return band.point([255 if value > threshold else 0 for value in range(256)])
+
 def remove_white_background(image_base64: str, bg_color_hex: str, threshold: int = 240) -> str:
     """
     Remueve el fondo blanco de una imagen y lo reemplaza con el color del slide
@@ -35,27 +59,18 @@ def remove_white_background(image_base64: str, bg_color_hex: str, threshold: int
         if img.mode != 'RGBA':
             img = img.convert('RGBA')
         
-        # Obtener datos de la imagen
-        data = img.getdata()
-        
         # Color de fondo del slide
         bg_color = hex_to_rgb(bg_color_hex)
         
-        # Nueva lista de pixels
-        new_data = []
+        # Máscara de pixels casi blancos (R, G, B > threshold), por bandas
+        r, g, b, _ = img.split()
+        mask = ImageChops.darker(
+            ImageChops.darker(_threshold_mask(r, threshold), _threshold_mask(g, threshold)),
+            _threshold_mask(b, threshold)
+        )
         
-        for item in data:
-            # Si el pixel es casi blanco (R, G, B > threshold)
-            if item[0] > threshold and item[1] > threshold and item[2] > threshold:
-                # Reemplazar con el color de fondo del slide (mantener alpha si existe)
-                alpha = item[3] if len(item) > 3 else 255
-                new_data.append((*bg_color, alpha))
-            else:
-                # Mantener el pixel original
-                new_data.append(item)
-        
-        # Actualizar imagen
-        img.putdata(new_data)
+        # Reemplazar con el color de fondo del slide (manteniendo alpha)
+        img = _replace_masked(img, mask, bg_color)
         
         # Convertir de vuelta a base64
         buffer = io.BytesIO()
@@ -70,6 +85,37 @@ def remove_white_background(image_base64: str, bg_color_hex: str, threshold: int
         return image_base64 if image_base64.startswith('data:') else f"data:image/png;base64,{image_base64}"
 
 
+def smart_background_removal_bytes(image_bytes: bytes, bg_color_hex: str) -> bytes:
+    """
+    Igual que smart_background_removal pero sobre bytes crudos
+    Devuelve el PNG procesado; lanza excepción si la imagen no es válida
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    
+    # Convertir a RGBA
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    
+    # Obtener color de fondo
+    bg_color = hex_to_rgb(bg_color_hex)
+    
+    # Máscara de fondo blanco: "blancura" (R+G+B)/3 > 240 y alpha > 200.
+    # Se evalúa como R+G+B > 720 sobre bandas enteras de 32 bits para
+    # no perder precisión al sumar.
+    r, g, b, a = img.split()
+    mask = ImageMath.eval(
+        "convert((((r + g + b) > 720) & (a > 200)) * 255, 'L')",
+        r=r, g=g, b=b, a=a
+    )
+    
+    # Reemplazar los pixels de fondo (manteniendo alpha)
+    img = _replace_masked(img, mask, bg_color)
+    
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
 def smart_background_removal(image_base64: str, bg_color_hex: str) -> str:
     """
     Remoción inteligente de fondo usando detección de bordes
@@ -81,42 +127,10 @@ def smart_background_removal(image_base64: str, bg_color_hex: str) -> str:
             image_base64 = image_base64.split(',')[1]
         
         image_data = base64.b64decode(image_base64)
-        img = Image.open(io.BytesIO(image_data))
-        
-        # Convertir a RGBA
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
-        
-        # Obtener color de fondo
-        bg_color = hex_to_rgb(bg_color_hex)
-        
-        # Crear máscara para detectar fondo blanco
-        # Convertir a escala de grises para análisis
-        gray = img.convert('L')
-        
-        # Crear nueva imagen con fondo reemplazado
-        data = img.getdata()
-        new_data = []
-        
-        for i, item in enumerate(data):
-            r, g, b = item[0], item[1], item[2]
-            alpha = item[3] if len(item) > 3 else 255
-            
-            # Calcular "blancura" del pixel
-            whiteness = (r + g + b) / 3
-            
-            # Si es muy blanco (>240) y tiene alpha alto, reemplazar
-            if whiteness > 240 and alpha > 200:
-                new_data.append((*bg_color, alpha))
-            else:
-                new_data.append(item)
-        
-        img.putdata(new_data)
+        processed = smart_background_removal_bytes(image_data, bg_color_hex)
         
         # Convertir a base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+        img_str = base64.b64encode(processed).decode()
         
         return f"data:image/png;base64,{img_str}"
         
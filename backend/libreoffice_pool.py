@@ -0,0 +1,553 @@
+"""
+Pool de workers LibreOffice de larga duración
+
+Cada conversión con `soffice --headless --convert-to` arranca LibreOffice
+desde cero (3-8 s). Este pool mantiene procesos soffice vivos, cada uno con
+su propio perfil aislado (-env:UserInstallation), de modo que varias
+conversiones pueden correr en paralelo sin pisarse el perfil.
+
+- Si la API UNO está disponible, cada worker es un soffice escuchando en
+  un puerto propio y las conversiones se hacen por UNO sobre ese proceso.
+- Si no, no hay ninguna instancia caliente: cada trabajo arranca un soffice
+  desde cero (el coste de arranque se paga siempre). El worker sólo
+  conserva su perfil ya inicializado, lo que evita crear el perfil en cada
+  arranque y que las conversiones concurrentes compartan perfil.
+  stats() lo refleja en 'warm_instances'.
+
+Los trabajos esperan en cola un worker libre (LIBREOFFICE_QUEUE_TIMEOUT),
+tienen un tiempo máximo de ejecución (LIBREOFFICE_JOB_TIMEOUT, al vencer se
+mata el proceso) y cada worker se reinicia tras LIBREOFFICE_MAX_JOBS_PER_WORKER
+conversiones o si falla el health check. Cada soffice corre en su propio
+grupo de procesos, y matarlo mata también los procesos que haya lanzado
+(soffice.bin), así un trabajo vencido libera su hilo enseguida.
+
+shutdown() detiene los workers y borra sus perfiles.
+"""
+
+import json
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+# Número de procesos soffice del pool
+LIBREOFFICE_POOL_SIZE = int(os.environ.get('LIBREOFFICE_POOL_SIZE', 2))
+
+# Conversiones antes de reciclar un worker (LibreOffice acumula memoria)
+LIBREOFFICE_MAX_JOBS_PER_WORKER = int(os.environ.get('LIBREOFFICE_MAX_JOBS_PER_WORKER', 50))
+
+# Tiempo máximo de una conversión (segundos)
+LIBREOFFICE_JOB_TIMEOUT = float(os.environ.get('LIBREOFFICE_JOB_TIMEOUT', 120))
+
+# Tiempo máximo esperando un worker libre (segundos)
+LIBREOFFICE_QUEUE_TIMEOUT = float(os.environ.get('LIBREOFFICE_QUEUE_TIMEOUT', 60))
+
+# Tiempo máximo de arranque de un worker (segundos)
+LIBREOFFICE_START_TIMEOUT = float(os.environ.get('LIBREOFFICE_START_TIMEOUT', 30))
+
+# Directorio de los perfiles aislados de cada worker
+LIBREOFFICE_PROFILE_ROOT = os.environ.get(
+    'LIBREOFFICE_PROFILE_ROOT',
+    os.path.join(tempfile.gettempdir(), 'lo_pool_profiles')
+)
+
+# Filtros de exportación de Impress por formato de salida
+EXPORT_FILTERS = {
+    'pdf': 'impress_pdf_Export',
+    'png': 'impress_png_Export',
+}
+
+
+class LibreOfficeError(Exception):
+    """Error en una conversión con LibreOffice"""
+
+
+class LibreOfficeTimeoutError(LibreOfficeError):
+    """La conversión superó el tiempo máximo y el worker fue reiniciado"""
+
+
+class PoolBusyError(LibreOfficeError):
+    """No hubo un worker libre dentro del tiempo de espera en cola"""
+
+
+def find_libreoffice() -> Optional[str]:
+    """Encuentra la ruta de LibreOffice en el sistema"""
+    possible_paths = [
+        r"C:\Program Files\LibreOffice\program\soffice.exe",
+        r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+        r"C:\Program Files\LibreOffice\program\soffice.com",
+        "/usr/bin/libreoffice",
+        "/usr/bin/soffice",
+        "/Applications/LibreOffice.app/Contents/MacOS/soffice"
+    ]
+    
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    
+    # Intentar encontrar en PATH
+    return shutil.which("soffice") or shutil.which("libreoffice")
+
+
+def uno_available() -> bool:
+    """Indica si se puede importar la API UNO (se evalúa en cada llamada)"""
+    try:
+        import uno  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _filter_options_json(filter_options: Dict[str, Any]) -> str:
+    """Opciones de filtro en la sintaxis JSON de --convert-to"""
+    options = {}
+    for name, value in filter_options.items():
+        if isinstance(value, bool):
+            options[name] = {"type": "boolean", "value": "true" if value else "false"}
+        elif isinstance(value, int):
+            options[name] = {"type": "long", "value": str(value)}
+        else:
+            options[name] = {"type": "string", "value": str(value)}
+    return json.dumps(options, separators=(',', ':'))
+
+
+# soffice lanza soffice.bin como hijo: cada proceso va en su propio grupo
+# para poder matar el árbol entero
+if os.name == 'nt':
+    _PROCESS_GROUP = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    _PROCESS_GROUP = {'start_new_session': True}
+
+
+def _kill_process_group(process: subprocess.Popen) -> None:
+    """Mata un proceso lanzado con _PROCESS_GROUP y todos sus descendientes"""
+    if os.name == 'nt':
+        if process.poll() is None:
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        # El grupo puede seguir vivo aunque el líder ya haya terminado
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        pass
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _port_open(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(1)
+        return s.connect_ex(('127.0.0.1', port)) == 0
+
+
+class LibreOfficeWorker:
+    """
+    Un proceso soffice con perfil aislado.
+    
+    En modo UNO el proceso queda escuchando en `port`; en modo subprocess
+    no hay proceso caliente: sólo existe mientras dura cada conversión.
+    """
+    
+    def __init__(self, index: int, soffice_path: str, profile_root: str, use_uno: bool):
+        self.index = index
+        self.soffice_path = soffice_path
+        self.use_uno = use_uno
+        self.profile_dir = os.path.join(profile_root, f"worker_{os.getpid()}_{index}")
+        self.port: Optional[int] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.jobs_done = 0
+        self.restarts = 0
+        self.started = False
+        self._job_process: Optional[subprocess.Popen] = None
+    
+    @property
+    def profile_url(self) -> str:
+        return Path(self.profile_dir).absolute().as_uri()
+    
+    def _base_cmd(self) -> List[str]:
+        return [
+            self.soffice_path,
+            f"-env:UserInstallation={self.profile_url}",
+            "--headless",
+            "--invisible",
+            "--norestore",
+            "--nologo",
+            "--nodefault",
+            "--nofirststartwizard",
+        ]
+    
+    def start(self, timeout: float = LIBREOFFICE_START_TIMEOUT) -> None:
+        """Arranca el proceso (sólo modo UNO) y espera a que acepte conexiones"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.jobs_done = 0
+        self.started = True
+        if not self.use_uno:
+            return
+        
+        self.port = _free_port()
+        cmd = self._base_cmd() + [
+            f"--accept=socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        ]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **_PROCESS_GROUP)
+        
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise LibreOfficeError(f"soffice terminó al arrancar (código {self.process.returncode})")
+            if _port_open(self.port):
+                print(f"   ✅ Worker LibreOffice #{self.index} listo en puerto {self.port}")
+                return
+            time.sleep(0.25)
+        
+        self.kill()
+        raise LibreOfficeError(f"Timeout arrancando worker LibreOffice #{self.index}")
+    
+    def is_healthy(self) -> bool:
+        """Health check: el proceso sigue vivo y acepta conexiones"""
+        if not self.use_uno:
+            return os.path.isdir(self.profile_dir)
+        return (
+            self.process is not None
+            and self.process.poll() is None
+            and self.port is not None
+            and _port_open(self.port)
+        )
+    
+    @property
+    def warm(self) -> bool:
+        """Hay un soffice arrancado esperando trabajos (sólo modo UNO)"""
+        return self.process is not None and self.process.poll() is None
+    
+    def kill(self) -> None:
+        """Mata el proceso del worker y cualquier conversión en curso, con sus hijos"""
+        for process in (self._job_process, self.process):
+            if process is not None:
+                _kill_process_group(process)
+        self.process = None
+        self._job_process = None
+    
+    def restart(self) -> None:
+        """Mata el proceso (si lo hay) y arranca uno nuevo"""
+        if self.started:
+            self.restarts += 1
+        self.kill()
+        self.start()
+    
+    def stop(self) -> None:
+        """Mata el proceso y borra el perfil del worker"""
+        self.kill()
+        self.started = False
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+    
+    def desktop(self):
+        """Objeto Desktop de UNO conectado a este worker"""
+        if not self.use_uno:
+            raise LibreOfficeError("La API UNO no está disponible")
+        import uno
+        
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        context = resolver.resolve(
+            f"uno:socket,host=127.0.0.1,port={self.port};urp;StarOffice.ComponentContext"
+        )
+        return context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+    
+    def convert(self, input_path: str, target_format: str, out_dir: str,
+                filter_options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Convierte un documento con este worker.
+        
+        filter_options son opciones del filtro de exportación (FilterData),
+        p. ej. {"PageRange": "1-3"} para exportar sólo esas páginas.
+        
+        Returns:
+            Ruta del archivo generado en out_dir
+        """
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(out_dir, f"{stem}.{target_format}")
+        
+        if self.use_uno:
+            self._convert_uno(input_path, target_format, output_path, filter_options)
+        else:
+            self._convert_subprocess(input_path, target_format, out_dir, filter_options)
+        
+        if not os.path.exists(output_path):
+            raise LibreOfficeError(f"LibreOffice no generó {os.path.basename(output_path)}")
+        return output_path
+    
+    def _convert_uno(self, input_path: str, target_format: str, output_path: str,
+                     filter_options: Optional[Dict[str, Any]] = None) -> None:
+        import uno
+        from com.sun.star.beans import PropertyValue
+        
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name = name
+            p.Value = value
+            return p
+        
+        doc = self.desktop().loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0,
+            (prop("Hidden", True), prop("ReadOnly", True))
+        )
+        if not doc:
+            raise LibreOfficeError("loadComponentFromURL devolvió None")
+        store_props = [prop("FilterName", EXPORT_FILTERS.get(target_format, target_format)), prop("Overwrite", True)]
+        if filter_options:
+            filter_data = tuple(prop(name, value) for name, value in filter_options.items())
+            store_props.append(prop("FilterData", uno.Any("[]com.sun.star.beans.PropertyValue", filter_data)))
+        try:
+            doc.storeToURL(uno.systemPathToFileUrl(os.path.abspath(output_path)), tuple(store_props))
+        finally:
+            doc.close(True)
+    
+    def _convert_subprocess(self, input_path: str, target_format: str, out_dir: str,
+                            filter_options: Optional[Dict[str, Any]] = None) -> None:
+        convert_to = target_format
+        if filter_options:
+            # Sintaxis "formato:filtro:{json}" de --convert-to (LibreOffice 7.4+)
+            filter_name = EXPORT_FILTERS.get(target_format, target_format)
+            convert_to = f"{target_format}:{filter_name}:{_filter_options_json(filter_options)}"
+        cmd = self._base_cmd() + ["--convert-to", convert_to, "--outdir", out_dir, input_path]
+        self._job_process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=out_dir,
+                                             **_PROCESS_GROUP)
+        try:
+            _, stderr = self._job_process.communicate()
+            if self._job_process.returncode != 0:
+                print(f"⚠️ LibreOffice stderr: {stderr.decode(errors='replace')}")
+        finally:
+            self._job_process = None
+
+
+class LibreOfficePool:
+    """
+    Pool de workers LibreOffice con cola, timeouts y reciclado.
+    
+    Los workers se crean al primer uso, así importar el módulo (o arrancar
+    la app sin LibreOffice instalado) no lanza ningún proceso.
+    """
+    
+    def __init__(self,
+                 size: int = LIBREOFFICE_POOL_SIZE,
+                 soffice_path: Optional[str] = None,
+                 max_jobs_per_worker: int = LIBREOFFICE_MAX_JOBS_PER_WORKER,
+                 job_timeout: float = LIBREOFFICE_JOB_TIMEOUT,
+                 queue_timeout: float = LIBREOFFICE_QUEUE_TIMEOUT,
+                 profile_root: str = LIBREOFFICE_PROFILE_ROOT,
+                 use_uno: Optional[bool] = None):
+        """
+        Args:
+            size: Número de workers
+            soffice_path: Ejecutable de LibreOffice (por defecto se busca en el sistema)
+            max_jobs_per_worker: Conversiones antes de reiniciar un worker
+            job_timeout: Segundos máximos por conversión
+            queue_timeout: Segundos máximos esperando un worker libre
+            profile_root: Directorio donde se crean los perfiles aislados
+            use_uno: Forzar (o desactivar) el modo UNO; None = autodetectar
+        """
+        self.size = max(1, size)
+        self.soffice_path = soffice_path
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.job_timeout = job_timeout
+        self.queue_timeout = queue_timeout
+        self.profile_root = profile_root
+        self.use_uno = use_uno
+        
+        self._idle: "queue.Queue[LibreOfficeWorker]" = queue.Queue()
+        self._workers: List[LibreOfficeWorker] = []
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {'jobs': 0, 'failures': 0, 'timeouts': 0, 'queue_timeouts': 0, 'recycled': 0}
+    
+    @property
+    def available(self) -> bool:
+        """Hay un ejecutable de LibreOffice con el que trabajar"""
+        return bool(self._soffice())
+    
+    def _soffice(self) -> Optional[str]:
+        if self.soffice_path is None:
+            self.soffice_path = find_libreoffice() or ''
+        return self.soffice_path or None
+    
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            if self._workers:
+                return
+            soffice = self._soffice()
+            if not soffice:
+                raise LibreOfficeError("LibreOffice no encontrado")
+            use_uno = uno_available() if self.use_uno is None else self.use_uno
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='libreoffice')
+            for index in range(self.size):
+                worker = LibreOfficeWorker(index, soffice, self.profile_root, use_uno)
+                self._workers.append(worker)
+                self._idle.put(worker)
+    
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Reserva un worker sano (esperando en cola si están todos ocupados).
+        
+        Raises:
+            PoolBusyError: si no se libera ninguno en `timeout` segundos
+        """
+        self._ensure_workers()
+        try:
+            worker = self._idle.get(timeout=self.queue_timeout if timeout is None else timeout)
+        except queue.Empty:
+            self._stats['queue_timeouts'] += 1
+            raise PoolBusyError("Todos los workers de LibreOffice están ocupados")
+        
+        try:
+            if not worker.is_healthy():
+                if worker.started:
+                    print(f"   ⚠️ Worker LibreOffice #{worker.index} no responde, reiniciando...")
+                worker.restart()
+            yield worker
+        finally:
+            if worker.jobs_done >= self.max_jobs_per_worker:
+                self._stats['recycled'] += 1
+                try:
+                    worker.restart()
+                except LibreOfficeError as e:
+                    print(f"   ⚠️ No se pudo reciclar el worker #{worker.index}: {e}")
+            self._idle.put(worker)
+    
+    def run(self, job: Callable[[LibreOfficeWorker], T], timeout: Optional[float] = None) -> T:
+        """
+        Ejecuta `job(worker)` en un worker del pool con tiempo máximo.
+        
+        Si el trabajo excede el tiempo, se mata el proceso del worker (lo
+        que desbloquea la llamada) y el worker se reinicia.
+        
+        Raises:
+            PoolBusyError: no hubo worker libre a tiempo
+            LibreOfficeTimeoutError: el trabajo superó el tiempo máximo
+        """
+        job_timeout = self.job_timeout if timeout is None else timeout
+        
+        with self.acquire() as worker:
+            future = self._executor.submit(job, worker)
+            try:
+                result = future.result(timeout=job_timeout)
+            except FutureTimeout:
+                self._stats['timeouts'] += 1
+                worker.kill()
+                try:
+                    future.result(timeout=10)
+                except Exception:
+                    pass
+                raise LibreOfficeTimeoutError(f"La conversión superó {job_timeout:.0f}s")
+            except Exception:
+                self._stats['failures'] += 1
+                worker.jobs_done += 1
+                raise
+            
+            worker.jobs_done += 1
+            self._stats['jobs'] += 1
+            return result
+    
+    def convert(self, input_path: str, target_format: str = 'pdf',
+                out_dir: Optional[str] = None, timeout: Optional[float] = None,
+                filter_options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Convierte un documento (por defecto a PDF) usando el pool.
+        
+        Args:
+            input_path: Documento de entrada (PPTX, PPT, ...)
+            target_format: Extensión de salida ('pdf', 'png', ...)
+            out_dir: Directorio de salida (por defecto el del documento)
+            timeout: Segundos máximos (por defecto LIBREOFFICE_JOB_TIMEOUT)
+            filter_options: Opciones del filtro de exportación, p. ej. {"PageRange": "1"}
+        
+        Returns:
+            Ruta del archivo generado
+        """
+        out_dir = out_dir or os.path.dirname(os.path.abspath(input_path))
+        return self.run(
+            lambda worker: worker.convert(input_path, target_format, out_dir, filter_options), timeout
+        )
+    
+    def health_check(self) -> Dict[int, bool]:
+        """Comprueba los workers libres y reinicia los que no respondan"""
+        results = {}
+        checked = []
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            healthy = worker.is_healthy()
+            if not healthy and worker.started:
+                try:
+                    worker.restart()
+                    healthy = worker.is_healthy()
+                except LibreOfficeError:
+                    healthy = False
+            results[worker.index] = healthy
+            checked.append(worker)
+        for worker in checked:
+            self._idle.put(worker)
+        return results
+    
+    def stats(self) -> Dict[str, Any]:
+        """Estado del pool"""
+        return {
+            'available': self.available,
+            'size': self.size,
+            'started': len(self._workers),
+            'idle': self._idle.qsize(),
+            'mode': ('uno' if self._workers[0].use_uno else 'subprocess') if self._workers else None,
+            # En modo subprocess siempre 0: cada trabajo arranca soffice en frío
+            'warm_instances': sum(1 for w in self._workers if w.warm),
+            'max_jobs_per_worker': self.max_jobs_per_worker,
+            'job_timeout': self.job_timeout,
+            'queue_timeout': self.queue_timeout,
+            'workers': [
+                {'index': w.index, 'jobs_done': w.jobs_done, 'restarts': w.restarts, 'port': w.port, 'warm': w.warm}
+                for w in self._workers
+            ],
+            **self._stats
+        }
+    
+    def shutdown(self) -> None:
+        """Detiene todos los workers y borra sus perfiles"""
+        with self._lock:
+            for worker in self._workers:
+                worker.stop()
+            try:
+                os.rmdir(self.profile_root)  # sólo si ya no queda el perfil de otro proceso
+            except OSError:
+                pass
+            self._workers = []
+            self._idle = queue.Queue()
+            if self._executor:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+# Pool compartido por todo el proceso
+libreoffice_pool = LibreOfficePool()
@@ -13,7 +13,10 @@ import tempfile
 import subprocess
 import time
 import socket
-from typing import List, Optional
+from typing import List, Optional, Callable, Sequence
+
+from libreoffice_pool import LibreOfficeError, libreoffice_pool
+from preview_encoding import DEFAULT_PREVIEW_ENCODING, EncodedPreview, PreviewEncoding
 
 # Agregar LibreOffice al path
 LIBREOFFICE_PROGRAM = r"C:\Program Files\LibreOffice\program"
@@ -150,58 +153,68 @@ def create_property(name: str, value):
     prop.Value = value
     return prop
 
-def render_pptx_with_uno(pptx_path: str, prefer_uno: bool = True) -> List[str]:
+def render_pptx_with_uno(pptx_path: str, prefer_uno: bool = True,
+                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                         slide_indices: Optional[Sequence[int]] = None,
+                         encoding: Optional[PreviewEncoding] = None,
+                         binary: bool = False) -> List[EncodedPreview]:
     """
     Renderiza PPTX usando LibreOffice UNO API
     
     Estrategia:
-    1. Intentar conectar a UNO service existente
-    2. Si no hay servicio, intentar iniciarlo
-    3. Si no funciona UNO, usar fallback headless
+    1. Tomar un worker del pool de LibreOffice (proceso ya arrancado, perfil aislado)
+    2. Renderizar cada slide por UNO sobre ese worker
+    3. Si no funciona UNO, devolver [] para que el llamador use headless
     
     Args:
         pptx_path: Ruta al archivo PPTX
         prefer_uno: Si True, intenta UNO primero; si False, usa headless directamente
+        progress_callback: Función opcional (slides_renderizados, total_slides)
+        slide_indices: Índices 0-based a renderizar (None = todos); sólo se
+            exportan esas draw pages, en orden ascendente
+        encoding: Formato de las imágenes (el PNG de LibreOffice se recodifica
+            si hace falta; ver preview_encoding)
+        binary: Devolver (bytes, tipo MIME) en lugar de data URLs base64
     
     Returns:
-        List[str]: Lista de imágenes en base64
+        List: Lista de imágenes en base64 (o binarias)
     """
     if not UNO_AVAILABLE:
         print("⚠️ UNO API no disponible, usando headless")
         return []
     
-    print("\n🎨 Renderizador LibreOffice UNO API")
-    
-    # Intentar conectar a servicio UNO existente
-    desktop = None
-    uno_tried = False
+    if not prefer_uno:
+        print("   ℹ️ UNO no preferido, usando headless")
+        return []
     
-    if prefer_uno:
-        # Intentar conectar a servicio existente
-        desktop = connect_to_uno_service(8100)
-        
-        if desktop:
-            print("   ✅ Conectado a UNO service existente")
-        else:
-            # Intentar iniciar servicio
-            print("   ℹ️ No hay UNO service, intentando iniciar...")
-            uno_tried = True
-            start_libreoffice_service(8100, timeout=15)
-            desktop = connect_to_uno_service(8100)
+    print("\n🎨 Renderizador LibreOffice UNO API")
     
-    # Si UNO no funciona, usar fallback headless
-    if not desktop:
-        if uno_tried:
-            print("   ⚠️ UNO service no disponible, usando headless")
-        else:
-            print("   ℹ️ UNO no preferido, usando headless")
+    try:
+        # El pool aplica la cola, el timeout por trabajo y el reciclado del worker
+        return libreoffice_pool.run(
+            lambda worker: _render_slides(worker.desktop(), pptx_path, progress_callback, slide_indices,
+                                          encoding or DEFAULT_PREVIEW_ENCODING, binary)
+        )
+    except LibreOfficeError as e:
+        print(f"   ⚠️ LibreOffice: {e}, usando headless")
         return []
-    
+    except Exception as e:
+        print(f"❌ Error con UNO API: {e}")
+        import traceback
+        traceback.print_exc()
+        return []
+
+
+def _render_slides(desktop, pptx_path: str,
+                   progress_callback: Optional[Callable[[int, int], None]] = None,
+                   slide_indices: Optional[Sequence[int]] = None,
+                   encoding: PreviewEncoding = DEFAULT_PREVIEW_ENCODING,
+                   binary: bool = False) -> List[EncodedPreview]:
+    """Renderiza cada slide a PNG con un Desktop UNO ya conectado"""
     # Variables para cleanup
     doc = None
     
     try:
-        
         # Convertir ruta a URL de LibreOffice
         if not pptx_path.startswith('file://'):
             pptx_url = uno.systemPathToFileUrl(os.path.abspath(pptx_path))
@@ -228,10 +241,14 @@ def render_pptx_with_uno(pptx_path: str, prefer_uno: bool = True) -> List[str]:
         
         print(f"   📊 Total slides: {slide_count}")
         
+        to_render = list(range(slide_count))
+        if slide_indices is not None:
+            to_render = [i for i in sorted(set(slide_indices)) if 0 <= i < slide_count]
+        
         images = []
         
-        # Renderizar cada slide
-        for i in range(slide_count):
+        # Renderizar cada slide pedido
+        for done, i in enumerate(to_render, 1):
             slide = slides.getByIndex(i)
             print(f"   📄 Renderizando slide {i + 1}...")
             
@@ -257,15 +274,17 @@ def render_pptx_with_uno(pptx_path: str, prefer_uno: bool = True) -> List[str]:
                 # Exportar slide a PNG
                 doc.storeToURL(output_url, export_props)
                 
-                # Leer imagen y convertir a base64
+                # Leer imagen y codificarla en el formato de las previews
                 if os.path.exists(output_path):
                     with open(output_path, 'rb') as f:
-                        img_data = f.read()
-                        img_str = base64.b64encode(img_data).decode()
-                        images.append(f"data:image/png;base64,{img_str}")
+                        img_data = encoding.transcode(f.read(), 'image/png')
+                        images.append(encoding.output(img_data, binary))
                         print(f"   ✅ Slide {i + 1} renderizado ({len(img_data)} bytes)")
                 else:
                     print(f"   ⚠️ No se generó imagen para slide {i + 1}")
+            
+            if progress_callback:
+                progress_callback(done, len(to_render))
         
         # Cerrar documento
         doc.close(True)
@@ -273,11 +292,6 @@ def render_pptx_with_uno(pptx_path: str, prefer_uno: bool = True) -> List[str]:
         print(f"\n✅ {len(images)} slides renderizados con UNO API\n")
         return images
         
-    except Exception as e:
-        print(f"❌ Error con UNO API: {e}")
-        import traceback
-        traceback.print_exc()
-        return []
     finally:
         # Cleanup: cerrar documento si está abierto
         try:
@@ -10,15 +10,22 @@ Refactored modular architecture:
 """
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import uvicorn
 
 # Import routers
 from routes.analysis import router as analysis_router
+from routes.assets import router as assets_router
 from routes.export import router as export_router
 from routes.templates import router as templates_router
 from routes.collaboration import router as collaboration_router, websocket_collaboration
 from routes.search import router as search_router
 from routes.web_search import router as web_search_router
+from core.offload import offloader
+from core.task_queue import task_queue
+from services.gemini_client import gemini_client
+from libreoffice_pool import libreoffice_pool
+import pdf_rasterizer
 
 # Create FastAPI app
 app = FastAPI(
@@ -43,6 +50,7 @@ app.add_middleware(
 
 # Register routers
 app.include_router(analysis_router)
+app.include_router(assets_router)
 app.include_router(export_router)
 app.include_router(templates_router)
 app.include_router(collaboration_router)
@@ -50,6 +58,24 @@ app.include_router(search_router)
 app.include_router(web_search_router)
 
 
+@app.on_event("startup")
+async def startup():
+    # Spawn task queue and offload workers now instead of on the first request
+    await asyncio.to_thread(task_queue.warm_up)
+    await asyncio.to_thread(offloader.warm_up)
+    await task_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await task_queue.stop()
+    task_queue.shutdown(wait=False)
+    offloader.shutdown(wait=False)
+    libreoffice_pool.shutdown()
+    pdf_rasterizer.shutdown()
+    await gemini_client.aclose()
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -58,10 +84,14 @@ async def root():
         "version": "2.0.0",
         "endpoints": {
             "analyze": "POST /api/analyze - Analiza un PPT y extrae su diseño",
+            "assets": "GET /api/assets/{hash} - Imagen extraída en modo lazyAssets",
+            "previews": "GET /api/previews/{fingerprint}?tier=thumb|medium|full - Preview de un slide",
             "generate": "POST /api/generate - Genera PPT con contenido de IA",
             "export_pptx": "POST /api/export/pptx - Exporta a PowerPoint",
             "export_pdf": "POST /api/export/pdf - Exporta a PDF",
+            "export_pdf_async": "POST /api/export/pdf/async - Exporta a PDF en la cola de tareas",
             "analyze_template": "POST /api/analyze-template - Análisis con Gemini Vision",
+            "analyze_template_batch": "POST /api/analyze-template/batch - Análisis de todos los slides",
             "templates": "GET /api/templates - Lista templates en caché"
         }
     }
@@ -50,6 +50,7 @@ class MappingCache:
             CREATE TABLE IF NOT EXISTS template_mappings (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 template_hash TEXT NOT NULL,
+                slide_index INTEGER DEFAULT 0,
                 element_id TEXT NOT NULL,
                 shape_id INTEGER,
                 purpose TEXT NOT NULL,
@@ -69,12 +70,27 @@ class MappingCache:
             ON template_mappings(template_hash)
         ''')
         
+        # Bases creadas antes del análisis por slide no tienen slide_index
+        cursor.execute('PRAGMA table_info(template_mappings)')
+        if 'slide_index' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE template_mappings ADD COLUMN slide_index INTEGER DEFAULT 0')
+        
         # Índice para búsqueda por hash en corporate_templates
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_templates_hash 
             ON corporate_templates(hash)
         ''')
         
+        # Slides analizados de cada template (aunque no tengan detecciones)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS template_slides (
+                template_hash TEXT NOT NULL,
+                slide_index INTEGER NOT NULL,
+                analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (template_hash, slide_index)
+            )
+        ''')
+        
         conn.commit()
         conn.close()
     
@@ -125,15 +141,22 @@ class MappingCache:
             # Obtener todos los mappings para este template
             cursor.execute('''
                 SELECT element_id, shape_id, purpose, coordinates, 
-                       original_style, user_corrected, created_at, updated_at
+                       original_style, user_corrected, created_at, updated_at,
+                       slide_index
                 FROM template_mappings
                 WHERE template_hash = ?
+                ORDER BY slide_index, id
             ''', (template_hash,))
             
             mapping_rows = cursor.fetchall()
             
+            cursor.execute('''
+                SELECT slide_index FROM template_slides WHERE template_hash = ?
+            ''', (template_hash,))
+            analyzed_slides = {row[0] for row in cursor.fetchall()}
+            
             elements = []
-            shape_mapping = {}
+            slide_mappings = {index: {} for index in analyzed_slides}
             
             for row in mapping_rows:
                 element = {
@@ -144,13 +167,19 @@ class MappingCache:
                     'style': json.loads(row[4]) if row[4] else None,
                     'userCorrected': bool(row[5]),
                     'createdAt': row[6],
-                    'updatedAt': row[7]
+                    'updatedAt': row[7],
+                    'slideIndex': row[8] or 0
                 }
                 elements.append(element)
                 
-                # Construir shape_mapping: tipo -> shape_id
+                # Construir shape_mapping por slide: tipo -> shape_id
+                slide_mapping = slide_mappings.setdefault(element['slideIndex'], {})
                 if row[1] is not None:  # shape_id
-                    shape_mapping[row[2]] = row[1]  # purpose -> shape_id
+                    slide_mapping[row[2]] = row[1]  # purpose -> shape_id
+            
+            # shapeMapping es siempre el del slide 0 (el del análisis de un
+            # solo slide); vacío si el slide 0 no tiene mapping
+            shape_mapping = slide_mappings.get(0, {})
             
             return {
                 'templateHash': template_hash,
@@ -160,6 +189,8 @@ class MappingCache:
                 'thumbnailUrl': template_row[3],
                 'elements': elements,
                 'shapeMapping': shape_mapping,
+                'slideMappings': slide_mappings,
+                'analyzedSlides': sorted(slide_mappings),
                 'analyzedAt': template_row[4],
                 'source': 'cache'
             }
@@ -173,17 +204,30 @@ class MappingCache:
         mapping: Dict[str, Any],
         template_name: Optional[str] = None,
         file_path: Optional[str] = None,
-        thumbnail_url: Optional[str] = None
+        thumbnail_url: Optional[str] = None,
+        replace: bool = False,
+        slides: Optional[List[int]] = None
     ) -> None:
         """
         Guarda mapping en caché.
         
+        Todo se escribe en una sola transacción: los elementos de todos los
+        slides de un análisis por lotes (cada uno con su `slideIndex`, 0 por
+        defecto) quedan guardados juntos o no se guarda ninguno.
+        
+        Los elementos corregidos por el usuario (update_element_type) nunca
+        se borran ni se sobrescriben.
+        
         Args:
             template_hash: Hash único del template
             mapping: Diccionario con elementos y sus mappings
             template_name: Nombre opcional del template
             file_path: Ruta opcional al archivo
             thumbnail_url: URL opcional del thumbnail
+            replace: Borrar antes los elementos guardados del template (solo
+                los de `slides` si se indican)
+            slides: Slides analizados en esta pasada; quedan registrados como
+                analizados aunque no tengan elementos
             
         Requirements: 4.1
         """
@@ -195,6 +239,14 @@ class MappingCache:
             template_id = secrets.token_urlsafe(12)
             now = datetime.now().isoformat()
             
+            # Conservar la ruta del template almacenado si no se indica otra
+            if file_path is None:
+                cursor.execute('''
+                    SELECT file_path FROM corporate_templates WHERE hash = ?
+                ''', (template_hash,))
+                existing = cursor.fetchone()
+                file_path = existing[0] if existing else None
+            
             # Insertar o actualizar template
             cursor.execute('''
                 INSERT OR REPLACE INTO corporate_templates 
@@ -202,19 +254,36 @@ class MappingCache:
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (template_id, template_hash, template_name, file_path, thumbnail_url, now))
             
+            if replace and slides is None:
+                cursor.execute('''
+                    DELETE FROM template_mappings
+                    WHERE template_hash = ? AND COALESCE(user_corrected, 0) = 0
+                ''', (template_hash,))
+            elif replace:
+                cursor.executemany('''
+                    DELETE FROM template_mappings
+                    WHERE template_hash = ? AND slide_index = ? AND COALESCE(user_corrected, 0) = 0
+                ''', [(template_hash, index) for index in slides])
+            
+            cursor.execute('''
+                SELECT element_id FROM template_mappings
+                WHERE template_hash = ? AND COALESCE(user_corrected, 0) != 0
+            ''', (template_hash,))
+            corrected = {row[0] for row in cursor.fetchall()}
+            
             # Insertar mappings de elementos
             elements = mapping.get('elements', [])
+            rows = []
             for element in elements:
+                if element.get('id') in corrected:
+                    continue
+                
                 coordinates = element.get('coordinates')
                 style = element.get('style')
                 
-                cursor.execute('''
-                    INSERT OR REPLACE INTO template_mappings
-                    (template_hash, element_id, shape_id, purpose, coordinates, 
-                     original_style, user_corrected, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+                rows.append((
                     template_hash,
+                    element.get('slideIndex', 0),
                     element.get('id'),
                     element.get('shapeId'),
                     element.get('type', 'UNKNOWN'),
@@ -225,8 +294,91 @@ class MappingCache:
                     now
                 ))
             
+            cursor.executemany('''
+                INSERT OR REPLACE INTO template_mappings
+                (template_hash, slide_index, element_id, shape_id, purpose, coordinates, 
+                 original_style, user_corrected, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            
+            if slides:
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO template_slides (template_hash, slide_index, analyzed_at)
+                    VALUES (?, ?, ?)
+                ''', [(template_hash, index, now) for index in slides])
+            
+            conn.commit()
+            
+        finally:
+            conn.close()
+    
+    def register_template_file(
+        self,
+        template_hash: str,
+        file_path: str,
+        template_name: Optional[str] = None
+    ) -> None:
+        """
+        Registra la ruta del archivo almacenado de un template.
+        
+        Crea la fila en corporate_templates si no existe; si ya existe
+        solo actualiza file_path (y el nombre si no tenía uno).
+        
+        Args:
+            template_hash: Hash único del template
+            file_path: Ruta al archivo en el almacén de templates
+            template_name: Nombre opcional del template
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+                UPDATE corporate_templates
+                SET file_path = ?, name = COALESCE(name, ?)
+                WHERE hash = ?
+            ''', (file_path, template_name, template_hash))
+            
+            if cursor.rowcount == 0:
+                cursor.execute('''
+                    INSERT INTO corporate_templates
+                    (id, hash, name, file_path, thumbnail_url, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    secrets.token_urlsafe(12),
+                    template_hash,
+                    template_name,
+                    file_path,
+                    None,
+                    datetime.now().isoformat()
+                ))
+            
             conn.commit()
+        
+        finally:
+            conn.close()
+    
+    def get_template_file_path(self, template_hash: str) -> Optional[str]:
+        """
+        Obtiene la ruta registrada del archivo de un template.
+        
+        Args:
+            template_hash: Hash del template
+        
+        Returns:
+            Ruta al archivo o None si no hay ninguna registrada
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+                SELECT file_path FROM corporate_templates WHERE hash = ?
+            ''', (template_hash,))
             
+            row = cursor.fetchone()
+            return row[0] if row else None
+        
         finally:
             conn.close()
     
@@ -291,6 +443,10 @@ class MappingCache:
                 DELETE FROM template_mappings
                 WHERE template_hash = ?
             ''', (template_hash,))
+            cursor.execute('''
+                DELETE FROM template_slides
+                WHERE template_hash = ?
+            ''', (template_hash,))
             
             # Eliminar template
             cursor.execute('''
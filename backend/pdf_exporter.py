@@ -0,0 +1,146 @@
+"""
+PDFExporter - Exportación de presentaciones a PDF
+
+El PDF se genera a partir del PPTX con el pool de LibreOffice: un único
+paso PPTX -> PDF que conserva texto, formas y fuentes como vectores (el
+texto se puede seleccionar y buscar, y el archivo no crece con la
+resolución).
+
+Sólo si LibreOffice no está disponible o falla se arma un PDF raster, una
+página por slide, con las previews ya codificadas: los PNG / JPEG se
+incrustan tal cual con PyMuPDF, sin decodificarlos ni volver a
+codificarlos. Los slides sin preview llevan su texto.
+"""
+
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from libreoffice_pool import LibreOfficeError, libreoffice_pool
+from preview_encoding import PreviewEncoding, to_binary
+
+
+# Tamaño de página (puntos) de los PDF raster: 16:9 sin márgenes
+PDF_PAGE_WIDTH = 960
+PDF_PAGE_HEIGHT = 540
+
+# Formatos que PyMuPDF incrusta directamente; el resto se pasa a PNG
+PDF_EMBEDDABLE_MIME_TYPES = ('image/png', 'image/jpeg')
+
+
+def export_pdf(pptx_path: Optional[str] = None,
+               slides: Sequence[Dict[str, Any]] = (),
+               output_path: Optional[str] = None,
+               progress_callback: Optional[Callable[[int, int], None]] = None) -> Tuple[str, str]:
+    """
+    Exporta a PDF: vectorial desde el PPTX si se puede y raster si no.
+    
+    Args:
+        pptx_path: PPTX generado (None = sólo hay previews)
+        slides: Slides del editor, con su `preview` y su `content`; se usan
+            para el PDF raster
+        output_path: Ruta del PDF (por defecto un archivo temporal)
+        progress_callback: Recibe (slides_procesados, total_slides)
+    
+    Returns:
+        (ruta del PDF, método: 'vector' o 'raster')
+    """
+    output_path = output_path or _temp_pdf_path()
+    
+    if pptx_path:
+        try:
+            return convert_pptx_to_pdf(pptx_path, output_path), 'vector'
+        except LibreOfficeError as e:
+            print(f"⚠️ PDF vectorial no disponible ({e}), usando previews")
+        
+        if not any(slide.get('preview') for slide in slides):
+            # Sin previews del editor: se rasteriza el propio PPTX
+            from pptx_full_renderer import render_pptx_complete
+            slides = [{'preview': image} for image in render_pptx_complete(pptx_path, binary=True)]
+    
+    return images_to_pdf(slides, output_path, progress_callback), 'raster'
+
+
+def convert_pptx_to_pdf(pptx_path: str, output_path: Optional[str] = None) -> str:
+    """
+    Convierte un PPTX a PDF vectorial con el pool de LibreOffice.
+    
+    Raises:
+        LibreOfficeError: si no hay LibreOffice o la conversión falla
+    """
+    if not libreoffice_pool.available:
+        raise LibreOfficeError("LibreOffice no encontrado")
+    
+    output_path = output_path or _temp_pdf_path()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = libreoffice_pool.convert(pptx_path, 'pdf', out_dir=temp_dir)
+        shutil.move(pdf_path, output_path)
+    
+    print(f"✅ PDF vectorial generado: {output_path}")
+    return output_path
+
+
+def images_to_pdf(slides: Sequence[Dict[str, Any]], output_path: Optional[str] = None,
+                  progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
+    """
+    Arma un PDF raster con una página por slide.
+    
+    Cada `preview` (data URL o (bytes, tipo MIME)) se incrusta tal cual si
+    es PNG o JPEG; los slides sin preview llevan su título, subtítulo y
+    bullets.
+    """
+    import fitz  # PyMuPDF
+    
+    output_path = output_path or _temp_pdf_path()
+    
+    with fitz.open() as doc:
+        for idx, slide in enumerate(slides):
+            page = doc.new_page(width=PDF_PAGE_WIDTH, height=PDF_PAGE_HEIGHT)
+            preview = slide.get('preview')
+            
+            if preview and (not isinstance(preview, str) or preview.startswith('data:image')):
+                try:
+                    _insert_preview(page, preview)
+                except Exception as e:
+                    print(f"   ⚠️ Error procesando imagen slide {idx + 1}: {e}")
+                    page.insert_textbox((0, PDF_PAGE_HEIGHT / 2 - 24, PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT / 2 + 24),
+                                        f"Slide {idx + 1}", fontsize=24, fontname='hebo', align=1)
+            else:
+                _insert_text(page, slide.get('content') or {}, idx)
+            
+            if progress_callback:
+                progress_callback(idx + 1, len(slides))
+        
+        doc.save(output_path, garbage=3, deflate=True)
+    
+    print(f"✅ PDF raster generado: {output_path} ({len(slides)} páginas)")
+    return output_path
+
+
+def _insert_preview(page, preview) -> None:
+    """Incrusta una preview ocupando toda la página"""
+    data, mime = to_binary(preview)
+    if mime not in PDF_EMBEDDABLE_MIME_TYPES:
+        data = PreviewEncoding('png').transcode(data, mime)
+    page.insert_image(page.rect, stream=data, keep_proportion=False)
+
+
+def _insert_text(page, content: Dict[str, Any], idx: int) -> None:
+    """Página de texto para los slides sin preview"""
+    width = PDF_PAGE_WIDTH
+    title = content.get('title') or content.get('heading', f'Slide {idx + 1}')
+    page.insert_textbox((0, 40, width, 104), title, fontsize=32, fontname='hebo', align=1)
+    
+    if content.get('subtitle'):
+        page.insert_textbox((0, 104, width, 144), content['subtitle'], fontsize=20, fontname='helv', align=1)
+    
+    y_pos = 180
+    for bullet in content.get('bullets', []):
+        if bullet and bullet.strip():
+            page.insert_text((80, y_pos), f"• {bullet}", fontsize=14, fontname='helv')
+            y_pos += 22
+
+
+def _temp_pdf_path() -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
+        return tmp.name
@@ -0,0 +1,159 @@
+"""
+PDFRasterizer - Rasterizado de páginas de PDF en paralelo
+
+Reparte las páginas pedidas en tramos contiguos entre un pool de procesos;
+cada proceso abre su propio fitz.Document (los documentos de PyMuPDF no se
+pueden compartir entre procesos ni hilos), rasteriza su tramo y devuelve
+las imágenes ya codificadas (ver preview_encoding). Así el render, la
+compresión PNG / WebP / JPEG y el base64 de un PDF de 120 páginas se
+reparten entre todos los núcleos.
+
+Los documentos cortos se rasterizan en el propio proceso: arrancar el pool
+cuesta más que lo que se ahorra.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from preview_encoding import DEFAULT_PREVIEW_ENCODING, EncodedPreview, PreviewEncoding
+
+
+# Procesos del pool. Configurable por entorno.
+PDF_RASTER_WORKERS = int(os.environ.get('PDF_RASTER_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Por debajo de este número de páginas no se usa el pool. Configurable por entorno.
+PDF_RASTER_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_RASTER_PARALLEL_MIN_PAGES', 8))
+
+# Resolución por defecto (3x sobre los 72 puntos por pulgada del PDF)
+DEFAULT_DPI = 216
+
+
+def rasterize_pdf(pdf_path: str,
+                  pages: Optional[Sequence[int]] = None,
+                  dpi: int = DEFAULT_DPI,
+                  encoding: Optional[PreviewEncoding] = None,
+                  progress_callback: Optional[Callable[[int, int], None]] = None,
+                  workers: Optional[int] = None,
+                  binary: bool = False) -> List[EncodedPreview]:
+    """
+    Rasteriza páginas de un PDF, en paralelo si compensa.
+    
+    Args:
+        pdf_path: Ruta al PDF
+        pages: Páginas 0-based a rasterizar (None = todas); se devuelven en
+            orden ascendente y las que no existen se ignoran
+        dpi: Resolución del render
+        encoding: Formato de las imágenes (por defecto DEFAULT_PREVIEW_ENCODING)
+        progress_callback: Recibe (páginas_convertidas, total_páginas)
+        workers: Procesos a usar (por defecto PDF_RASTER_WORKERS)
+        binary: Devolver (bytes, tipo MIME) en lugar de data URLs
+    
+    Returns:
+        Lista de imágenes, una por página
+    """
+    import fitz  # PyMuPDF
+    
+    encoding = encoding or DEFAULT_PREVIEW_ENCODING
+    
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+    page_numbers = list(range(page_count))
+    if pages is not None:
+        page_numbers = [p for p in sorted(set(pages)) if 0 <= p < page_count]
+    if not page_numbers:
+        return []
+    
+    workers = PDF_RASTER_WORKERS if workers is None else workers
+    images = {}
+    
+    def collect(chunk_result: List[Tuple[int, EncodedPreview]]) -> None:
+        for page_num, image in chunk_result:
+            images[page_num] = image
+            if progress_callback:
+                progress_callback(len(images), len(page_numbers))
+    
+    if workers > 1 and len(page_numbers) >= PDF_RASTER_PARALLEL_MIN_PAGES:
+        chunks = split_pages(page_numbers, workers * 2)
+        try:
+            executor = _get_executor(workers)
+            futures = [executor.submit(rasterize_pages, pdf_path, chunk, dpi, encoding, binary)
+                       for chunk in chunks]
+            for future in as_completed(futures):
+                collect(future.result())
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            print(f"⚠️ Pool de rasterizado no disponible ({e}), continuando en este proceso")
+            shutdown()
+    
+    missing = [p for p in page_numbers if p not in images]
+    if missing:
+        collect(rasterize_pages(pdf_path, missing, dpi, encoding, binary))
+    
+    return [images[p] for p in page_numbers]
+
+
+def split_pages(page_numbers: Sequence[int], parts: int) -> List[List[int]]:
+    """Divide las páginas en como mucho `parts` tramos contiguos de tamaño similar"""
+    parts = max(1, min(parts, len(page_numbers)))
+    size, extra = divmod(len(page_numbers), parts)
+    chunks = []
+    start = 0
+    for index in range(parts):
+        end = start + size + (1 if index < extra else 0)
+        chunks.append(list(page_numbers[start:end]))
+        start = end
+    return chunks
+
+
+def rasterize_pages(pdf_path: str, page_numbers: Sequence[int], dpi: int,
+                    encoding: PreviewEncoding, binary: bool = False) -> List[Tuple[int, EncodedPreview]]:
+    """
+    Rasteriza un tramo de páginas con su propio documento (se ejecuta en
+    los procesos del pool).
+    
+    Returns:
+        Pares (página, imagen codificada)
+    """
+    import fitz  # PyMuPDF
+    
+    results = []
+    with fitz.open(pdf_path) as doc:
+        for page_num in page_numbers:
+            # IMPORTANTE: alpha=False para fondo blanco en lugar de transparente/negro
+            pix = doc.load_page(page_num).get_pixmap(dpi=dpi, alpha=False)
+            results.append((page_num, encoding.output(encoding.encode_pixmap(pix), binary)))
+    return results
+
+
+# ---------------------------------------------------------------
+# Pool de procesos compartido (se crea al primer uso)
+# ---------------------------------------------------------------
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            # spawn: el servidor tiene hilos vivos, y fork con hilos no es seguro
+            _executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = workers
+        return _executor
+
+
+def shutdown() -> None:
+    """Detiene el pool de procesos (se vuelve a crear si hace falta)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -1,7 +1,7 @@
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.shapes import MSO_SHAPE_TYPE
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional
 import json
 import base64
 from io import BytesIO
@@ -19,6 +19,24 @@ if os.path.exists(LIBREOFFICE_PROGRAM) and LIBREOFFICE_PROGRAM not in sys.path:
 # Importar procesador de imágenes
 from image_processor import remove_white_background, smart_background_removal
 
+# Caché en disco de previews y análisis por huella de slide (evita volver a
+# renderizar / analizar los slides que no cambiaron)
+from preview_cache import PreviewKey, preview_cache
+from preview_encoding import DEFAULT_PREVIEW_TRANSPORT, to_binary, to_data_url
+from preview_tiers import DEFAULT_PREVIEW_TIER, derive_tiers, get_tier
+from slide_fingerprint import fingerprint_slides, slide_analysis_cache
+
+# Temas y fondos heredados, parseados una vez por presentación
+from theme_resolver import NAMESPACES as THEME_NAMESPACES, ThemeResolver, solid_background
+
+# Resolución con la que cada renderizador produce las previews (parte de la
+# clave de la caché) y orden de preferencia al buscarlas
+PREVIEW_RESOLUTIONS = {
+    'uno': '1920x1080',
+    'libreoffice': 'pdf-3x',
+    'full': '96dpi-2x',
+}
+
 # Intentar importar UNO API de LibreOffice
 try:
     from libreoffice_uno_renderer import render_pptx_with_uno, UNO_AVAILABLE
@@ -61,56 +79,41 @@ try:
 except ImportError:
     LIBREOFFICE_AVAILABLE = False
 
-def analyze_presentation(pptx_path: str) -> Dict[str, Any]:
+def analyze_presentation(pptx_path: str, lazy_assets: bool = False,
+                         preview_tier: str = DEFAULT_PREVIEW_TIER,
+                         preview_transport: str = DEFAULT_PREVIEW_TRANSPORT) -> Dict[str, Any]:
     """
     Analiza un archivo PowerPoint y extrae toda su estructura de diseño
     Incluye extracción de imágenes originales con transparencia
-    """
-    prs = Presentation(pptx_path)
     
-    # Intentar generar previews de slides (prioridad: UNO API > LibreOffice > Full Renderer > Placeholder)
-    slide_images = []
+    Con lazy_assets=True los assets no se incrustan en base64: se guardan en
+    el asset store y el análisis sólo lleva sus metadatos y su hash
     
-    if UNO_AVAILABLE:
-        try:
-            print("🎨 Usando LibreOffice UNO API (máxima calidad)...")
-            slide_images = render_pptx_with_uno(pptx_path)
-            print(f"✅ Generadas {len(slide_images)} imágenes con UNO API")
-        except Exception as e:
-            print(f"⚠️ Error con UNO API: {e}")
-            import traceback
-            traceback.print_exc()
+    preview_tier ('thumb', 'medium' o 'full') elige el tamaño de las previews
+    de la respuesta; los demás tamaños se piden luego por la huella del slide
+    a GET /api/previews/{fingerprint}
     
-    if not slide_images and LIBREOFFICE_AVAILABLE:
-        try:
-            print("🎨 Usando LibreOffice headless...")
-            slide_images = convert_pptx_to_images(pptx_path)
-            print(f"✅ Generadas {len(slide_images)} imágenes con LibreOffice")
-        except Exception as e:
-            print(f"⚠️ Error con LibreOffice: {e}")
-            import traceback
-            traceback.print_exc()
+    preview_transport='url' devuelve esa URL en lugar del data URL base64 de
+    cada preview (los placeholders, que no se guardan, van siempre inline)
+    """
+    prs = Presentation(pptx_path)
     
-    if not slide_images and FULL_RENDERER_AVAILABLE:
-        try:
-            print("🎨 Usando renderizador completo...")
-            slide_images = render_pptx_complete(pptx_path)
-            print(f"✅ Generadas {len(slide_images)} imágenes con renderizador completo")
-        except Exception as e:
-            print(f"⚠️ Error con renderizador completo: {e}")
-            import traceback
-            traceback.print_exc()
+    # Un solo resolver de temas / fondos para el análisis, los assets y el renderizador
+    themes = ThemeResolver()
     
-    if not slide_images:
-        print("⚠️ Usando placeholders")
-        from pptx_to_images import generate_placeholder_image
-        slide_images = [generate_placeholder_image(i + 1) for i in range(len(prs.slides))]
+    # Huella de cada slide: sólo se renderizan / analizan los que cambiaron
+    fingerprints = fingerprint_slides(prs)
+    slide_images, slide_renderers = render_slide_previews(pptx_path, prs, fingerprints, themes=themes)
+    tier_images = preview_tier_images(fingerprints, slide_images, slide_renderers, preview_tier)
+    tier_images = preview_outputs(fingerprints, tier_images, slide_renderers, preview_tier, preview_transport)
     
     # Extraer todos los assets (imágenes con transparencia, logos, etc.)
     print(f"\n{'='*60}")
     print(f"EXTRAYENDO ASSETS DEL PPTX")
     print(f"{'='*60}")
-    extracted_assets = extract_all_assets(prs)
+    # Tipo de slide y fondo se resuelven una vez por layout
+    layout_index = LayoutIndex(prs, themes)
+    extracted_assets = extract_all_assets(prs, lazy=lazy_assets, layout_index=layout_index)
     print(f"\n📊 RESUMEN DE ASSETS:")
     print(f"   Total: {extracted_assets['totalCount']}")
     print(f"   Logos: {len(extracted_assets['logos'])}")
@@ -126,14 +129,32 @@ def analyze_presentation(pptx_path: str) -> Dict[str, Any]:
             "height": prs.slide_height
         },
         "slides": [],
-        "slideImages": slide_images,
+        "slideImages": tier_images,
+        "previewTier": preview_tier,
+        "previewTransport": preview_transport,
         "extractedAssets": extracted_assets,
         "renderMethod": "custom" if CUSTOM_RENDERER_AVAILABLE and slide_images else ("libreoffice" if LIBREOFFICE_AVAILABLE and slide_images else ("aspose" if ASPOSE_AVAILABLE and slide_images else "placeholder"))
     }
     
+    reused_slides = 0
     for slide_idx, slide in enumerate(prs.slides):
+        preview = tier_images[slide_idx] if slide_idx < len(tier_images) else None
+        
+        # Slide sin cambios: reutilizar su análisis (las imágenes dependen del modo lazy)
+        analysis_key = f"{fingerprints[slide_idx]}:lazy" if lazy_assets else fingerprints[slide_idx]
+        slide_data = slide_analysis_cache.get(analysis_key)
+        if slide_data is not None:
+            slide_data.update({
+                "number": slide_idx + 1,
+                "isCover": slide_idx == 0,
+                "preview": preview
+            })
+            analysis["slides"].append(slide_data)
+            reused_slides += 1
+            continue
+        
         # Extraer fondo del XML primero
-        slide_bg = extract_background(slide)
+        slide_bg = layout_index.background(slide_idx)
         bg_color_hex = slide_bg.get('color', '#FFFFFF')
         
         # Si el fondo es blanco pero la preview muestra otro color, extraer de la imagen
@@ -147,13 +168,14 @@ def analyze_presentation(pptx_path: str) -> Dict[str, Any]:
         
         slide_data = {
             "number": slide_idx + 1,
-            "type": detect_slide_type(slide),
+            "type": layout_index.slide_type(slide_idx),
             "layout": slide.slide_layout.name,
             "layoutType": get_layout_category(slide.slide_layout.name),  # Nuevo
-            "isTitle": is_title_slide(slide),  # Nuevo
+            "isTitle": layout_index.is_title(slide_idx),  # Nuevo
             "isCover": slide_idx == 0,  # Nuevo: primera slide es portada
             "background": slide_bg,
-            "preview": slide_images[slide_idx] if slide_idx < len(slide_images) else None,
+            "preview": preview,
+            "fingerprint": fingerprints[slide_idx],
             "textAreas": [],
             "imageAreas": [],
             "shapes": []
@@ -166,7 +188,7 @@ def analyze_presentation(pptx_path: str) -> Dict[str, Any]:
                 slide_data["textAreas"].append(text_area)
             
             elif shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                image_area = extract_image_area(shape)
+                image_area = extract_image_area(shape, lazy=lazy_assets)
                 slide_data["imageAreas"].append(image_area)
             
             else:
@@ -174,9 +196,260 @@ def analyze_presentation(pptx_path: str) -> Dict[str, Any]:
                 slide_data["shapes"].append(shape_data)
         
         analysis["slides"].append(slide_data)
+        
+        # El fondo puede venir de la preview: no guardar el de un placeholder
+        if slide_renderers[slide_idx] is not None:
+            slide_analysis_cache.put(analysis_key, dict(slide_data, preview=None))
+    
+    if reused_slides:
+        print(f"♻️ {reused_slides}/{len(prs.slides)} slides sin cambios (análisis reutilizado)")
+    
+    analysis["layoutIndex"] = layout_index.get_stats()
+    print(f"🧩 {len(prs.slides)} slides en {analysis['layoutIndex']['layouts']} layouts "
+          f"(reuso {analysis['layoutIndex']['reuseRatio']:.0%})")
     
     return analysis
 
+def available_preview_renderers() -> List[tuple]:
+    """Pares (renderizador, resolución) disponibles, en orden de preferencia"""
+    available = {
+        'uno': UNO_AVAILABLE,
+        'libreoffice': LIBREOFFICE_AVAILABLE,
+        'full': FULL_RENDERER_AVAILABLE,
+    }
+    return [(name, resolution) for name, resolution in PREVIEW_RESOLUTIONS.items() if available[name]]
+
+def render_slide_previews(pptx_path: str, prs, fingerprints: List[str],
+                          themes: Optional[ThemeResolver] = None) -> tuple:
+    """
+    Obtiene las previews de todos los slides: las de los slides sin cambios
+    salen de la caché de previews y sólo se renderizan las que faltan
+    (prioridad: UNO API > LibreOffice > Full Renderer > Placeholder)
+    
+    Los placeholders no se guardan: el siguiente análisis vuelve a intentar
+    un renderizado real. Tampoco se aceptan renderizados con un número de
+    imágenes distinto al de slides pedidos (no se sabría a qué slide
+    corresponde cada una)
+    
+    themes (opcional) se comparte con el renderizador completo
+    
+    Returns:
+        (lista de (bytes, tipo MIME) a resolución completa, renderizador de
+        cada slide; None para los que quedaron en placeholder)
+    """
+    slide_count = len(prs.slides)
+    cached, cached_renderer = preview_cache.find_slides(fingerprints, available_preview_renderers())
+    if cached:
+        print(f"♻️ {len(cached)}/{slide_count} previews desde caché ({cached_renderer})")
+    
+    missing = [i for i in range(slide_count) if i not in cached]
+    images = dict(cached)
+    renderers = {i: cached_renderer for i in cached}
+    
+    if missing:
+        # Sin nada en caché se renderiza el archivo completo; si no, sólo los slides que cambiaron
+        slide_indices = missing if cached else None
+        rendered, renderer = render_slides(pptx_path, slide_indices, themes=themes)
+        if rendered and len(rendered) != len(missing):
+            # Un renderizador que se salta slides (sin PNG, ocultos en el PDF...)
+            # desplazaría las imágenes a otros slides: no se usan ni se guardan
+            print(f"⚠️ {renderer}: {len(rendered)} imágenes para {len(missing)} slides, se descartan")
+            rendered = []
+        rendered_images = dict(zip(missing, rendered))
+        if rendered_images:
+            stored = preview_cache.put_slides(fingerprints, renderer, PREVIEW_RESOLUTIONS[renderer], rendered_images)
+            print(f"💾 {stored} previews guardadas en caché ({renderer})")
+            images.update(rendered_images)
+            renderers.update((i, renderer) for i in rendered_images)
+    
+    placeholders = {i for i in range(slide_count) if i not in images}
+    if placeholders:
+        print(f"⚠️ Usando placeholders para {len(placeholders)} slides")
+        from pptx_to_images import generate_placeholder_image
+        for i in placeholders:
+            images[i] = generate_placeholder_image(i + 1, binary=True)
+    
+    return [images[i] for i in range(slide_count)], [renderers.get(i) for i in range(slide_count)]
+
+def preview_tier_images(fingerprints: List[str], slide_images: List[tuple],
+                        slide_renderers: List[str], tier: str) -> List[tuple]:
+    """
+    Previews del tamaño pedido, derivadas de las de resolución completa
+    (y guardadas en la caché de previews para la próxima vez)
+    """
+    if tier == 'full':
+        return slide_images
+    
+    images = []
+    for fingerprint, full, renderer in zip(fingerprints, slide_images, slide_renderers):
+        if renderer is None:
+            # Placeholder: se reduce sin guardarlo
+            images.append(derive_tiers(full[0])[tier])
+            continue
+        key = PreviewKey(fingerprint, renderer, PREVIEW_RESOLUTIONS[renderer], tier)
+        images.append(get_tier(preview_cache, key, full=full))
+    return images
+
+def preview_outputs(fingerprints: List[str], images: List[tuple], slide_renderers: List[str],
+                    tier: str, transport: str = DEFAULT_PREVIEW_TRANSPORT) -> List[str]:
+    """
+    Previews tal y como van en la respuesta: data URL base64 ('inline') o
+    URL de GET /api/previews/{fingerprint} ('url') para las que están en caché
+    """
+    outputs = []
+    for fingerprint, image, renderer in zip(fingerprints, images, slide_renderers):
+        if transport == 'url' and renderer is not None:
+            outputs.append(f"/api/previews/{fingerprint}?tier={tier}")
+        else:
+            outputs.append(to_data_url(*image))
+    return outputs
+
+def render_slides(pptx_path: str, slide_indices: List[int] = None,
+                  themes: Optional[ThemeResolver] = None) -> tuple:
+    """
+    Renderiza los slides pedidos (todos si slide_indices es None) con el
+    primer renderizador que funcione
+    
+    Returns:
+        (lista de (bytes, tipo MIME) en el orden de slide_indices, renderizador) o ([], None)
+    """
+    if UNO_AVAILABLE:
+        try:
+            print("🎨 Usando LibreOffice UNO API (máxima calidad)...")
+            slide_images = render_pptx_with_uno(pptx_path, slide_indices=slide_indices, binary=True)
+            print(f"✅ Generadas {len(slide_images)} imágenes con UNO API")
+            if slide_images:
+                return slide_images, 'uno'
+        except Exception as e:
+            print(f"⚠️ Error con UNO API: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    if LIBREOFFICE_AVAILABLE:
+        try:
+            print("🎨 Usando LibreOffice headless...")
+            slide_images = convert_pptx_to_images(pptx_path, slide_indices=slide_indices, binary=True)
+            print(f"✅ Generadas {len(slide_images)} imágenes con LibreOffice")
+            if slide_images:
+                return slide_images, 'libreoffice'
+        except Exception as e:
+            print(f"⚠️ Error con LibreOffice: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    if FULL_RENDERER_AVAILABLE:
+        try:
+            print("🎨 Usando renderizador completo...")
+            # No sabe renderizar slides sueltos: se renderiza todo y se eligen
+            slide_images = render_pptx_complete(pptx_path, binary=True, themes=themes)
+            if slide_indices is not None:
+                slide_images = [slide_images[i] for i in slide_indices]
+            print(f"✅ Generadas {len(slide_images)} imágenes con renderizador completo")
+            if slide_images:
+                return slide_images, 'full'
+        except Exception as e:
+            print(f"⚠️ Error con renderizador completo: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    return [], None
+
+def slide_layout_signature(slide) -> tuple:
+    """
+    Clave de layout de un slide: la parte del layout (p. ej.
+    /ppt/slideLayouts/slideLayout2.xml) y los tipos de sus placeholders, en
+    orden. Los slides con la misma clave se analizan igual.
+    """
+    placeholders = tuple(
+        shape.placeholder_format.type for shape in slide.shapes if shape.is_placeholder
+    )
+    return str(slide.slide_layout.part.partname), placeholders
+
+
+class LayoutIndex:
+    """
+    Slides de una presentación agrupados por layout
+    
+    Las presentaciones grandes reutilizan unos pocos layouts en decenas de
+    slides. El trabajo que sólo depende del layout se hace una vez por
+    grupo (slide_layout_signature) y se reparte a los slides del grupo:
+    
+    - el tipo de slide (detect_slide_type) e is_title_slide
+    - el fondo heredado (layout -> master -> tema) de los slides sin fondo propio
+    - el análisis de Gemini Vision de los templates (ver record())
+    
+    get_stats() reporta cuántos slides y grupos hay y qué parte del trabajo
+    se reutilizó. Los temas y los fondos se leen con `themes`, un
+    ThemeResolver que puede compartirse con el resto del análisis.
+    """
+    
+    def __init__(self, prs, themes: Optional[ThemeResolver] = None):
+        self.slides = list(prs.slides)
+        self.themes = themes or ThemeResolver()
+        self.keys = [slide_layout_signature(slide) for slide in self.slides]
+        self.groups: Dict[tuple, List[int]] = {}
+        for slide_idx, key in enumerate(self.keys):
+            self.groups.setdefault(key, []).append(slide_idx)
+        self._memo: Dict[tuple, Any] = {}
+        self._work: Dict[str, Dict[str, int]] = {}
+    
+    def representatives(self) -> List[int]:
+        """Primer slide de cada grupo, en orden"""
+        return [members[0] for members in self.groups.values()]
+    
+    def representative(self, slide_idx: int) -> int:
+        return self.groups[self.keys[slide_idx]][0]
+    
+    def record(self, kind: str, computed: int = 0, reused: int = 0) -> None:
+        """Anota trabajo hecho fuera del índice (p. ej. llamadas a Gemini)"""
+        work = self._work.setdefault(kind, {"computed": 0, "reused": 0})
+        work["computed"] += computed
+        work["reused"] += reused
+    
+    def _memoize(self, kind: str, key: tuple, compute: Callable[[], Any]) -> Any:
+        memo_key = (kind,) + key
+        if memo_key in self._memo:
+            self.record(kind, reused=1)
+        else:
+            self.record(kind, computed=1)
+            self._memo[memo_key] = compute()
+        return self._memo[memo_key]
+    
+    def slide_type(self, slide_idx: int) -> str:
+        slide = self.slides[slide_idx]
+        # detect_slide_type también mira si es el slide con id 1
+        key = (self.keys[slide_idx], slide.slide_id == 1)
+        return self._memoize("slideType", key, lambda: detect_slide_type(slide))
+    
+    def is_title(self, slide_idx: int) -> bool:
+        slide = self.slides[slide_idx]
+        return self._memoize("isTitle", (self.keys[slide_idx],), lambda: is_title_slide(slide))
+    
+    def background(self, slide_idx: int) -> Dict[str, Any]:
+        """Fondo del slide (una copia: quien lo recibe puede modificarla)"""
+        slide = self.slides[slide_idx]
+        if slide.follow_master_background:
+            key = (self.keys[slide_idx],)
+        else:
+            key = ("slide", slide_idx)
+        return dict(self._memoize("background", key, lambda: extract_background(slide, self.themes)))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        slides = len(self.slides)
+        layouts = len(self.groups)
+        work = {}
+        for kind, counts in self._work.items():
+            total = counts["computed"] + counts["reused"]
+            work[kind] = dict(counts, reuseRatio=round(counts["reused"] / total, 3) if total else 0.0)
+        return {
+            "slides": slides,
+            "layouts": layouts,
+            "reuseRatio": round(1 - layouts / slides, 3) if slides else 0.0,
+            "work": work,
+            "themes": dict(self.themes.stats)
+        }
+
+
 def detect_slide_type(slide) -> str:
     """
     Detecta el tipo de diapositiva basándose en múltiples criterios:
@@ -302,54 +575,16 @@ def is_title_slide(slide) -> bool:
     # Es título si tiene título y subtítulo pero NO contenido
     return has_title and has_subtitle and not has_content
 
-def get_theme_colors(slide) -> Dict[str, str]:
+def get_theme_colors(slide, themes: Optional[ThemeResolver] = None) -> Dict[str, str]:
     """
     Extrae los colores del tema del PPTX
+    
+    Con un ThemeResolver cada tema se parsea una sola vez por presentación
     """
-    try:
-        from lxml import etree
-        
-        namespaces = {
-            'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
-        }
-        
-        # Acceder al tema a través del master
-        master = slide.slide_layout.slide_master
-        theme_part = master.part.part_related_by('http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme')
-        theme_xml = theme_part.blob
-        theme_root = etree.fromstring(theme_xml)
-        
-        # Buscar el esquema de colores
-        color_scheme = theme_root.find('.//a:clrScheme', namespaces)
-        
-        if color_scheme is None:
-            return {}
-        
-        theme_colors = {}
-        
-        for color_elem in color_scheme:
-            color_name = color_elem.tag.split('}')[-1]
-            
-            # Buscar el valor del color
-            srgb = color_elem.find('.//a:srgbClr', namespaces)
-            sys_clr = color_elem.find('.//a:sysClr', namespaces)
-            
-            if srgb is not None:
-                color_val = srgb.get('val')
-                theme_colors[color_name] = f"#{color_val}"
-            elif sys_clr is not None:
-                color_val = sys_clr.get('lastClr')
-                if color_val:
-                    theme_colors[color_name] = f"#{color_val}"
-        
-        return theme_colors
-        
-    except Exception as e:
-        print(f"   ⚠️ Error extrayendo colores del tema: {e}")
-        return {}
+    return (themes or ThemeResolver()).theme_colors(slide)
 
 
-def extract_background(slide) -> Dict[str, Any]:
+def extract_background(slide, themes: Optional[ThemeResolver] = None) -> Dict[str, Any]:
     """
     Extrae información del fondo de la diapositiva
     Lee directamente del XML y usa los colores reales del tema
@@ -360,182 +595,35 @@ def extract_background(slide) -> Dict[str, Any]:
     3. Si no hay, buscar en el slide master
     4. Si no hay, usar color del tema (lt1 o bg1)
     5. Si todo falla, usar el color dominante del preview
+    
+    Los pasos 2-4 sólo dependen del layout: con un ThemeResolver compartido
+    se resuelven una vez por layout (y el tema una vez por master)
     """
-    background = {
-        "type": "solid",
-        "color": None,
-        "source": "unknown"  # slide, layout, master, theme, preview
-    }
+    themes = themes or ThemeResolver()
     
     try:
-        from lxml import etree
-        
-        # Obtener colores del tema primero
-        theme_colors = get_theme_colors(slide)
-        
-        # Mapeo de colores del tema a nombres legibles
-        theme_color_names = {
-            'bg1': 'Fondo 1',
-            'bg2': 'Fondo 2',
-            'tx1': 'Texto 1',
-            'tx2': 'Texto 2',
-            'lt1': 'Claro 1',
-            'lt2': 'Claro 2',
-            'dk1': 'Oscuro 1',
-            'dk2': 'Oscuro 2',
-            'accent1': 'Acento 1',
-            'accent2': 'Acento 2',
-            'accent3': 'Acento 3',
-            'accent4': 'Acento 4',
-            'accent5': 'Acento 5',
-            'accent6': 'Acento 6',
-        }
-        
-        def apply_theme_color(scheme_val, source_name):
-            """Aplica un color del tema al fondo"""
-            if scheme_val in theme_colors:
-                background["color"] = theme_colors[scheme_val]
-                background["source"] = source_name
-                color_name = theme_color_names.get(scheme_val, scheme_val)
-                print(f"   ✅ Color del tema ({color_name}) aplicado desde {source_name}: {background['color']}")
-            else:
-                # Fallback a colores por defecto
-                scheme_colors_default = {
-                    'bg1': '#FFFFFF',
-                    'bg2': '#F2F2F2',
-                    'tx1': '#000000',
-                    'tx2': '#1F1F1F',
-                    'accent1': '#4472C4',
-                    'accent2': '#ED7D31',
-                    'accent3': '#A5A5A5',
-                    'accent4': '#FFC000',
-                    'accent5': '#5B9BD5',
-                    'accent6': '#70AD47',
-                    'dk1': '#000000',
-                    'lt1': '#FFFFFF',
-                    'dk2': '#1F1F1F',
-                    'lt2': '#EEECE1'
-                }
-                background["color"] = scheme_colors_default.get(scheme_val, '#FFFFFF')
-                background["source"] = f"{source_name}_default"
-                color_name = theme_color_names.get(scheme_val, scheme_val)
-                print(f"   ⚠️ Color por defecto ({color_name}) aplicado: {background['color']}")
-        
-        # Namespaces de PowerPoint
-        namespaces = {
-            'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
-            'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
-        }
-        
         # ===== 1. Buscar en el slide XML =====
-        slide_part = slide.part
-        slide_xml = slide_part.blob
-        root = etree.fromstring(slide_xml)
-        
-        bg_element = root.find('.//p:cSld/p:bg', namespaces)
+        bg_element = themes.background_element(slide)
         
         if bg_element is not None:
-            # Color sólido directo
-            solid_fill = bg_element.find('.//a:solidFill/a:srgbClr', namespaces)
-            if solid_fill is not None:
-                color_val = solid_fill.get('val')
-                if color_val:
-                    background["color"] = f"#{color_val}"
-                    background["type"] = "solid"
-                    background["source"] = "slide"
-                    print(f"   ✅ Color de fondo extraído del slide: {background['color']}")
-                    return background
-            
-            # Color del esquema
-            scheme_fill = bg_element.find('.//a:solidFill/a:schemeClr', namespaces)
-            if scheme_fill is not None:
-                scheme_val = scheme_fill.get('val')
-                apply_theme_color(scheme_val, "slide")
+            # Color sólido directo o del esquema
+            background = solid_background(bg_element, themes.theme_colors(slide), "slide")
+            if background:
                 return background
             
             # Gradiente
-            grad_fill = bg_element.find('.//a:gradFill', namespaces)
+            grad_fill = bg_element.find('.//a:gradFill', THEME_NAMESPACES)
             if grad_fill is not None:
-                background["type"] = "gradient"
-                first_color = grad_fill.find('.//a:srgbClr', namespaces)
+                first_color = grad_fill.find('.//a:srgbClr', THEME_NAMESPACES)
                 if first_color is not None:
                     color_val = first_color.get('val')
                     if color_val:
-                        background["color"] = f"#{color_val}"
-                        background["source"] = "slide_gradient"
-                        print(f"   ✅ Color de gradiente extraído del slide: {background['color']}")
-                        return background
+                        print(f"   ✅ Color de gradiente extraído del slide: #{color_val}")
+                        return {"type": "gradient", "color": f"#{color_val}", "source": "slide_gradient"}
         
-        # ===== 2. Buscar en el layout =====
+        # ===== 2-4. Layout, master y tema =====
         print(f"   ℹ️ No se encontró fondo en el slide, buscando en layout...")
-        layout_part = slide.slide_layout.part
-        layout_xml = layout_part.blob
-        layout_root = etree.fromstring(layout_xml)
-        
-        bg_element = layout_root.find('.//p:cSld/p:bg', namespaces)
-        if bg_element is not None:
-            solid_fill = bg_element.find('.//a:solidFill/a:srgbClr', namespaces)
-            if solid_fill is not None:
-                color_val = solid_fill.get('val')
-                if color_val:
-                    background["color"] = f"#{color_val}"
-                    background["type"] = "solid"
-                    background["source"] = "layout"
-                    print(f"   ✅ Color de fondo extraído del layout: {background['color']}")
-                    return background
-            
-            scheme_fill = bg_element.find('.//a:solidFill/a:schemeClr', namespaces)
-            if scheme_fill is not None:
-                scheme_val = scheme_fill.get('val')
-                apply_theme_color(scheme_val, "layout")
-                return background
-        
-        # ===== 3. Buscar en el slide master =====
-        print(f"   ℹ️ No se encontró fondo en el layout, buscando en master...")
-        try:
-            master = slide.slide_layout.slide_master
-            master_part = master.part
-            master_xml = master_part.blob
-            master_root = etree.fromstring(master_xml)
-            
-            bg_element = master_root.find('.//p:cSld/p:bg', namespaces)
-            if bg_element is not None:
-                solid_fill = bg_element.find('.//a:solidFill/a:srgbClr', namespaces)
-                if solid_fill is not None:
-                    color_val = solid_fill.get('val')
-                    if color_val:
-                        background["color"] = f"#{color_val}"
-                        background["type"] = "solid"
-                        background["source"] = "master"
-                        print(f"   ✅ Color de fondo extraído del master: {background['color']}")
-                        return background
-                
-                scheme_fill = bg_element.find('.//a:solidFill/a:schemeClr', namespaces)
-                if scheme_fill is not None:
-                    scheme_val = scheme_fill.get('val')
-                    apply_theme_color(scheme_val, "master")
-                    return background
-        except Exception as master_error:
-            print(f"   ⚠️ Error buscando en master: {master_error}")
-        
-        # ===== 4. Usar color del tema directamente =====
-        print(f"   ℹ️ No se encontró fondo explícito, usando color del tema...")
-        
-        # Preferir lt1 (usual para fondos claros) o bg1
-        if 'lt1' in theme_colors:
-            background["color"] = theme_colors['lt1']
-            background["source"] = "theme_lt1"
-            print(f"   ✅ Color del tema (lt1) aplicado: {background['color']}")
-        elif 'bg1' in theme_colors:
-            background["color"] = theme_colors['bg1']
-            background["source"] = "theme_bg1"
-            print(f"   ✅ Color del tema (bg1) aplicado: {background['color']}")
-        elif theme_colors:
-            # Usar el primer color del tema disponible
-            first_color = list(theme_colors.values())[0]
-            background["color"] = first_color
-            background["source"] = "theme_first"
-            print(f"   ✅ Primer color del tema aplicado: {background['color']}")
+        return themes.inherited_background(slide)
         
     except Exception as e:
         print(f"   ⚠️ Error extrayendo fondo del XML: {e}")
@@ -543,12 +631,8 @@ def extract_background(slide) -> Dict[str, Any]:
         traceback.print_exc()
     
     # Si todo falla, #FFFFFF por defecto
-    if not background["color"]:
-        background["color"] = "#FFFFFF"
-        background["source"] = "default_white"
-        print(f"   ℹ️ No se pudo detectar color de fondo, usando blanco por defecto")
-    
-    return background
+    print(f"   ℹ️ No se pudo detectar color de fondo, usando blanco por defecto")
+    return {"type": "solid", "color": "#FFFFFF", "source": "default_white"}
 
 def extract_text_area(shape) -> Dict[str, Any]:
     """
@@ -646,9 +730,12 @@ def extract_text_formatting(text_frame) -> Dict[str, Any]:
     
     return formatting
 
-def extract_image_area(shape) -> Dict[str, Any]:
+def extract_image_area(shape, lazy: bool = False) -> Dict[str, Any]:
     """
     Extrae información de un área de imagen, incluyendo la imagen original con transparencia
+    
+    En modo lazy la imagen se guarda en el asset store y el área lleva su
+    hash y su URL en lugar del data URL base64
     """
     image_data = {
         "id": shape.shape_id,
@@ -664,6 +751,8 @@ def extract_image_area(shape) -> Dict[str, Any]:
         "format": None,
         "isLogo": False
     }
+    if lazy:
+        del image_data["imageBase64"]
     
     try:
         # Extraer la imagen original del shape
@@ -705,10 +794,21 @@ def extract_image_area(shape) -> Dict[str, Any]:
             image_data["isLogo"] = True
             print(f"🏷️ Posible logo detectado: shape_id={shape.shape_id}")
         
-        # Convertir a base64 para enviar al frontend
-        img_base64 = base64.b64encode(image_bytes).decode('utf-8')
         mime_type = content_type if content_type else f"image/{image_data['format']}"
-        image_data["imageBase64"] = f"data:{mime_type};base64,{img_base64}"
+        if lazy:
+            # Sólo metadatos: los bytes se sirven desde /api/assets/{hash}
+            from services.asset_store import asset_store
+            asset_hash, _, _ = asset_store.save_bytes(image_bytes, image.ext)
+            image_data.update({
+                "assetHash": asset_hash,
+                "mimeType": mime_type,
+                "size": len(image_bytes),
+                "url": f"/api/assets/{asset_hash}",
+            })
+        else:
+            # Convertir a base64 para enviar al frontend
+            img_base64 = base64.b64encode(image_bytes).decode('utf-8')
+            image_data["imageBase64"] = f"data:{mime_type};base64,{img_base64}"
         
         print(f"✅ Imagen extraída: format={image_data['format']}, transparency={image_data['hasTransparency']}, logo={image_data['isLogo']}")
         
@@ -750,9 +850,10 @@ def rgb_to_hex(rgb):
     return f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
 
 
-def extract_dominant_color_from_preview(preview_base64: str) -> str:
+def extract_dominant_color_from_preview(preview) -> str:
     """
     Extrae el color dominante de una imagen preview del slide
+    (data URL o (bytes, tipo MIME))
     Útil cuando el fondo no se puede extraer del XML
     """
     try:
@@ -762,10 +863,7 @@ def extract_dominant_color_from_preview(preview_base64: str) -> str:
         from collections import Counter
         
         # Decodificar imagen
-        if ',' in preview_base64:
-            preview_base64 = preview_base64.split(',')[1]
-        
-        image_data = base64.b64decode(preview_base64)
+        image_data, _ = to_binary(preview)
         img = Image.open(BytesIO(image_data))
         
         # Redimensionar para análisis más rápido
@@ -799,12 +897,22 @@ def extract_dominant_color_from_preview(preview_base64: str) -> str:
         return "#FFFFFF"
 
 
-def extract_all_assets(prs) -> Dict[str, Any]:
+def extract_all_assets(prs, lazy: bool = False, layout_index: LayoutIndex = None) -> Dict[str, Any]:
     """
     Extrae todos los assets (imágenes, logos) del PPTX
     Preserva transparencias y formatos originales
     Incluye el color de fondo del slide para cada asset
+    
+    Las imágenes repetidas (mismo contenido) producen un único asset cuya
+    lista "occurrences" recoge cada shape donde aparece
+    
+    En modo lazy cada imagen se guarda en el asset store y el asset lleva
+    assetHash/url (y processedUrl si el fondo no es blanco) en lugar de
+    imageBase64; el procesado del fondo se hace al pedir la URL
+    
+    layout_index (opcional) comparte los fondos ya resueltos por layout
     """
+    layout_index = layout_index or LayoutIndex(prs)
     assets = {
         "logos": [],
         "images": [],
@@ -813,7 +921,10 @@ def extract_all_assets(prs) -> Dict[str, Any]:
         "totalCount": 0
     }
     
-    seen_blobs = set()  # Para evitar duplicados
+    # Índice de assets por contenido (SHA-1 del blob completo, el mismo que
+    # calcula python-pptx): cada imagen única se decodifica y procesa una
+    # sola vez y todas sus apariciones apuntan al mismo asset
+    asset_index: Dict[str, Dict[str, Any]] = {}
     
     for slide_idx, slide in enumerate(prs.slides):
         # Detectar elementos animados en este slide
@@ -822,7 +933,7 @@ def extract_all_assets(prs) -> Dict[str, Any]:
         print(f"   Resultado: {len(animated_shape_ids)} shapes animados detectados: {animated_shape_ids}")
         
         # Extraer color de fondo del slide
-        slide_bg_color = extract_background(slide)
+        slide_bg_color = layout_index.background(slide_idx)
         bg_color_hex = slide_bg_color.get('color', '#FFFFFF')  # Default blanco
         print(f"   🎨 Color de fondo del slide: {bg_color_hex}")
         
@@ -830,11 +941,29 @@ def extract_all_assets(prs) -> Dict[str, Any]:
             if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
                 try:
                     image = shape.image
-                    blob_hash = hash(image.blob[:100])  # Hash parcial para detectar duplicados
                     
-                    if blob_hash in seen_blobs:
+                    # Detectar si tiene animación
+                    has_animation = shape.shape_id in animated_shape_ids
+                    
+                    occurrence = {
+                        "slideNumber": slide_idx + 1,
+                        "shapeId": shape.shape_id,
+                        "hasAnimation": has_animation,
+                        "backgroundColor": bg_color_hex,
+                        "position": {
+                            "x": shape.left,
+                            "y": shape.top,
+                            "width": shape.width,
+                            "height": shape.height
+                        }
+                    }
+                    
+                    # Imagen ya vista: sólo registrar la aparición
+                    existing = asset_index.get(image.sha1)
+                    if existing is not None:
+                        existing["occurrences"].append(occurrence)
+                        existing["hasAnimation"] = existing["hasAnimation"] or has_animation
                         continue
-                    seen_blobs.add(blob_hash)
                     
                     image_bytes = image.blob
                     content_type = image.content_type
@@ -863,22 +992,36 @@ def extract_all_assets(prs) -> Dict[str, Any]:
                     slide_height = prs.slide_height
                     is_logo = (shape.width / slide_width < 0.25) and (shape.height / slide_height < 0.25)
                     
-                    # Detectar si tiene animación
-                    has_animation = shape.shape_id in animated_shape_ids
-                    
-                    # Crear asset
-                    img_base64 = base64.b64encode(image_bytes).decode('utf-8')
                     mime_type = content_type if content_type else f"image/{img_format}"
-                    original_image = f"data:{mime_type};base64,{img_base64}"
+                    needs_background = bool(bg_color_hex) and bg_color_hex != "#FFFFFF"
                     
-                    # PROCESAR IMAGEN: Remover fondo blanco y aplicar color del slide
-                    processed_image = original_image
-                    if bg_color_hex and bg_color_hex != "#FFFFFF":
-                        print(f"      🎨 Procesando imagen para aplicar fondo {bg_color_hex}...")
-                        processed_image = smart_background_removal(original_image, bg_color_hex)
-                        print(f"      ✅ Imagen procesada con nuevo fondo")
+                    if lazy:
+                        # Sólo metadatos: los bytes se sirven desde /api/assets/{hash}
+                        from services.asset_store import asset_store
+                        asset_hash, _, _ = asset_store.save_bytes(image_bytes, image.ext)
+                        image_fields = {
+                            "assetHash": asset_hash,
+                            "mimeType": mime_type,
+                            "size": len(image_bytes),
+                            "url": f"/api/assets/{asset_hash}",
+                        }
+                        if needs_background:
+                            image_fields["processedUrl"] = f"/api/assets/{asset_hash}?bg={bg_color_hex.lstrip('#')}"
+                    else:
+                        # Crear asset
+                        img_base64 = base64.b64encode(image_bytes).decode('utf-8')
+                        original_image = f"data:{mime_type};base64,{img_base64}"
+                        
+                        # PROCESAR IMAGEN: Remover fondo blanco y aplicar color del slide
+                        processed_image = original_image
+                        if needs_background:
+                            print(f"      🎨 Procesando imagen para aplicar fondo {bg_color_hex}...")
+                            processed_image = smart_background_removal(original_image, bg_color_hex)
+                            print(f"      ✅ Imagen procesada con nuevo fondo")
+                        image_fields = {"imageBase64": processed_image}  # Usar imagen procesada
                     
-                    asset = {
+                    # La primera aparición define posición y fondo del asset
+                    asset_index[image.sha1] = {
                         "id": f"asset_{slide_idx}_{shape.shape_id}",
                         "slideNumber": slide_idx + 1,
                         "shapeId": shape.shape_id,
@@ -887,33 +1030,30 @@ def extract_all_assets(prs) -> Dict[str, Any]:
                         "hasAnimation": has_animation,
                         "isLogo": is_logo,
                         "backgroundColor": bg_color_hex,  # Color de fondo del slide
-                        "position": {
-                            "x": shape.left,
-                            "y": shape.top,
-                            "width": shape.width,
-                            "height": shape.height
-                        },
-                        "imageBase64": processed_image  # Usar imagen procesada
+                        "position": occurrence["position"],
+                        **image_fields,
+                        "occurrences": [occurrence]
                     }
                     
-                    # Clasificar - priorizar elementos animados
-                    if has_animation:
-                        assets["animatedElements"].append(asset)
-                        print(f"🎬 Elemento animado extraído: slide {slide_idx + 1}, shape_id={shape.shape_id}")
-                    elif is_logo:
-                        assets["logos"].append(asset)
-                        print(f"🏷️ Logo extraído: slide {slide_idx + 1}, transparency={has_transparency}")
-                    elif has_transparency:
-                        assets["transparentImages"].append(asset)
-                        print(f"🔍 Imagen transparente extraída: slide {slide_idx + 1}")
-                    else:
-                        assets["images"].append(asset)
-                    
-                    assets["totalCount"] += 1
-                    
                 except Exception as e:
                     print(f"⚠️ Error extrayendo asset: {e}")
     
+    for asset in asset_index.values():
+        # Clasificar - priorizar elementos animados (en cualquiera de sus apariciones)
+        if asset["hasAnimation"]:
+            assets["animatedElements"].append(asset)
+            print(f"🎬 Elemento animado extraído: slide {asset['slideNumber']}, shape_id={asset['shapeId']}")
+        elif asset["isLogo"]:
+            assets["logos"].append(asset)
+            print(f"🏷️ Logo extraído: slide {asset['slideNumber']}, transparency={asset['hasTransparency']}")
+        elif asset["hasTransparency"]:
+            assets["transparentImages"].append(asset)
+            print(f"🔍 Imagen transparente extraída: slide {asset['slideNumber']}")
+        else:
+            assets["images"].append(asset)
+        
+        assets["totalCount"] += 1
+    
     print(f"📦 Assets extraídos: {assets['totalCount']} total ({len(assets['logos'])} logos, {len(assets['transparentImages'])} transparentes, {len(assets['animatedElements'])} animados, {len(assets['images'])} imágenes)")
     
     return assets
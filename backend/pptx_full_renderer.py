@@ -6,17 +6,23 @@ from pptx import Presentation
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 from io import BytesIO
 import base64
-from typing import List, Dict, Tuple
-from lxml import etree
+from typing import List, Dict, Optional, Tuple
 import re
 
+from preview_encoding import DEFAULT_PREVIEW_ENCODING, EncodedPreview, PreviewEncoding
+from theme_resolver import ThemeResolver
+
 class PPTXRenderer:
     """Renderizador completo de presentaciones PPTX"""
     
-    def __init__(self, pptx_path: str, dpi: int = 96, scale: int = 3):
+    def __init__(self, pptx_path: str, dpi: int = 96, scale: int = 3,
+                 encoding: Optional[PreviewEncoding] = None, binary: bool = False,
+                 themes: Optional[ThemeResolver] = None):
         self.prs = Presentation(pptx_path)
         self.dpi = dpi
         self.scale = scale  # Factor de escala para mejor calidad
+        self.encoding = encoding or DEFAULT_PREVIEW_ENCODING  # Formato de las imágenes
+        self.binary = binary  # (bytes, tipo MIME) en lugar de data URL
         
         # Dimensiones del slide
         self.slide_width_emu = self.prs.slide_width
@@ -26,7 +32,10 @@ class PPTXRenderer:
         self.width_px = int(self.slide_width_emu / 914400 * dpi * scale)
         self.height_px = int(self.slide_height_emu / 914400 * dpi * scale)
         
-        # Cache de colores del tema
+        # Temas y fondos memoizados por parte (compartidos con el análisis)
+        self.themes = themes or ThemeResolver()
+        
+        # Colores del tema del slide que se está renderizando
         self.theme_colors = {}
         
         # Namespaces XML
@@ -41,36 +50,8 @@ class PPTXRenderer:
         return int(emu / 914400 * self.dpi * self.scale)
     
     def extract_theme_colors(self, slide) -> Dict[str, str]:
-        """Extrae colores del tema"""
-        if self.theme_colors:
-            return self.theme_colors
-        
-        try:
-            master = slide.slide_layout.slide_master
-            theme_part = master.part.part_related_by(
-                'http://schemas.openxmlformats.org/officeDocument/2006/relationships/theme'
-            )
-            theme_xml = theme_part.blob
-            theme_root = etree.fromstring(theme_xml)
-            
-            color_scheme = theme_root.find('.//a:clrScheme', self.ns)
-            if color_scheme is not None:
-                for color_elem in color_scheme:
-                    color_name = color_elem.tag.split('}')[-1]
-                    
-                    srgb = color_elem.find('.//a:srgbClr', self.ns)
-                    sys_clr = color_elem.find('.//a:sysClr', self.ns)
-                    
-                    if srgb is not None:
-                        color_val = srgb.get('val')
-                        self.theme_colors[color_name] = f"#{color_val}"
-                    elif sys_clr is not None:
-                        color_val = sys_clr.get('lastClr')
-                        if color_val:
-                            self.theme_colors[color_name] = f"#{color_val}"
-        except Exception as e:
-            print(f"   ⚠️ Error extrayendo tema: {e}")
-        
+        """Extrae colores del tema (el del master de cada slide, parseado una vez)"""
+        self.theme_colors = self.themes.theme_colors(slide)
         return self.theme_colors
     
     def parse_color(self, color_elem, default='#FFFFFF') -> str:
@@ -101,12 +82,8 @@ class PPTXRenderer:
     def render_background(self, slide, img: Image.Image) -> Image.Image:
         """Renderiza el fondo del slide"""
         try:
-            slide_part = slide.part
-            slide_xml = slide_part.blob
-            root = etree.fromstring(slide_xml)
-            
             # Buscar elemento de fondo
-            bg_element = root.find('.//p:cSld/p:bg', self.ns)
+            bg_element = self.themes.background_element(slide)
             
             if bg_element is not None:
                 bg_pr = bg_element.find('.//p:bgPr', self.ns)
@@ -135,11 +112,7 @@ class PPTXRenderer:
                         return img
             
             # Si no hay fondo en el slide, buscar en layout
-            layout_part = slide.slide_layout.part
-            layout_xml = layout_part.blob
-            layout_root = etree.fromstring(layout_xml)
-            
-            bg_element = layout_root.find('.//p:cSld/p:bg', self.ns)
+            bg_element = self.themes.background_element(slide.slide_layout)
             if bg_element is not None:
                 bg_pr = bg_element.find('.//p:bgPr', self.ns)
                 if bg_pr is not None:
@@ -289,7 +262,7 @@ class PPTXRenderer:
         except Exception as e:
             print(f"      ⚠️ Error en forma: {e}")
     
-    def render_slide(self, slide_idx: int) -> str:
+    def render_slide(self, slide_idx: int) -> EncodedPreview:
         """Renderiza un slide completo"""
         slide = self.prs.slides[slide_idx]
         
@@ -307,16 +280,14 @@ class PPTXRenderer:
         # 2. Renderizar shapes
         img = self.render_shapes(slide, img)
         
-        # Convertir a base64
-        buffer = BytesIO()
-        img.save(buffer, format='PNG', quality=95)
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+        # Codificar en el formato de las previews
+        data = self.encoding.encode(img)
         
         print(f"   ✅ Slide {slide_idx + 1} completado")
         
-        return f"data:image/png;base64,{img_str}"
+        return self.encoding.output(data, self.binary)
     
-    def render_all(self) -> List[str]:
+    def render_all(self) -> List[EncodedPreview]:
         """Renderiza todos los slides"""
         print(f"\n🎨 Renderizador Completo de PPTX")
         print(f"   Dimensiones: {self.width_px}x{self.height_px} px")
@@ -332,9 +303,13 @@ class PPTXRenderer:
         return images
 
 
-def render_pptx_complete(pptx_path: str) -> List[str]:
+def render_pptx_complete(pptx_path: str, encoding: Optional[PreviewEncoding] = None,
+                         binary: bool = False, themes: Optional[ThemeResolver] = None) -> List[EncodedPreview]:
     """
     Función principal para renderizar PPTX completo
+    
+    themes: ThemeResolver del mismo archivo para reutilizar sus temas ya parseados
     """
-    renderer = PPTXRenderer(pptx_path, dpi=96, scale=2)  # Reducir escala a 2x
+    renderer = PPTXRenderer(pptx_path, dpi=96, scale=2,  # Reducir escala a 2x
+                            encoding=encoding, binary=binary, themes=themes)
     return renderer.render_all()
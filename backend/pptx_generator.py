@@ -3,7 +3,7 @@ from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 import tempfile
 import os
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 from copy import deepcopy
 
 # Importar el nuevo clonador XML avanzado
@@ -54,7 +54,9 @@ except ImportError as e:
 
 def generate_presentation(original_path: str, ai_content: Optional[Dict] = None,
                          use_xml_cloner: bool = True,
-                         text_areas_by_slide: List[List[Dict]] = None) -> str:
+                         text_areas_by_slide: List[List[Dict]] = None,
+                         template_hash: Optional[str] = None,
+                         progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
     """
     Genera una nueva presentación CLONANDO completamente el diseño original
     y solo reemplazando el contenido de texto con el generado por IA.
@@ -71,6 +73,8 @@ def generate_presentation(original_path: str, ai_content: Optional[Dict] = None,
         use_xml_cloner: Si True, usa el clonador XML avanzado que preserva
                        animaciones, transiciones, SmartArt, etc.
         text_areas_by_slide: Lista de textAreas por slide para reemplazo preciso
+        template_hash: SHA-256 del template si viene del almacén de templates
+        progress_callback: Función opcional (slides_procesados, total_slides)
     
     Returns:
         Ruta al archivo PPTX generado
@@ -84,7 +88,9 @@ def generate_presentation(original_path: str, ai_content: Optional[Dict] = None,
         if XML_CLONER_AVAILABLE:
             try:
                 print("🚀 Usando CLONADOR XML (preserva animaciones, SmartArt, gradientes, macros)")
-                return generate_with_xml_cloner(original_path, ai_content, text_areas_by_slide)
+                return generate_with_xml_cloner(original_path, ai_content, text_areas_by_slide,
+                                                template_hash=template_hash,
+                                                progress_callback=progress_callback)
             except Exception as e:
                 print(f"⚠️ Error con clonador XML: {e}")
                 import traceback
@@ -97,7 +103,9 @@ def generate_presentation(original_path: str, ai_content: Optional[Dict] = None,
 
 
 def generate_with_xml_cloner(original_path: str, ai_content: Dict,
-                            text_areas_by_slide: List[List[Dict]] = None) -> str:
+                            text_areas_by_slide: List[List[Dict]] = None,
+                            template_hash: Optional[str] = None,
+                            progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
     """
     Genera presentación usando el clonador XML avanzado.
     
@@ -113,6 +121,8 @@ def generate_with_xml_cloner(original_path: str, ai_content: Dict,
         original_path: Ruta al template
         ai_content: Contenido IA
         text_areas_by_slide: Lista de textAreas por slide para reemplazo preciso
+        template_hash: SHA-256 del template (evita volver a calcularlo)
+        progress_callback: Función opcional (slides_procesados, total_slides)
     """
     print("🚀 Usando clonador XML avanzado (preserva animaciones, SmartArt, etc.)")
     
@@ -149,7 +159,10 @@ def generate_with_xml_cloner(original_path: str, ai_content: Dict,
     
     # Usar el clonador XML con textAreas para reemplazo preciso
     try:
-        output_path = clone_pptx_preserving_all(original_path, content_by_slide, text_areas_by_slide)
+        output_path = clone_pptx_preserving_all(
+            original_path, content_by_slide, text_areas_by_slide, template_hash=template_hash,
+            progress_callback=progress_callback
+        )
         print(f"✅ Presentación generada con clonador XML: {output_path}")
         return output_path
     except Exception as e:
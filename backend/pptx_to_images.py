@@ -2,40 +2,54 @@
 Conversor de PPT a imágenes de alta calidad
 Usa LibreOffice en modo headless (gratis, sin marcas de agua, calidad profesional)
 """
-import subprocess
 import os
 import tempfile
 import base64
 from PIL import Image
 import io
-from typing import List
-import shutil
+import re
+import zipfile
+from typing import List, Optional, Callable, Sequence
 
-def find_libreoffice():
-    """Encuentra la ruta de LibreOffice en el sistema"""
-    possible_paths = [
-        r"C:\Program Files\LibreOffice\program\soffice.exe",
-        r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
-        r"C:\Program Files\LibreOffice\program\soffice.com",
-        "/usr/bin/libreoffice",
-        "/usr/bin/soffice",
-        "/Applications/LibreOffice.app/Contents/MacOS/soffice"
-    ]
-    
-    for path in possible_paths:
-        if os.path.exists(path):
-            return path
-    
-    # Intentar encontrar en PATH
-    result = shutil.which("soffice") or shutil.which("libreoffice")
-    return result
+from libreoffice_pool import LibreOfficeError, find_libreoffice, libreoffice_pool
+from pdf_rasterizer import DEFAULT_DPI, rasterize_pdf
+from preview_encoding import DEFAULT_PREVIEW_ENCODING, EncodedPreview, PreviewEncoding
 
 LIBREOFFICE_PATH = find_libreoffice()
 
-def convert_pptx_to_images(pptx_path: str) -> List[str]:
+SLIDE_PART_RE = re.compile(r'^ppt/slides/slide\d+\.xml$')
+
+def page_range(indices: Sequence[int]) -> str:
+    """
+    Rango de páginas 1-based para LibreOffice ("1,3,5-7") a partir de
+    índices de slide 0-based
+    """
+    pages = sorted({i + 1 for i in indices})
+    ranges = []
+    start = prev = pages[0]
+    for page in pages[1:] + [None]:
+        if page is not None and page == prev + 1:
+            prev = page
+            continue
+        ranges.append(f"{start}-{prev}" if prev != start else str(start))
+        if page is not None:
+            start = prev = page
+    return ",".join(ranges)
+
+
+def convert_pptx_to_images(pptx_path: str,
+                           progress_callback: Optional[Callable[[int, int], None]] = None,
+                           slide_indices: Optional[Sequence[int]] = None,
+                           encoding: Optional[PreviewEncoding] = None,
+                           binary: bool = False) -> List[EncodedPreview]:
     """
     Convierte cada slide del PPT a imagen base64 usando LibreOffice
     Calidad profesional, sin marcas de agua
+    
+    progress_callback (opcional) recibe (páginas_convertidas, total_páginas).
+    slide_indices (opcional, 0-based): sólo se exportan y rasterizan esos
+    slides; el resultado sigue su orden ascendente.
+    encoding / binary: ver convert_pdf_to_images.
     """
     if not LIBREOFFICE_PATH:
         print("❌ LibreOffice no encontrado")
@@ -44,80 +58,42 @@ def convert_pptx_to_images(pptx_path: str) -> List[str]:
     print(f"📍 LibreOffice encontrado en: {LIBREOFFICE_PATH}")
     
     try:
-        # Crear directorio temporal para las imágenes
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Copiar el archivo PPTX al directorio temporal
-            pptx_basename = os.path.basename(pptx_path)
-            temp_pptx = os.path.join(temp_dir, pptx_basename)
-            shutil.copy2(pptx_path, temp_pptx)
-            
-            print(f"📂 Directorio temporal: {temp_dir}")
-            
-            # Ejecutar LibreOffice para convertir a PNG
-            cmd = [
-                LIBREOFFICE_PATH,
-                "--headless",
-                "--invisible",
-                "--convert-to", "png",
-                "--outdir", temp_dir,
-                temp_pptx
-            ]
-            
-            print(f"🚀 Ejecutando: {' '.join(cmd)}")
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=120,
-                cwd=temp_dir
-            )
-            
-            if result.returncode != 0:
-                print(f"⚠️ LibreOffice stderr: {result.stderr}")
-            
-            # LibreOffice genera un solo PNG, necesitamos usar PDF como intermedio
-            # Intentar método alternativo: convertir a PDF primero
-            pdf_path = os.path.join(temp_dir, pptx_basename.replace('.pptx', '.pdf').replace('.ppt', '.pdf'))
-            
-            # Convertir a PDF
-            cmd_pdf = [
-                LIBREOFFICE_PATH,
-                "--headless",
-                "--invisible", 
-                "--convert-to", "pdf",
-                "--outdir", temp_dir,
-                temp_pptx
-            ]
-            
-            print(f"🚀 Convirtiendo a PDF...")
-            subprocess.run(cmd_pdf, capture_output=True, timeout=120, cwd=temp_dir)
-            
-            if os.path.exists(pdf_path):
-                print(f"✅ PDF generado: {pdf_path}")
-                # Convertir PDF a imágenes usando pdf2image o Pillow
-                return convert_pdf_to_images(pdf_path)
-            
-            # Buscar imágenes PNG generadas directamente
-            png_files = sorted([f for f in os.listdir(temp_dir) if f.endswith('.png')])
-            
-            if not png_files:
-                print("⚠️ No se generaron imágenes PNG")
+            print(f"🚀 Convirtiendo a PDF con el pool de LibreOffice...")
+            # Un solo paso PPTX -> PDF en un worker ya arrancado; cada página
+            # del PDF se rasteriza después (el export PNG de LibreOffice sólo
+            # genera la primera slide). Los slides ocultos también se
+            # exportan: la página N del PDF tiene que ser el slide N
+            filter_options = {"ExportHiddenSlides": True}
+            wanted = None
+            total_slides = count_pptx_slides(pptx_path)
+            if slide_indices is not None:
+                wanted = sorted(set(slide_indices))
+                if total_slides is not None:
+                    wanted = [i for i in wanted if 0 <= i < total_slides]
+                if not wanted:
+                    return []
+                filter_options["PageRange"] = page_range(wanted)
+            pdf_path = libreoffice_pool.convert(pptx_path, 'pdf', out_dir=temp_dir,
+                                                filter_options=filter_options)
+            print(f"✅ PDF generado: {pdf_path}")
+            
+            pages = None
+            pdf_pages = count_pdf_pages(pdf_path)
+            if wanted is not None and total_slides is not None and pdf_pages == total_slides:
+                # Versiones de LibreOffice que ignoran PageRange exportan
+                # todo el documento: en ese caso se eligen las páginas aquí
+                pages = wanted
+            elif pdf_pages != (len(wanted) if wanted is not None else total_slides) and total_slides is not None:
+                # Faltan páginas (p. ej. una versión que ignora
+                # ExportHiddenSlides): no se sabe qué página es cada slide
+                print(f"⚠️ El PDF tiene {pdf_pages} páginas para {total_slides} slides, se descarta")
                 return []
-            
-            base64_images = []
-            for png_file in png_files:
-                png_path = os.path.join(temp_dir, png_file)
-                with open(png_path, 'rb') as f:
-                    img_data = f.read()
-                    img_str = base64.b64encode(img_data).decode()
-                    base64_images.append(f"data:image/png;base64,{img_str}")
-                    print(f"✅ Imagen convertida: {png_file}")
-            
-            return base64_images
-            
-    except subprocess.TimeoutExpired:
-        print("❌ Timeout al ejecutar LibreOffice")
+            return convert_pdf_to_images(pdf_path, progress_callback=progress_callback, pages=pages,
+                                         encoding=encoding, binary=binary)
+    
+    except LibreOfficeError as e:
+        print(f"❌ Error de LibreOffice: {e}")
         return []
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -125,28 +101,48 @@ def convert_pptx_to_images(pptx_path: str) -> List[str]:
         traceback.print_exc()
         return []
 
-def convert_pdf_to_images(pdf_path: str) -> List[str]:
-    """Convierte PDF a imágenes usando pdf2image o PyMuPDF"""
+def count_pptx_slides(pptx_path: str) -> Optional[int]:
+    """Número de slides de un PPTX sin cargarlo (None si no es un PPTX)"""
+    try:
+        with zipfile.ZipFile(pptx_path) as zf:
+            return sum(1 for name in zf.namelist() if SLIDE_PART_RE.match(name))
+    except (zipfile.BadZipFile, OSError):
+        return None
+
+def count_pdf_pages(pdf_path: str) -> int:
+    """Número de páginas de un PDF (-1 si no se puede leer)"""
+    try:
+        import fitz  # PyMuPDF
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception:
+        return -1
+
+def convert_pdf_to_images(pdf_path: str,
+                          progress_callback: Optional[Callable[[int, int], None]] = None,
+                          pages: Optional[Sequence[int]] = None,
+                          dpi: int = DEFAULT_DPI,
+                          encoding: Optional[PreviewEncoding] = None,
+                          binary: bool = False) -> List[EncodedPreview]:
+    """
+    Convierte PDF a imágenes usando pdf2image o PyMuPDF
+    
+    progress_callback (opcional) recibe (páginas_convertidas, total_páginas).
+    pages (opcional, 0-based): sólo se rasterizan esas páginas, en orden
+    ascendente; las que no existen se ignoran.
+    dpi: resolución (por defecto 3x). Con PyMuPDF las páginas se rasterizan
+    en paralelo (ver pdf_rasterizer).
+    encoding (opcional): formato de las imágenes (ver preview_encoding).
+    binary: devolver (bytes, tipo MIME) en lugar de data URLs base64.
+    """
+    encoding = encoding or DEFAULT_PREVIEW_ENCODING
     try:
         # Intentar con PyMuPDF (fitz) - más ligero
         import fitz  # PyMuPDF
         
-        doc = fitz.open(pdf_path)
-        base64_images = []
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            # Renderizar a alta resolución (3x para mejor calidad)
-            # IMPORTANTE: alpha=False para fondo blanco en lugar de transparente/negro
-            mat = fitz.Matrix(3, 3)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            
-            img_data = pix.tobytes("png")
-            img_str = base64.b64encode(img_data).decode()
-            base64_images.append(f"data:image/png;base64,{img_str}")
-            print(f"✅ Página {page_num + 1} convertida")
-        
-        doc.close()
+        base64_images = rasterize_pdf(pdf_path, pages=pages, dpi=dpi, encoding=encoding,
+                                      progress_callback=progress_callback, binary=binary)
+        print(f"✅ {len(base64_images)} páginas convertidas")
         return base64_images
         
     except ImportError:
@@ -155,16 +151,21 @@ def convert_pdf_to_images(pdf_path: str) -> List[str]:
         try:
             from pdf2image import convert_from_path
             
-            images = convert_from_path(pdf_path, dpi=200)
+            if pages is None:
+                images = convert_from_path(pdf_path, dpi=200)
+            else:
+                images = []
+                for page_num in sorted(set(pages)):
+                    images.extend(convert_from_path(pdf_path, dpi=200,
+                                                    first_page=page_num + 1, last_page=page_num + 1))
             base64_images = []
             
             for i, img in enumerate(images):
-                img_byte_arr = io.BytesIO()
-                img.save(img_byte_arr, format='PNG')
-                img_byte_arr.seek(0)
-                img_str = base64.b64encode(img_byte_arr.getvalue()).decode()
-                base64_images.append(f"data:image/png;base64,{img_str}")
+                base64_images.append(encoding.output(encoding.encode(img), binary))
                 print(f"✅ Página {i + 1} convertida")
+                
+                if progress_callback:
+                    progress_callback(i + 1, len(images))
             
             return base64_images
             
@@ -172,7 +173,8 @@ def convert_pdf_to_images(pdf_path: str) -> List[str]:
             print("❌ Ni PyMuPDF ni pdf2image están instalados")
             return []
 
-def generate_placeholder_image(slide_number: int) -> str:
+def generate_placeholder_image(slide_number: int, encoding: Optional[PreviewEncoding] = None,
+                               binary: bool = False) -> EncodedPreview:
     """Genera una imagen placeholder para slides sin preview"""
     from PIL import Image, ImageDraw, ImageFont
     
@@ -199,10 +201,5 @@ def generate_placeholder_image(slide_number: int) -> str:
     
     draw.text((x, y), text, fill='#666666', font=font)
     
-    # Convertir a base64
-    img_byte_arr = io.BytesIO()
-    img.save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    img_str = base64.b64encode(img_byte_arr.getvalue()).decode()
-    
-    return f"data:image/png;base64,{img_str}"
+    encoding = encoding or DEFAULT_PREVIEW_ENCODING
+    return encoding.output(encoding.encode(img), binary)
@@ -18,11 +18,14 @@ import tempfile
 import shutil
 import re
 import hashlib
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Union, BinaryIO, Callable
 from lxml import etree
 from copy import deepcopy
 import logging
 
+from slide_scanner import ShapeFeatures, SlideFeatureIndex, scan_slide
+from template_cache import CachedTemplate, hash_template_file, template_cache
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -81,6 +84,20 @@ NAMESPACES = {
 for prefix, uri in NAMESPACES.items():
     etree.register_namespace(prefix, uri)
 
+# Partes del paquete OPC relevantes para el clonador
+SLIDE_PART_RE = re.compile(r'^ppt/slides/slide(\d+)\.xml$')
+FONT_PART_RE = re.compile(r'^ppt/(slides|slideMasters|slideLayouts|theme)/[^/]+\.xml$')
+VBA_PROJECT_PARTS = ('ppt/vbaProject.bin', 'vbaProject.bin')
+
+# Tamaño de bloque para copiar partes sin cargarlas completas en memoria
+ZIP_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def parse_slide_xml(slide_xml: bytes):
+    """Parsea el XML de un slide preservando espacios, CDATA y namespaces"""
+    parser = etree.XMLParser(remove_blank_text=False, strip_cdata=False)
+    return etree.fromstring(slide_xml, parser).getroottree()
+
 
 # Patrones de placeholder compilados para mejor rendimiento
 PLACEHOLDER_PATTERNS = [
@@ -159,8 +176,9 @@ class PPTXXMLCloner:
     """
     Clonador avanzado de PPTX que preserva TODOS los elementos visuales.
     
-    Funciona extrayendo el PPTX (que es un ZIP), modificando solo los
-    elementos de texto en el XML, y re-empaquetando el archivo.
+    Funciona leyendo el PPTX (que es un ZIP) entrada por entrada, modificando
+    solo los elementos de texto en el XML de los slides, y copiando el resto
+    de partes sin cambios al archivo de salida.
     
     Esto preserva:
     - Animaciones (p:timing, p:anim*)
@@ -174,14 +192,18 @@ class PPTXXMLCloner:
     - Macros VBA (vbaProject.bin) - ¡NUEVO!
     """
     
-    def __init__(self, template_path: str):
+    def __init__(self, template_path: str, template_hash: Optional[str] = None,
+                 use_cache: bool = True):
         """
         Inicializa el clonador con un template.
         
         Args:
             template_path: Ruta al archivo PPTX template
+            template_hash: SHA-256 del template si ya se conoce (evita recalcularlo)
+            use_cache: Si True, reutiliza el análisis guardado en template_cache
         """
         self.template_path = template_path
+        self.template_hash = template_hash
         self.temp_dir: Optional[str] = None
         self.text_map: List[List[TextLocation]] = []
         self.slide_count = 0
@@ -189,64 +211,90 @@ class PPTXXMLCloner:
         self.preservation_report: List[Dict] = []  # Reporte de preservación
         self.vba_project_data: Optional[bytes] = None  # Datos del proyecto VBA (macros)
         self.has_vba_macros: bool = False  # Flag indicando si hay macros
+        self.slide_xml: Dict[int, bytes] = {}  # XML crudo por slide (0-based)
+        self.slide_trees: Dict[int, Any] = {}  # Árbol prístino por slide (0-based), no modificar
+        
+        if not use_cache:
+            self._analyze_template()
+            return
+        
+        if not self.template_hash:
+            self.template_hash = hash_template_file(template_path)
+        
+        cached = template_cache.get(self.template_hash)
+        if cached is not None:
+            logger.info(f"⚡ Template en caché: {self.template_hash[:16]}... (sin re-análisis)")
+            self._load_from_cache(cached)
+            return
         
-        # Analizar estructura del template
+        # Analizar estructura del template y guardarla para próximas exportaciones
         self._analyze_template()
+        template_cache.put(self._to_cache_entry())
+    
+    def _load_from_cache(self, cached: CachedTemplate):
+        """Restaura el estado del análisis desde una entrada de template_cache"""
+        self.slide_count = cached.slide_count
+        self.text_map = cached.text_map
+        self.fonts_used = set(cached.fonts_used)
+        self.vba_project_data = cached.vba_project_data
+        self.has_vba_macros = cached.vba_project_data is not None
+        self.slide_xml = cached.slide_xml
+        self.slide_trees = cached.slide_trees
+    
+    def _to_cache_entry(self) -> CachedTemplate:
+        """Empaqueta el análisis actual para guardarlo en template_cache"""
+        return CachedTemplate(
+            template_hash=self.template_hash,
+            slide_count=self.slide_count,
+            text_map=self.text_map,
+            fonts_used=frozenset(self.fonts_used),
+            vba_project_data=self.vba_project_data,
+            slide_xml=self.slide_xml,
+            slide_trees=self.slide_trees
+        )
     
     def _analyze_template(self):
         """Analiza el template para construir el mapa de textos y extraer fuentes"""
         logger.info(f"📄 Analizando template: {self.template_path}")
         
-        # Extraer temporalmente para análisis
-        temp_dir = tempfile.mkdtemp()
-        try:
-            with zipfile.ZipFile(self.template_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
+        # Leer las partes directamente del ZIP, sin extraer a disco
+        with zipfile.ZipFile(self.template_path, 'r') as zip_ref:
+            part_names = set(zip_ref.namelist())
             
             # 🔍 DETECTAR Y EXTRAER MACROS VBA
-            self._extract_vba_project(temp_dir)
+            self._extract_vba_project(zip_ref)
             
             # Contar slides
-            slides_dir = os.path.join(temp_dir, 'ppt', 'slides')
-            if os.path.exists(slides_dir):
-                slide_files = [f for f in os.listdir(slides_dir)
-                              if f.startswith('slide') and f.endswith('.xml')]
-                self.slide_count = len(slide_files)
-                
-                # Analizar cada slide
-                for i in range(1, self.slide_count + 1):
-                    slide_path = os.path.join(slides_dir, f'slide{i}.xml')
-                    if os.path.exists(slide_path):
-                        slide_texts = self._analyze_slide(slide_path, i)
-                        self.text_map.append(slide_texts)
-                    else:
-                        self.text_map.append([])
+            self.slide_count = sum(1 for name in part_names if SLIDE_PART_RE.match(name))
+            
+            # Analizar cada slide
+            for i in range(1, self.slide_count + 1):
+                slide_part = f'ppt/slides/slide{i}.xml'
+                if slide_part in part_names:
+                    slide_xml = zip_ref.read(slide_part)
+                    self.slide_xml[i - 1] = slide_xml
+                    self.text_map.append(self._analyze_slide(slide_xml, i))
+                else:
+                    self.text_map.append([])
             
             logger.info(f"✅ Template analizado: {self.slide_count} slides")
             
             # Extraer fuentes del template
-            self._extract_fonts(temp_dir)
-            
-        finally:
-            shutil.rmtree(temp_dir)
+            self._extract_fonts(zip_ref)
     
-    def _extract_vba_project(self, temp_dir: str):
+    def _extract_vba_project(self, zip_ref: zipfile.ZipFile):
         """
         Extrae el proyecto VBA (macros) del template si existe.
         
         Los macros VBA en PPTX se almacenan en:
         - ppt/vbaProject.bin (archivo binario con el proyecto VBA)
         """
-        vba_paths = [
-            os.path.join(temp_dir, 'ppt', 'vbaProject.bin'),
-            os.path.join(temp_dir, 'vbaProject.bin'),
-        ]
+        part_names = set(zip_ref.namelist())
         
-        for vba_path in vba_paths:
-            if os.path.exists(vba_path):
+        for vba_part in VBA_PROJECT_PARTS:
+            if vba_part in part_names:
                 try:
-                    with open(vba_path, 'rb') as f:
-                        self.vba_project_data = f.read()
+                    self.vba_project_data = zip_ref.read(vba_part)
                     
                     self.has_vba_macros = True
                     vba_size_kb = len(self.vba_project_data) / 1024
@@ -260,51 +308,25 @@ class PPTXXMLCloner:
         self.has_vba_macros = False
         self.vba_project_data = None
     
-    def _extract_fonts(self, temp_dir: str):
+    def _extract_fonts(self, zip_ref: zipfile.ZipFile):
         """Extrae todas las fuentes usadas en el template"""
         fonts = set()
         
-        # Buscar en todos los slides
-        slides_dir = os.path.join(temp_dir, 'ppt', 'slides')
-        if os.path.exists(slides_dir):
-            for slide_file in os.listdir(slides_dir):
-                if slide_file.endswith('.xml'):
-                    slide_path = os.path.join(slides_dir, slide_file)
-                    fonts.update(self._extract_fonts_from_xml(slide_path))
-        
-        # Buscar en slide masters
-        masters_dir = os.path.join(temp_dir, 'ppt', 'slideMasters')
-        if os.path.exists(masters_dir):
-            for master_file in os.listdir(masters_dir):
-                if master_file.endswith('.xml'):
-                    master_path = os.path.join(masters_dir, master_file)
-                    fonts.update(self._extract_fonts_from_xml(master_path))
-        
-        # Buscar en slide layouts
-        layouts_dir = os.path.join(temp_dir, 'ppt', 'slideLayouts')
-        if os.path.exists(layouts_dir):
-            for layout_file in os.listdir(layouts_dir):
-                if layout_file.endswith('.xml'):
-                    layout_path = os.path.join(layouts_dir, layout_file)
-                    fonts.update(self._extract_fonts_from_xml(layout_path))
-        
-        # Buscar en theme
-        theme_dir = os.path.join(temp_dir, 'ppt', 'theme')
-        if os.path.exists(theme_dir):
-            for theme_file in os.listdir(theme_dir):
-                if theme_file.endswith('.xml'):
-                    theme_path = os.path.join(theme_dir, theme_file)
-                    fonts.update(self._extract_fonts_from_xml(theme_path))
+        # Buscar en slides, slide masters, slide layouts y theme
+        for part_name in zip_ref.namelist():
+            if FONT_PART_RE.match(part_name):
+                with zip_ref.open(part_name) as part_file:
+                    fonts.update(self._extract_fonts_from_xml(part_file))
         
         self.fonts_used = fonts
         if fonts:
             logger.info(f"🔤 Fuentes detectadas: {', '.join(sorted(fonts))}")
     
-    def _extract_fonts_from_xml(self, xml_path: str) -> set:
-        """Extrae nombres de fuentes de un archivo XML"""
+    def _extract_fonts_from_xml(self, xml_source) -> set:
+        """Extrae nombres de fuentes de un XML (ruta o archivo abierto)"""
         fonts = set()
         try:
-            tree = etree.parse(xml_path)
+            tree = etree.parse(xml_source)
             root = tree.getroot()
             
             # Buscar elementos de fuente en diferentes ubicaciones
@@ -336,7 +358,7 @@ class PPTXXMLCloner:
                     fonts.add(typeface)
                     
         except Exception as e:
-            logger.debug(f"Error extrayendo fuentes de {xml_path}: {e}")
+            logger.debug(f"Error extrayendo fuentes de {getattr(xml_source, 'name', xml_source)}: {e}")
         
         return fonts
     
@@ -344,43 +366,39 @@ class PPTXXMLCloner:
         """Retorna lista de fuentes usadas en el template"""
         return sorted(list(self.fonts_used))
     
-    def _analyze_slide(self, slide_path: str, slide_num: int) -> List[TextLocation]:
-        """Analiza un slide y extrae ubicaciones de texto"""
+    def _analyze_slide(self, slide_xml: bytes, slide_num: int) -> List[TextLocation]:
+        """
+        Analiza el XML de un slide y extrae ubicaciones de texto.
+        
+        El árbol parseado se guarda en slide_trees como copia prístina para
+        las clonaciones posteriores (ver _pristine_copy).
+        """
         texts = []
         
         try:
-            tree = etree.parse(slide_path)
-            root = tree.getroot()
-            
-            # Buscar todos los shapes con texto
-            # sp = shape, graphicFrame = charts/tables/smartart
-            shapes = root.findall('.//p:sp', NAMESPACES)
+            tree = parse_slide_xml(slide_xml)
+            self.slide_trees[slide_num - 1] = tree
+            index = scan_slide(tree.getroot())
             
-            for shape in shapes:
-                shape_id = self._get_shape_id(shape)
-                text_type = self._detect_text_type(shape)
-                
-                # Buscar text body
-                txBody = shape.find('.//p:txBody', NAMESPACES)
-                if txBody is None:
+            # Recorrer los shapes con texto (sp = shape; los graphicFrame
+            # de charts/tables/smartart van aparte en el índice)
+            for shape in index.shapes:
+                if shape.tx_body is None:
                     continue
                 
-                # Analizar párrafos
-                paragraphs = txBody.findall('.//a:p', NAMESPACES)
-                for para_idx, para in enumerate(paragraphs):
-                    runs = para.findall('.//a:r', NAMESPACES)
-                    for run_idx, run in enumerate(runs):
-                        text_elem = run.find('.//a:t', NAMESPACES)
-                        if text_elem is not None and text_elem.text:
-                            xpath = self._build_xpath(shape, para_idx, run_idx)
-                            texts.append(TextLocation(
-                                xpath=xpath,
-                                original_text=text_elem.text,
-                                text_type=text_type,
-                                shape_id=shape_id,
-                                para_idx=para_idx,
-                                run_idx=run_idx
-                            ))
+                text_type = self._detect_text_type(shape)
+                
+                for run in shape.runs:
+                    if run.text is not None and run.text.text:
+                        xpath = self._build_xpath(shape, run.para_idx, run.run_idx)
+                        texts.append(TextLocation(
+                            xpath=xpath,
+                            original_text=run.text.text,
+                            text_type=text_type,
+                            shape_id=shape.shape_id,
+                            para_idx=run.para_idx,
+                            run_idx=run.run_idx
+                        ))
             
             logger.debug(f"   Slide {slide_num}: {len(texts)} textos encontrados")
             
@@ -389,16 +407,7 @@ class PPTXXMLCloner:
         
         return texts
     
-    def _get_shape_id(self, shape) -> Optional[int]:
-        """Obtiene el ID del shape"""
-        nvSpPr = shape.find('.//p:nvSpPr', NAMESPACES)
-        if nvSpPr is not None:
-            cNvPr = nvSpPr.find('.//p:cNvPr', NAMESPACES)
-            if cNvPr is not None:
-                return int(cNvPr.get('id', 0))
-        return None
-    
-    def _detect_text_type(self, shape) -> str:
+    def _detect_text_type(self, shape: ShapeFeatures) -> str:
         """
         Detecta el tipo de texto basándose en múltiples heurísticas:
         1. Placeholder type (más confiable)
@@ -407,61 +416,43 @@ class PPTXXMLCloner:
         4. Contenido del texto (palabras clave)
         
         MEJORADO: Heurísticas más permisivas para templates personalizados
+        
+        Lee los datos del shape ya recogidos por scan_slide.
         """
         # Método 1: Placeholder type (más confiable)
-        nvSpPr = shape.find('.//p:nvSpPr', NAMESPACES)
-        if nvSpPr is not None:
-            nvPr = nvSpPr.find('.//p:nvPr', NAMESPACES)
-            if nvPr is not None:
-                ph = nvPr.find('.//p:ph', NAMESPACES)
-                if ph is not None:
-                    ph_type = ph.get('type', '')
-                    if ph_type in ['title', 'ctrTitle']:
-                        logger.debug(f"         Tipo detectado por placeholder: title")
-                        return 'title'
-                    elif ph_type in ['subTitle']:
-                        logger.debug(f"         Tipo detectado por placeholder: subtitle")
-                        return 'subtitle'
-                    elif ph_type in ['body']:
-                        logger.debug(f"         Tipo detectado por placeholder: body")
-                        return 'body'
+        ph_type = shape.placeholder_type
+        if ph_type in ['title', 'ctrTitle']:
+            logger.debug(f"         Tipo detectado por placeholder: title")
+            return 'title'
+        elif ph_type in ['subTitle']:
+            logger.debug(f"         Tipo detectado por placeholder: subtitle")
+            return 'subtitle'
+        elif ph_type in ['body']:
+            logger.debug(f"         Tipo detectado por placeholder: body")
+            return 'body'
         
         # Método 2: Analizar posición y tamaño de fuente
         try:
-            # Obtener posición del shape
-            spPr = shape.find('.//p:spPr', NAMESPACES)
-            if spPr is not None:
-                xfrm = spPr.find('.//a:xfrm', NAMESPACES)
-                if xfrm is not None:
-                    off = xfrm.find('.//a:off', NAMESPACES)
-                    if off is not None:
-                        y_pos = int(off.get('y', '0'))
-                        
-                        # MEJORADO: Más permisivo con la posición
-                        # Si está en la mitad superior del slide, probablemente es título
-                        if y_pos < 3500000:  # ~3.8 pulgadas desde arriba (mitad del slide)
-                            logger.debug(f"         Tipo detectado por posición: title (y={y_pos})")
-                            return 'title'
+            # Posición del shape
+            y_pos = shape.y_pos
+            if y_pos is not None:
+                # MEJORADO: Más permisivo con la posición
+                # Si está en la mitad superior del slide, probablemente es título
+                if y_pos < 3500000:  # ~3.8 pulgadas desde arriba (mitad del slide)
+                    logger.debug(f"         Tipo detectado por posición: title (y={y_pos})")
+                    return 'title'
             
-            # Método 3: Analizar tamaño de fuente
-            txBody = shape.find('.//p:txBody', NAMESPACES)
-            if txBody is not None:
-                para = txBody.find('.//a:p', NAMESPACES)
-                if para is not None:
-                    run = para.find('.//a:r', NAMESPACES)
-                    if run is not None:
-                        rPr = run.find('.//a:rPr', NAMESPACES)
-                        if rPr is not None:
-                            font_size = rPr.get('sz')
-                            if font_size:
-                                size_pt = int(font_size) / 100  # EMUs to points
-                                # MEJORADO: Umbrales más bajos
-                                if size_pt > 24:  # Fuentes > 24pt = título
-                                    logger.debug(f"         Tipo detectado por tamaño fuente: title ({size_pt}pt)")
-                                    return 'title'
-                                elif size_pt > 18:  # Fuentes > 18pt = subtitle
-                                    logger.debug(f"         Tipo detectado por tamaño fuente: subtitle ({size_pt}pt)")
-                                    return 'subtitle'
+            # Método 3: Analizar tamaño de fuente (primer run del primer párrafo)
+            font_size = shape.font_size
+            if font_size:
+                size_pt = int(font_size) / 100  # EMUs to points
+                # MEJORADO: Umbrales más bajos
+                if size_pt > 24:  # Fuentes > 24pt = título
+                    logger.debug(f"         Tipo detectado por tamaño fuente: title ({size_pt}pt)")
+                    return 'title'
+                elif size_pt > 18:  # Fuentes > 18pt = subtitle
+                    logger.debug(f"         Tipo detectado por tamaño fuente: subtitle ({size_pt}pt)")
+                    return 'subtitle'
         except Exception as e:
             logger.debug(f"         Error detectando tipo por heurística: {e}")
         
@@ -469,14 +460,15 @@ class PPTXXMLCloner:
         logger.debug(f"         Tipo por defecto: body")
         return 'body'
     
-    def _build_xpath(self, shape, para_idx: int, run_idx: int) -> str:
+    def _build_xpath(self, shape: ShapeFeatures, para_idx: int, run_idx: int) -> str:
         """Construye un XPath aproximado para el elemento"""
-        shape_id = self._get_shape_id(shape)
-        return f"//p:sp[@id='{shape_id}']/p:txBody/a:p[{para_idx+1}]/a:r[{run_idx+1}]/a:t"
+        return f"//p:sp[@id='{shape.shape_id}']/p:txBody/a:p[{para_idx+1}]/a:r[{run_idx+1}]/a:t"
 
     
     def clone_with_content(self, content_by_slide: List[Dict[str, Any]],
-                          text_areas_by_slide: List[List[Dict]] = None) -> str:
+                          text_areas_by_slide: List[List[Dict]] = None,
+                          streaming: bool = True,
+                          progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
         """
         Clona el template reemplazando solo el texto.
         
@@ -494,6 +486,11 @@ class PPTXXMLCloner:
                 - 'type': 'title'|'subtitle'|'bullets'|'body'
                 - 'position': {x, y, width, height}
                 - 'text': texto original
+            streaming: Si True (por defecto), clona ZIP→ZIP en memoria con
+                clone_to_stream. Si False, usa el método legacy que extrae
+                el template a un directorio temporal y lo re-empaqueta.
+            progress_callback: Función opcional (slides_procesados, total_slides)
+                que se invoca después de modificar cada slide.
         
         Returns:
             Path al archivo PPTX generado
@@ -501,6 +498,13 @@ class PPTXXMLCloner:
         logger.info(f"🔄 Clonando template con {len(content_by_slide)} slides de contenido")
         logger.info(f"📍 text_areas_by_slide: {text_areas_by_slide is not None}")
         
+        if streaming:
+            output_path = tempfile.mktemp(suffix='.pptx')
+            self.clone_to_stream(content_by_slide, text_areas_by_slide, output_path,
+                                 progress_callback=progress_callback)
+            logger.info(f"✅ PPTX generado: {output_path}")
+            return output_path
+        
         # 1. Extraer PPTX a directorio temporal
         self.temp_dir = tempfile.mkdtemp()
         with zipfile.ZipFile(self.template_path, 'r') as zip_ref:
@@ -516,11 +520,13 @@ class PPTXXMLCloner:
             slide_path = os.path.join(slides_dir, slide_file)
             
             if os.path.exists(slide_path):
-                content = content_by_slide[slide_idx] if slide_idx < len(content_by_slide) else {}
-                text_areas = (text_areas_by_slide[slide_idx]
-                             if text_areas_by_slide and slide_idx < len(text_areas_by_slide)
-                             else [])
+                content, text_areas = self._content_for_slide(
+                    content_by_slide, text_areas_by_slide, slide_idx
+                )
                 self._modify_slide(slide_path, content, slide_idx, text_areas)
+            
+            if progress_callback:
+                progress_callback(slide_idx + 1, self.slide_count)
         
         # 3. RESTAURAR MACROS VBA (si existían)
         self._restore_vba_project()
@@ -536,6 +542,84 @@ class PPTXXMLCloner:
         logger.info(f"✅ PPTX generado: {output_path}")
         return output_path
     
+    def clone_to_stream(self, content_by_slide: List[Dict[str, Any]],
+                        text_areas_by_slide: List[List[Dict]] = None,
+                        output: Union[str, BinaryIO, None] = None,
+                        progress_callback: Optional[Callable[[int, int], None]] = None) -> Union[str, BinaryIO]:
+        """
+        Clona el template ZIP→ZIP sin extraerlo a disco.
+        
+        Recorre una sola vez las entradas (ZipInfo) del template: solo los
+        ppt/slides/slideN.xml se parsean y re-serializan; el resto de partes
+        (media, layouts, vbaProject.bin, etc.) se copian por bloques con su
+        mismo método de compresión.
+        
+        Args:
+            content_by_slide: Contenido por slide (ver clone_with_content)
+            text_areas_by_slide: textAreas por slide (ver clone_with_content)
+            output: Ruta de salida o archivo binario escribible (p. ej. BytesIO).
+                Si es None, se crea un archivo temporal .pptx.
+            progress_callback: Función opcional (slides_procesados, total_slides)
+        
+        Returns:
+            La ruta o el objeto de salida donde se escribió el PPTX
+        """
+        if output is None:
+            output = tempfile.mktemp(suffix='.pptx')
+        
+        logger.info(f"📦 Clonando en modo streaming (sin extraer a disco)")
+        slides_done = 0
+        
+        with zipfile.ZipFile(self.template_path, 'r') as zin, \
+                zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                slide_match = SLIDE_PART_RE.match(info.filename)
+                slide_idx = int(slide_match.group(1)) - 1 if slide_match else -1
+                
+                if 0 <= slide_idx < self.slide_count:
+                    content, text_areas = self._content_for_slide(
+                        content_by_slide, text_areas_by_slide, slide_idx
+                    )
+                    original_xml = self.slide_xml.get(slide_idx)
+                    if original_xml is None:
+                        original_xml = zin.read(info)
+                    slide_xml = self._modify_slide_xml(original_xml, content, slide_idx, text_areas)
+                    zout.writestr(self._copy_zip_info(info), slide_xml)
+                    
+                    slides_done += 1
+                    if progress_callback:
+                        progress_callback(slides_done, self.slide_count)
+                else:
+                    self._copy_zip_entry(zin, zout, info)
+        
+        return output
+    
+    @staticmethod
+    def _content_for_slide(content_by_slide: List[Dict[str, Any]],
+                           text_areas_by_slide: Optional[List[List[Dict]]],
+                           slide_idx: int) -> Tuple[Dict[str, Any], List[Dict]]:
+        """Obtiene el contenido y las textAreas correspondientes a un slide"""
+        content = content_by_slide[slide_idx] if slide_idx < len(content_by_slide) else {}
+        text_areas = (text_areas_by_slide[slide_idx]
+                      if text_areas_by_slide and slide_idx < len(text_areas_by_slide)
+                      else [])
+        return content, text_areas
+    
+    @staticmethod
+    def _copy_zip_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+        """Crea un ZipInfo de salida con el mismo nombre, fecha y compresión"""
+        new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+        new_info.compress_type = info.compress_type
+        new_info.external_attr = info.external_attr
+        new_info.file_size = info.file_size
+        return new_info
+    
+    def _copy_zip_entry(self, zin: zipfile.ZipFile, zout: zipfile.ZipFile,
+                        info: zipfile.ZipInfo):
+        """Copia una parte sin modificar, por bloques y sin cargarla en memoria"""
+        with zin.open(info) as src, zout.open(self._copy_zip_info(info), 'w') as dst:
+            shutil.copyfileobj(src, dst, ZIP_COPY_CHUNK_SIZE)
+    
     def _restore_vba_project(self):
         """
         Restaura el proyecto VBA en el directorio temporal.
@@ -563,7 +647,59 @@ class PPTXXMLCloner:
     def _modify_slide(self, slide_path: str, content: Dict[str, Any], slide_idx: int,
                      text_areas: List[Dict] = None):
         """
-        Modifica el XML de un slide reemplazando textos.
+        Modifica el XML de un slide en disco reemplazando textos.
+        
+        Args:
+            slide_path: Ruta al archivo XML del slide
+            content: Contenido IA a insertar
+            slide_idx: Índice del slide (0-based)
+            text_areas: Lista de textAreas del análisis (con coordenadas)
+        """
+        tree = self._pristine_copy(slide_idx)
+        if tree is None:
+            # Parsear XML preservando namespaces y comentarios
+            parser = etree.XMLParser(remove_blank_text=False, strip_cdata=False)
+            tree = etree.parse(slide_path, parser)
+        
+        if self._apply_slide_content(tree.getroot(), content, slide_idx, text_areas):
+            # Guardar cambios preservando formato XML y namespaces
+            tree.write(slide_path, xml_declaration=True, encoding='UTF-8', standalone=True)
+    
+    def _modify_slide_xml(self, slide_xml: bytes, content: Dict[str, Any], slide_idx: int,
+                          text_areas: List[Dict] = None) -> bytes:
+        """
+        Igual que _modify_slide pero en memoria: recibe y devuelve los bytes
+        del XML del slide. Si no hay contenido, devuelve los bytes originales
+        sin copiar ni parsear nada.
+        """
+        if not self._prepare_content_queue(content):
+            logger.debug(f"   Sin contenido para slide {slide_idx + 1}")
+            return slide_xml
+        
+        tree = self._pristine_copy(slide_idx)
+        if tree is None:
+            tree = parse_slide_xml(slide_xml)
+        
+        if not self._apply_slide_content(tree.getroot(), content, slide_idx, text_areas):
+            return slide_xml
+        
+        return etree.tostring(tree, xml_declaration=True,
+                              encoding='UTF-8', standalone=True)
+    
+    def _pristine_copy(self, slide_idx: int):
+        """
+        Copia (deepcopy) del árbol prístino de un slide, o None si no está.
+        
+        Los árboles de slide_trees se comparten con template_cache y con
+        otras exportaciones del mismo template: solo se modifica la copia.
+        """
+        tree = self.slide_trees.get(slide_idx)
+        return deepcopy(tree) if tree is not None else None
+    
+    def _apply_slide_content(self, root, content: Dict[str, Any], slide_idx: int,
+                             text_areas: List[Dict] = None) -> bool:
+        """
+        Reemplaza textos en el árbol XML de un slide.
         
         Preserva:
         - Todas las animaciones (p:timing)
@@ -571,33 +707,26 @@ class PPTXXMLCloner:
         - Efectos visuales
         - SmartArt
         
-        Args:
-            slide_path: Ruta al archivo XML del slide
-            content: Contenido IA a insertar
-            slide_idx: Índice del slide (0-based)
-            text_areas: Lista de textAreas del análisis (con coordenadas)
+        El árbol se recorre una vez con scan_slide antes de modificar (el
+        índice sirve para capturar el estado y para los reemplazos) y otra
+        después, para verificar la preservación.
+        
+        Returns:
+            True si el slide tenía contenido para insertar (árbol modificado)
         """
         logger.info(f"   📝 Modificando slide {slide_idx + 1}")
         logger.info(f"   📍 text_areas recibidas: {len(text_areas) if text_areas else 0}")
         
-        # Leer el archivo original para preservar la declaración XML exacta
-        with open(slide_path, 'rb') as f:
-            original_content = f.read()
-        
-        # Parsear XML preservando namespaces y comentarios
-        parser = etree.XMLParser(remove_blank_text=False, strip_cdata=False)
-        tree = etree.parse(slide_path, parser)
-        root = tree.getroot()
-        
         # Capturar estado de elementos críticos ANTES de modificar
-        preservation_state = self._capture_preservation_state(root, slide_idx)
+        index = scan_slide(root)
+        preservation_state = self._capture_preservation_state(index, slide_idx)
         
         # Preparar contenido a insertar
         content_queue = self._prepare_content_queue(content)
         
         if not content_queue:
             logger.debug(f"   Sin contenido para slide {slide_idx + 1}")
-            return
+            return False
         
         # Obtener mapa de textos para este slide
         slide_texts = self.text_map[slide_idx] if slide_idx < len(self.text_map) else []
@@ -605,20 +734,19 @@ class PPTXXMLCloner:
         # Estrategia de reemplazo: usar textAreas si están disponibles
         if text_areas and len(text_areas) > 0:
             logger.info(f"   🎯 Usando coordenadas de textAreas para reemplazo preciso")
-            replacements_made = self._replace_with_text_areas(root, content, text_areas)
+            replacements_made = self._replace_with_text_areas(index, content, text_areas)
         else:
             logger.info(f"   🔍 Usando detección automática por tipo de texto")
-            replacements_made = self._smart_replace(root, content, slide_texts)
+            replacements_made = self._smart_replace(index, content, slide_texts)
         
         logger.info(f"   ✅ {replacements_made} reemplazos en slide {slide_idx + 1}")
         
         # Verificar preservación DESPUÉS de modificar
-        self._verify_preservation(root, preservation_state, slide_idx)
+        self._verify_preservation(scan_slide(root), preservation_state, slide_idx)
         
-        # Guardar cambios preservando formato XML y namespaces
-        tree.write(slide_path, xml_declaration=True, encoding='UTF-8', standalone=True)
+        return True
     
-    def _replace_with_text_areas(self, root, content: Dict[str, Any],
+    def _replace_with_text_areas(self, index: SlideFeatureIndex, content: Dict[str, Any],
                                  text_areas: List[Dict]) -> int:
         """
         Reemplaza texto usando las coordenadas exactas de textAreas.
@@ -645,14 +773,9 @@ class PPTXXMLCloner:
         # Contadores para bullets
         bullet_idx = 0
         
-        # Buscar shapes en el slide
-        shapes = root.findall('.//p:sp', NAMESPACES)
-        
-        for shape in shapes:
-            shape_id = self._get_shape_id(shape)
-            
+        for shape in index.shapes:
             # Buscar textAreas que coincidan con este shape
-            matching_areas = [ta for ta in text_areas if ta.get('id') == shape_id]
+            matching_areas = [ta for ta in text_areas if ta.get('id') == shape.shape_id]
             
             if not matching_areas:
                 continue
@@ -678,44 +801,28 @@ class PPTXXMLCloner:
                 
                 if new_text:
                     # Encontrar y reemplazar el texto en el shape
-                    txBody = shape.find('.//p:txBody', NAMESPACES)
-                    if txBody is not None:
-                        text_elems = txBody.findall('.//a:t', NAMESPACES)
-                        for text_elem in text_elems:
-                            if text_elem.text:
-                                original = text_elem.text
-                                text_elem.text = new_text
-                                replacements += 1
-                                logger.info(f"      ✅ Reemplazo preciso: '{original[:30]}...' → '{new_text[:30]}...' (tipo: {area_type})")
-                                break
+                    for text_elem in shape.texts:
+                        if text_elem.text:
+                            original = text_elem.text
+                            text_elem.text = new_text
+                            replacements += 1
+                            logger.info(f"      ✅ Reemplazo preciso: '{original[:30]}...' → '{new_text[:30]}...' (tipo: {area_type})")
+                            break
         
         if replacements == 0:
             logger.warning(f"      ⚠️ No se hicieron reemplazos con textAreas, usando fallback")
             # Fallback al método original
             slide_texts = []
-            return self._smart_replace(root, content, slide_texts)
+            return self._smart_replace(index, content, slide_texts)
         
         return replacements
     
-    def _capture_preservation_state(self, root, slide_idx: int) -> Dict[str, Any]:
+    def _capture_preservation_state(self, index: SlideFeatureIndex, slide_idx: int) -> Dict[str, Any]:
         """
         Captura el estado de elementos críticos antes de modificar.
         Usado para verificar que no se perdieron durante la edición.
         """
-        ns_p = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
-        ns_a = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
-        
-        state = {
-            'slide_idx': slide_idx,
-            'has_timing': root.find(f'.//{ns_p}timing') is not None,
-            'has_transition': root.find(f'.//{ns_p}transition') is not None,
-            'has_gradient': root.find(f'.//{ns_a}gradFill') is not None,
-            'has_shadow': root.find(f'.//{ns_a}outerShdw') is not None or root.find(f'.//{ns_a}innerShdw') is not None,
-            'has_3d': root.find(f'.//{ns_a}scene3d') is not None or root.find(f'.//{ns_a}sp3d') is not None,
-            'has_smartart': root.find('.//{http://schemas.openxmlformats.org/drawingml/2006/diagram}*') is not None,
-            'shape_count': len(root.findall(f'.//{ns_p}sp')),
-            'image_count': len(root.findall(f'.//{ns_p}pic')),
-        }
+        state = {'slide_idx': slide_idx, **index.preservation_state()}
         
         if state['has_timing']:
             logger.info(f"   🎬 Slide {slide_idx + 1}: Animaciones detectadas")
@@ -732,50 +839,42 @@ class PPTXXMLCloner:
         
         return state
     
-    def _verify_preservation(self, root, before_state: Dict[str, Any], slide_idx: int) -> bool:
+    def _verify_preservation(self, index: SlideFeatureIndex, before_state: Dict[str, Any], slide_idx: int) -> bool:
         """
         Verifica que los elementos críticos se preservaron después de modificar.
         Registra warnings si algo se perdió.
-        """
-        ns_p = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
-        ns_a = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
         
+        Args:
+            index: scan_slide del árbol ya modificado
+        """
         issues = []
         
         # Verificar animaciones
-        if before_state['has_timing']:
-            if root.find(f'.//{ns_p}timing') is None:
-                issues.append("❌ ANIMACIONES PERDIDAS (p:timing)")
+        if before_state['has_timing'] and not index.has_timing:
+            issues.append("❌ ANIMACIONES PERDIDAS (p:timing)")
         
         # Verificar transiciones
-        if before_state['has_transition']:
-            if root.find(f'.//{ns_p}transition') is None:
-                issues.append("❌ TRANSICIÓN PERDIDA (p:transition)")
+        if before_state['has_transition'] and not index.has_transition:
+            issues.append("❌ TRANSICIÓN PERDIDA (p:transition)")
         
         # Verificar gradientes
-        if before_state['has_gradient']:
-            if root.find(f'.//{ns_a}gradFill') is None:
-                issues.append("❌ GRADIENTES PERDIDOS (a:gradFill)")
+        if before_state['has_gradient'] and not index.has_gradient:
+            issues.append("❌ GRADIENTES PERDIDOS (a:gradFill)")
         
         # Verificar sombras
-        if before_state['has_shadow']:
-            has_shadow_after = root.find(f'.//{ns_a}outerShdw') is not None or root.find(f'.//{ns_a}innerShdw') is not None
-            if not has_shadow_after:
-                issues.append("❌ SOMBRAS PERDIDAS (a:outerShdw/innerShdw)")
+        if before_state['has_shadow'] and not index.has_shadow:
+            issues.append("❌ SOMBRAS PERDIDAS (a:outerShdw/innerShdw)")
         
         # Verificar 3D
-        if before_state['has_3d']:
-            has_3d_after = root.find(f'.//{ns_a}scene3d') is not None or root.find(f'.//{ns_a}sp3d') is not None
-            if not has_3d_after:
-                issues.append("❌ EFECTOS 3D PERDIDOS (a:scene3d/sp3d)")
+        if before_state['has_3d'] and not index.has_3d:
+            issues.append("❌ EFECTOS 3D PERDIDOS (a:scene3d/sp3d)")
         
         # Verificar SmartArt
-        if before_state['has_smartart']:
-            if root.find('.//{http://schemas.openxmlformats.org/drawingml/2006/diagram}*') is None:
-                issues.append("❌ SMARTART PERDIDO (dgm:*)")
+        if before_state['has_smartart'] and not index.has_smartart:
+            issues.append("❌ SMARTART PERDIDO (dgm:*)")
         
         # Verificar conteo de shapes
-        shape_count_after = len(root.findall(f'.//{ns_p}sp'))
+        shape_count_after = index.shape_count
         if shape_count_after < before_state['shape_count']:
             issues.append(f"⚠️ SHAPES REDUCIDOS: {before_state['shape_count']} -> {shape_count_after}")
         
@@ -808,7 +907,7 @@ class PPTXXMLCloner:
         
         return queue
     
-    def _smart_replace(self, root, content: Dict[str, Any],
+    def _smart_replace(self, index: SlideFeatureIndex, content: Dict[str, Any],
                        slide_texts: List[TextLocation]) -> int:
         """
         Reemplazo inteligente basado en tipo de texto y posición.
@@ -820,8 +919,7 @@ class PPTXXMLCloner:
         """
         replacements = 0
         
-        # Buscar todos los shapes
-        shapes = root.findall('.//p:sp', NAMESPACES)
+        shapes = index.shapes
         
         logger.info(f"   🔍 Encontrados {len(shapes)} shapes en el slide")
         
@@ -845,24 +943,21 @@ class PPTXXMLCloner:
         
         for shape_idx, shape in enumerate(shapes):
             text_type = self._detect_text_type(shape)
-            shape_id = self._get_shape_id(shape)
-            txBody = shape.find('.//p:txBody', NAMESPACES)
             
-            logger.info(f"   📦 Shape {shape_idx+1} (ID: {shape_id}): tipo detectado = '{text_type}'")
+            logger.info(f"   📦 Shape {shape_idx+1} (ID: {shape.shape_id}): tipo detectado = '{text_type}'")
             
-            if txBody is None:
+            if shape.tx_body is None:
                 logger.info(f"      ⚠️ Shape sin txBody, saltando")
                 continue
             
-            paragraphs = txBody.findall('.//a:p', NAMESPACES)
+            paragraphs = shape.paragraphs
             logger.info(f"      📄 {len(paragraphs)} párrafos encontrados")
             
-            for para_idx, para in enumerate(paragraphs):
-                runs = para.findall('.//a:r', NAMESPACES)
+            for para_idx, runs in enumerate(paragraphs):
                 logger.info(f"         Párrafo {para_idx+1}: {len(runs)} runs")
                 
                 for run_idx, run in enumerate(runs):
-                    text_elem = run.find('.//a:t', NAMESPACES)
+                    text_elem = run.text
                     if text_elem is None:
                         continue
                     
@@ -903,35 +998,35 @@ class PPTXXMLCloner:
         
         # === MODIFICAR SMARTART ===
         if SMARTART_AVAILABLE:
-            smartart_replacements = self._modify_smartart(root, content)
+            smartart_replacements = self._modify_smartart(index, content)
             logger.info(f"   📊 Reemplazos en SmartArt: {smartart_replacements}")
             replacements += smartart_replacements
         
         # === MODIFICAR GRÁFICOS ===
         if CHART_MODIFIER_AVAILABLE:
-            chart_replacements = self._modify_charts(root, content)
+            chart_replacements = self._modify_charts(index, content)
             logger.info(f"   📊 Reemplazos en Gráficos: {chart_replacements}")
             replacements += chart_replacements
         
         # === MODIFICAR TABLAS ===
         if TABLE_PRESERVER_AVAILABLE:
-            table_replacements = self._modify_tables(root, content)
+            table_replacements = self._modify_tables(index, content)
             logger.info(f"   📊 Reemplazos en Tablas: {table_replacements}")
             replacements += table_replacements
         
         # MODO DE RESPALDO: Si no hubo reemplazos, intentar modo forzado
         if replacements == 0 and (title_content or bullets_content or body_content):
             logger.warning(f"   ⚠️ No hubo reemplazos por tipo, activando MODO DE RESPALDO")
-            replacements = self._fallback_replace(root, content)
+            replacements = self._fallback_replace(index, content)
         
         return replacements
     
-    def _modify_smartart(self, root, content: Dict[str, Any]) -> int:
+    def _modify_smartart(self, index: SlideFeatureIndex, content: Dict[str, Any]) -> int:
         """
         Modifica texto dentro de elementos SmartArt.
         
         Args:
-            root: Elemento raíz del XML del slide
+            index: scan_slide del XML del slide
             content: Contenido IA a insertar
         
         Returns:
@@ -940,12 +1035,8 @@ class PPTXXMLCloner:
         replacements = 0
         
         try:
-            # Buscar elementos de diagrama (SmartArt)
-            diagram_data_elements = root.findall('.//dgm:diagramData', NAMESPACES)
-            
-            if not diagram_data_elements:
-                # También buscar en otras ubicaciones
-                diagram_data_elements = root.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/diagram}diagramData')
+            # Elementos de diagrama (SmartArt)
+            diagram_data_elements = index.diagram_data
             
             logger.info(f"   📊 SmartArt encontrado: {len(diagram_data_elements)} diagramas")
             
@@ -984,12 +1075,12 @@ class PPTXXMLCloner:
         
         return replacements
     
-    def _modify_charts(self, root, content: Dict[str, Any]) -> int:
+    def _modify_charts(self, index: SlideFeatureIndex, content: Dict[str, Any]) -> int:
         """
         Modifica datos de gráficos en el slide.
         
         Args:
-            root: Elemento raíz del XML del slide
+            index: scan_slide del XML del slide
             content: Contenido IA a insertar
         
         Returns:
@@ -998,12 +1089,8 @@ class PPTXXMLCloner:
         replacements = 0
         
         try:
-            # Buscar elementos de gráficos
-            chart_elements = root.findall('.//c:chart', NAMESPACES)
-            
-            if not chart_elements:
-                # Intentar con namespace alternativo
-                chart_elements = root.findall('.//{http://schemas.openxmlformats.org/drawingml/2006/chart}chart')
+            # Elementos de gráficos
+            chart_elements = index.charts
             
             logger.info(f"   📈 Gráficos encontrados: {len(chart_elements)}")
             
@@ -1045,12 +1132,12 @@ class PPTXXMLCloner:
         
         return replacements
     
-    def _modify_tables(self, root, content: Dict[str, Any]) -> int:
+    def _modify_tables(self, index: SlideFeatureIndex, content: Dict[str, Any]) -> int:
         """
         Modifica contenido de tablas en el slide.
         
         Args:
-            root: Elemento raíz del XML del slide
+            index: scan_slide del XML del slide
             content: Contenido IA a insertar
         
         Returns:
@@ -1059,8 +1146,8 @@ class PPTXXMLCloner:
         replacements = 0
         
         try:
-            # Buscar elementos de tabla
-            table_elements = root.findall('.//a:tbl', NAMESPACES)
+            # Elementos de tabla
+            table_elements = index.tables
             
             logger.info(f"   📋 Tablas encontradas: {len(table_elements)}")
             
@@ -1095,7 +1182,7 @@ class PPTXXMLCloner:
         
         return replacements
     
-    def _fallback_replace(self, root, content: Dict[str, Any]) -> int:
+    def _fallback_replace(self, index: SlideFeatureIndex, content: Dict[str, Any]) -> int:
         """
         Modo de respaldo: Reemplaza TODO el texto encontrado en orden,
         sin importar los tipos. Útil para templates muy personalizados.
@@ -1119,25 +1206,16 @@ class PPTXXMLCloner:
         
         replacements = 0
         content_idx = 0
-        shapes = root.findall('.//p:sp', NAMESPACES)
-        
-        for shape in shapes:
-            txBody = shape.find('.//p:txBody', NAMESPACES)
-            if txBody is None:
-                continue
-            
-            paragraphs = txBody.findall('.//a:p', NAMESPACES)
-            for para in paragraphs:
-                runs = para.findall('.//a:r', NAMESPACES)
-                for run in runs:
-                    text_elem = run.find('.//a:t', NAMESPACES)
-                    if text_elem is not None and content_idx < len(all_content):
-                        original = text_elem.text or ''
-                        new_text = all_content[content_idx]
-                        text_elem.text = new_text
-                        content_idx += 1
-                        replacements += 1
-                        logger.info(f"      🔄 Reemplazo {replacements}: '{original[:30]}...' -> '{new_text[:30]}...'")
+        for shape in index.shapes:
+            for run in shape.runs:
+                text_elem = run.text
+                if text_elem is not None and content_idx < len(all_content):
+                    original = text_elem.text or ''
+                    new_text = all_content[content_idx]
+                    text_elem.text = new_text
+                    content_idx += 1
+                    replacements += 1
+                    logger.info(f"      🔄 Reemplazo {replacements}: '{original[:30]}...' -> '{new_text[:30]}...'")
         
         logger.info(f"   📊 Total de reemplazos (modo respaldo): {replacements}")
         return replacements
@@ -1311,7 +1389,9 @@ class PPTXXMLCloner:
 # ============================================
 
 def clone_pptx_preserving_all(template_path: str, content_by_slide: List[Dict[str, Any]],
-                             text_areas_by_slide: List[List[Dict]] = None) -> str:
+                             text_areas_by_slide: List[List[Dict]] = None,
+                             template_hash: Optional[str] = None,
+                             progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
     """
     Función principal para clonar un PPTX preservando todos los elementos visuales.
     
@@ -1328,6 +1408,9 @@ def clone_pptx_preserving_all(template_path: str, content_by_slide: List[Dict[st
                 [{'id': 1, 'type': 'title', 'position': {...}, 'text': '...'}, ...],
                 ...
             ]
+        template_hash: SHA-256 del template si ya se conoce; se usa como clave
+            de template_cache para no re-analizar templates repetidos
+        progress_callback: Función opcional (slides_procesados, total_slides)
     
     Returns:
         Ruta al archivo PPTX generado
@@ -1342,8 +1425,9 @@ def clone_pptx_preserving_all(template_path: str, content_by_slide: List[Dict[st
         ...     text_areas_by_slide
         ... )
     """
-    cloner = PPTXXMLCloner(template_path)
-    return cloner.clone_with_content(content_by_slide, text_areas_by_slide)
+    cloner = PPTXXMLCloner(template_path, template_hash=template_hash)
+    return cloner.clone_with_content(content_by_slide, text_areas_by_slide,
+                                     progress_callback=progress_callback)
 
 
 def analyze_pptx_structure(pptx_path: str) -> Dict[str, Any]:
@@ -0,0 +1,367 @@
+"""
+PreviewCache - Caché en disco de las previews de slides
+
+Guarda la imagen renderizada de cada slide indexada por su huella de
+contenido (ver slide_fingerprint), el renderizador que la produjo y su
+resolución. Así, volver a analizar un archivo ya visto sirve `slideImages`
+desde disco sin arrancar LibreOffice, y tras editar un slide sólo hay que
+renderizar ese slide.
+
+- Escrituras atómicas (archivo temporal + os.replace).
+- Expulsión LRU acotada por el total de bytes en disco; el orden de uso
+  se guarda en el mtime de cada archivo, así sobrevive a reinicios.
+- Varios workers de uvicorn pueden compartir el directorio: una búsqueda
+  que no está en el índice del proceso se resuelve contra el disco, y el
+  índice se reconstruye desde el disco cada PREVIEW_CACHE_RESCAN_WRITES
+  escrituras y antes de expulsar, así el límite cuenta lo escrito por todos.
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from preview_encoding import to_binary
+
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Directorio de la caché. Configurable por entorno.
+PREVIEW_CACHE_DIR = os.environ.get('PREVIEW_CACHE_DIR', os.path.join(BACKEND_DIR, 'preview_cache'))
+
+# Límite de disco de la caché (bytes). Configurable por entorno.
+PREVIEW_CACHE_MAX_BYTES = int(os.environ.get('PREVIEW_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Cada cuántas escrituras se vuelve a leer el disco para contar lo que
+# escribieron otros procesos. Entre lecturas el total puede pasarse del
+# límite como mucho en (número de workers) × este número de previews.
+PREVIEW_CACHE_RESCAN_WRITES = int(os.environ.get('PREVIEW_CACHE_RESCAN_WRITES', 32))
+
+# Extensión de archivo por tipo MIME de la preview
+PREVIEW_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp',
+}
+PREVIEW_MIME_TYPES = {ext: mime for mime, ext in PREVIEW_EXTENSIONS.items()}
+
+
+@dataclass(frozen=True)
+class PreviewKey:
+    """Identifica una preview: huella del slide, renderizador, resolución y tamaño"""
+    fingerprint: str
+    renderer: str
+    resolution: str
+    tier: str = 'full'  # ver preview_tiers
+
+    def directory(self, root: str) -> str:
+        return os.path.join(root, self.fingerprint[:2], self.fingerprint, self.renderer)
+
+
+class PreviewCache:
+    """
+    Caché LRU en disco de previews de slides, segura para varios hilos.
+    
+    Cada proceso mantiene su propio índice en memoria, pero el disco es la
+    fuente de verdad: lo que falta en el índice se busca en disco, y antes de
+    expulsar (y cada rescan_writes escrituras) el índice se reconstruye desde
+    el disco. Así varios workers de uvicorn pueden compartir el directorio
+    sin perder aciertos y con el límite de bytes aplicado al total.
+    """
+    
+    def __init__(self, root: str = PREVIEW_CACHE_DIR, max_bytes: int = PREVIEW_CACHE_MAX_BYTES,
+                 rescan_writes: int = PREVIEW_CACHE_RESCAN_WRITES):
+        """
+        Inicializa la caché.
+        
+        Args:
+            root: Directorio donde se guardan las previews
+            max_bytes: Total de bytes en disco antes de expulsar
+            rescan_writes: Escrituras entre relecturas del disco
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.rescan_writes = max(1, rescan_writes)
+        self._writes_since_scan = 0
+        self._last_touch_ns = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # ruta -> bytes, de menos a más reciente
+        self._total_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._writes = 0
+    
+    # ---------------------------------------------------------------
+    # Previews individuales
+    # ---------------------------------------------------------------
+    
+    def get(self, key: PreviewKey) -> Optional[Tuple[bytes, str]]:
+        """
+        Recupera una preview y la marca como usada recientemente.
+        
+        Returns:
+            (bytes, tipo MIME) o None si no está en caché
+        """
+        with self._lock:
+            self._load_index()
+            for ext, mime in PREVIEW_MIME_TYPES.items():
+                path = self._path(key, ext)
+                try:
+                    # Se lee aunque no esté en el índice: puede haberla
+                    # escrito otro proceso
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    self._touch(path)
+                except OSError:
+                    # No existe o la expulsó otro proceso
+                    self._forget(path)
+                    continue
+                self._track(path, len(data))
+                self._hits += 1
+                return data, mime
+            self._misses += 1
+            return None
+    
+    def put(self, key: PreviewKey, data: bytes, mime: str = 'image/png') -> bool:
+        """
+        Guarda una preview, expulsando las menos usadas si hace falta.
+        
+        Returns:
+            True si se guardó, False si por sí sola excede el límite
+        """
+        if len(data) > self.max_bytes:
+            return False
+        ext = PREVIEW_EXTENSIONS.get(mime)
+        if ext is None:
+            raise ValueError(f"Tipo de preview no soportado: {mime}")
+        
+        directory = key.directory(self.root)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            path = self._path(key, ext)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        
+        with self._lock:
+            self._load_index()
+            # Una preview por clave: quitar la de otro formato si existía
+            for other in PREVIEW_MIME_TYPES:
+                other_path = self._path(key, other)
+                if other_path != path:
+                    self._remove(other_path)
+            self._touch(path)
+            self._track(path, len(data))
+            self._writes += 1
+            self._writes_since_scan += 1
+            if self._writes_since_scan >= self.rescan_writes:
+                self._scan_disk()
+            self._evict()
+        return True
+    
+    # ---------------------------------------------------------------
+    # Presentaciones (lo que usa analyze_presentation)
+    # ---------------------------------------------------------------
+    
+    def get_slides(self, fingerprints: Sequence[str], renderer: str,
+                   resolution: str) -> Dict[int, Tuple[bytes, str]]:
+        """
+        Devuelve las previews en caché de los slides dados.
+        
+        Args:
+            fingerprints: Huella de cada slide, en orden
+        
+        Returns:
+            Índice del slide -> (bytes, tipo MIME), sólo para los que están en caché
+        """
+        images = {}
+        for index, fingerprint in enumerate(fingerprints):
+            cached = self.get(PreviewKey(fingerprint, renderer, resolution))
+            if cached is not None:
+                images[index] = cached
+        return images
+    
+    def find_slides(self, fingerprints: Sequence[str],
+                    renderers: Sequence[Tuple[str, str]]) -> Tuple[Dict[int, str], Optional[str]]:
+        """
+        Busca las previews del renderizador que más slides tenga en caché
+        (a igualdad, el primero en orden de preferencia). No mezcla
+        renderizadores dentro de una misma presentación.
+        
+        Args:
+            fingerprints: Huella de cada slide, en orden
+            renderers: Pares (renderizador, resolución) en orden de preferencia
+        
+        Returns:
+            (índice del slide -> (bytes, tipo MIME), renderizador) o ({}, None)
+        """
+        best, best_count = None, 0
+        for renderer, resolution in renderers:
+            count = self._count_cached(fingerprints, renderer, resolution)
+            if count > best_count:
+                best, best_count = (renderer, resolution), count
+        if best is None:
+            return {}, None
+        return self.get_slides(fingerprints, *best), best[0]
+    
+    def put_slides(self, fingerprints: Sequence[str], renderer: str, resolution: str,
+                   images: Dict[int, Any]) -> int:
+        """
+        Guarda las previews de los slides dados.
+        
+        Args:
+            fingerprints: Huella de cada slide, en orden
+            images: Índice del slide -> (bytes, tipo MIME) o data URL
+        
+        Returns:
+            Número de previews guardadas
+        """
+        stored = 0
+        for index, preview in images.items():
+            if not preview:
+                continue
+            data, mime = to_binary(preview)
+            if mime in PREVIEW_EXTENSIONS and self.put(PreviewKey(fingerprints[index], renderer, resolution), data, mime):
+                stored += 1
+        return stored
+    
+    def invalidate(self, fingerprint: str) -> int:
+        """
+        Elimina todas las previews de un slide.
+        
+        Returns:
+            Número de previews eliminadas
+        """
+        directory = os.path.join(self.root, fingerprint[:2], fingerprint)
+        with self._lock:
+            self._load_index()
+            prefix = directory + os.sep
+            paths = [path for path in self._entries if path.startswith(prefix)]
+            for path in paths:
+                self._remove(path)
+        shutil.rmtree(directory, ignore_errors=True)
+        return len(paths)
+    
+    def clear(self) -> None:
+        """Vacía la caché y reinicia las estadísticas"""
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._entries.clear()
+            self._total_bytes = 0
+            self._hits = self._misses = self._evictions = self._writes = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            self._load_index()
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'totalBytes': self._total_bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'writes': self._writes,
+                'hitRatio': self._hits / lookups if lookups else 0.0,
+                'directory': self.root
+            }
+    
+    # ---------------------------------------------------------------
+    # Internos (los que tocan el índice requieren el lock)
+    # ---------------------------------------------------------------
+    
+    def _path(self, key: PreviewKey, ext: str) -> str:
+        name = key.resolution if key.tier == 'full' else f"{key.resolution}-{key.tier}"
+        return os.path.join(key.directory(self.root), f"{name}.{ext}")
+    
+    def _count_cached(self, fingerprints: Sequence[str], renderer: str, resolution: str) -> int:
+        """Cuenta, sin tocar hits/misses, los slides con preview en caché"""
+        with self._lock:
+            self._load_index()
+            count = 0
+            for fingerprint in fingerprints:
+                key = PreviewKey(fingerprint, renderer, resolution)
+                if any(self._path(key, ext) in self._entries or os.path.exists(self._path(key, ext))
+                       for ext in PREVIEW_MIME_TYPES):
+                    count += 1
+            return count
+    
+    def _load_index(self) -> None:
+        """Construye el índice a partir del disco (al primer uso)"""
+        if self._loaded:
+            return
+        self._loaded = True
+        self._scan_disk()
+        self._evict()
+    
+    def _scan_disk(self) -> None:
+        """Reconstruye el índice desde el disco, incluidas las escrituras de otros procesos"""
+        self._entries.clear()
+        self._total_bytes = 0
+        self._writes_since_scan = 0
+        found = []
+        for ext in PREVIEW_MIME_TYPES:
+            for path in glob.glob(os.path.join(self.root, '*', '*', '*', f'*.{ext}')):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime_ns, path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._total_bytes += size
+    
+    def _evict(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Decidir con el disco: el total y el orden LRU los comparten los workers
+        self._scan_disk()
+        while self._entries and self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._evictions += 1
+    
+    def _remove(self, path: str) -> None:
+        self._forget(path)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    
+    def _touch(self, path: str) -> None:
+        """
+        Marca el archivo como usado ahora. El mtime se fija con precisión de
+        nanosegundos (el reloj del sistema de archivos es más grueso) para que
+        el orden LRU leído del disco coincida con el orden de uso.
+        """
+        now = max(time.time_ns(), self._last_touch_ns + 1)
+        self._last_touch_ns = now
+        os.utime(path, ns=(now, now))
+    
+    def _track(self, path: str, size: int) -> None:
+        """Registra (o refresca) una entrada como la más reciente"""
+        self._forget(path)
+        self._entries[path] = size
+        self._total_bytes += size
+    
+    def _forget(self, path: str) -> None:
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._total_bytes -= size
+
+
+# Instancia compartida por todo el proceso
+preview_cache = PreviewCache()
@@ -0,0 +1,127 @@
+"""
+PreviewEncoding - Codificación común de las previews de slides
+
+Todos los renderizadores (UNO, PDF de LibreOffice, renderizador completo y
+placeholders) codifican sus imágenes con un PreviewEncoding: formato (PNG,
+JPEG o WebP), calidad para los formatos con pérdida y `optimize` para PNG.
+El formato por defecto se configura por entorno.
+
+Los renderizadores devuelven data URLs base64 (lo que esperan los
+llamadores de siempre) o, con binary=True, pares (bytes, tipo MIME): el
+base64 ocupa un 33% más y sólo hace falta al construir la respuesta JSON.
+Con el transporte 'url' la respuesta del análisis ni siquiera lo lleva:
+cada preview es la URL de GET /api/previews/{fingerprint}, que sirve los
+bytes tal cual.
+"""
+
+import base64
+import io
+import os
+from dataclasses import dataclass
+from typing import Tuple, Union
+
+from PIL import Image
+
+
+# Formato y calidad por defecto de las previews. Configurables por entorno.
+PREVIEW_FORMAT = os.environ.get('PREVIEW_FORMAT', 'png')
+PREVIEW_QUALITY = int(os.environ.get('PREVIEW_QUALITY', 85))
+PREVIEW_PNG_OPTIMIZE = os.environ.get('PREVIEW_PNG_OPTIMIZE', '').lower() in ('1', 'true', 'yes')
+
+FORMAT_MIME_TYPES = {
+    'png': 'image/png',
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+# Cómo viajan las previews en la respuesta del análisis
+PREVIEW_TRANSPORTS = ('inline', 'url')
+DEFAULT_PREVIEW_TRANSPORT = 'inline'
+
+# Una preview codificada: data URL o (bytes, tipo MIME) con binary=True
+EncodedPreview = Union[str, Tuple[bytes, str]]
+
+
+@dataclass(frozen=True)
+class PreviewEncoding:
+    """Formato de salida de las previews"""
+    format: str = 'png'
+    quality: int = PREVIEW_QUALITY  # JPEG / WebP (1-100)
+    optimize: bool = False  # PNG: compresión más lenta y archivos más pequeños
+    
+    def __post_init__(self):
+        image_format = self.format.lower()
+        if image_format == 'jpg':
+            image_format = 'jpeg'
+        if image_format not in FORMAT_MIME_TYPES:
+            raise ValueError(f"Formato de imagen no soportado: {self.format}")
+        object.__setattr__(self, 'format', image_format)
+    
+    @property
+    def mime_type(self) -> str:
+        return FORMAT_MIME_TYPES[self.format]
+    
+    def encode(self, img: Image.Image) -> bytes:
+        """Codifica una imagen de PIL"""
+        if self.format == 'jpeg' and img.mode != 'RGB':
+            img = flatten(img)
+        elif img.mode not in ('RGB', 'RGBA', 'L'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+        buffer = io.BytesIO()
+        if self.format == 'png':
+            img.save(buffer, format='PNG', optimize=self.optimize)
+        elif self.format == 'jpeg':
+            img.save(buffer, format='JPEG', quality=self.quality, optimize=True)
+        else:
+            img.save(buffer, format='WEBP', quality=self.quality, method=4)
+        return buffer.getvalue()
+    
+    def encode_pixmap(self, pix) -> bytes:
+        """Codifica un Pixmap de PyMuPDF (sin pasar por PIL si no hace falta)"""
+        if self.format == 'png' and not self.optimize:
+            return pix.tobytes('png')
+        if self.format == 'jpeg':
+            return pix.tobytes('jpeg', jpg_quality=self.quality)
+        return self.encode(Image.frombytes('RGB', (pix.width, pix.height), pix.samples))
+    
+    def transcode(self, data: bytes, mime: str) -> bytes:
+        """Recodifica una imagen ya codificada (p.ej. el PNG que exporta LibreOffice)"""
+        if mime == self.mime_type and not (self.format == 'png' and self.optimize):
+            return data
+        return self.encode(Image.open(io.BytesIO(data)))
+    
+    def output(self, data: bytes, binary: bool = False) -> EncodedPreview:
+        """Data URL, o (bytes, tipo MIME) con binary=True"""
+        return (data, self.mime_type) if binary else to_data_url(data, self.mime_type)
+
+
+def is_valid_transport(transport: str) -> bool:
+    return transport in PREVIEW_TRANSPORTS
+
+
+def flatten(img: Image.Image, background: str = 'white') -> Image.Image:
+    """Compone una imagen con transparencia sobre un fondo opaco (RGB)"""
+    img = img.convert('RGBA')
+    base = Image.new('RGB', img.size, background)
+    base.paste(img, mask=img.getchannel('A'))
+    return base
+
+
+def split_data_url(data_url: str) -> Tuple[bytes, str]:
+    """Separa un data URL base64 en (bytes, tipo MIME)"""
+    header, _, payload = data_url.partition(',')
+    mime = header[5:].split(';')[0] if header.startswith('data:') else 'image/png'
+    return base64.b64decode(payload), mime or 'image/png'
+
+
+def to_data_url(data: bytes, mime: str) -> str:
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+
+def to_binary(preview: EncodedPreview) -> Tuple[bytes, str]:
+    """(bytes, tipo MIME) de una preview en cualquiera de sus dos formas"""
+    return split_data_url(preview) if isinstance(preview, str) else preview
+
+
+# Codificación por defecto de todos los renderizadores
+DEFAULT_PREVIEW_ENCODING = PreviewEncoding(PREVIEW_FORMAT, PREVIEW_QUALITY, PREVIEW_PNG_OPTIMIZE)
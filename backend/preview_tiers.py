@@ -0,0 +1,91 @@
+"""
+PreviewTiers - Previews de slides en varias resoluciones
+
+Del raster a resolución completa de cada slide (1920x1080 con UNO, 3x con
+el PDF de LibreOffice) se derivan dos tamaños más pequeños:
+
+- thumb:  miniatura para la tira de slides
+- medium: vista del editor
+- full:   el raster original, para exportar
+
+Todos salen de un único raster decodificado una sola vez (medium se
+reduce del original y thumb de medium) y se guardan en la caché de
+previews junto al original, así que pedir otro tamaño no vuelve a
+renderizar el slide.
+"""
+
+import io
+import os
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from preview_cache import PreviewCache, PreviewKey
+from preview_encoding import DEFAULT_PREVIEW_ENCODING
+
+
+# Ancho máximo (px) de cada tamaño; None = raster original. Configurable por entorno.
+PREVIEW_TIERS = {
+    'thumb': int(os.environ.get('PREVIEW_THUMB_WIDTH', 320)),
+    'medium': int(os.environ.get('PREVIEW_MEDIUM_WIDTH', 960)),
+    'full': None,
+}
+DEFAULT_PREVIEW_TIER = 'full'
+
+
+def is_valid_tier(tier: str) -> bool:
+    return tier in PREVIEW_TIERS
+
+
+def derive_tiers(data: bytes) -> Dict[str, Tuple[bytes, str]]:
+    """
+    Deriva los tamaños reducidos de un raster completo.
+    
+    Args:
+        data: Imagen a resolución completa (PNG, JPEG o WebP)
+    
+    Returns:
+        Tamaño -> (bytes, tipo MIME) en DEFAULT_PREVIEW_ENCODING, sin incluir 'full'
+    """
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+    
+    tiers = {}
+    # De mayor a menor: cada tamaño se reduce del anterior
+    for tier, width in sorted(((t, w) for t, w in PREVIEW_TIERS.items() if w), key=lambda item: -item[1]):
+        if img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+        tiers[tier] = (DEFAULT_PREVIEW_ENCODING.encode(img), DEFAULT_PREVIEW_ENCODING.mime_type)
+    return tiers
+
+
+def get_tier(cache: PreviewCache, key: PreviewKey,
+             full: Optional[Tuple[bytes, str]] = None) -> Optional[Tuple[bytes, str]]:
+    """
+    Devuelve la preview de un tamaño, derivándola (y guardando todos los
+    tamaños) si sólo está en caché el raster completo.
+    
+    Args:
+        cache: Caché de previews
+        key: Clave de la preview con el tamaño pedido en `tier`
+        full: Raster completo (bytes, MIME) si el llamador ya lo tiene
+    
+    Returns:
+        (bytes, tipo MIME) o None si el slide no está en caché
+    """
+    cached = cache.get(key)
+    if cached is not None or key.tier == 'full':
+        return cached
+    
+    if full is None:
+        full = cache.get(PreviewKey(key.fingerprint, key.renderer, key.resolution))
+        if full is None:
+            return None
+    
+    derived = derive_tiers(full[0])
+    for tier, (data, mime) in derived.items():
+        cache.put(PreviewKey(key.fingerprint, key.renderer, key.resolution, tier), data, mime)
+    return derived[key.tier]
@@ -1,11 +1,13 @@
 # Routes package
 from .analysis import router as analysis_router
+from .assets import router as assets_router
 from .export import router as export_router
 from .templates import router as templates_router
 from .collaboration import router as collaboration_router
 
 __all__ = [
     'analysis_router',
+    'assets_router',
     'export_router', 
     'templates_router',
     'collaboration_router'
@@ -1,48 +1,50 @@
 """
 Analysis routes - PPTX/PDF analysis, fonts, content extraction.
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import Response
+import asyncio
 import tempfile
 import os
 import json
 
 from pptx import Presentation
-from pptx_analyzer import analyze_presentation
+from pptx_analyzer import analyze_presentation, available_preview_renderers
 from font_detector import analyze_fonts as analyze_pptx_fonts
+from preview_cache import PreviewKey, preview_cache
+from preview_encoding import DEFAULT_PREVIEW_ENCODING, DEFAULT_PREVIEW_TRANSPORT, PREVIEW_TRANSPORTS, is_valid_transport, to_data_url
+from preview_tiers import DEFAULT_PREVIEW_TIER, PREVIEW_TIERS, derive_tiers, get_tier, is_valid_tier
+from slide_fingerprint import is_valid_fingerprint
+from pdf_rasterizer import rasterize_pdf
+from utils.http_cache import IMMUTABLE_CACHE_CONTROL, etag_matches
 from utils.logging_utils import logger
+from core.offload import offload
 
 router = APIRouter(prefix="/api", tags=["analysis"])
 
+# Resolución de las previews de PDF (2x sobre 72 dpi)
+PDF_PREVIEW_DPI = 144
 
-def analyze_pdf(pdf_path: str) -> dict:
+
+def analyze_pdf(pdf_path: str, preview_tier: str = DEFAULT_PREVIEW_TIER) -> dict:
     """
     Analiza un archivo PDF y extrae sus páginas como slides.
     Intenta usar PyMuPDF (fitz) primero, luego pdf2image como fallback.
     """
-    import base64
-    from io import BytesIO
-    
     # Intentar con PyMuPDF (no requiere Poppler)
     try:
         import fitz  # PyMuPDF
         
         logger.info(f"📄 Convirtiendo PDF con PyMuPDF: {pdf_path}")
         
-        doc = fitz.open(pdf_path)
+        # Renderizar páginas a imagen (zoom 2x), repartidas entre procesos
+        slide_images = rasterize_pdf(pdf_path, dpi=PDF_PREVIEW_DPI, binary=True)
+        if preview_tier != 'full':
+            slide_images = [derive_tiers(data)[preview_tier] for data, _ in slide_images]
+        slide_images = [to_data_url(*image) for image in slide_images]
         slides = []
-        slide_images = []
         
-        for i, page in enumerate(doc):
-            # Renderizar página a imagen (zoom 2x para mejor calidad)
-            mat = fitz.Matrix(2, 2)
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convertir a base64
-            img_data = pix.tobytes("png")
-            img_base64 = base64.b64encode(img_data).decode()
-            
-            slide_images.append(f"data:image/png;base64,{img_base64}")
-            
+        for i, preview in enumerate(slide_images):
             slides.append({
                 "number": i + 1,
                 "type": "content",
@@ -51,18 +53,17 @@ def analyze_pdf(pdf_path: str) -> dict:
                 "isTitle": i == 0,
                 "isCover": i == 0,
                 "textAreas": [],
-                "preview": f"data:image/png;base64,{img_base64}"
+                "preview": preview
             })
         
         # Obtener tamaño de la primera página
-        if doc.page_count > 0:
-            page = doc[0]
-            width = int(page.rect.width * 2)  # Con zoom 2x
-            height = int(page.rect.height * 2)
-        else:
-            width, height = 1920, 1080
-        
-        doc.close()
+        with fitz.open(pdf_path) as doc:
+            if doc.page_count > 0:
+                page = doc[0]
+                width = int(page.rect.width * PDF_PREVIEW_DPI / 72)  # Con zoom 2x
+                height = int(page.rect.height * PDF_PREVIEW_DPI / 72)
+            else:
+                width, height = 1920, 1080
         
         return {
             "fileName": os.path.basename(pdf_path),
@@ -72,6 +73,8 @@ def analyze_pdf(pdf_path: str) -> dict:
             },
             "slides": slides,
             "slideImages": slide_images,
+            "previewTier": preview_tier,
+            "previewTransport": "inline",
             "extractedAssets": {
                 "logos": [],
                 "images": [],
@@ -87,24 +90,19 @@ def analyze_pdf(pdf_path: str) -> dict:
     # Fallback a pdf2image (requiere Poppler)
     try:
         from pdf2image import convert_from_path
-        from PIL import Image
         
         logger.info(f"📄 Convirtiendo PDF con pdf2image: {pdf_path}")
         
-        # Convertir PDF a imágenes
+        # Convertir PDF a imágenes, en el mismo formato y tamaño que con PyMuPDF
         images = convert_from_path(pdf_path, dpi=150)
-        
+        slide_images = [(DEFAULT_PREVIEW_ENCODING.encode(image), DEFAULT_PREVIEW_ENCODING.mime_type)
+                        for image in images]
+        if preview_tier != 'full':
+            slide_images = [derive_tiers(data)[preview_tier] for data, _ in slide_images]
+        slide_images = [to_data_url(*image) for image in slide_images]
         slides = []
-        slide_images = []
         
-        for i, image in enumerate(images):
-            # Convertir imagen a base64
-            buffered = BytesIO()
-            image.save(buffered, format="PNG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
-            
-            slide_images.append(f"data:image/png;base64,{img_base64}")
-            
+        for i, preview in enumerate(slide_images):
             slides.append({
                 "number": i + 1,
                 "type": "content",
@@ -113,7 +111,7 @@ def analyze_pdf(pdf_path: str) -> dict:
                 "isTitle": i == 0,
                 "isCover": i == 0,
                 "textAreas": [],
-                "preview": f"data:image/png;base64,{img_base64}"
+                "preview": preview
             })
         
         width, height = images[0].size if images else (1920, 1080)
@@ -126,6 +124,8 @@ def analyze_pdf(pdf_path: str) -> dict:
             },
             "slides": slides,
             "slideImages": slide_images,
+            "previewTier": preview_tier,
+            "previewTransport": "inline",
             "extractedAssets": {
                 "logos": [],
                 "images": [],
@@ -156,6 +156,8 @@ def analyze_pdf(pdf_path: str) -> dict:
             "preview": None
         }],
         "slideImages": [],
+        "previewTier": preview_tier,
+        "previewTransport": "inline",
         "extractedAssets": {
             "logos": [],
             "images": [],
@@ -168,10 +170,27 @@ def analyze_pdf(pdf_path: str) -> dict:
 
 
 @router.post("/analyze")
-async def analyze_ppt(file: UploadFile = File(...)):
+async def analyze_ppt(file: UploadFile = File(...), lazyAssets: bool = False,
+                      previewTier: str = DEFAULT_PREVIEW_TIER,
+                      previewTransport: str = DEFAULT_PREVIEW_TRANSPORT):
     """
     Analiza un archivo PowerPoint o PDF y extrae toda su estructura de diseño.
+    
+    Con `?lazyAssets=true` los assets del PPTX no se incrustan en base64: la
+    respuesta trae sus metadatos y la URL /api/assets/{hash} de cada uno.
+    
+    Con `?previewTier=thumb|medium|full` las previews vienen en ese tamaño
+    (por defecto full); cada slide trae su `fingerprint` para pedir otro
+    tamaño a /api/previews/{fingerprint}.
+    
+    Con `?previewTransport=url` las previews del PPTX son esas URLs en lugar
+    de data URLs base64 (los PDF van siempre inline).
     """
+    if not is_valid_tier(previewTier):
+        raise HTTPException(status_code=400, detail=f"previewTier inválido (usa {', '.join(PREVIEW_TIERS)})")
+    if not is_valid_transport(previewTransport):
+        raise HTTPException(status_code=400, detail=f"previewTransport inválido (usa {', '.join(PREVIEW_TRANSPORTS)})")
+    
     filename = file.filename.lower()
     
     # Determinar tipo de archivo
@@ -192,27 +211,68 @@ async def analyze_ppt(file: UploadFile = File(...)):
         
         logger.info(f"📄 Archivo guardado en: {tmp_path} (tipo: {file_type})")
         
-        if file_type == 'pdf':
-            analysis = analyze_pdf(tmp_path)
-        else:
-            analysis = analyze_presentation(tmp_path)
+        # El análisis bloquea varios segundos: corre fuera del event loop
+        try:
+            if file_type == 'pdf':
+                analysis = await offload("analyze", analyze_pdf, tmp_path, preview_tier=previewTier)
+            else:
+                analysis = await offload("analyze", analyze_presentation, tmp_path, lazy_assets=lazyAssets,
+                                         preview_tier=previewTier, preview_transport=previewTransport)
+        finally:
+            os.unlink(tmp_path)
         
         logger.info(f"✅ Análisis completado: {len(analysis['slides'])} slides")
         
-        os.unlink(tmp_path)
-        
         return {
             "success": True,
             "analysis": analysis,
             "message": f"Análisis completado: {len(analysis['slides'])} diapositivas detectadas"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error al analizar: {str(e)}")
 
 
+@router.get("/preview-cache/stats")
+async def preview_cache_stats():
+    """
+    Estadísticas de la caché en disco de previews de slides.
+    """
+    return preview_cache.get_stats()
+
+
+@router.get("/previews/{fingerprint}")
+async def get_slide_preview(fingerprint: str, request: Request, tier: str = DEFAULT_PREVIEW_TIER):
+    """
+    Sirve la preview de un slide (por su huella) en el tamaño pedido.
+    
+    Los tamaños reducidos se derivan de la preview completa en la primera
+    petición y se guardan para las siguientes.
+    """
+    if not is_valid_fingerprint(fingerprint):
+        raise HTTPException(status_code=400, detail="Huella de slide inválida")
+    if not is_valid_tier(tier):
+        raise HTTPException(status_code=400, detail=f"Tamaño inválido (usa {', '.join(PREVIEW_TIERS)})")
+    
+    for renderer, resolution in available_preview_renderers():
+        etag = f'"{fingerprint}.{renderer}.{tier}"'
+        headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        
+        key = PreviewKey(fingerprint, renderer, resolution, tier)
+        preview = await asyncio.to_thread(get_tier, preview_cache, key)
+        if preview is not None:
+            data, mime = preview
+            return Response(content=data, media_type=mime, headers=headers)
+    
+    raise HTTPException(status_code=404, detail="Preview no encontrada")
+
+
 @router.post("/analyze-fonts")
 async def analyze_fonts_endpoint(file: UploadFile = File(...)):
     """
@@ -229,9 +289,10 @@ async def analyze_fonts_endpoint(file: UploadFile = File(...)):
         
         logger.info(f"🔤 Analizando fuentes de: {file.filename}")
         
-        font_analysis = analyze_pptx_fonts(tmp_path)
-        
-        os.unlink(tmp_path)
+        try:
+            font_analysis = await offload("analyze-fonts", analyze_pptx_fonts, tmp_path)
+        finally:
+            os.unlink(tmp_path)
         
         logger.info(f"✅ Análisis de fuentes completado: {font_analysis['summary']}")
         
@@ -241,6 +302,8 @@ async def analyze_fonts_endpoint(file: UploadFile = File(...)):
             **font_analysis
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error analizando fuentes: {str(e)}")
         import traceback
@@ -248,6 +311,54 @@ async def analyze_fonts_endpoint(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error al analizar fuentes: {str(e)}")
 
 
+def extract_slide_content(pptx_path: str) -> list:
+    """
+    Textos de cada slide de un PPTX (títulos, subtítulos, cuerpo y bullets),
+    sin diseño.
+    """
+    prs = Presentation(pptx_path)
+    
+    extracted_slides = []
+    
+    for slide_idx, slide in enumerate(prs.slides):
+        slide_content = {
+            "slideNumber": slide_idx + 1,
+            "type": "content",
+            "texts": []
+        }
+        
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                text = shape.text_frame.text.strip()
+                if text:
+                    text_type = "body"
+                    if shape.is_placeholder:
+                        placeholder_type = shape.placeholder_format.type
+                        if placeholder_type == 1:
+                            text_type = "title"
+                        elif placeholder_type == 2:
+                            text_type = "subtitle"
+                    
+                    if '\n' in text and text_type == "body":
+                        bullets = [line.strip() for line in text.split('\n') if line.strip()]
+                        slide_content["texts"].append({
+                            "type": "bullets",
+                            "content": bullets
+                        })
+                    else:
+                        slide_content["texts"].append({
+                            "type": text_type,
+                            "content": text
+                        })
+        
+        if slide_idx == 0 or any(t["type"] == "title" for t in slide_content["texts"]):
+            slide_content["type"] = "title"
+        
+        extracted_slides.append(slide_content)
+    
+    return extracted_slides
+
+
 @router.post("/extract-content")
 async def extract_content(file: UploadFile = File(...)):
     """
@@ -264,47 +375,10 @@ async def extract_content(file: UploadFile = File(...)):
         
         logger.info(f"📄 Extrayendo contenido de: {tmp_path}")
         
-        prs = Presentation(tmp_path)
-        
-        extracted_slides = []
-        
-        for slide_idx, slide in enumerate(prs.slides):
-            slide_content = {
-                "slideNumber": slide_idx + 1,
-                "type": "content",
-                "texts": []
-            }
-            
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    text = shape.text_frame.text.strip()
-                    if text:
-                        text_type = "body"
-                        if shape.is_placeholder:
-                            placeholder_type = shape.placeholder_format.type
-                            if placeholder_type == 1:
-                                text_type = "title"
-                            elif placeholder_type == 2:
-                                text_type = "subtitle"
-                        
-                        if '\n' in text and text_type == "body":
-                            bullets = [line.strip() for line in text.split('\n') if line.strip()]
-                            slide_content["texts"].append({
-                                "type": "bullets",
-                                "content": bullets
-                            })
-                        else:
-                            slide_content["texts"].append({
-                                "type": text_type,
-                                "content": text
-                            })
-            
-            if slide_idx == 0 or any(t["type"] == "title" for t in slide_content["texts"]):
-                slide_content["type"] = "title"
-            
-            extracted_slides.append(slide_content)
-        
-        os.unlink(tmp_path)
+        try:
+            extracted_slides = await offload("extract-content", extract_slide_content, tmp_path)
+        finally:
+            os.unlink(tmp_path)
         
         logger.info(f"✅ Contenido extraído: {len(extracted_slides)} slides")
         
@@ -315,6 +389,8 @@ async def extract_content(file: UploadFile = File(...)):
             "slides": extracted_slides
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -0,0 +1,62 @@
+"""
+Asset routes - serve images extracted in lazy analysis mode.
+"""
+import asyncio
+import re
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+from image_processor import smart_background_removal_bytes
+from services.asset_store import asset_store, is_valid_asset_hash, media_type_for
+from utils.http_cache import IMMUTABLE_CACHE_CONTROL, etag_matches
+from utils.logging_utils import logger
+
+router = APIRouter(prefix="/api", tags=["assets"])
+
+BG_COLOR_RE = re.compile(r'^#?[0-9a-fA-F]{6}$')
+
+
+@router.get("/assets/{asset_hash}")
+async def get_asset(asset_hash: str, request: Request, bg: Optional[str] = None):
+    """
+    Sirve un asset extraído por /api/analyze en modo lazy.
+    
+    - Sin `bg`: los bytes originales de la imagen.
+    - Con `bg=RRGGBB`: la imagen con el fondo blanco reemplazado por ese color
+      (PNG), generada en la primera petición y guardada para las siguientes.
+    """
+    if not is_valid_asset_hash(asset_hash):
+        raise HTTPException(status_code=400, detail="Hash de asset inválido")
+    
+    variant = None
+    if bg is not None:
+        if not BG_COLOR_RE.match(bg):
+            raise HTTPException(status_code=400, detail="Color de fondo inválido (usa RRGGBB)")
+        variant = f"bg-{bg.lstrip('#').lower()}"
+    
+    etag = f'"{asset_hash}.{variant}"' if variant else f'"{asset_hash}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    if variant is None:
+        path = asset_store.get_path(asset_hash)
+    else:
+        bg_color_hex = f"#{variant[3:]}"
+        try:
+            path = await asyncio.to_thread(
+                asset_store.get_variant,
+                asset_hash, variant, 'png',
+                lambda data: smart_background_removal_bytes(data, bg_color_hex)
+            )
+        except Exception as e:
+            logger.error(f"❌ Error procesando asset {asset_hash[:16]}...: {e}")
+            raise HTTPException(status_code=422, detail=f"No se pudo procesar el asset: {str(e)}")
+    
+    if not path:
+        raise HTTPException(status_code=404, detail="Asset no encontrado")
+    
+    return FileResponse(path, media_type=media_type_for(path), headers=headers)
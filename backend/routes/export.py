@@ -3,21 +3,150 @@ Export routes - PPTX and PDF export functionality.
 Supports both sync (small files) and async (large files) generation.
 """
 from fastapi import APIRouter, UploadFile, File, HTTPException, Request, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 import tempfile
 import os
 import json
-import re
-import base64
 import asyncio
+from typing import Any, Callable, Iterable, Optional, Tuple
 
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx_generator import generate_presentation
+from mapping_cache import MappingCache
+from services.template_store import template_store, is_valid_template_hash
 from utils.logging_utils import logger
+from utils.multipart_stream import (
+    read_multipart_stream, StreamedForm, MultipartError, PartTooLargeError
+)
 from core.task_queue import task_queue, TaskStatus
+from core.offload import offload, offloader
+from libreoffice_pool import libreoffice_pool
+from pdf_exporter import export_pdf as export_pdf_file
 
 router = APIRouter(prefix="/api", tags=["export"])
+mapping_cache = MappingCache()
+
+# Server-sent events: how often task state is checked and how long an idle
+# stream waits before sending a keep-alive comment (seconds)
+TASK_EVENTS_INTERVAL = 0.5
+TASK_EVENTS_KEEPALIVE = 15
+
+# Suggested polling interval (Retry-After) for clients that don't use events
+TASK_POLL_RETRY_AFTER = {TaskStatus.PENDING: 2, TaskStatus.RUNNING: 1}
+
+# Media type and download name of task results, by file extension
+TASK_RESULT_TYPES = {
+    '.pptx': ("application/vnd.openxmlformats-officedocument.presentationml.presentation", "presentacion.pptx"),
+    '.pdf': ("application/pdf", "presentacion.pdf"),
+}
+
+
+def _resolve_template_hash(template_hash: str) -> str:
+    """
+    Resolve a `templateHash` reference to the stored template path.
+    Raises 400 for malformed hashes and 404 for unknown templates.
+    """
+    if not is_valid_template_hash(template_hash):
+        raise HTTPException(status_code=400, detail="Invalid templateHash")
+    
+    path = template_store.get_path(template_hash)
+    if not path:
+        registered_path = mapping_cache.get_template_file_path(template_hash)
+        if registered_path and os.path.isfile(registered_path):
+            path = registered_path
+    
+    if not path:
+        raise HTTPException(
+            status_code=404,
+            detail="Template not found. Upload it first with POST /api/template/upload"
+        )
+    
+    return path
+
+
+def _get_template_hash(data: Any, form_value: str = None) -> str:
+    """Read `templateHash` from the multipart field or the JSON payload."""
+    if form_value:
+        return form_value.strip()
+    if data:
+        parsed = json.loads(data) if isinstance(data, str) else data
+        return parsed.get('templateHash')
+    return None
+
+
+async def _read_export_payload(
+    request: Request,
+    fields: Iterable[str] = ('template', 'templateHash', 'data')
+) -> Tuple[Optional[dict], StreamedForm]:
+    """
+    Read an export request without buffering multipart bodies in memory.
+    
+    Multipart bodies are parsed as they stream in: the template part is
+    spooled to a temp file and `data` is decoded from its spool. Plain JSON
+    bodies are parsed directly.
+    
+    Returns:
+        (data, form) - the caller must close the form
+    """
+    content_type = request.headers.get('content-type', '')
+    
+    if 'multipart/form-data' not in content_type:
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
+        if not isinstance(data, dict):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+        return data, StreamedForm()
+    
+    try:
+        form = await read_multipart_stream(content_type, request.stream(), fields)
+    except PartTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MultipartError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    data_part = form.get('data')
+    try:
+        data = data_part.load_json() if data_part else None
+    except ValueError:
+        form.close()
+        raise HTTPException(status_code=400, detail="Invalid JSON in data field")
+    if data is not None and not isinstance(data, dict):
+        form.close()
+        raise HTTPException(status_code=400, detail="data field must be a JSON object")
+    
+    return data, form
+
+
+def _take_template(data: Optional[dict], form: StreamedForm) -> Tuple[Optional[str], Optional[str], bool]:
+    """
+    Template of an export request: a stored one referenced by `templateHash`
+    or the uploaded part, detached so it outlives the request.
+    
+    Returns:
+        (template_path, template_hash, cleanup_template) - the caller removes
+        the template afterwards only when cleanup_template is set
+    """
+    # Stored templates are referenced by hash instead of re-uploaded
+    template_hash = _get_template_hash(data, form.text('templateHash'))
+    template_path = _resolve_template_hash(template_hash) if template_hash else None
+    
+    # Keep the spooled upload on disk for background processing
+    template_part = form.get('template')
+    if not template_path and template_part and template_part.path and template_part.size:
+        return template_part.detach(), template_part.sha256, True
+    
+    return template_path, template_hash, False
+
+
+async def _read_pdf_export_request(request: Request) -> Tuple[Optional[str], Optional[dict], Optional[str], bool]:
+    """Payload and template of a PDF export: (template_path, data, template_hash, cleanup_template)."""
+    data, form = await _read_export_payload(request)
+    with form:
+        template_path, template_hash, cleanup_template = _take_template(data, form)
+    return template_path, data, template_hash, cleanup_template
 
 
 # ============================================
@@ -35,60 +164,18 @@ async def export_pptx_async(request: Request, background_tasks: BackgroundTasks)
     """
     try:
         # Parse request (same as sync version)
-        content_type = request.headers.get('content-type', '')
-        template_content = None
-        template_filename = None
-        data = None
-        
-        if 'multipart/form-data' in content_type:
-            body = await request.body()
-            boundary_match = re.search(r'boundary=([^;]+)', content_type)
-            if not boundary_match:
-                raise HTTPException(status_code=400, detail="Invalid multipart boundary")
-            
-            boundary = boundary_match.group(1).strip('"')
-            parts = body.split(f'--{boundary}'.encode())
-            
-            for part in parts:
-                if b'name="template"' in part:
-                    filename_match = re.search(rb'filename="([^"]+)"', part)
-                    if filename_match:
-                        template_filename = filename_match.group(1).decode('utf-8')
-                    content_start = part.find(b'\r\n\r\n')
-                    if content_start != -1:
-                        template_content = part[content_start + 4:]
-                        if template_content.endswith(b'\r\n'):
-                            template_content = template_content[:-2]
-                elif b'name="data"' in part:
-                    content_start = part.find(b'\r\n\r\n')
-                    if content_start != -1:
-                        data_bytes = part[content_start + 4:]
-                        if data_bytes.endswith(b'\r\n'):
-                            data_bytes = data_bytes[:-2]
-                        data = data_bytes.decode('utf-8')
-        else:
-            body = await request.body()
-            json_data = json.loads(body)
-            data = json.dumps(json_data)
-        
-        # Create task
-        task = task_queue.create_task()
+        data, form = await _read_export_payload(request)
         
-        # Save template to temp file for background processing
-        template_path = None
-        if template_content:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp:
-                tmp.write(template_content)
-                template_path = tmp.name
+        with form:
+            template_path, template_hash, cleanup_template = _take_template(data, form)
         
-        # Schedule background task
-        asyncio.create_task(
-            task_queue.run_in_background(
-                task.id,
-                _generate_pptx_task,
-                template_path,
-                data
-            )
+        # Create and schedule task (persisted when the queue store is durable)
+        task = task_queue.submit(
+            _generate_pptx_task,
+            template_path,
+            data,
+            template_hash,
+            cleanup_template
         )
         
         logger.info(f"📋 PPTX generation queued: task {task.id}")
@@ -100,26 +187,114 @@ async def export_pptx_async(request: Request, background_tasks: BackgroundTasks)
             "message": "Generación en cola. Usa GET /api/task/{taskId} para verificar estado."
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error queuing PPTX export: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/export/pdf/async")
+async def export_pdf_async(request: Request):
+    """
+    Async PDF export - returns task ID immediately.
+    Same payload as POST /api/export/pdf; poll GET /api/task/{task_id} and
+    fetch the PDF from GET /api/task/{task_id}/download.
+    """
+    try:
+        template_path, data, template_hash, cleanup_template = await _read_pdf_export_request(request)
+        
+        task = task_queue.submit(_export_pdf_task, template_path, data, template_hash, cleanup_template)
+        
+        logger.info(f"📋 PDF export queued: task {task.id}")
+        
+        return JSONResponse({
+            "success": True,
+            "taskId": task.id,
+            "status": "pending",
+            "message": "Exportación en cola. Usa GET /api/task/{taskId} para verificar estado."
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error queuing PDF export: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _task_payload(task) -> dict:
+    """Task status as returned to clients."""
+    response = task.to_dict()
+    
+    # If completed, include download URL
+    if task.status == TaskStatus.COMPLETED and task.result:
+        response["downloadUrl"] = f"/api/task/{task.id}/download"
+    
+    return response
+
+
 @router.get("/task/{task_id}")
 async def get_task_status(task_id: str):
-    """Get status of an async task."""
+    """
+    Get status of an async task.
+    Unfinished tasks carry a Retry-After header with the suggested polling
+    interval; GET /api/task/{task_id}/events streams updates instead.
+    """
     task = task_queue.get_task(task_id)
     
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    response = task.to_dict()
+    headers = {}
+    if task.status in TASK_POLL_RETRY_AFTER:
+        headers["Retry-After"] = str(TASK_POLL_RETRY_AFTER[task.status])
     
-    # If completed, include download URL
-    if task.status == TaskStatus.COMPLETED and task.result:
-        response["downloadUrl"] = f"/api/task/{task_id}/download"
+    return JSONResponse(_task_payload(task), headers=headers)
+
+
+@router.get("/task/{task_id}/events")
+async def stream_task_events(task_id: str, request: Request):
+    """
+    Server-sent events for a task.
+    Emits a `progress` event whenever status or progress changes and ends
+    with a single `completed` or `failed` event carrying the final state.
+    """
+    if not task_queue.get_task(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
     
-    return response
+    async def events():
+        last_payload = None
+        idle = 0.0
+        yield "retry: 2000\n\n"
+        
+        while not await request.is_disconnected():
+            task = task_queue.get_task(task_id)
+            if task is None:
+                yield f"event: failed\ndata: {json.dumps({'id': task_id, 'error': 'Task not found'})}\n\n"
+                return
+            
+            payload = _task_payload(task)
+            finished = task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED)
+            
+            if payload != last_payload:
+                event = task.status.value if finished else "progress"
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+                last_payload = payload
+                idle = 0.0
+                if finished:
+                    return
+            elif idle >= TASK_EVENTS_KEEPALIVE:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            
+            await asyncio.sleep(TASK_EVENTS_INTERVAL)
+            idle += TASK_EVENTS_INTERVAL
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/task/{task_id}/download")
@@ -136,24 +311,38 @@ async def download_task_result(task_id: str):
     if not task.result or not os.path.exists(task.result):
         raise HTTPException(status_code=404, detail="Result file not found")
     
+    media_type, filename = TASK_RESULT_TYPES.get(
+        os.path.splitext(task.result)[1].lower(), TASK_RESULT_TYPES['.pptx']
+    )
     return FileResponse(
         task.result,
-        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
-        filename="presentacion.pptx",
-        headers={"Content-Disposition": "attachment; filename=presentacion.pptx"}
+        media_type=media_type,
+        filename=filename,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 
 @router.get("/queue/status")
 async def get_queue_status():
-    """Get current task queue statistics."""
-    return task_queue.get_queue_status()
+    """Get current task queue, offload and LibreOffice pool statistics."""
+    return {
+        **task_queue.get_queue_status(),
+        "offload": offloader.get_stats(),
+        "libreoffice": libreoffice_pool.stats()
+    }
 
 
-def _generate_pptx_task(template_path: str, data: str) -> str:
+def _generate_pptx_task(template_path: str, data: Any, template_hash: str = None,
+                        cleanup_template: bool = False,
+                        progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
     """
-    Synchronous PPTX generation task (runs in thread pool).
+    Synchronous PPTX generation task (runs on the task queue backend).
     Returns path to generated file.
+    
+    `template_path` is removed afterwards, even if generation fails, only
+    when `cleanup_template` is set (per-request uploads); templates from the
+    store are shared and kept. The task queue passes `progress_callback`,
+    called once per cloned slide.
     """
     try:
         slides_data = []
@@ -183,13 +372,11 @@ def _generate_pptx_task(template_path: str, data: str) -> str:
             output_path = generate_presentation(
                 template_path,
                 ai_content,
-                text_areas_by_slide=text_areas_by_slide if has_text_areas else None
+                text_areas_by_slide=text_areas_by_slide if has_text_areas else None,
+                template_hash=template_hash,
+                progress_callback=progress_callback
             )
             
-            # Cleanup template
-            if os.path.exists(template_path):
-                os.unlink(template_path)
-            
             return output_path
         else:
             # Generate basic presentation without template
@@ -198,6 +385,47 @@ def _generate_pptx_task(template_path: str, data: str) -> str:
     except Exception as e:
         logger.error(f"❌ PPTX generation failed: {e}")
         raise
+    finally:
+        # Cleanup uploaded template (stored templates are shared and kept)
+        _cleanup_template(template_path, cleanup_template)
+
+
+def _cleanup_template(template_path: Optional[str], cleanup_template: bool) -> None:
+    """Remove a per-request template upload; stored templates are kept."""
+    if cleanup_template and template_path and os.path.exists(template_path):
+        os.unlink(template_path)
+
+
+def _export_pdf_task(template_path: Optional[str], data: Any, template_hash: str = None,
+                     cleanup_template: bool = False,
+                     progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
+    """
+    Synchronous PDF export task (runs on the task queue backend).
+    Returns path to the generated PDF.
+    
+    With a template the PPTX is generated first and converted to vector PDF
+    by the LibreOffice pool; without one, or if LibreOffice fails, the PDF
+    is assembled from the slide previews (see pdf_exporter).
+    """
+    parsed_data = json.loads(data) if isinstance(data, str) else (data or {})
+    slides = parsed_data.get('slides', [])
+    
+    pptx_path = None
+    try:
+        if template_path:
+            try:
+                pptx_path = _generate_pptx_task(template_path, parsed_data, template_hash, cleanup_template)
+            except Exception as e:
+                logger.warning(f"⚠️ PPTX generation failed, exporting previews instead: {e}")
+        
+        pdf_path, method = export_pdf_file(pptx_path, slides, progress_callback=progress_callback)
+    finally:
+        _cleanup_template(template_path, cleanup_template)
+        if pptx_path and os.path.exists(pptx_path):
+            os.unlink(pptx_path)
+    
+    logger.info(f"📄 PDF export ({method}): {pdf_path}")
+    return pdf_path
 
 
 def _generate_basic_pptx(slides: list) -> str:
@@ -209,7 +437,8 @@ def _generate_basic_pptx(slides: list) -> str:
     for slide_data in slides:
         slide_type = slide_data.get('type', 'content')
         content = slide_data.get('content', {})
-        layout = prs.slide_layouts[6]
+        
+        layout = prs.slide_layouts[6]  # Blank
         slide = prs.slides.add_slide(layout)
         
         if slide_type == 'title':
@@ -220,6 +449,14 @@ def _generate_basic_pptx(slides: list) -> str:
             title_para.font.size = Pt(44)
             title_para.font.bold = True
             title_para.alignment = 1
+            
+            if content.get('subtitle'):
+                sub_box = slide.shapes.add_textbox(Inches(0.5), Inches(4), Inches(12.333), Inches(1))
+                sub_frame = sub_box.text_frame
+                sub_para = sub_frame.paragraphs[0]
+                sub_para.text = content.get('subtitle', '')
+                sub_para.font.size = Pt(24)
+                sub_para.alignment = 1
         else:
             if content.get('heading'):
                 head_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(12.333), Inches(1))
@@ -228,6 +465,19 @@ def _generate_basic_pptx(slides: list) -> str:
                 head_para.text = content.get('heading', '')
                 head_para.font.size = Pt(32)
                 head_para.font.bold = True
+            
+            bullets = content.get('bullets', [])
+            if bullets:
+                bullet_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(12.333), Inches(5))
+                bullet_frame = bullet_box.text_frame
+                bullet_frame.word_wrap = True
+                
+                for i, bullet in enumerate(bullets):
+                    if bullet and bullet.strip():
+                        para = bullet_frame.paragraphs[0] if i == 0 else bullet_frame.add_paragraph()
+                        para.text = f"• {bullet}"
+                        para.font.size = Pt(18)
+                        para.space_after = Pt(12)
     
     with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp:
         prs.save(tmp.name)
@@ -278,53 +528,21 @@ async def export_pptx(request: Request):
     Si se proporciona un template, clona su diseño y solo reemplaza el texto.
     """
     try:
-        content_type = request.headers.get('content-type', '')
-        
-        template_content = None
-        template_filename = None
-        data = None
+        data, form = await _read_export_payload(request)
         
-        if 'multipart/form-data' in content_type:
-            body = await request.body()
+        with form:
+            template_part = form.get('template')
+            template_filename = template_part.filename if template_part else None
             
-            boundary_match = re.search(r'boundary=([^;]+)', content_type)
-            if not boundary_match:
-                raise HTTPException(status_code=400, detail="Invalid multipart boundary")
+            if template_part:
+                logger.info(f"📤 Export PPTX - Template: {template_filename}")
+                logger.info(f"📤 Export PPTX - Template size: {template_part.size} bytes")
             
-            boundary = boundary_match.group(1).strip('"')
-            parts = body.split(f'--{boundary}'.encode())
-            
-            for part in parts:
-                if b'name="template"' in part:
-                    filename_match = re.search(rb'filename="([^"]+)"', part)
-                    if filename_match:
-                        template_filename = filename_match.group(1).decode('utf-8')
-                    
-                    content_start = part.find(b'\r\n\r\n')
-                    if content_start != -1:
-                        template_content = part[content_start + 4:]
-                        if template_content.endswith(b'\r\n'):
-                            template_content = template_content[:-2]
-                
-                elif b'name="data"' in part:
-                    content_start = part.find(b'\r\n\r\n')
-                    if content_start != -1:
-                        data_bytes = part[content_start + 4:]
-                        if data_bytes.endswith(b'\r\n'):
-                            data_bytes = data_bytes[:-2]
-                        data = data_bytes.decode('utf-8')
-            
-            logger.info(f"📤 Export PPTX - Template: {template_filename}")
-            logger.info(f"📤 Export PPTX - Template size: {len(template_content) if template_content else 0} bytes")
-        else:
-            body = await request.body()
-            json_data = json.loads(body)
-            data = json.dumps(json_data)
+            template_path, template_hash, cleanup_template = _take_template(data, form)
         
         slides = []
         if data:
-            slides_data = json.loads(data) if isinstance(data, str) else data
-            slides = slides_data.get('slides', [])
+            slides = data.get('slides', [])
             logger.info(f"📤 Slides parseados: {len(slides)}")
             
             # DEBUG: Mostrar contenido de cada slide
@@ -340,12 +558,8 @@ async def export_pptx(request: Request):
                         logger.info(f"     • {bullet}")
         
         # Si hay template, usar clonación completa
-        if template_content and template_filename:
-            logger.info(f"📄 Usando template: {template_filename}")
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp:
-                tmp.write(template_content)
-                template_path = tmp.name
+        if template_path:
+            logger.info(f"📄 Usando template: {template_filename or template_hash[:16] + '...'}")
             
             # Preparar contenido y textAreas
             ai_content = {
@@ -359,16 +573,20 @@ async def export_pptx(request: Request):
             if has_text_areas:
                 logger.info(f"📍 Enviando {sum(len(ta) for ta in text_areas_by_slide)} textAreas al clonador")
             
-            output_path = generate_presentation(
-                template_path,
-                ai_content,
-                text_areas_by_slide=text_areas_by_slide if has_text_areas else None
-            )
+            try:
+                output_path = await offload(
+                    "export-pptx",
+                    generate_presentation,
+                    template_path,
+                    ai_content,
+                    text_areas_by_slide=text_areas_by_slide if has_text_areas else None,
+                    template_hash=template_hash
+                )
+            finally:
+                _cleanup_template(template_path, cleanup_template)
             
             logger.info(f"✅ Presentación generada: {output_path}")
             
-            os.unlink(template_path)
-            
             return FileResponse(
                 output_path,
                 media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
@@ -377,66 +595,17 @@ async def export_pptx(request: Request):
             )
         
         # Si no hay template, crear presentación básica
-        prs = Presentation()
-        prs.slide_width = Inches(13.333)
-        prs.slide_height = Inches(7.5)
-        
-        for slide_data in slides:
-            slide_type = slide_data.get('type', 'content')
-            content = slide_data.get('content', {})
-            
-            layout = prs.slide_layouts[6]  # Blank
-            slide = prs.slides.add_slide(layout)
-            
-            if slide_type == 'title':
-                title_box = slide.shapes.add_textbox(Inches(0.5), Inches(2.5), Inches(12.333), Inches(1.5))
-                title_frame = title_box.text_frame
-                title_para = title_frame.paragraphs[0]
-                title_para.text = content.get('title', '')
-                title_para.font.size = Pt(44)
-                title_para.font.bold = True
-                title_para.alignment = 1
-                
-                if content.get('subtitle'):
-                    sub_box = slide.shapes.add_textbox(Inches(0.5), Inches(4), Inches(12.333), Inches(1))
-                    sub_frame = sub_box.text_frame
-                    sub_para = sub_frame.paragraphs[0]
-                    sub_para.text = content.get('subtitle', '')
-                    sub_para.font.size = Pt(24)
-                    sub_para.alignment = 1
-            else:
-                if content.get('heading'):
-                    head_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(12.333), Inches(1))
-                    head_frame = head_box.text_frame
-                    head_para = head_frame.paragraphs[0]
-                    head_para.text = content.get('heading', '')
-                    head_para.font.size = Pt(32)
-                    head_para.font.bold = True
-                
-                bullets = content.get('bullets', [])
-                if bullets:
-                    bullet_box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(12.333), Inches(5))
-                    bullet_frame = bullet_box.text_frame
-                    bullet_frame.word_wrap = True
-                    
-                    for i, bullet in enumerate(bullets):
-                        if bullet and bullet.strip():
-                            para = bullet_frame.paragraphs[0] if i == 0 else bullet_frame.add_paragraph()
-                            para.text = f"• {bullet}"
-                            para.font.size = Pt(18)
-                            para.space_after = Pt(12)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp:
-            prs.save(tmp.name)
-            tmp_path = tmp.name
+        output_path = await offload("export-pptx", _generate_basic_pptx, slides)
         
         return FileResponse(
-            tmp_path,
+            output_path,
             media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation",
             filename="presentacion.pptx",
             headers={"Content-Disposition": "attachment; filename=presentacion.pptx"}
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -446,100 +615,29 @@ async def export_pptx(request: Request):
 @router.post("/export/pdf")
 async def export_pdf(request: Request):
     """
-    Exporta slides a PDF usando las imágenes de preview.
-    Tamaño exacto 16:9 sin márgenes.
+    Exporta slides a PDF.
+    Con template (subido o por templateHash) se genera el PPTX y LibreOffice
+    lo convierte a PDF vectorial; si no, o si LibreOffice falla, el PDF se
+    arma con las imágenes de preview (16:9 sin márgenes).
+    
+    La exportación corre en el backend de la cola de tareas, fuera del
+    event loop; para presentaciones grandes usa POST /api/export/pdf/async.
     """
     try:
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.utils import ImageReader
-        from PIL import Image
-        from io import BytesIO
-        
-        PAGE_WIDTH = 960
-        PAGE_HEIGHT = 540
-        
-        content_type = request.headers.get('content-type', '')
-        slides = []
-        
-        if 'multipart/form-data' in content_type:
-            body = await request.body()
-            
-            boundary_match = re.search(r'boundary=([^;]+)', content_type)
-            if boundary_match:
-                boundary = boundary_match.group(1).strip('"')
-                parts = body.split(f'--{boundary}'.encode())
-                
-                for part in parts:
-                    if b'name="data"' in part:
-                        content_start = part.find(b'\r\n\r\n')
-                        if content_start != -1:
-                            data_bytes = part[content_start + 4:]
-                            if data_bytes.endswith(b'\r\n'):
-                                data_bytes = data_bytes[:-2]
-                            data = json.loads(data_bytes.decode('utf-8'))
-                            slides = data.get('slides', [])
-        else:
-            body = await request.body()
-            data = json.loads(body)
-            slides = data.get('slides', [])
+        template_path, data, template_hash, cleanup_template = await _read_pdf_export_request(request)
+        slides = data.get('slides', []) if data else []
         
         logger.info(f"📄 Exportando PDF 16:9 con {len(slides)} slides")
         
-        pdf_path = tempfile.mktemp(suffix='.pdf')
-        c = canvas.Canvas(pdf_path, pagesize=(PAGE_WIDTH, PAGE_HEIGHT))
-        
-        for idx, slide in enumerate(slides):
-            preview = slide.get('preview')
-            
-            if preview and preview.startswith('data:image'):
-                try:
-                    header, base64_data = preview.split(',', 1)
-                    image_data = base64.b64decode(base64_data)
-                    
-                    img = Image.open(BytesIO(image_data))
-                    
-                    if img.mode in ('RGBA', 'P'):
-                        img = img.convert('RGB')
-                    
-                    img_buffer = BytesIO()
-                    img.save(img_buffer, format='PNG')
-                    img_buffer.seek(0)
-                    
-                    c.drawImage(ImageReader(img_buffer), 0, 0, PAGE_WIDTH, PAGE_HEIGHT)
-                    
-                    logger.info(f"   ✅ Slide {idx + 1} agregado al PDF")
-                    
-                except Exception as e:
-                    logger.warning(f"   ⚠️ Error procesando imagen slide {idx + 1}: {e}")
-                    c.setFont("Helvetica-Bold", 24)
-                    c.drawCentredString(PAGE_WIDTH / 2, PAGE_HEIGHT / 2, f"Slide {idx + 1}")
-            else:
-                c.setFont("Helvetica-Bold", 32)
-                content = slide.get('content', {})
-                title = content.get('title') or content.get('heading', f'Slide {idx + 1}')
-                c.drawCentredString(PAGE_WIDTH / 2, PAGE_HEIGHT - 80, title)
-                
-                if content.get('subtitle'):
-                    c.setFont("Helvetica", 20)
-                    c.drawCentredString(PAGE_WIDTH / 2, PAGE_HEIGHT - 120, content['subtitle'])
-                
-                bullets = content.get('bullets', [])
-                if bullets:
-                    c.setFont("Helvetica", 14)
-                    y_pos = PAGE_HEIGHT - 180
-                    for bullet in bullets:
-                        if bullet and bullet.strip():
-                            c.drawString(80, y_pos, f"• {bullet}")
-                            y_pos -= 22
-                
-                logger.info(f"   📝 Slide {idx + 1} (texto) agregado al PDF")
-            
-            if idx < len(slides) - 1:
-                c.showPage()
-        
-        c.save()
+        try:
+            pdf_path = await offload(
+                "export-pdf", _export_pdf_task, template_path, data, template_hash, cleanup_template
+            )
+        finally:
+            # The task removes the upload too; this covers a rejected (429) or failed stage
+            _cleanup_template(template_path, cleanup_template)
         
-        logger.info(f"✅ PDF 16:9 generado: {pdf_path}")
+        logger.info(f"✅ PDF generado: {pdf_path}")
         
         return FileResponse(
             pdf_path,
@@ -548,6 +646,8 @@ async def export_pdf(request: Request):
             headers={"Content-Disposition": "attachment; filename=presentacion.pdf"}
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error exportando PDF: {e}")
         import traceback
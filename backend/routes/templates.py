@@ -1,16 +1,23 @@
 """
 Template routes - Template analysis, caching, and mapping.
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Response
+import asyncio
+import copy
 import tempfile
 import os
+import zipfile
+from typing import Dict, List, Optional
 
 from pptx import Presentation
 from mapping_cache import MappingCache
+from pptx_analyzer import LayoutIndex
 from shape_matcher import ShapeMatcher
 from schemas.requests import UpdateMappingRequest
-from services.gemini_vision import analyze_with_retry, validate_element_type, VALID_ELEMENT_TYPES
-from services.slide_converter import convert_slide_to_image
+from core.offload import offload
+from services.gemini_vision import analyze_batch, analyze_with_retry, validate_element_type, VALID_ELEMENT_TYPES
+from services.slide_converter import convert_slide_to_image, convert_slides_to_images
+from services.template_store import template_store, is_valid_template_hash
 from utils.logging_utils import (
     logger, ErrorCategory, 
     log_error_with_context, log_operation_start, log_operation_success
@@ -20,6 +27,30 @@ router = APIRouter(prefix="/api", tags=["templates"])
 mapping_cache = MappingCache()
 
 
+def match_slide_shapes(matcher: ShapeMatcher, shapes: list, detections: List[dict]) -> Dict[str, int]:
+    """
+    Link Gemini detections with the real shapes of one slide.
+    
+    Sets `shapeId` on every matched detection, then maps the remaining
+    shapes by their own classification. Returns type -> shape_id.
+    """
+    shape_mapping = matcher.match_detections_to_shapes(shapes, detections)
+    
+    for element in detections:
+        element_type = element['type']
+        if element_type in shape_mapping:
+            element['shapeId'] = shape_mapping[element_type]
+    
+    for shape in shapes:
+        shape_id = getattr(shape, 'shape_id', None)
+        if shape_id and shape_id not in shape_mapping.values():
+            classified_type = matcher.classify_shape(shape)
+            if classified_type != 'UNKNOWN' and classified_type not in shape_mapping:
+                shape_mapping[classified_type] = shape_id
+    
+    return shape_mapping
+
+
 @router.post("/analyze-template")
 async def analyze_template(file: UploadFile = File(...)):
     """
@@ -56,17 +87,18 @@ async def analyze_template(file: UploadFile = File(...)):
         operation_context["template_hash"] = template_hash[:16] + "..."
         logger.info(f"📄 Template hash: {template_hash[:16]}...")
         
-        # Check cache first
+        # Check cache first (only slide 0: a batch analysis stores every slide)
         cached_mapping = mapping_cache.get_cached_mapping(template_hash)
-        if cached_mapping:
-            log_operation_success("analyze_template", f"Loaded from cache - {len(cached_mapping['elements'])} elements")
+        if cached_mapping and 0 in cached_mapping['analyzedSlides']:
+            elements = [e for e in cached_mapping['elements'] if e['slideIndex'] == 0]
+            log_operation_success("analyze_template", f"Loaded from cache - {len(elements)} elements")
             return {
                 "success": True,
                 "templateHash": template_hash,
-                "elements": cached_mapping['elements'],
-                "shapeMapping": cached_mapping['shapeMapping'],
+                "elements": elements,
+                "shapeMapping": cached_mapping['slideMappings'][0],
                 "source": "cache",
-                "message": f"Template reconocido - {len(cached_mapping['elements'])} elementos cargados desde caché"
+                "message": f"Template reconocido - {len(elements)} elementos cargados desde caché"
             }
         
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp:
@@ -76,7 +108,7 @@ async def analyze_template(file: UploadFile = File(...)):
         logger.info(f"📄 Archivo guardado temporalmente: {tmp_path}")
         
         try:
-            prs = Presentation(tmp_path)
+            prs = await asyncio.to_thread(Presentation, tmp_path)
             slide_width = prs.slide_width
             slide_height = prs.slide_height
             operation_context["slide_dimensions"] = f"{slide_width}x{slide_height}"
@@ -90,12 +122,14 @@ async def analyze_template(file: UploadFile = File(...)):
         logger.info(f"📐 Slide dimensions: {slide_width} x {slide_height} EMUs")
         logger.info(f"🔷 Found {len(shapes)} shapes in first slide")
         
-        # Convert slide to image
+        # Convert slide to image, off the event loop
         logger.info("🎨 Converting slide to image...")
         try:
-            slide_image = convert_slide_to_image(tmp_path, 0)
+            slide_image = await offload("analyze-template", convert_slide_to_image, tmp_path, 0)
             if not slide_image:
                 raise ValueError("Image conversion returned empty result")
+        except HTTPException:
+            raise
         except Exception as e:
             log_error_with_context(e, ErrorCategory.FILE_CONVERSION, "convert_slide_to_image", operation_context)
             raise HTTPException(status_code=500, detail="Error de conversión: No se pudo convertir el slide a imagen.")
@@ -113,23 +147,9 @@ async def analyze_template(file: UploadFile = File(...)):
         
         # Match detections to shapes
         logger.info("🔗 Matching detections to shapes...")
+        detections = vision_result['elements']
         try:
-            matcher = ShapeMatcher(slide_width, slide_height)
-            detections = vision_result['elements']
-            shape_mapping = matcher.match_detections_to_shapes(shapes, detections)
-            
-            for element in detections:
-                element_type = element['type']
-                if element_type in shape_mapping:
-                    element['shapeId'] = shape_mapping[element_type]
-            
-            for shape in shapes:
-                shape_id = getattr(shape, 'shape_id', None)
-                if shape_id and shape_id not in shape_mapping.values():
-                    classified_type = matcher.classify_shape(shape)
-                    if classified_type != 'UNKNOWN' and classified_type not in shape_mapping:
-                        shape_mapping[classified_type] = shape_id
-            
+            shape_mapping = match_slide_shapes(ShapeMatcher(slide_width, slide_height), shapes, detections)
             operation_context["shape_mapping"] = shape_mapping
             logger.info(f"✅ Shape mapping complete: {shape_mapping}")
             
@@ -138,15 +158,22 @@ async def analyze_template(file: UploadFile = File(...)):
             logger.warning("⚠️ Shape matching failed, continuing with empty mapping")
             shape_mapping = {}
         
-        # Save to cache
+        # Save to cache (and keep the template so exports can reference it by hash)
+        try:
+            _, stored_path, _ = await asyncio.to_thread(template_store.save_bytes, file_content)
+        except Exception as e:
+            log_error_with_context(e, ErrorCategory.CACHE_OPERATION, "store_template", operation_context)
+            stored_path = None
+        
         try:
             mapping_to_save = {'elements': detections, 'shapeMapping': shape_mapping}
             mapping_cache.save_mapping(
                 template_hash=template_hash,
                 mapping=mapping_to_save,
                 template_name=file.filename,
-                file_path=None,
-                thumbnail_url=slide_image[:100] + '...' if slide_image else None
+                file_path=stored_path,
+                thumbnail_url=slide_image[:100] + '...' if slide_image else None,
+                slides=[0]
             )
             logger.info(f"💾 Mapping saved to cache")
         except Exception as e:
@@ -179,6 +206,268 @@ async def analyze_template(file: UploadFile = File(...)):
                 logger.warning(f"Could not delete temp file: {e}")
 
 
+@router.post("/analyze-template/batch")
+async def analyze_template_batch(file: UploadFile = File(...), concurrency: Optional[int] = None,
+                                 dedupeLayouts: bool = True):
+    """
+    Analyze every slide of a PPTX template and return one mapping per slide.
+    
+    1. Verifies cache by hash; only the slides it does not cover yet (new
+       template, or slides that failed last time) are analyzed
+    2. Renders those slides in one pass and sends them to Gemini Vision
+       concurrently, at most `concurrency` at once (GEMINI_BATCH_CONCURRENCY
+       by default). With `dedupeLayouts` (the default) only one slide per
+       layout group is rendered and analyzed, and its detections are shared
+       by the other slides of the group (see LayoutIndex)
+    3. Links each slide's detections with its shapes using ShapeMatcher
+    4. Saves the mappings of the analyzed slides in a single transaction,
+       keeping the elements corrected by the user
+    
+    Element ids are prefixed with the slide (`slide2_element_1`) so they stay
+    unique per template. Slides whose analysis fails are reported in
+    `failedSlides`; the request only fails if every slide does.
+    """
+    operation_context = {
+        "filename": file.filename,
+        "content_type": file.content_type,
+        "batch": True
+    }
+    log_operation_start("analyze_template_batch", operation_context)
+    
+    if not file.filename.endswith(('.pptx', '.ppt')):
+        raise HTTPException(status_code=400, detail="Solo se aceptan archivos .pptx")
+    if concurrency is not None and concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency debe ser mayor que 0")
+    
+    tmp_path = None
+    
+    try:
+        file_content = await file.read()
+        template_hash = mapping_cache.generate_template_hash(file_content)
+        operation_context["template_hash"] = template_hash[:16] + "..."
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp:
+            tmp.write(file_content)
+            tmp_path = tmp.name
+        
+        try:
+            prs = await asyncio.to_thread(Presentation, tmp_path)
+        except Exception as e:
+            log_error_with_context(e, ErrorCategory.FILE_CONVERSION, "open_presentation", operation_context)
+            raise HTTPException(status_code=400, detail="No se pudo abrir el archivo PPTX.")
+        
+        slide_count = len(prs.slides)
+        operation_context["slide_count"] = slide_count
+        if not slide_count:
+            raise HTTPException(status_code=400, detail="El template no tiene slides")
+        
+        # Check cache first
+        cached_mapping = mapping_cache.get_cached_mapping(template_hash)
+        cached_slides = {}
+        if cached_mapping:
+            cached_slides = {
+                index: {
+                    "slideIndex": index,
+                    "elements": [e for e in cached_mapping['elements'] if e['slideIndex'] == index],
+                    "shapeMapping": cached_mapping['slideMappings'][index]
+                }
+                for index in cached_mapping['analyzedSlides'] if index < slide_count
+            }
+        
+        pending = [index for index in range(slide_count) if index not in cached_slides]
+        if not pending:
+            log_operation_success("analyze_template_batch", f"Loaded from cache - {slide_count} slides")
+            slides = [cached_slides[index] for index in range(slide_count)]
+            return {
+                "success": True,
+                "templateHash": template_hash,
+                "slides": slides,
+                "elements": [element for slide in slides for element in slide['elements']],
+                "shapeMapping": cached_mapping['slideMappings'][0],
+                "failedSlides": [],
+                "source": "cache",
+                "message": f"Template reconocido - {slide_count} slides cargados desde caché"
+            }
+        
+        layout_index = LayoutIndex(prs)
+        if dedupeLayouts:
+            analyzed = sorted({layout_index.representative(index) for index in pending})
+        else:
+            analyzed = pending
+        
+        # Render the analyzed slides in one conversion, off the event loop
+        logger.info(f"🎨 Converting {len(analyzed)}/{slide_count} slides to images...")
+        try:
+            slide_images = await offload("analyze-template", convert_slides_to_images, tmp_path, analyzed)
+        except HTTPException:
+            raise
+        except Exception as e:
+            log_error_with_context(e, ErrorCategory.FILE_CONVERSION, "convert_slides_to_images", operation_context)
+            raise HTTPException(status_code=500, detail="Error de conversión: No se pudieron convertir los slides a imagen.")
+        
+        logger.info(f"🔍 Calling Gemini Vision API for {len(analyzed)} slides...")
+        vision_results = dict(zip(analyzed, await analyze_batch(slide_images, concurrency)))
+        layout_index.record("vision", computed=len(analyzed), reused=len(pending) - len(analyzed))
+        
+        matcher = ShapeMatcher(prs.slide_width, prs.slide_height)
+        slides = []
+        failed_slides = []
+        for index in pending:
+            slide = prs.slides[index]
+            vision_result = vision_results.get(index)
+            if vision_result is None:
+                vision_result = vision_results[layout_index.representative(index)]
+            if isinstance(vision_result, Exception):
+                error = getattr(vision_result, 'detail', None) or str(vision_result)
+                log_error_with_context(vision_result, ErrorCategory.GEMINI_API, "analyze_batch",
+                                       {**operation_context, "slide_index": index}, include_traceback=False)
+                failed_slides.append({"slideIndex": index, "error": error})
+                continue
+            
+            detections = copy.deepcopy(vision_result['elements'])
+            for element in detections:
+                element['id'] = f"slide{index + 1}_{element['id']}"
+                element['slideIndex'] = index
+            
+            try:
+                shape_mapping = match_slide_shapes(matcher, list(slide.shapes), detections)
+            except Exception as e:
+                log_error_with_context(e, ErrorCategory.SHAPE_MATCHING, "match_detections_to_shapes",
+                                       {**operation_context, "slide_index": index})
+                shape_mapping = {}
+            
+            slides.append({"slideIndex": index, "elements": detections, "shapeMapping": shape_mapping})
+        
+        if not slides and not cached_slides:
+            raise HTTPException(status_code=500, detail=f"Error de análisis visual: {failed_slides[0]['error']}")
+        
+        new_detections = [element for slide in slides for element in slide['elements']]
+        
+        # Save to cache (and keep the template so exports can reference it by hash)
+        try:
+            _, stored_path, _ = await asyncio.to_thread(template_store.save_bytes, file_content)
+        except Exception as e:
+            log_error_with_context(e, ErrorCategory.CACHE_OPERATION, "store_template", operation_context)
+            stored_path = None
+        
+        try:
+            mapping_cache.save_mapping(
+                template_hash=template_hash,
+                mapping={'elements': new_detections},
+                template_name=file.filename,
+                file_path=stored_path,
+                thumbnail_url=slide_images[0][:100] + '...' if slide_images else None,
+                replace=True,
+                slides=[slide['slideIndex'] for slide in slides]
+            )
+            logger.info(f"💾 Mappings of {len(slides)} slides saved to cache")
+        except Exception as e:
+            log_error_with_context(e, ErrorCategory.CACHE_OPERATION, "save_mapping", operation_context)
+            logger.warning("⚠️ Failed to save mapping to cache, continuing...")
+        
+        log_operation_success("analyze_template_batch",
+                              f"{len(new_detections)} elements in {len(slides)}/{len(pending)} slides "
+                              f"({len(cached_slides)} from cache)")
+        
+        slides = sorted(slides + list(cached_slides.values()), key=lambda slide: slide['slideIndex'])
+        detections = [element for slide in slides for element in slide['elements']]
+        
+        return {
+            "success": True,
+            "templateHash": template_hash,
+            "slides": slides,
+            "elements": detections,
+            "shapeMapping": slides[0]['shapeMapping'] if slides[0]['slideIndex'] == 0 else {},
+            "failedSlides": failed_slides,
+            "layoutIndex": layout_index.get_stats(),
+            "source": "vision",
+            "message": f"Análisis completado - {len(detections)} elementos en {len(slides)} de {slide_count} slides"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error_with_context(e, ErrorCategory.UNKNOWN, "analyze_template_batch", operation_context)
+        raise HTTPException(status_code=500, detail=f"Error al analizar template: {str(e)}")
+    
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.unlink(tmp_path)
+            except Exception as e:
+                logger.warning(f"Could not delete temp file: {e}")
+
+
+def _is_zip_upload(source) -> bool:
+    """Whether an uploaded file is a ZIP container (as every .pptx is); rewinds it."""
+    try:
+        return zipfile.is_zipfile(source)
+    finally:
+        source.seek(0)
+
+
+@router.post("/template/upload")
+async def upload_template(file: UploadFile = File(...)):
+    """
+    Store a template once in the content-addressed template store.
+    Export requests can then send `templateHash` instead of the file.
+    
+    The upload is checked and copied on a worker thread: templates can be
+    tens of MB and the copy would otherwise block the event loop.
+    """
+    if not (file.filename or '').lower().endswith('.pptx'):
+        raise HTTPException(status_code=400, detail="Solo se aceptan archivos .pptx")
+    if not await asyncio.to_thread(_is_zip_upload, file.file):
+        raise HTTPException(status_code=400, detail="El archivo no es un .pptx válido")
+    
+    try:
+        template_hash, stored_path, already_stored = await asyncio.to_thread(template_store.save_stream, file.file)
+        mapping_cache.register_template_file(template_hash, stored_path, file.filename)
+        
+        log_operation_success("upload_template", f"{template_hash[:16]}... (already stored: {already_stored})")
+        
+        return {
+            "success": True,
+            "templateHash": template_hash,
+            "size": os.path.getsize(stored_path),
+            "alreadyStored": already_stored
+        }
+    except Exception as e:
+        log_error_with_context(e, ErrorCategory.CACHE_OPERATION, "upload_template", {"filename": file.filename})
+        raise HTTPException(status_code=500, detail=f"Error al guardar template: {str(e)}")
+
+
+@router.head("/template/{template_hash}/file")
+async def head_template_file(template_hash: str):
+    """Check whether a template file is stored (no body, 404 if missing)."""
+    size = template_store.get_size(template_hash)
+    if size is None:
+        return Response(status_code=404)
+    
+    return Response(
+        status_code=200,
+        headers={
+            "Content-Length": str(size),
+            "Content-Type": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+            "ETag": f'"{template_hash}"'
+        }
+    )
+
+
+@router.get("/template/{template_hash}/exists")
+async def template_file_exists(template_hash: str):
+    """Report whether a template file is stored, for clients deciding to upload."""
+    if not is_valid_template_hash(template_hash):
+        raise HTTPException(status_code=400, detail="Invalid template hash")
+    
+    size = template_store.get_size(template_hash)
+    return {
+        "templateHash": template_hash,
+        "exists": size is not None,
+        "size": size
+    }
+
+
 @router.post("/update-mapping")
 async def update_mapping(request: UpdateMappingRequest):
     """
@@ -2,15 +2,21 @@
 from .gemini_vision import (
     call_gemini_vision_api,
     analyze_with_retry,
+    analyze_batch,
     parse_vision_response,
     validate_element_type,
     VALID_ELEMENT_TYPES
 )
+from .gemini_client import GeminiClient, GeminiAPIError, gemini_client
 
 __all__ = [
     'call_gemini_vision_api',
     'analyze_with_retry',
+    'analyze_batch',
     'parse_vision_response',
     'validate_element_type',
-    'VALID_ELEMENT_TYPES'
+    'VALID_ELEMENT_TYPES',
+    'GeminiClient',
+    'GeminiAPIError',
+    'gemini_client'
 ]
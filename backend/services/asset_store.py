@@ -0,0 +1,169 @@
+"""
+Content-addressed store for assets extracted from templates.
+
+In lazy mode the analyzer saves each image blob here under its SHA-256
+and returns only metadata plus the hash; the bytes are served later by
+GET /api/assets/{hash}. Processed variants (e.g. the white background
+replaced by the slide colour) are produced on first request and kept
+next to the original.
+"""
+import glob
+import hashlib
+import os
+import re
+import tempfile
+from typing import Callable, Optional, Tuple
+
+from utils.logging_utils import logger
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSET_STORE_DIR = os.environ.get('ASSET_STORE_DIR', os.path.join(BACKEND_DIR, 'asset_store'))
+
+ASSET_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+VARIANT_KEY_RE = re.compile(r'^[0-9a-z-]{1,64}$')
+EXT_RE = re.compile(r'^[0-9a-z]{1,8}$')
+
+ASSET_MEDIA_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'bmp': 'image/bmp',
+    'tif': 'image/tiff',
+    'tiff': 'image/tiff',
+    'svg': 'image/svg+xml',
+    'emf': 'image/x-emf',
+    'wmf': 'image/x-wmf',
+}
+
+
+def is_valid_asset_hash(asset_hash: str) -> bool:
+    """Check that a value looks like a lowercase hex SHA-256 digest."""
+    return isinstance(asset_hash, str) and bool(ASSET_HASH_RE.match(asset_hash))
+
+
+def hash_asset(data: bytes) -> str:
+    """Content hash used as the asset key."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def media_type_for(path: str) -> str:
+    """Media type of a stored asset, from its extension."""
+    ext = os.path.splitext(path)[1].lstrip('.').lower()
+    return ASSET_MEDIA_TYPES.get(ext, 'application/octet-stream')
+
+
+class AssetStore:
+    """
+    Stores asset bytes on disk keyed by content hash.
+    
+    Layout:
+        <root>/<first two hex chars>/<hash>.<ext>              original blob
+        <root>/<first two hex chars>/<hash>.<variant>.<ext>    processed variant
+    Writes are published with os.replace, so readers never observe a
+    partially written file.
+    """
+    
+    def __init__(self, root: str = ASSET_STORE_DIR):
+        self.root = root
+    
+    def _dir_for(self, asset_hash: str) -> str:
+        if not is_valid_asset_hash(asset_hash):
+            raise ValueError(f"Invalid asset hash: {asset_hash!r}")
+        return os.path.join(self.root, asset_hash[:2])
+    
+    def path_for(self, asset_hash: str, ext: str, variant: Optional[str] = None) -> str:
+        """Return the on-disk path for an asset (the file may not exist)."""
+        ext = ext.lower().lstrip('.')
+        if not EXT_RE.match(ext):
+            raise ValueError(f"Invalid asset extension: {ext!r}")
+        if variant is not None and not VARIANT_KEY_RE.match(variant):
+            raise ValueError(f"Invalid asset variant: {variant!r}")
+        name = f"{asset_hash}.{variant}.{ext}" if variant else f"{asset_hash}.{ext}"
+        return os.path.join(self._dir_for(asset_hash), name)
+    
+    def get_path(self, asset_hash: str) -> Optional[str]:
+        """Return the path of the original blob, or None if unknown."""
+        if not is_valid_asset_hash(asset_hash):
+            return None
+        # Originals are the only files named exactly <hash>.<ext>
+        for path in glob.glob(os.path.join(self._dir_for(asset_hash), f"{asset_hash}.*")):
+            if os.path.basename(path).count('.') == 1:
+                return path
+        return None
+    
+    def exists(self, asset_hash: str) -> bool:
+        return self.get_path(asset_hash) is not None
+    
+    def save_bytes(self, data: bytes, ext: str) -> Tuple[str, str, bool]:
+        """
+        Store an asset blob.
+        
+        Args:
+            data: Raw bytes of the asset
+            ext: File extension without the dot (png, jpeg, ...)
+        
+        Returns:
+            (asset_hash, path, already_stored)
+        """
+        asset_hash = hash_asset(data)
+        existing = self.get_path(asset_hash)
+        if existing:
+            return asset_hash, existing, True
+        
+        path = self.path_for(asset_hash, ext)
+        self._write_atomic(path, data)
+        return asset_hash, path, False
+    
+    def get_variant(self, asset_hash: str, variant: str, ext: str,
+                    producer: Callable[[bytes], bytes]) -> Optional[str]:
+        """
+        Return the path of a processed variant, producing it on first use.
+        
+        Args:
+            asset_hash: Hash of the original blob
+            variant: Key of the variant, e.g. 'bg-1e3a5f'
+            ext: Extension of the produced file
+            producer: Turns the original bytes into the variant bytes
+        
+        Returns:
+            Path of the variant, or None if the original is not stored
+        """
+        original = self.get_path(asset_hash)
+        if not original:
+            return None
+        
+        path = self.path_for(asset_hash, ext, variant)
+        if os.path.isfile(path):
+            return path
+        
+        with open(original, 'rb') as f:
+            data = producer(f.read())
+        self._write_atomic(path, data)
+        logger.info(f"🎨 Asset variant stored: {asset_hash[:16]}... {variant}")
+        return path
+    
+    def delete(self, asset_hash: str) -> bool:
+        """Remove an asset and all its variants. Returns False if it was not stored."""
+        if not self.exists(asset_hash):
+            return False
+        for path in glob.glob(os.path.join(self._dir_for(asset_hash), f"{asset_hash}.*")):
+            os.unlink(path)
+        return True
+    
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+# Singleton instance
+asset_store = AssetStore()
@@ -0,0 +1,223 @@
+"""
+Shared HTTP client for the Gemini API.
+
+One httpx.AsyncClient lives for the whole application, so connections
+(and their TLS sessions) are pooled and reused across calls and retries;
+HTTP/2 is used when the `h2` package is installed. Calls are also
+throttled:
+
+- a concurrency limit (GEMINI_MAX_CONCURRENCY requests in flight)
+- a token bucket matching the Gemini quota (GEMINI_REQUESTS_PER_MINUTE,
+  with bursts of up to GEMINI_BURST requests)
+- a 429 pauses the bucket for the server's Retry-After, so every pending
+  call backs off together instead of hammering the quota
+"""
+import asyncio
+import importlib.util
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+
+from utils.logging_utils import logger
+
+# Requests in flight at once
+GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', 4))
+
+# Quota: sustained requests per minute and burst size
+GEMINI_REQUESTS_PER_MINUTE = float(os.environ.get('GEMINI_REQUESTS_PER_MINUTE', 60))
+GEMINI_BURST = int(os.environ.get('GEMINI_BURST', GEMINI_MAX_CONCURRENCY))
+
+# Per-request timeout (seconds)
+GEMINI_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', 60.0))
+
+# Backoff when the server gives no Retry-After (seconds)
+GEMINI_BACKOFF_BASE = float(os.environ.get('GEMINI_BACKOFF_BASE', 1.0))
+GEMINI_BACKOFF_MAX = float(os.environ.get('GEMINI_BACKOFF_MAX', 30.0))
+
+# HTTP/2 needs the optional h2 package (httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+# Status codes worth retrying
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class GeminiAPIError(Exception):
+    """A failed Gemini call; status_code is None for network errors."""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+    
+    @property
+    def retryable(self) -> bool:
+        return self.status_code is None or self.status_code in RETRYABLE_STATUS_CODES
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, error: Optional[Exception] = None,
+                  base: float = GEMINI_BACKOFF_BASE, cap: float = GEMINI_BACKOFF_MAX) -> float:
+    """
+    Delay before retry number `attempt` (1-based): the server's Retry-After
+    when it sent one, otherwise exponential backoff with full jitter.
+    """
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is not None:
+        return min(retry_after, cap)
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, up to `capacity`.
+    
+    Only used from the event loop, so taking a token needs no lock.
+    """
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+    
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def _take(self) -> float:
+        """Take a token; returns 0 or the seconds to wait before trying again."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    async def acquire(self) -> None:
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+    
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for `seconds` (e.g. after a 429), and start empty."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class GeminiClient:
+    """
+    Application-lifetime Gemini HTTP client.
+    
+    The httpx client is created on first use and bound to the running event
+    loop; call aclose() on shutdown. A client from another loop (tests run
+    each scenario in a fresh loop) is replaced transparently.
+    """
+    
+    def __init__(self, max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+                 requests_per_minute: float = GEMINI_REQUESTS_PER_MINUTE,
+                 burst: int = GEMINI_BURST,
+                 timeout: float = GEMINI_TIMEOUT,
+                 http2: Optional[bool] = None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2 and HTTP2_AVAILABLE
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=self.http2,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client
+    
+    async def post_json(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST a JSON payload and return the JSON response.
+        
+        Raises:
+            GeminiAPIError: non-200 response or network error, carrying the
+                status code and the server's Retry-After
+        """
+        client = self._get_client()
+        await self.bucket.acquire()
+        
+        async with self._semaphore:
+            self._stats['requests'] += 1
+            try:
+                response = await client.post(url, json=payload)
+            except httpx.HTTPError as e:
+                self._stats['errors'] += 1
+                raise GeminiAPIError(f"Gemini API request failed: {e}") from e
+        
+        if response.status_code == 200:
+            return response.json()
+        
+        self._stats['errors'] += 1
+        retry_after = parse_retry_after(response.headers.get('retry-after'))
+        if response.status_code == 429:
+            self._stats['throttled'] += 1
+            pause = retry_after if retry_after is not None else backoff_delay(1)
+            logger.warning(f"⏳ Gemini quota exceeded, pausing requests for {pause:.1f}s")
+            self.bucket.pause(pause)
+        
+        try:
+            error_msg = response.json().get('error', {}).get('message', 'Unknown error')
+        except ValueError:
+            error_msg = 'Unknown error'
+        raise GeminiAPIError(f"Gemini API Error: {response.status_code} - {error_msg}",
+                             response.status_code, retry_after)
+    
+    def get_stats(self) -> dict:
+        return {
+            **self._stats,
+            "http2": self.http2,
+            "max_concurrency": self.max_concurrency,
+            "tokens": round(self.bucket.tokens, 2),
+        }
+    
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Singleton instance
+gemini_client = GeminiClient()
@@ -5,17 +5,20 @@ import os
 import json
 import re
 import asyncio
-import httpx
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence, Union
 from fastapi import HTTPException
 
 from utils.logging_utils import logger
+from .gemini_client import GEMINI_MAX_CONCURRENCY, GeminiAPIError, backoff_delay, gemini_client
 
 # Gemini Vision API configuration
 GEMINI_API_KEY = os.environ.get('VITE_GEMINI_API_KEY', os.environ.get('GEMINI_API_KEY', ''))
 GEMINI_MODEL = os.environ.get('VITE_GEMINI_MODEL', 'gemini-1.5-flash')
 GEMINI_API_URL = 'https://generativelanguage.googleapis.com/v1beta/models'
 
+# Slides of one batch analysis sent to Gemini at once
+GEMINI_BATCH_CONCURRENCY = int(os.environ.get('GEMINI_BATCH_CONCURRENCY', GEMINI_MAX_CONCURRENCY))
+
 # Valid element types
 VALID_ELEMENT_TYPES = ['TITLE', 'SUBTITLE', 'BODY', 'FOOTER', 'IMAGE_HOLDER', 'CHART_AREA', 'UNKNOWN']
 
@@ -57,7 +60,7 @@ async def call_gemini_vision_api(base64_data: str) -> dict:
         Raw JSON response from Gemini
         
     Raises:
-        Exception if API call fails
+        GeminiAPIError if the API call fails, Exception if the response has no JSON
     """
     if not GEMINI_API_KEY:
         raise HTTPException(status_code=500, detail="GEMINI_API_KEY not configured")
@@ -85,22 +88,15 @@ async def call_gemini_vision_api(base64_data: str) -> dict:
         }
     }
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(url, json=payload)
-        
-        if response.status_code != 200:
-            error_data = response.json() if response.content else {}
-            error_msg = error_data.get('error', {}).get('message', 'Unknown error')
-            raise Exception(f"Gemini API Error: {response.status_code} - {error_msg}")
-        
-        data = response.json()
-        text_content = data.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '{}')
-        
-        json_match = re.search(r'\{[\s\S]*\}', text_content)
-        if not json_match:
-            raise Exception('No valid JSON found in Gemini response')
-        
-        return json.loads(json_match.group(0))
+    # Pooled, rate-limited client shared by every call (see gemini_client)
+    data = await gemini_client.post_json(url, payload)
+    text_content = data.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '{}')
+    
+    json_match = re.search(r'\{[\s\S]*\}', text_content)
+    if not json_match:
+        raise Exception('No valid JSON found in Gemini response')
+    
+    return json.loads(json_match.group(0))
 
 
 def normalize_coordinate(value: Any) -> int:
@@ -181,7 +177,9 @@ def parse_vision_response(raw_response: dict) -> dict:
 
 async def analyze_with_retry(image_base64: str, max_retries: int = 2) -> dict:
     """
-    Analyze template layout with retry logic and exponential backoff.
+    Analyze template layout with retry logic and adaptive backoff: waits the
+    server's Retry-After when given, exponential backoff with jitter
+    otherwise, and gives up at once on errors that retrying can't fix.
     
     Args:
         image_base64: Base64 encoded image of the slide
@@ -202,9 +200,9 @@ async def analyze_with_retry(image_base64: str, max_retries: int = 2) -> dict:
     for attempt in range(max_retries + 1):
         try:
             if attempt > 0:
-                backoff_ms = 1000 * attempt
-                logger.info(f"⏳ Retry attempt {attempt}/{max_retries} after {backoff_ms}ms backoff...")
-                await asyncio.sleep(backoff_ms / 1000)
+                backoff = backoff_delay(attempt, last_error)
+                logger.info(f"⏳ Retry attempt {attempt}/{max_retries} after {backoff * 1000:.0f}ms backoff...")
+                await asyncio.sleep(backoff)
             
             raw_result = await call_gemini_vision_api(base64_data)
             logger.info('📄 Raw Gemini response received')
@@ -223,10 +221,38 @@ async def analyze_with_retry(image_base64: str, max_retries: int = 2) -> dict:
             last_error = e
             logger.error(f"❌ Attempt {attempt + 1}/{max_retries + 1} failed: {str(e)}")
             
-            if attempt == max_retries:
+            if attempt == max_retries or isinstance(e, HTTPException):
+                break
+            if isinstance(e, GeminiAPIError) and not e.retryable:
                 break
     
     raise HTTPException(
         status_code=500, 
-        detail=f"Gemini Vision analysis failed after {max_retries + 1} attempts: {str(last_error)}"
+        detail=f"Gemini Vision analysis failed after {attempt + 1} attempts: {str(last_error)}"
     )
+
+
+async def analyze_batch(images: Sequence[str], max_concurrency: Optional[int] = None,
+                        max_retries: int = 2) -> List[Union[dict, Exception]]:
+    """
+    Analyze several slide images concurrently, each with analyze_with_retry.
+    
+    At most `max_concurrency` slides (default GEMINI_BATCH_CONCURRENCY) are
+    in flight at once; the shared client's own limits still apply on top.
+    
+    Args:
+        images: Base64 encoded slide images
+        max_concurrency: Slides analyzed at once
+        max_retries: Retries per slide
+    
+    Returns:
+        One entry per image, in order: the parsed vision response, or the
+        exception that made that slide fail
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or GEMINI_BATCH_CONCURRENCY))
+    
+    async def analyze(image: str) -> dict:
+        async with semaphore:
+            return await analyze_with_retry(image, max_retries)
+    
+    return await asyncio.gather(*(analyze(image) for image in images), return_exceptions=True)
@@ -1,40 +1,78 @@
 """
 Slide to image conversion service.
 """
+from typing import List, Sequence
+
 from utils.logging_utils import logger
 
 
 def convert_slide_to_image(pptx_path: str, slide_index: int = 0) -> str:
     """
     Convert a specific slide to a base64 PNG image.
-    Uses LibreOffice or custom renderer.
+    Uses the shared LibreOffice worker pool or the custom renderer.
+    
+    Only the requested slide is exported and rasterized: a single draw page
+    over UNO, or a one-page PDF (PageRange) with the headless converter.
     
     Args:
         pptx_path: Path to the PPTX file
         slide_index: Index of the slide to convert (default: 0 for first slide)
-        
+    
     Returns:
         Base64 encoded PNG image with data URL prefix
     """
+    return convert_slides_to_images(pptx_path, [slide_index])[0]
+
+
+def convert_slides_to_images(pptx_path: str, slide_indices: Sequence[int]) -> List[str]:
+    """
+    Convert several slides to base64 PNG images in one rendering pass.
+    
+    The whole batch goes through a single UNO / LibreOffice conversion
+    instead of one per slide. A renderer that returns fewer images than
+    requested is skipped in favour of the next one.
+    
+    Args:
+        pptx_path: Path to the PPTX file
+        slide_indices: 0-based indices of the slides to convert
+    
+    Returns:
+        One data URL per index, in ascending slide order (duplicates removed)
+    """
+    wanted = sorted(set(slide_indices))
+    if not wanted:
+        return []
+    
+    try:
+        from libreoffice_uno_renderer import render_pptx_with_uno, UNO_AVAILABLE
+        
+        if UNO_AVAILABLE:
+            images = render_pptx_with_uno(pptx_path, slide_indices=wanted)
+            if len(images) == len(wanted):
+                return images
+    except Exception as e:
+        logger.warning(f"UNO rendering failed: {e}")
+    
     try:
         from pptx_to_images import convert_pptx_to_images
         
-        images = convert_pptx_to_images(pptx_path)
-        if images and len(images) > slide_index:
-            return images[slide_index]
+        images = convert_pptx_to_images(pptx_path, slide_indices=wanted)
+        if len(images) == len(wanted):
+            return images
     except Exception as e:
         logger.warning(f"LibreOffice conversion failed: {e}")
     
-    # Fallback to custom renderer
+    from pptx_to_images import generate_placeholder_image
+    
+    # Fallback to custom renderer, with placeholders for slides it missed
     try:
         from pptx_to_images_custom import convert_pptx_to_images_custom
         
         images = convert_pptx_to_images_custom(pptx_path)
-        if images and len(images) > slide_index:
-            return images[slide_index]
+        if images:
+            return [images[i] if i < len(images) else generate_placeholder_image(i + 1) for i in wanted]
     except Exception as e:
         logger.warning(f"Custom renderer failed: {e}")
     
-    # Final fallback: generate placeholder
-    from pptx_to_images import generate_placeholder_image
-    return generate_placeholder_image(slide_index + 1)
+    # Final fallback: generate placeholders
+    return [generate_placeholder_image(i + 1) for i in wanted]
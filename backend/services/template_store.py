@@ -0,0 +1,116 @@
+"""
+Content-addressed template store.
+
+Templates are uploaded once and saved under their SHA-256 (the same hash
+MappingCache.generate_template_hash produces), so export requests can
+reference a `templateHash` instead of re-sending the whole PPTX.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from io import BytesIO
+from typing import BinaryIO, Optional, Tuple
+
+from utils.logging_utils import logger
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_STORE_DIR = os.environ.get('TEMPLATE_STORE_DIR', os.path.join(BACKEND_DIR, 'template_store'))
+
+# Chunk size used when spooling uploads into the store
+STORE_CHUNK_SIZE = 1024 * 1024
+
+TEMPLATE_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def is_valid_template_hash(template_hash: str) -> bool:
+    """Check that a value looks like a lowercase hex SHA-256 digest."""
+    return isinstance(template_hash, str) and bool(TEMPLATE_HASH_RE.match(template_hash))
+
+
+class TemplateStore:
+    """
+    Stores PPTX templates on disk keyed by content hash.
+    
+    Layout: <root>/<first two hex chars>/<hash>.pptx
+    Writes go to a temp file in the same directory and are published with
+    os.replace, so readers never observe a partially written template.
+    """
+    
+    def __init__(self, root: str = TEMPLATE_STORE_DIR):
+        self.root = root
+    
+    def path_for(self, template_hash: str) -> str:
+        """Return the on-disk path for a hash (the file may not exist)."""
+        if not is_valid_template_hash(template_hash):
+            raise ValueError(f"Invalid template hash: {template_hash!r}")
+        return os.path.join(self.root, template_hash[:2], f"{template_hash}.pptx")
+    
+    def exists(self, template_hash: str) -> bool:
+        """Check whether a template is stored."""
+        return self.get_path(template_hash) is not None
+    
+    def get_path(self, template_hash: str) -> Optional[str]:
+        """Return the stored template path, or None if unknown."""
+        if not is_valid_template_hash(template_hash):
+            return None
+        path = self.path_for(template_hash)
+        return path if os.path.isfile(path) else None
+    
+    def get_size(self, template_hash: str) -> Optional[int]:
+        """Return the stored template size in bytes, or None if unknown."""
+        path = self.get_path(template_hash)
+        return os.path.getsize(path) if path else None
+    
+    def save_stream(self, source: BinaryIO) -> Tuple[str, str, bool]:
+        """
+        Copy a binary stream into the store, hashing it on the way.
+        
+        Args:
+            source: Readable binary file object, read in chunks
+        
+        Returns:
+            (template_hash, path, already_stored)
+        """
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        
+        fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=self.root)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in iter(lambda: source.read(STORE_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            
+            template_hash = digest.hexdigest()
+            path = self.path_for(template_hash)
+            
+            if os.path.isfile(path):
+                os.unlink(tmp_path)
+                return template_hash, path, True
+            
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            logger.info(f"💾 Template stored: {template_hash[:16]}... ({os.path.getsize(path)} bytes)")
+            return template_hash, path, False
+        
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    def save_bytes(self, data: bytes) -> Tuple[str, str, bool]:
+        """Store an in-memory template. Same return value as save_stream."""
+        return self.save_stream(BytesIO(data))
+    
+    def delete(self, template_hash: str) -> bool:
+        """Remove a stored template. Returns False if it was not stored."""
+        path = self.get_path(template_hash)
+        if not path:
+            return False
+        os.unlink(path)
+        return True
+
+
+# Singleton instance
+template_store = TemplateStore()
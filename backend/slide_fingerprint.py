@@ -0,0 +1,199 @@
+"""
+SlideFingerprint - Huella de contenido de cada slide
+
+La huella de un slide es el SHA-256 de su XML canonicalizado (C14N) más,
+recursivamente, el de las partes que referencia: layout, master, tema e
+imágenes / media. Dos slides con la misma huella se renderizan igual, así
+que tras editar un slide sólo cambia su huella (o las de todos los que
+usan un layout / master editado) y sólo esos se vuelven a renderizar y a
+analizar.
+
+Incluye también SlideAnalysisCache: el `slide_data` ya calculado de cada
+huella, en proceso y con expulsión LRU acotada por bytes.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+
+# Límite de memoria de la caché de análisis (bytes). Configurable por entorno.
+SLIDE_ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get('SLIDE_ANALYSIS_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Relaciones que no afectan al aspecto del slide (notas) o que apuntan
+# "hacia arriba" (master -> layouts) y harían depender la huella de todos
+# los layouts del master
+IGNORED_RELATIONSHIPS = {
+    RT.NOTES_SLIDE,
+    RT.NOTES_MASTER,
+    RT.HANDOUT_MASTER,
+    RT.SLIDE,
+}
+
+
+FINGERPRINT_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def is_valid_fingerprint(value: str) -> bool:
+    return bool(FINGERPRINT_RE.match(value))
+
+
+def canonical_xml(blob: bytes) -> bytes:
+    """XML canonicalizado (C14N): mismo contenido -> mismos bytes"""
+    parser = etree.XMLParser(resolve_entities=False, huge_tree=True)
+    return etree.tostring(etree.fromstring(blob, parser), method='c14n')
+
+
+def fingerprint_slides(prs) -> List[str]:
+    """
+    Calcula la huella de cada slide de una presentación.
+    
+    Las partes compartidas (layouts, master, tema) se procesan una sola vez.
+    
+    Args:
+        prs: Presentación de python-pptx
+    
+    Returns:
+        Lista de huellas hexadecimales (SHA-256), una por slide y en orden
+    """
+    memo: Dict[str, str] = {}
+    # El tamaño del slide afecta al renderizado y vive en presentation.xml
+    slide_size = f"{prs.slide_width}x{prs.slide_height}".encode()
+    fingerprints = []
+    for slide in prs.slides:
+        digest = hashlib.sha256(slide_size)
+        digest.update(_part_digest(slide.part, memo).encode())
+        fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def _part_digest(part, memo: Dict[str, str]) -> str:
+    """Hash de una parte y de las partes que referencia (memoizado por partname)"""
+    partname = str(part.partname)
+    if partname in memo:
+        return memo[partname]
+    # Protección contra ciclos: mientras se calcula, la parte vale su nombre
+    memo[partname] = partname
+    
+    digest = hashlib.sha256(part.content_type.encode())
+    blob = part.blob
+    if part.content_type.endswith('xml'):
+        try:
+            blob = canonical_xml(blob)
+        except etree.XMLSyntaxError:
+            pass
+    digest.update(hashlib.sha256(blob).digest())
+    
+    is_master = part.content_type.endswith('slideMaster+xml')
+    for r_id, rel in sorted(part.rels.items()):
+        if rel.reltype in IGNORED_RELATIONSHIPS or (is_master and rel.reltype == RT.SLIDE_LAYOUT):
+            continue
+        digest.update(f"{r_id}|{rel.reltype}|".encode())
+        if rel.is_external:
+            digest.update(rel.target_ref.encode())
+        else:
+            digest.update(_part_digest(rel.target_part, memo).encode())
+    
+    memo[partname] = digest.hexdigest()
+    return memo[partname]
+
+
+class SlideAnalysisCache:
+    """
+    Caché LRU del análisis (`slide_data`) de cada slide, indexada por huella.
+    
+    Guarda el JSON serializado: el tamaño en bytes es exacto y cada get
+    devuelve una copia independiente que el llamador puede modificar.
+    """
+    
+    def __init__(self, max_bytes: int = SLIDE_ANALYSIS_CACHE_MAX_BYTES):
+        """
+        Inicializa la caché.
+        
+        Args:
+            max_bytes: Total de bytes que puede retener antes de expulsar
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+    
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Recupera el análisis de un slide y lo marca como usado recientemente.
+        
+        Returns:
+            Copia del slide_data o None si no está en caché
+        """
+        with self._lock:
+            payload = self._entries.get(fingerprint)
+            if payload is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self._hits += 1
+        return json.loads(payload)
+    
+    def put(self, fingerprint: str, slide_data: Dict[str, Any]) -> bool:
+        """
+        Guarda el análisis de un slide, expulsando los menos usados si hace falta.
+        
+        Returns:
+            True si se guardó, False si no es serializable o excede el límite
+        """
+        try:
+            payload = json.dumps(slide_data, separators=(',', ':')).encode()
+        except (TypeError, ValueError):
+            return False
+        if len(payload) > self.max_bytes:
+            return False
+        
+        with self._lock:
+            self._remove(fingerprint)
+            while self._entries and self._total_bytes + len(payload) > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+            self._entries[fingerprint] = payload
+            self._total_bytes += len(payload)
+        return True
+    
+    def clear(self) -> None:
+        """Vacía la caché y reinicia las estadísticas"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self._hits = self._misses = self._evictions = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'totalBytes': self._total_bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hitRatio': self._hits / lookups if lookups else 0.0
+            }
+    
+    def _remove(self, fingerprint: str) -> None:
+        """Elimina una entrada (el llamador debe tener el lock)"""
+        payload = self._entries.pop(fingerprint, None)
+        if payload is not None:
+            self._total_bytes -= len(payload)
+
+
+# Instancia compartida por todo el proceso
+slide_analysis_cache = SlideAnalysisCache()
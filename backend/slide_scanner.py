@@ -0,0 +1,217 @@
+"""
+Slide Scanner - Índice de características de un slide en un solo recorrido
+
+El clonador XML buscaba lo mismo una y otra vez en cada slide:
+_capture_preservation_state y _verify_preservation hacían ~10
+root.find('.//...') (cada uno recorre el árbol completo) antes y después de
+modificar, y _detect_text_type / _get_shape_id volvían a bajar por los
+descendientes de cada shape.
+
+scan_slide recorre el árbol una sola vez (etree.iterwalk, eventos start/end)
+y construye un SlideFeatureIndex con:
+
+- los shapes (p:sp) en orden de documento: id, tipo de placeholder, posición
+  vertical, tamaño de fuente del primer run, txBody y sus runs por párrafo
+- animaciones, transiciones, gradientes, sombras y efectos 3D
+- SmartArt (dgm:*), gráficos (c:chart) y tablas (a:tbl)
+- conteo de shapes e imágenes
+
+El índice guarda referencias a los elementos del árbol: reemplazar el texto
+de un a:t no lo invalida, cambiar la estructura (añadir o quitar nodos) sí.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from lxml import etree
+
+
+NS_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+NS_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+NS_DGM = '{http://schemas.openxmlformats.org/drawingml/2006/diagram}'
+NS_C = '{http://schemas.openxmlformats.org/drawingml/2006/chart}'
+
+SP = f'{NS_P}sp'
+PIC = f'{NS_P}pic'
+NV_SP_PR = f'{NS_P}nvSpPr'
+C_NV_PR = f'{NS_P}cNvPr'
+NV_PR = f'{NS_P}nvPr'
+PH = f'{NS_P}ph'
+SP_PR = f'{NS_P}spPr'
+TX_BODY = f'{NS_P}txBody'
+TIMING = f'{NS_P}timing'
+TRANSITION = f'{NS_P}transition'
+
+XFRM = f'{NS_A}xfrm'
+OFF = f'{NS_A}off'
+PARAGRAPH = f'{NS_A}p'
+RUN = f'{NS_A}r'
+RUN_PR = f'{NS_A}rPr'
+TEXT = f'{NS_A}t'
+GRAD_FILL = f'{NS_A}gradFill'
+SHADOWS = (f'{NS_A}outerShdw', f'{NS_A}innerShdw')
+EFFECTS_3D = (f'{NS_A}scene3d', f'{NS_A}sp3d')
+TABLE = f'{NS_A}tbl'
+
+DIAGRAM_DATA = f'{NS_DGM}diagramData'
+CHART = f'{NS_C}chart'
+
+
+class TextRun:
+    """Un a:r de un txBody con su a:t (None si el run no tiene texto)"""
+    
+    __slots__ = ('para_idx', 'run_idx', 'element', 'text')
+    
+    def __init__(self, para_idx: int, run_idx: int, element):
+        self.para_idx = para_idx
+        self.run_idx = run_idx
+        self.element = element
+        self.text = None
+
+
+class ShapeFeatures:
+    """Lo que el clonador necesita de un p:sp, leído durante el recorrido"""
+    
+    __slots__ = ('element', 'shape_id', 'placeholder_type', 'y_pos', 'font_size',
+                 'tx_body', 'paragraphs', 'texts', '_xfrm', '_in_tx_body')
+    
+    def __init__(self, element):
+        self.element = element
+        self.shape_id: Optional[int] = None
+        self.placeholder_type: Optional[str] = None  # '' si es placeholder sin tipo
+        self.y_pos: Optional[int] = None
+        self.font_size: Optional[str] = None  # a:rPr/@sz del primer run
+        self.tx_body = None
+        self.paragraphs: List[List[TextRun]] = []
+        self.texts: List[Any] = []  # todos los a:t del txBody (runs y campos)
+        self._xfrm = None
+        self._in_tx_body = False
+    
+    @property
+    def runs(self) -> List[TextRun]:
+        """Runs de todos los párrafos, en orden"""
+        return [run for paragraph in self.paragraphs for run in paragraph]
+
+
+class SlideFeatureIndex:
+    """Resultado de scan_slide"""
+    
+    def __init__(self):
+        self.shapes: List[ShapeFeatures] = []
+        self.image_count = 0
+        self.has_timing = False
+        self.has_transition = False
+        self.has_gradient = False
+        self.has_shadow = False
+        self.has_3d = False
+        self.has_smartart = False
+        self.diagram_data: List[Any] = []
+        self.charts: List[Any] = []
+        self.tables: List[Any] = []
+    
+    @property
+    def shape_count(self) -> int:
+        return len(self.shapes)
+    
+    def preservation_state(self) -> Dict[str, Any]:
+        """Elementos críticos que el clonador verifica antes y después de modificar"""
+        return {
+            'has_timing': self.has_timing,
+            'has_transition': self.has_transition,
+            'has_gradient': self.has_gradient,
+            'has_shadow': self.has_shadow,
+            'has_3d': self.has_3d,
+            'has_smartart': self.has_smartart,
+            'shape_count': self.shape_count,
+            'image_count': self.image_count,
+        }
+
+
+def scan_slide(root) -> SlideFeatureIndex:
+    """Construye el índice de características de un slide en un solo recorrido"""
+    index = SlideFeatureIndex()
+    shape: Optional[ShapeFeatures] = None
+    
+    for event, elem in etree.iterwalk(root, events=('start', 'end')):
+        tag = elem.tag
+        if not isinstance(tag, str):
+            continue  # comentarios e instrucciones de procesamiento
+        
+        if event == 'end':
+            if tag == SP:
+                shape = None
+            elif shape is not None and elem is shape.tx_body:
+                shape._in_tx_body = False
+            continue
+        
+        # ===== Elementos de todo el slide =====
+        if tag == SP:
+            shape = ShapeFeatures(elem)
+            index.shapes.append(shape)
+            continue
+        if tag == PIC:
+            index.image_count += 1
+        elif tag == TIMING:
+            index.has_timing = True
+        elif tag == TRANSITION:
+            index.has_transition = True
+        elif tag == GRAD_FILL:
+            index.has_gradient = True
+        elif tag in SHADOWS:
+            index.has_shadow = True
+        elif tag in EFFECTS_3D:
+            index.has_3d = True
+        elif tag == TABLE:
+            index.tables.append(elem)
+        elif tag == CHART:
+            index.charts.append(elem)
+        elif tag.startswith(NS_DGM):
+            index.has_smartart = True
+            if tag == DIAGRAM_DATA:
+                index.diagram_data.append(elem)
+        
+        if shape is None:
+            continue
+        
+        # ===== Dentro de un p:sp =====
+        parent = elem.getparent()
+        if tag == C_NV_PR:
+            if shape.shape_id is None and parent.tag == NV_SP_PR:
+                shape.shape_id = int(elem.get('id', 0))
+        elif tag == PH:
+            if shape.placeholder_type is None and parent.tag == NV_PR and parent.getparent().tag == NV_SP_PR:
+                shape.placeholder_type = elem.get('type', '')
+        elif tag == XFRM:
+            if shape._xfrm is None and parent.tag == SP_PR and parent.getparent() is shape.element:
+                shape._xfrm = elem
+        elif tag == OFF:
+            if shape.y_pos is None and parent is shape._xfrm:
+                try:
+                    shape.y_pos = int(elem.get('y', '0'))
+                except ValueError:
+                    pass
+        elif tag == TX_BODY:
+            if shape.tx_body is None and parent is shape.element:
+                shape.tx_body = elem
+                shape._in_tx_body = True
+        elif not shape._in_tx_body:
+            continue
+        elif tag == PARAGRAPH:
+            if parent is shape.tx_body:
+                shape.paragraphs.append([])
+        elif tag == RUN:
+            if parent.tag == PARAGRAPH and parent.getparent() is shape.tx_body:
+                paragraph = shape.paragraphs[-1]
+                paragraph.append(TextRun(len(shape.paragraphs) - 1, len(paragraph), elem))
+        elif tag in (TEXT, RUN_PR):
+            if tag == TEXT:
+                shape.texts.append(elem)
+            run = shape.paragraphs[-1][-1] if shape.paragraphs and shape.paragraphs[-1] else None
+            if run is None or parent is not run.element:
+                continue
+            if tag == TEXT:
+                if run.text is None:
+                    run.text = elem
+            elif shape.font_size is None and run.para_idx == 0 and run.run_idx == 0:
+                shape.font_size = elem.get('sz')
+    
+    return index
@@ -0,0 +1,194 @@
+"""
+TemplateCache - Caché en proceso de templates PPTX ya analizados
+
+Guarda el resultado del análisis de PPTXXMLCloner (text_map, fuentes,
+proyecto VBA, el XML crudo de cada slide y su árbol ya parseado) indexado
+por el hash SHA-256 del archivo, el mismo que produce
+MappingCache.generate_template_hash. Así, exportar de nuevo con un template
+conocido no vuelve a descomprimir ni a parsear sus slides.
+
+Los árboles guardados son prístinos: se comparten entre exportaciones (y
+entre hilos) y nunca se modifican; cada clonación trabaja sobre un deepcopy.
+
+La expulsión es LRU y está acotada por el total de bytes retenidos.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+# Límite de memoria de la caché (bytes). Configurable por entorno.
+TEMPLATE_CACHE_MAX_BYTES = int(os.environ.get('TEMPLATE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Tamaño de bloque para calcular el hash sin cargar el archivo completo
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Coste estimado de cada TextLocation retenido (objeto + strings auxiliares)
+TEXT_LOCATION_OVERHEAD = 256
+
+# Un árbol lxml ocupa en memoria varias veces el tamaño de su XML serializado
+PARSED_TREE_FACTOR = 4
+
+
+def hash_template_file(template_path: str) -> str:
+    """
+    Calcula el SHA-256 de un archivo PPTX leyéndolo por bloques.
+
+    Produce el mismo valor que MappingCache.generate_template_hash
+    sobre el contenido completo del archivo.
+
+    Args:
+        template_path: Ruta al archivo PPTX
+
+    Returns:
+        Hash hexadecimal de 64 caracteres
+    """
+    digest = hashlib.sha256()
+    with open(template_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class CachedTemplate:
+    """Resultado del análisis de un template, listo para reutilizar"""
+    template_hash: str
+    slide_count: int
+    text_map: List[List[Any]]
+    fonts_used: frozenset
+    vba_project_data: Optional[bytes]
+    slide_xml: Dict[int, bytes] = field(default_factory=dict)  # índice 0-based -> XML crudo
+    slide_trees: Dict[int, Any] = field(default_factory=dict)  # índice 0-based -> árbol prístino
+
+    @property
+    def size_bytes(self) -> int:
+        """Estimación de la memoria retenida por la entrada"""
+        size = sum(len(xml) for xml in self.slide_xml.values())
+        size += sum(PARSED_TREE_FACTOR * len(self.slide_xml.get(idx, b'')) for idx in self.slide_trees)
+        size += len(self.vba_project_data) if self.vba_project_data else 0
+        for slide_texts in self.text_map:
+            for location in slide_texts:
+                size += TEXT_LOCATION_OVERHEAD + len(getattr(location, 'original_text', '') or '')
+        size += sum(len(font) for font in self.fonts_used)
+        return size
+
+
+class TemplateCache:
+    """
+    Caché LRU de templates analizados, compartida por todo el proceso.
+
+    Es segura para usar desde varios hilos (el TaskQueue ejecuta las
+    exportaciones en un pool de hilos).
+    """
+
+    def __init__(self, max_bytes: int = TEMPLATE_CACHE_MAX_BYTES):
+        """
+        Inicializa la caché.
+
+        Args:
+            max_bytes: Total de bytes que puede retener antes de expulsar
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedTemplate]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, template_hash: str) -> Optional[CachedTemplate]:
+        """
+        Recupera un template analizado y lo marca como usado recientemente.
+
+        Args:
+            template_hash: Hash SHA-256 del template
+
+        Returns:
+            La entrada en caché o None si no existe
+        """
+        with self._lock:
+            entry = self._entries.get(template_hash)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(template_hash)
+            self._hits += 1
+            return entry
+
+    def put(self, entry: CachedTemplate) -> bool:
+        """
+        Guarda un template analizado, expulsando los menos usados si hace falta.
+
+        Args:
+            entry: Template analizado
+
+        Returns:
+            True si se guardó, False si por sí solo excede el límite
+        """
+        size = entry.size_bytes
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            self._remove(entry.template_hash)
+
+            while self._entries and self._total_bytes + size > self.max_bytes:
+                oldest_hash = next(iter(self._entries))
+                self._remove(oldest_hash)
+                self._evictions += 1
+
+            self._entries[entry.template_hash] = entry
+            self._sizes[entry.template_hash] = size
+            self._total_bytes += size
+
+        return True
+
+    def invalidate(self, template_hash: str) -> bool:
+        """
+        Elimina un template de la caché.
+
+        Returns:
+            True si existía, False si no
+        """
+        with self._lock:
+            return self._remove(template_hash)
+
+    def clear(self) -> None:
+        """Vacía la caché y reinicia las estadísticas"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'totalBytes': self._total_bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hitRatio': self._hits / lookups if lookups else 0.0
+            }
+
+    def _remove(self, template_hash: str) -> bool:
+        """Elimina una entrada (el llamador debe tener el lock)"""
+        if template_hash not in self._entries:
+            return False
+        del self._entries[template_hash]
+        self._total_bytes -= self._sizes.pop(template_hash)
+        return True
+
+
+# Instancia compartida por todo el proceso
+template_cache = TemplateCache()
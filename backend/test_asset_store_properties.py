@@ -0,0 +1,287 @@
+"""
+Property-Based Tests for AssetStore and lazy asset extraction
+
+Properties tested:
+1. Content addressing: the stored hash is the SHA-256 of the blob and it round-trips
+2. Variants: a processed variant is produced once and reused afterwards
+3. Lazy extraction: assets and image areas carry hash and URL metadata instead of
+   base64 data, and no data URL appears anywhere in a lazy analysis
+4. Dedup: assets are keyed by full content, each blob is processed once and keeps every occurrence
+5. Endpoint: GET /api/assets/{hash} serves the bytes with ETag/Cache-Control and honours If-None-Match
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings, HealthCheck
+import httpx
+import pytest
+from fastapi import FastAPI
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.util import Inches
+
+import pptx_analyzer
+import routes.assets
+import services.asset_store
+from preview_cache import PreviewCache
+from pptx_analyzer import extract_all_assets
+from services.asset_store import AssetStore, is_valid_asset_hash
+
+
+def _png_bytes(color=(255, 255, 255, 255), size=(40, 30)) -> bytes:
+    img = Image.new('RGBA', size, color)
+    img.paste((200, 30, 60, 255), (10, 10, 20, 20))
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _png_with_shared_prefix(color) -> bytes:
+    """PNG whose first few hundred bytes (header + text chunk) do not depend on the pixels."""
+    info = PngInfo()
+    info.add_text('Comment', 'x' * 300)
+    buffer = io.BytesIO()
+    Image.new('RGB', (20, 20), color).save(buffer, format='PNG', pnginfo=info)
+    return buffer.getvalue()
+
+
+def _deck_with_picture(png: bytes, bg_rgb=None) -> Presentation:
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    if bg_rgb is not None:
+        fill = slide.background.fill
+        fill.solid()
+        fill.fore_color.rgb = RGBColor(*bg_rgb)
+    slide.shapes.add_picture(io.BytesIO(png), Inches(4), Inches(3), Inches(4), Inches(3))
+    return prs
+
+
+class TestAssetStore:
+
+    @given(content=st.binary(min_size=1, max_size=20000))
+    @settings(max_examples=50, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_store_is_content_addressed(self, tmp_path, content):
+        store = AssetStore(str(tmp_path / 'assets'))
+        
+        asset_hash, path, already_stored = store.save_bytes(content, 'png')
+        
+        assert is_valid_asset_hash(asset_hash)
+        assert asset_hash == hashlib.sha256(content).hexdigest()
+        assert store.get_path(asset_hash) == path
+        with open(path, 'rb') as f:
+            assert f.read() == content
+        
+        again_hash, again_path, again_stored = store.save_bytes(content, 'png')
+        assert (again_hash, again_path, again_stored) == (asset_hash, path, True)
+    
+    def test_variant_is_produced_once(self, tmp_path):
+        store = AssetStore(str(tmp_path / 'assets'))
+        asset_hash, original, _ = store.save_bytes(b'original', 'png')
+        calls = []
+        
+        def producer(data):
+            calls.append(data)
+            return data.upper()
+        
+        first = store.get_variant(asset_hash, 'bg-000000', 'png', producer)
+        second = store.get_variant(asset_hash, 'bg-000000', 'png', producer)
+        
+        assert first == second != original
+        assert calls == [b'original']
+        assert store.get_path(asset_hash) == original
+        with open(first, 'rb') as f:
+            assert f.read() == b'ORIGINAL'
+    
+    def test_unknown_or_invalid_hash(self, tmp_path):
+        store = AssetStore(str(tmp_path / 'assets'))
+        assert store.get_path('0' * 64) is None
+        assert store.get_path('../../etc/passwd') is None
+        assert store.get_variant('0' * 64, 'bg-000000', 'png', bytes) is None
+        with pytest.raises(ValueError):
+            store.path_for('../evil', 'png')
+        with pytest.raises(ValueError):
+            store.path_for('0' * 64, 'png', '../x')
+    
+    def test_delete_removes_variants(self, tmp_path):
+        store = AssetStore(str(tmp_path / 'assets'))
+        asset_hash, _, _ = store.save_bytes(b'blob', 'jpeg')
+        store.get_variant(asset_hash, 'bg-ffffff', 'png', lambda data: data)
+        
+        assert store.delete(asset_hash) is True
+        assert store.exists(asset_hash) is False
+        assert os.listdir(os.path.join(store.root, asset_hash[:2])) == []
+
+
+class TestLazyExtraction:
+
+    def test_lazy_assets_have_no_inline_data(self, tmp_path, monkeypatch):
+        store = AssetStore(str(tmp_path / 'assets'))
+        monkeypatch.setattr(services.asset_store, 'asset_store', store)
+        png = _png_bytes()
+        
+        assets = extract_all_assets(_deck_with_picture(png, bg_rgb=(0x1E, 0x3A, 0x5F)), lazy=True)
+        
+        extracted = assets['images'] + assets['logos'] + assets['transparentImages'] + assets['animatedElements']
+        assert assets['totalCount'] == len(extracted) == 1
+        asset = extracted[0]
+        assert 'imageBase64' not in asset
+        assert asset['assetHash'] == hashlib.sha256(png).hexdigest()
+        assert asset['url'] == f"/api/assets/{asset['assetHash']}"
+        assert asset['processedUrl'] == f"/api/assets/{asset['assetHash']}?bg=1E3A5F"
+        assert asset['size'] == len(png)
+        with open(store.get_path(asset['assetHash']), 'rb') as f:
+            assert f.read() == png
+    
+    def test_lazy_analysis_has_no_data_urls(self, tmp_path, monkeypatch):
+        store = AssetStore(str(tmp_path / 'assets'))
+        monkeypatch.setattr(services.asset_store, 'asset_store', store)
+        monkeypatch.setattr(pptx_analyzer, 'preview_cache', PreviewCache(str(tmp_path / 'previews')))
+        monkeypatch.setattr(pptx_analyzer, 'UNO_AVAILABLE', False)
+        monkeypatch.setattr(pptx_analyzer, 'LIBREOFFICE_AVAILABLE', True)
+        monkeypatch.setattr(pptx_analyzer, 'convert_pptx_to_images',
+                            lambda path, slide_indices=None, binary=False, **kwargs: [(_png_bytes(), 'image/png')],
+                            raising=False)
+        png = _png_bytes()
+        deck = str(tmp_path / 'deck.pptx')
+        _deck_with_picture(png).save(deck)
+        
+        analysis = pptx_analyzer.analyze_presentation(deck, lazy_assets=True, preview_transport='url')
+        
+        area = analysis['slides'][0]['imageAreas'][0]
+        assert 'imageBase64' not in area
+        assert area['assetHash'] == hashlib.sha256(png).hexdigest()
+        assert area['url'] == f"/api/assets/{area['assetHash']}"
+        assert store.exists(area['assetHash'])
+        assert 'data:' not in json.dumps(analysis, default=str)
+        
+        eager = pptx_analyzer.analyze_presentation(deck)
+        assert eager['slides'][0]['imageAreas'][0]['imageBase64'].startswith('data:image/png;base64,')
+    
+    def test_eager_mode_is_unchanged(self, tmp_path, monkeypatch):
+        store = AssetStore(str(tmp_path / 'assets'))
+        monkeypatch.setattr(services.asset_store, 'asset_store', store)
+        
+        assets = extract_all_assets(_deck_with_picture(_png_bytes()))
+        
+        asset = (assets['images'] + assets['transparentImages'])[0]
+        assert asset['imageBase64'].startswith('data:image/png;base64,')
+        assert 'assetHash' not in asset
+        assert not os.path.exists(store.root)
+
+
+class TestAssetDedup:
+
+    def _deck(self, pictures, bg_rgb=(0x1E, 0x3A, 0x5F)) -> Presentation:
+        """One slide per entry; each entry is a list of PNG blobs to place on it."""
+        prs = Presentation()
+        for blobs in pictures:
+            slide = prs.slides.add_slide(prs.slide_layouts[6])
+            fill = slide.background.fill
+            fill.solid()
+            fill.fore_color.rgb = RGBColor(*bg_rgb)
+            for offset, png in enumerate(blobs):
+                slide.shapes.add_picture(io.BytesIO(png), Inches(1 + offset), Inches(1), Inches(4), Inches(3))
+        return prs
+    
+    @staticmethod
+    def _all(assets):
+        return assets['images'] + assets['logos'] + assets['transparentImages'] + assets['animatedElements']
+    
+    def test_shared_prefix_is_not_a_duplicate(self):
+        first = _png_with_shared_prefix((255, 0, 0))
+        second = _png_with_shared_prefix((0, 0, 255))
+        assert first[:100] == second[:100] and first != second
+        
+        assets = extract_all_assets(self._deck([[first, second]]))
+        
+        assert assets['totalCount'] == 2
+        assert len({asset['imageBase64'] for asset in self._all(assets)}) == 2
+    
+    @given(layout=st.lists(st.lists(st.integers(0, 2), min_size=1, max_size=3), min_size=1, max_size=4))
+    @settings(max_examples=15, deadline=None)
+    def test_each_blob_processed_once(self, layout):
+        blobs = [_png_with_shared_prefix(color) for color in [(255, 0, 0), (0, 255, 0), (0, 0, 255)]]
+        calls = []
+        original = pptx_analyzer.smart_background_removal
+        
+        def counting(image_base64, bg_color_hex):
+            calls.append(image_base64)
+            return original(image_base64, bg_color_hex)
+        
+        pptx_analyzer.smart_background_removal = counting
+        try:
+            assets = extract_all_assets(self._deck([[blobs[i] for i in slide] for slide in layout]))
+        finally:
+            pptx_analyzer.smart_background_removal = original
+        
+        used = {i for slide in layout for i in slide}
+        extracted = self._all(assets)
+        assert assets['totalCount'] == len(extracted) == len(used) == len(calls)
+        assert len(set(calls)) == len(calls)
+        
+        occurrences = [(o['slideNumber'], o['position']['x']) for a in extracted for o in a['occurrences']]
+        expected = [(n + 1, Inches(1 + offset)) for n, slide in enumerate(layout) for offset in range(len(slide))]
+        assert sorted(occurrences) == sorted(expected)
+        for asset in extracted:
+            first = asset['occurrences'][0]
+            assert (asset['slideNumber'], asset['shapeId']) == (first['slideNumber'], first['shapeId'])
+
+
+class TestAssetEndpoint:
+
+    def _get(self, store, monkeypatch, url, headers=None):
+        monkeypatch.setattr(routes.assets, 'asset_store', store)
+        app = FastAPI()
+        app.include_router(routes.assets.router)
+        
+        async def fetch():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                return await client.get(url, headers=headers or {})
+        
+        return asyncio.run(fetch())
+    
+    def test_serves_original_with_cache_headers(self, tmp_path, monkeypatch):
+        store = AssetStore(str(tmp_path / 'assets'))
+        png = _png_bytes()
+        asset_hash, _, _ = store.save_bytes(png, 'png')
+        
+        response = self._get(store, monkeypatch, f'/api/assets/{asset_hash}')
+        
+        assert response.status_code == 200
+        assert response.content == png
+        assert response.headers['content-type'] == 'image/png'
+        assert response.headers['etag'] == f'"{asset_hash}"'
+        assert 'immutable' in response.headers['cache-control']
+        
+        cached = self._get(store, monkeypatch, f'/api/assets/{asset_hash}',
+                           headers={'If-None-Match': f'"{asset_hash}"'})
+        assert cached.status_code == 304
+        assert cached.content == b''
+    
+    def test_serves_processed_variant(self, tmp_path, monkeypatch):
+        store = AssetStore(str(tmp_path / 'assets'))
+        asset_hash, _, _ = store.save_bytes(_png_bytes(), 'png')
+        
+        response = self._get(store, monkeypatch, f'/api/assets/{asset_hash}?bg=1E3A5F')
+        
+        assert response.status_code == 200
+        assert response.headers['etag'] == f'"{asset_hash}.bg-1e3a5f"'
+        img = Image.open(io.BytesIO(response.content)).convert('RGBA')
+        assert img.getpixel((0, 0)) == (0x1E, 0x3A, 0x5F, 255)
+        assert img.getpixel((15, 15)) == (200, 30, 60, 255)
+    
+    def test_invalid_and_unknown(self, tmp_path, monkeypatch):
+        store = AssetStore(str(tmp_path / 'assets'))
+        assert self._get(store, monkeypatch, '/api/assets/not-a-hash').status_code == 400
+        assert self._get(store, monkeypatch, f"/api/assets/{'0' * 64}").status_code == 404
+        assert self._get(store, monkeypatch, f"/api/assets/{'0' * 64}?bg=red").status_code == 400
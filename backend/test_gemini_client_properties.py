@@ -0,0 +1,211 @@
+"""
+Property-Based Tests for the shared Gemini client
+
+Properties tested:
+1. Connection reuse: consecutive calls (and retries) go over one pooled keep-alive connection
+2. Concurrency: never more than max_concurrency requests in flight, whatever the burst size
+3. Rate limiting: the token bucket spaces requests past the burst
+4. Backoff: a 429 Retry-After (seconds or HTTP-date) is honoured before retrying;
+   without one, exponential backoff with jitter stays within its bounds
+5. Non-retryable errors (e.g. 400) fail at once
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import HealthCheck, given, strategies as st, settings
+import pytest
+from fastapi import HTTPException
+
+import services.gemini_vision as gemini_vision
+from services.gemini_client import (
+    GeminiAPIError, GeminiClient, TokenBucket, backoff_delay, parse_retry_after
+)
+
+VISION_TEXT = json.dumps({'elements': [{'type': 'title', 'x': 10, 'y': 10, 'width': 80, 'height': 20}]})
+VISION_RESPONSE = {'candidates': [{'content': {'parts': [{'text': VISION_TEXT}]}}]}
+
+
+class FakeGemini:
+    """Local HTTP/1.1 keep-alive server with scripted responses."""
+    
+    def __init__(self, script=(), delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = []
+        self.in_flight = 0
+        self.peak = 0
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def setup(self):
+                super().setup()
+                with fake.lock:
+                    fake.connections += 1
+            
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with fake.lock:
+                    fake.requests.append(time.monotonic())
+                    fake.in_flight += 1
+                    fake.peak = max(fake.peak, fake.in_flight)
+                    status, headers, body = fake.script.pop(0) if fake.script else (200, {}, VISION_RESPONSE)
+                time.sleep(fake.delay)
+                with fake.lock:
+                    fake.in_flight -= 1
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """Points gemini_vision at a FakeGemini through a fresh client."""
+    servers = []
+    
+    def start(script=(), delay=0.0, **client_options):
+        fake = FakeGemini(script, delay)
+        servers.append(fake)
+        client = GeminiClient(**client_options)
+        monkeypatch.setattr(gemini_vision, 'GEMINI_API_URL', fake.url)
+        monkeypatch.setattr(gemini_vision, 'GEMINI_API_KEY', 'test-key')
+        monkeypatch.setattr(gemini_vision, 'gemini_client', client)
+        return fake, client
+    
+    yield start
+    for fake in servers:
+        fake.close()
+
+
+async def _with_client(client, coroutine):
+    try:
+        return await coroutine
+    finally:
+        await client.aclose()
+
+
+class TestGeminiClient:
+
+    def test_connection_reuse(self, gemini):
+        fake, client = gemini(max_concurrency=2, requests_per_minute=6000)
+        
+        async def scenario():
+            return [await gemini_vision.call_gemini_vision_api('aGVsbG8=') for _ in range(5)]
+        
+        results = asyncio.run(_with_client(client, scenario()))
+        assert all(r['elements'][0]['type'] == 'title' for r in results)
+        assert len(fake.requests) == 5
+        assert fake.connections == 1
+        assert client.get_stats()['requests'] == 5
+    
+    @given(max_concurrency=st.integers(1, 4), burst=st.integers(1, 10))
+    @settings(max_examples=8, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_concurrency_limit(self, gemini, max_concurrency, burst):
+        fake, client = gemini(delay=0.03, max_concurrency=max_concurrency, requests_per_minute=60000, burst=burst)
+        
+        async def scenario():
+            return await asyncio.gather(*(gemini_vision.call_gemini_vision_api('aGVsbG8=') for _ in range(burst)))
+        
+        assert len(asyncio.run(_with_client(client, scenario()))) == burst
+        assert fake.peak <= max_concurrency
+        assert fake.connections <= max_concurrency
+    
+    def test_rate_limit(self, gemini):
+        # 600/min = one request every 0.1s after a burst of 2
+        fake, client = gemini(max_concurrency=4, requests_per_minute=600, burst=2)
+        
+        async def scenario():
+            await asyncio.gather(*(gemini_vision.call_gemini_vision_api('aGVsbG8=') for _ in range(5)))
+        
+        started = time.monotonic()
+        asyncio.run(_with_client(client, scenario()))
+        assert time.monotonic() - started >= 0.28
+        assert len(fake.requests) == 5
+    
+    def test_retry_after_is_honoured(self, gemini):
+        quota = {'error': {'message': 'Resource has been exhausted'}}
+        fake, client = gemini([(429, {'Retry-After': '0.3'}, quota)], max_concurrency=2, requests_per_minute=6000)
+        
+        result = asyncio.run(_with_client(client, gemini_vision.analyze_with_retry('data:image/png;base64,aGVsbG8=')))
+        assert len(result['elements']) == 1
+        assert len(fake.requests) == 2
+        assert fake.requests[1] - fake.requests[0] >= 0.28
+        assert fake.connections == 1
+        assert client.get_stats()['throttled'] == 1
+    
+    def test_client_errors_are_not_retried(self, gemini):
+        fake, client = gemini([(400, {}, {'error': {'message': 'API key not valid'}})], requests_per_minute=6000)
+        
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(_with_client(client, gemini_vision.analyze_with_retry('aGVsbG8=')))
+        assert 'after 1 attempts' in exc_info.value.detail
+        assert 'API key not valid' in exc_info.value.detail
+        assert len(fake.requests) == 1
+
+
+class TestBackoff:
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('7') == 7.0
+        assert parse_retry_after(' 1.5 ') == 1.5
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('soon') is None
+        when = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+        assert 25 <= parse_retry_after(when) <= 30
+        past = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+        assert parse_retry_after(past) == 0.0
+    
+    @given(attempt=st.integers(1, 10), base=st.floats(0.1, 2), cap=st.floats(1, 60))
+    @settings(max_examples=50)
+    def test_backoff_bounds(self, attempt, base, cap):
+        assert 0 <= backoff_delay(attempt, base=base, cap=cap) <= min(cap, base * 2 ** (attempt - 1))
+        error = GeminiAPIError('quota', 429, retry_after=3.0)
+        assert backoff_delay(attempt, error, base=base, cap=cap) == min(3.0, cap)
+    
+    def test_retryable_status_codes(self):
+        assert GeminiAPIError('quota', 429).retryable
+        assert GeminiAPIError('unavailable', 503).retryable
+        assert GeminiAPIError('network').retryable
+        assert not GeminiAPIError('bad request', 400).retryable
+    
+    def test_bucket_pause(self):
+        bucket = TokenBucket(rate=1000, capacity=2)
+        
+        async def scenario():
+            bucket.pause(0.2)
+            started = time.monotonic()
+            await bucket.acquire()
+            return time.monotonic() - started
+        
+        assert asyncio.run(scenario()) >= 0.18
@@ -0,0 +1,78 @@
+"""
+Property-Based Tests for image_processor
+
+Properties tested:
+1. remove_white_background matches the per-pixel reference bit-for-bit
+2. smart_background_removal matches the per-pixel reference bit-for-bit
+3. The alpha channel is never modified
+"""
+
+import base64
+import io
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+from PIL import Image
+
+from image_processor import remove_white_background, smart_background_removal
+from benchmark_image_processor import (
+    legacy_remove_white_background, legacy_smart_background_removal
+)
+
+
+@st.composite
+def images_base64(draw):
+    """Small images in several modes, biased towards near-white pixels."""
+    width = draw(st.integers(min_value=1, max_value=12))
+    height = draw(st.integers(min_value=1, max_value=12))
+    mode = draw(st.sampled_from(['RGBA', 'RGB', 'L', 'LA']))
+    channel = st.one_of(st.integers(min_value=0, max_value=255), st.integers(min_value=230, max_value=255))
+    pixels = draw(st.lists(
+        st.tuples(channel, channel, channel, channel),
+        min_size=width * height, max_size=width * height
+    ))
+    
+    img = Image.new('RGBA', (width, height))
+    img.putdata(pixels)
+    if mode != 'RGBA':
+        img = img.convert(mode)
+    
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    prefix = draw(st.sampled_from(['', 'data:image/png;base64,']))
+    return prefix + base64.b64encode(buffer.getvalue()).decode()
+
+
+hex_colors = st.tuples(
+    st.integers(0, 255), st.integers(0, 255), st.integers(0, 255)
+).map(lambda rgb: '#%02X%02X%02X' % rgb)
+
+
+def decode(data_url: str) -> Image.Image:
+    return Image.open(io.BytesIO(base64.b64decode(data_url.split(',', 1)[1])))
+
+
+class TestBackgroundRemovalEquivalence:
+
+    @given(image=images_base64(), color=hex_colors, threshold=st.integers(min_value=-1, max_value=256))
+    @settings(max_examples=200, deadline=None)
+    def test_remove_white_background_matches_reference(self, image, color, threshold):
+        assert remove_white_background(image, color, threshold) == \
+            legacy_remove_white_background(image, color, threshold)
+    
+    @given(image=images_base64(), color=hex_colors)
+    @settings(max_examples=200, deadline=None)
+    def test_smart_background_removal_matches_reference(self, image, color):
+        assert smart_background_removal(image, color) == \
+            legacy_smart_background_removal(image, color)
+    
+    @given(image=images_base64(), color=hex_colors)
+    @settings(max_examples=50, deadline=None)
+    def test_alpha_preserved(self, image, color):
+        original = decode(image if image.startswith('data:') else 'data:,' + image).convert('RGBA')
+        for processed in (remove_white_background(image, color), smart_background_removal(image, color)):
+            assert decode(processed).getchannel('A').tobytes() == original.getchannel('A').tobytes()
@@ -0,0 +1,88 @@
+"""
+Property-Based Tests for the layout index of pptx_analyzer
+
+Properties tested:
+1. Grouping: slides are grouped by layout part and placeholder structure
+2. Equivalence: slide type, is_title and background from the index match the
+   per-slide functions, for slides with and without their own background
+3. Reuse: layout-level work runs once per group; the stats report the reuse ratio
+4. Backgrounds handed out are copies, so callers can modify them
+"""
+
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+
+from pptx_analyzer import (
+    LayoutIndex, detect_slide_type, extract_background, is_title_slide, slide_layout_signature
+)
+
+
+def _deck(slides):
+    """One slide per (layout index, own background color or None)."""
+    prs = Presentation()
+    for layout, color in slides:
+        slide = prs.slides.add_slide(prs.slide_layouts[layout])
+        if color is not None:
+            fill = slide.background.fill
+            fill.solid()
+            fill.fore_color.rgb = RGBColor.from_string(color)
+    return prs
+
+
+slides_strategy = st.lists(
+    st.tuples(st.sampled_from([0, 1, 5, 6]), st.one_of(st.none(), st.sampled_from(['1E3A5F', 'FF0000']))),
+    min_size=1, max_size=10
+)
+
+
+class TestLayoutIndex:
+
+    @given(slides=slides_strategy)
+    @settings(max_examples=25, deadline=None)
+    def test_matches_per_slide_analysis(self, slides):
+        prs = _deck(slides)
+        index = LayoutIndex(prs)
+        
+        for slide_idx, slide in enumerate(prs.slides):
+            assert index.slide_type(slide_idx) == detect_slide_type(slide)
+            assert index.is_title(slide_idx) == is_title_slide(slide)
+            assert index.background(slide_idx) == extract_background(slide)
+    
+    @given(slides=slides_strategy)
+    @settings(max_examples=25, deadline=None)
+    def test_work_runs_once_per_group(self, slides):
+        prs = _deck(slides)
+        index = LayoutIndex(prs)
+        
+        layouts = {layout for layout, _ in slides}
+        assert len(index.groups) == len(layouts)
+        assert index.representatives() == sorted(index.groups[k][0] for k in index.groups)
+        for slide_idx, slide in enumerate(prs.slides):
+            assert slide_idx in index.groups[slide_layout_signature(slide)]
+        
+        for slide_idx in range(len(slides)):
+            index.slide_type(slide_idx)
+            index.background(slide_idx)
+        
+        stats = index.get_stats()
+        own_backgrounds = sum(color is not None for _, color in slides)
+        inherited = {layout for layout, color in slides if color is None}
+        assert stats['slides'] == len(slides)
+        assert stats['layouts'] == len(layouts)
+        assert stats['reuseRatio'] == round(1 - len(layouts) / len(slides), 3)
+        assert stats['work']['slideType']['computed'] == len(layouts)
+        assert stats['work']['background']['computed'] == own_backgrounds + len(inherited)
+        assert stats['work']['background']['computed'] + stats['work']['background']['reused'] == len(slides)
+    
+    def test_background_is_a_copy(self):
+        index = LayoutIndex(_deck([(6, None), (6, None)]))
+        index.background(0)['color'] = '#123456'
+        assert index.background(1)['color'] != '#123456'
+        assert index.get_stats()['work']['background'] == {'computed': 1, 'reused': 1, 'reuseRatio': 0.5}
@@ -0,0 +1,224 @@
+"""
+Property-Based Tests for LibreOfficePool
+
+Uses a fake `soffice` script (subprocess mode) that records its arguments,
+writes the requested output file and can be made to hang.
+
+Properties tested:
+1. Isolation: every worker runs with its own -env:UserInstallation profile
+2. Single pass: a conversion launches exactly one --convert-to pdf run
+3. Queue: jobs beyond the pool size wait, and time out with PoolBusyError
+4. Timeouts: a hung conversion is killed together with the processes it spawned,
+   its thread is freed and the worker keeps serving jobs
+5. Recycling: workers restart after max_jobs_per_worker conversions
+6. Shutdown: worker profiles are removed; subprocess mode reports no warm instance
+"""
+
+import os
+import stat
+import sys
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import pytest
+
+from libreoffice_pool import LibreOfficeError, LibreOfficePool, LibreOfficeTimeoutError, PoolBusyError
+
+FAKE_SOFFICE = '''#!{python}
+import os, subprocess, sys, time
+args = sys.argv[1:]
+with open(os.environ['FAKE_SOFFICE_LOG'], 'a') as log:
+    log.write(' '.join(args) + '\\n')
+fmt = args[args.index('--convert-to') + 1]
+out_dir = args[args.index('--outdir') + 1]
+source = args[-1]
+if 'spawn' in os.path.basename(source):
+    # Like soffice launching soffice.bin: the child inherits stdout/stderr
+    child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+    with open(os.environ['FAKE_SOFFICE_LOG'] + '.child', 'w') as pid_file:
+        pid_file.write(str(child.pid))
+if 'hang' in os.path.basename(source):
+    time.sleep(60)
+stem = os.path.splitext(os.path.basename(source))[0]
+with open(os.path.join(out_dir, stem + '.' + fmt), 'w') as out:
+    out.write('converted ' + source)
+'''
+
+
+@pytest.fixture
+def fake_soffice(tmp_path, monkeypatch):
+    script = tmp_path / 'soffice'
+    script.write_text(FAKE_SOFFICE.format(python=sys.executable))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / 'soffice.log'
+    log.write_text('')
+    monkeypatch.setenv('FAKE_SOFFICE_LOG', str(log))
+    return str(script), log
+
+
+def _pool(tmp_path, soffice, **kwargs):
+    return LibreOfficePool(soffice_path=soffice, profile_root=str(tmp_path / 'profiles'),
+                           use_uno=False, **kwargs)
+
+
+def _alive(pid):
+    """The process exists and is not a zombie waiting to be reaped"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+
+def _document(tmp_path, name='deck.pptx'):
+    path = tmp_path / name
+    path.write_bytes(b'PK fake pptx')
+    return str(path)
+
+
+class TestLibreOfficePool:
+
+    def test_single_pdf_pass_with_isolated_profile(self, tmp_path, fake_soffice):
+        soffice, log = fake_soffice
+        pool = _pool(tmp_path, soffice, size=1)
+        out_dir = tmp_path / 'out'
+        out_dir.mkdir()
+        
+        pdf = pool.convert(_document(tmp_path), 'pdf', out_dir=str(out_dir))
+        
+        assert pdf == str(out_dir / 'deck.pdf')
+        runs = log.read_text().splitlines()
+        assert len(runs) == 1
+        assert '--convert-to pdf' in runs[0]
+        assert f"-env:UserInstallation={pool._workers[0].profile_url}" in runs[0]
+        pool.shutdown()
+    
+    @given(size=st.integers(1, 3), jobs=st.integers(1, 6))
+    @settings(max_examples=8, deadline=None)
+    def test_concurrent_jobs_use_distinct_profiles(self, tmp_path_factory, size, jobs):
+        tmp_path = tmp_path_factory.mktemp('pool')
+        script = tmp_path / 'soffice'
+        script.write_text(FAKE_SOFFICE.format(python=sys.executable))
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        log = tmp_path / 'soffice.log'
+        log.write_text('')
+        os.environ['FAKE_SOFFICE_LOG'] = str(log)
+        
+        pool = _pool(tmp_path, str(script), size=size)
+        busy = set()
+        overlaps = []
+        lock = threading.Lock()
+        
+        def job(worker):
+            with lock:
+                overlaps.append(worker.profile_dir in busy)
+                busy.add(worker.profile_dir)
+            time.sleep(0.02)
+            with lock:
+                busy.discard(worker.profile_dir)
+            return worker.index
+        
+        threads = [threading.Thread(target=pool.run, args=(job,)) for _ in range(jobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        # A profile is never used by two jobs at once
+        assert not any(overlaps)
+        assert len({w.profile_dir for w in pool._workers}) == size
+        assert pool.stats()['jobs'] == jobs
+        assert pool.stats()['idle'] == size
+        pool.shutdown()
+    
+    def test_queue_timeout_when_all_workers_busy(self, tmp_path, fake_soffice):
+        soffice, _ = fake_soffice
+        pool = _pool(tmp_path, soffice, size=1, queue_timeout=0.1)
+        release = threading.Event()
+        
+        holder = threading.Thread(target=pool.run, args=(lambda worker: release.wait(5),))
+        holder.start()
+        time.sleep(0.1)
+        try:
+            with pytest.raises(PoolBusyError):
+                pool.run(lambda worker: None)
+        finally:
+            release.set()
+            holder.join()
+        
+        assert pool.stats()['queue_timeouts'] == 1
+        pool.shutdown()
+    
+    def test_hung_conversion_is_killed(self, tmp_path, fake_soffice):
+        soffice, _ = fake_soffice
+        pool = _pool(tmp_path, soffice, size=1, job_timeout=1)
+        
+        start = time.monotonic()
+        with pytest.raises(LibreOfficeTimeoutError):
+            pool.convert(_document(tmp_path, 'hang.pptx'), 'pdf')
+        assert time.monotonic() - start < 15
+        
+        # The worker is returned to the pool and still converts
+        assert pool.convert(_document(tmp_path), 'pdf').endswith('deck.pdf')
+        assert pool.stats()['timeouts'] == 1
+        pool.shutdown()
+    
+    @pytest.mark.skipif(os.name == 'nt', reason='process groups are POSIX only')
+    def test_timeout_kills_spawned_processes(self, tmp_path, fake_soffice):
+        soffice, log = fake_soffice
+        pool = _pool(tmp_path, soffice, size=1, job_timeout=1)
+        
+        start = time.monotonic()
+        with pytest.raises(LibreOfficeTimeoutError):
+            pool.convert(_document(tmp_path, 'spawn-hang.pptx'), 'pdf')
+        # The child held the pipes open: killing only soffice left the thread waiting
+        assert time.monotonic() - start < 5
+        assert pool._workers[0]._job_process is None
+        
+        child = int((tmp_path / 'soffice.log.child').read_text())
+        time.sleep(0.2)
+        assert not _alive(child)
+        pool.shutdown()
+    
+    def test_shutdown_removes_profiles(self, tmp_path, fake_soffice):
+        soffice, _ = fake_soffice
+        pool = _pool(tmp_path, soffice, size=2)
+        pool.convert(_document(tmp_path), 'pdf')
+        
+        stats = pool.stats()
+        assert stats['mode'] == 'subprocess'
+        assert stats['warm_instances'] == 0
+        assert not any(w['warm'] for w in stats['workers'])
+        assert os.path.isdir(pool._workers[0].profile_dir)
+        
+        pool.shutdown()
+        assert not os.path.exists(tmp_path / 'profiles')
+    
+    def test_workers_recycled_after_max_jobs(self, tmp_path, fake_soffice):
+        soffice, _ = fake_soffice
+        pool = _pool(tmp_path, soffice, size=1, max_jobs_per_worker=2)
+        
+        for _ in range(5):
+            pool.run(lambda worker: None)
+        
+        worker = pool._workers[0]
+        assert worker.restarts == 2
+        assert worker.jobs_done == 1
+        assert pool.stats()['recycled'] == 2
+        pool.shutdown()
+    
+    def test_missing_soffice_is_reported(self, tmp_path):
+        pool = _pool(tmp_path, '')
+        assert pool.available is False
+        with pytest.raises(LibreOfficeError):
+            pool.convert(_document(tmp_path), 'pdf')
@@ -0,0 +1,166 @@
+"""
+Property-Based Tests for the streaming multipart reader
+
+Properties tested:
+1. Round trip: every part is recovered byte-for-byte for any chunking of the body
+2. File parts are spooled to disk and hashed while streaming
+3. Unwanted fields are drained without being kept
+4. Parts over the size limit are rejected
+5. Parts are written off the event loop thread
+6. Export endpoints answer 400 when `data` (or a JSON body) is not a JSON object
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import routes.export
+import utils.multipart_stream as multipart_stream
+from utils.multipart_stream import read_multipart_stream, MultipartError, PartTooLargeError
+
+BOUNDARY = '----TestBoundary7MA4YWxkTrZu0gW'
+CONTENT_TYPE = f'multipart/form-data; boundary={BOUNDARY}'
+
+
+def build_body(template: bytes, data: dict, template_hash: str = None) -> bytes:
+    """Encode a multipart body the way the frontend FormData does."""
+    parts = [
+        (f'--{BOUNDARY}\r\n'
+         'Content-Disposition: form-data; name="template"; filename="plantilla.pptx"\r\n'
+         'Content-Type: application/vnd.openxmlformats-officedocument.presentationml.presentation\r\n'
+         '\r\n').encode() + template + b'\r\n',
+        (f'--{BOUNDARY}\r\n'
+         'Content-Disposition: form-data; name="data"\r\n'
+         '\r\n').encode() + json.dumps(data).encode('utf-8') + b'\r\n',
+    ]
+    if template_hash:
+        parts.append((f'--{BOUNDARY}\r\n'
+                      'Content-Disposition: form-data; name="templateHash"\r\n'
+                      '\r\n' + template_hash + '\r\n').encode())
+    return b''.join(parts) + f'--{BOUNDARY}--\r\n'.encode()
+
+
+def chunked(body: bytes, sizes: list):
+    """Split a body into chunks of the given sizes (cycled) as an async iterator."""
+    async def iterator():
+        pos, idx = 0, 0
+        while pos < len(body):
+            size = sizes[idx % len(sizes)]
+            yield body[pos:pos + size]
+            pos += size
+            idx += 1
+    return iterator()
+
+
+def parse(body: bytes, sizes: list, fields=None):
+    return asyncio.run(read_multipart_stream(CONTENT_TYPE, chunked(body, sizes), fields))
+
+
+class TestMultipartRoundTrip:
+
+    @given(template=st.binary(min_size=0, max_size=20000),
+           title=st.text(max_size=50),
+           sizes=st.lists(st.integers(min_value=1, max_value=4096), min_size=1, max_size=5))
+    @settings(max_examples=100, deadline=None)
+    def test_parts_round_trip(self, template, title, sizes):
+        """Parts are recovered exactly regardless of how the body is chunked."""
+        data = {'slides': [{'content': {'title': title}}]}
+        form = parse(build_body(template, data, 'a' * 64), sizes)
+        
+        with form:
+            template_part = form.get('template')
+            assert template_part.filename == 'plantilla.pptx'
+            assert template_part.size == len(template)
+            assert template_part.sha256 == hashlib.sha256(template).hexdigest()
+            with open(template_part.path, 'rb') as f:
+                assert f.read() == template
+            
+            assert form.get('data').load_json() == data
+            assert form.text('templateHash') == 'a' * 64
+    
+    def test_detached_file_survives_close(self):
+        form = parse(build_body(b'PK\x03\x04' * 100, {}), [64])
+        path = form.get('template').detach()
+        form.close()
+        try:
+            assert os.path.exists(path)
+        finally:
+            os.unlink(path)
+    
+    def test_writes_run_off_the_event_loop(self):
+        threads = set()
+        write = multipart_stream.StreamedPart.write
+        
+        def recording_write(part, data):
+            threads.add(threading.get_ident())
+            write(part, data)
+        
+        with patch.object(multipart_stream.StreamedPart, 'write', recording_write):
+            form = parse(build_body(b'PK\x03\x04' * 1000, {}), [512])
+        form.close()
+        assert threads and threading.get_ident() not in threads
+    
+    def test_close_removes_spooled_file(self):
+        form = parse(build_body(b'PK\x03\x04' * 100, {}), [64])
+        path = form.get('template').path
+        form.close()
+        assert not os.path.exists(path)
+
+
+class TestMultipartFiltering:
+
+    def test_unwanted_fields_are_dropped(self):
+        form = parse(build_body(b'x' * 5000, {'slides': []}), [128], fields=('data',))
+        with form:
+            assert form.get('template') is None
+            assert form.get('data').load_json() == {'slides': []}
+    
+    def test_part_size_limit(self):
+        with patch.object(multipart_stream, 'MULTIPART_MAX_PART_SIZE', 1000):
+            with pytest.raises(PartTooLargeError):
+                parse(build_body(b'x' * 5000, {}), [256])
+    
+    def test_missing_boundary(self):
+        async def empty():
+            yield b''
+        with pytest.raises(MultipartError):
+            asyncio.run(read_multipart_stream('multipart/form-data', empty()))
+
+
+class TestExportPayloadValidation:
+
+    def _post(self, content, content_type):
+        app = FastAPI()
+        app.include_router(routes.export.router)
+        
+        async def post():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                return await client.post('/api/export/pptx', content=content, headers={'content-type': content_type})
+        return asyncio.run(post())
+    
+    @given(data=st.one_of(
+        st.lists(st.integers(), max_size=3), st.text(max_size=10), st.integers(), st.booleans()
+    ))
+    @settings(max_examples=20, deadline=None)
+    def test_non_object_data_is_rejected(self, data):
+        response = self._post(build_body(b'PK\x03\x04', data), CONTENT_TYPE)
+        assert response.status_code == 400
+        assert 'JSON object' in response.json()['detail']
+        
+        response = self._post(json.dumps(data).encode(), 'application/json')
+        assert response.status_code == 400
+    
+    def test_invalid_json_body_is_rejected(self):
+        assert self._post(b'{not json', 'application/json').status_code == 400
@@ -0,0 +1,254 @@
+"""
+Property-Based Tests for the offload layer
+
+Properties tested:
+1. Results and exceptions come back unchanged; the work runs off the event loop thread
+2. Concurrency: never more than max_concurrent stages run at once, whatever the burst size
+3. Backpressure: past max_concurrent + max_queued requests are rejected (429 with Retry-After)
+4. Responsiveness: the event loop keeps serving other requests while a stage blocks,
+   and the analysis endpoints go through the offloader; their uploads are removed
+   even when the stage is rejected (429) or fails
+5. Metrics: per-endpoint counts, errors, rejections and latency percentiles
+6. Cancellation: a request cancelled mid-stage keeps its slot until the worker finishes
+7. Isolation: by default stages run on a dedicated backend sized to max_concurrent,
+   not on the task queue executor used by background tasks
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import core.offload
+from core.offload import Offloader, OffloadBusyError, offload
+from core.task_queue import TaskQueue, ThreadBackend, task_queue
+from core.task_store import MemoryTaskStore
+
+
+def _queue(workers=8):
+    return TaskQueue(max_concurrent=workers, backend=ThreadBackend(max_workers=workers), store=MemoryTaskStore())
+
+
+class Gauge:
+    """Tracks how many calls are inside `work` at the same time."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+    
+    def work(self, value, seconds=0.02):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(seconds)
+        with self.lock:
+            self.current -= 1
+        return value
+
+
+def _fail():
+    raise ValueError("boom")
+
+
+class TestOffloader:
+
+    def test_results_errors_and_thread(self):
+        offloader = Offloader(max_concurrent=2, max_queued=2, queue=_queue())
+        
+        async def scenario():
+            loop_thread = threading.get_ident()
+            worker_thread = await offloader.run('ident', threading.get_ident)
+            result = await offloader.run('sum', sum, [1, 2, 3], start=4)
+            with pytest.raises(ValueError):
+                await offloader.run('fail', _fail)
+            return loop_thread, worker_thread, result
+        
+        loop_thread, worker_thread, result = asyncio.run(scenario())
+        assert worker_thread != loop_thread
+        assert result == 10
+        assert offloader.get_stats()['endpoints']['fail']['errors'] == 1
+    
+    @given(max_concurrent=st.integers(1, 4), burst=st.integers(1, 12))
+    @settings(max_examples=10, deadline=None)
+    def test_concurrency_limit(self, max_concurrent, burst):
+        offloader = Offloader(max_concurrent=max_concurrent, max_queued=burst, queue=_queue())
+        gauge = Gauge()
+        
+        async def scenario():
+            return await asyncio.gather(*(offloader.run('burst', gauge.work, i) for i in range(burst)))
+        
+        assert asyncio.run(scenario()) == list(range(burst))
+        assert gauge.peak <= max_concurrent
+        stats = offloader.get_stats()
+        assert stats['running'] == stats['waiting'] == 0
+        assert stats['endpoints']['burst']['count'] == burst
+    
+    @given(max_concurrent=st.integers(1, 3), max_queued=st.integers(0, 3), extra=st.integers(1, 4))
+    @settings(max_examples=10, deadline=None)
+    def test_backpressure(self, max_concurrent, max_queued, extra):
+        offloader = Offloader(max_concurrent=max_concurrent, max_queued=max_queued, retry_after=7, queue=_queue())
+        gauge = Gauge()
+        capacity = max_concurrent + max_queued
+        
+        async def scenario():
+            calls = [asyncio.ensure_future(offloader.run('busy', gauge.work, i, 0.1)) for i in range(capacity + extra)]
+            return await asyncio.gather(*calls, return_exceptions=True)
+        
+        results = asyncio.run(scenario())
+        rejected = [r for r in results if isinstance(r, OffloadBusyError)]
+        assert results[:capacity] == list(range(capacity))
+        assert len(rejected) == extra
+        assert all(r.retry_after == 7 for r in rejected)
+        assert offloader.get_stats()['endpoints']['busy']['rejected'] == extra
+    
+    def test_metrics(self):
+        offloader = Offloader(max_concurrent=1, max_queued=4, queue=_queue())
+        gauge = Gauge()
+        
+        async def scenario():
+            await asyncio.gather(*(offloader.run('slow', gauge.work, i, 0.05) for i in range(3)))
+        
+        asyncio.run(scenario())
+        stats = offloader.get_stats()['endpoints']['slow']
+        assert stats['count'] == 3 and stats['errors'] == 0
+        assert 45 <= stats['run_ms']['p50'] <= stats['run_ms']['p95'] <= stats['run_ms']['max']
+        # One slot: the last request waited for the other two
+        assert stats['wait_ms']['max'] >= 90
+    
+    @given(max_concurrent=st.integers(1, 3))
+    @settings(max_examples=5, deadline=None)
+    def test_cancelled_stage_keeps_its_slot(self, max_concurrent):
+        offloader = Offloader(max_concurrent=max_concurrent, max_queued=8, queue=_queue())
+        gauge = Gauge()
+        release = threading.Event()
+        
+        def blocked():
+            gauge.work(None, 0)
+            release.wait(5)
+        
+        async def scenario():
+            stuck = [asyncio.ensure_future(offloader.run('stuck', blocked)) for _ in range(max_concurrent)]
+            await asyncio.sleep(0.05)
+            for call in stuck:
+                call.cancel()
+            await asyncio.sleep(0.05)
+            # The cancelled stages still occupy their workers and their slots
+            assert offloader.get_stats()['running'] == max_concurrent
+            follow_up = asyncio.ensure_future(offloader.run('next', gauge.work, 'done', 0))
+            await asyncio.sleep(0.1)
+            assert not follow_up.done()
+            release.set()
+            return await follow_up
+        
+        assert asyncio.run(scenario()) == 'done'
+        assert gauge.peak <= max_concurrent
+        # Recorded once the worker finished, not when the request went away
+        stuck = offloader.get_stats()['endpoints']['stuck']
+        assert stuck['count'] == max_concurrent and stuck['run_ms']['max'] >= 150
+    
+    def test_dedicated_backend(self):
+        offloader = Offloader(max_concurrent=3)
+        try:
+            backend = offloader.get_backend()
+            assert backend is not task_queue.get_backend()
+            assert backend.max_workers == 3
+            assert asyncio.run(offloader.run('ident', threading.get_ident)) != threading.get_ident()
+            assert offloader.get_stats()['backend']['completed'] == 1
+        finally:
+            offloader.shutdown()
+
+
+class TestOffloadedEndpoints:
+
+    def _app(self, monkeypatch, offloader):
+        monkeypatch.setattr(core.offload, 'offloader', offloader)
+        app = FastAPI()
+        
+        @app.get('/slow')
+        async def slow():
+            return {"value": await offload('slow', time.sleep, 0.3)}
+        
+        @app.get('/health')
+        async def health():
+            return {"status": "healthy"}
+        
+        return app
+    
+    def test_event_loop_stays_responsive(self, monkeypatch):
+        app = self._app(monkeypatch, Offloader(max_concurrent=1, max_queued=0, retry_after=3, queue=_queue()))
+        
+        async def scenario():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                slow = asyncio.ensure_future(client.get('/slow'))
+                await asyncio.sleep(0.05)
+                started = time.monotonic()
+                health = await client.get('/health')
+                health_seconds = time.monotonic() - started
+                busy = await client.get('/slow')
+                return (await slow), health, health_seconds, busy
+        
+        slow, health, health_seconds, busy = asyncio.run(scenario())
+        assert slow.status_code == 200
+        assert health.status_code == 200
+        assert health_seconds < 0.2
+        assert busy.status_code == 429
+        assert busy.headers['retry-after'] == '3'
+    
+    def test_extract_content_is_offloaded(self, monkeypatch, tmp_path):
+        import routes.analysis
+        from pptx import Presentation
+        
+        offloader = Offloader(max_concurrent=1, max_queued=1, queue=_queue())
+        monkeypatch.setattr(core.offload, 'offloader', offloader)
+        app = FastAPI()
+        app.include_router(routes.analysis.router)
+        
+        prs = Presentation()
+        prs.slides.add_slide(prs.slide_layouts[0]).shapes.title.text = 'Portada'
+        deck = tmp_path / 'deck.pptx'
+        prs.save(str(deck))
+        
+        async def extract():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                files = {'file': ('deck.pptx', deck.read_bytes())}
+                return await client.post('/api/extract-content', files=files)
+        
+        response = asyncio.run(extract())
+        assert response.status_code == 200
+        assert response.json()['slides'][0]['texts'][0]['content'] == 'Portada'
+        assert offloader.get_stats()['endpoints']['extract-content']['count'] == 1
+    
+    @pytest.mark.parametrize('path', ['/api/analyze', '/api/analyze-fonts', '/api/extract-content'])
+    def test_rejected_or_failed_uploads_are_removed(self, monkeypatch, tmp_path, path):
+        import tempfile
+        import routes.analysis
+        
+        uploads = tmp_path / 'uploads'
+        uploads.mkdir()
+        monkeypatch.setattr(tempfile, 'tempdir', str(uploads))
+        app = FastAPI()
+        app.include_router(routes.analysis.router)
+        
+        async def post():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                return await client.post(path, files={'file': ('deck.pptx', b'not a deck')})
+        
+        # No slot and no room in the queue: every stage is rejected
+        monkeypatch.setattr(core.offload, 'offloader', Offloader(max_concurrent=0, max_queued=0, queue=_queue()))
+        assert asyncio.run(post()).status_code == 429
+        assert list(uploads.iterdir()) == []
+        
+        # The stage runs and fails on the invalid deck
+        monkeypatch.setattr(core.offload, 'offloader', Offloader(max_concurrent=1, max_queued=0, queue=_queue()))
+        assert asyncio.run(post()).status_code == 500
+        assert list(uploads.iterdir()) == []
@@ -0,0 +1,198 @@
+"""
+Property-Based Tests for PDF export
+
+Properties tested:
+1. images_to_pdf: one 16:9 page per slide; JPEG previews are embedded byte-identical,
+   other formats as images and slides without preview as text
+2. export_pdf: a PPTX goes through the LibreOffice pool (vector) and falls back to the previews
+   (raster) when LibreOffice fails
+3. POST /api/export/pdf runs on the task queue backend (through the offloader) and returns the PDF
+4. POST /api/export/pdf/async queues a task whose download is served as application/pdf
+5. An uploaded template is removed when the export is rejected (429) or its PPTX fails
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import fitz
+import httpx
+from fastapi import FastAPI
+from PIL import Image
+
+import core.offload
+import pdf_exporter
+import routes.export
+from core.offload import Offloader
+from core.task_queue import TaskQueue, TaskStatus, ThreadBackend
+from core.task_store import MemoryTaskStore
+from libreoffice_pool import LibreOfficeError
+from preview_encoding import PreviewEncoding, to_data_url
+
+
+def _preview(image_format, color='teal'):
+    encoding = PreviewEncoding(image_format)
+    return encoding.encode(Image.new('RGB', (192, 108), color)), encoding.mime_type
+
+
+def _pages(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return [(page.rect.width, page.rect.height, page.get_images(), page.get_text()) for page in doc]
+
+
+class FakePool:
+    """LibreOffice pool that 'converts' by writing a text-only PDF."""
+    
+    def __init__(self, fail=False):
+        self.available = True
+        self.fail = fail
+        self.converted = []
+    
+    def convert(self, input_path, target_format='pdf', out_dir=None, timeout=None, filter_options=None):
+        self.converted.append((input_path, target_format))
+        if self.fail:
+            raise LibreOfficeError("soffice crashed")
+        output_path = os.path.join(out_dir, 'out.pdf')
+        with fitz.open() as doc:
+            doc.new_page(width=720, height=405).insert_text((72, 72), 'vector slide')
+            doc.save(output_path)
+        return output_path
+
+
+class TestImagesToPdf:
+
+    @given(kinds=st.lists(st.sampled_from(['png', 'jpeg', 'webp', 'text']), min_size=1, max_size=6))
+    @settings(max_examples=15, deadline=None)
+    def test_one_page_per_slide(self, kinds):
+        slides = []
+        for index, kind in enumerate(kinds):
+            if kind == 'text':
+                slides.append({'content': {'title': f'Title {index}', 'bullets': ['uno', 'dos']}})
+            else:
+                slides.append({'preview': to_data_url(*_preview(kind))})
+        progress = []
+        
+        pdf_path = pdf_exporter.images_to_pdf(slides, progress_callback=lambda done, total: progress.append(done))
+        pages = _pages(pdf_path)
+        os.unlink(pdf_path)
+        
+        assert len(pages) == len(kinds)
+        assert progress == list(range(1, len(kinds) + 1))
+        for kind, (width, height, images, text) in zip(kinds, pages):
+            assert (width, height) == (pdf_exporter.PDF_PAGE_WIDTH, pdf_exporter.PDF_PAGE_HEIGHT)
+            assert len(images) == (0 if kind == 'text' else 1)
+            assert ('Title' in text) == (kind == 'text')
+    
+    def test_jpeg_is_embedded_as_is(self, tmp_path):
+        data, mime = _preview('jpeg', 'orange')
+        pdf_path = pdf_exporter.images_to_pdf([{'preview': (data, mime)}], str(tmp_path / 'out.pdf'))
+        
+        with fitz.open(pdf_path) as doc:
+            xref = doc[0].get_images()[0][0]
+            assert doc.extract_image(xref)['image'] == data
+    
+    def test_broken_preview_becomes_a_placeholder(self, tmp_path):
+        pdf_path = pdf_exporter.images_to_pdf([{'preview': 'data:image/png;base64,AAAA'}], str(tmp_path / 'out.pdf'))
+        assert 'Slide 1' in _pages(pdf_path)[0][3]
+
+
+class TestExportPdf:
+
+    def test_vector_then_raster_fallback(self, tmp_path, monkeypatch):
+        pptx_path = str(tmp_path / 'deck.pptx')
+        open(pptx_path, 'wb').close()
+        slides = [{'preview': _preview('png')}]
+        
+        pool = FakePool()
+        monkeypatch.setattr(pdf_exporter, 'libreoffice_pool', pool)
+        pdf_path, method = pdf_exporter.export_pdf(pptx_path, slides, str(tmp_path / 'vector.pdf'))
+        assert method == 'vector'
+        assert pool.converted == [(pptx_path, 'pdf')]
+        assert 'vector slide' in _pages(pdf_path)[0][3]
+        
+        monkeypatch.setattr(pdf_exporter, 'libreoffice_pool', FakePool(fail=True))
+        pdf_path, method = pdf_exporter.export_pdf(pptx_path, slides, str(tmp_path / 'raster.pdf'))
+        assert method == 'raster'
+        assert len(_pages(pdf_path)[0][2]) == 1
+        
+        pdf_path, method = pdf_exporter.export_pdf(None, slides, str(tmp_path / 'previews.pdf'))
+        assert method == 'raster'
+
+
+class TestExportPdfApi:
+
+    def _app(self, monkeypatch):
+        queue = TaskQueue(max_concurrent=1, backend=ThreadBackend(max_workers=1), store=MemoryTaskStore())
+        monkeypatch.setattr(routes.export, 'task_queue', queue)
+        monkeypatch.setattr(routes.export.offloader, '_queue', queue)
+        monkeypatch.setattr(pdf_exporter, 'libreoffice_pool', FakePool(fail=True))
+        app = FastAPI()
+        app.include_router(routes.export.router)
+        return app, queue
+    
+    def test_sync_export_runs_on_the_task_queue(self, monkeypatch):
+        app, queue = self._app(monkeypatch)
+        payload = {'slides': [{'preview': to_data_url(*_preview('jpeg'))}, {'content': {'title': 'Fin'}}]}
+        
+        async def export():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                return await client.post('/api/export/pdf', json=payload)
+        
+        response = asyncio.run(export())
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/pdf'
+        with fitz.open(stream=response.content, filetype='pdf') as doc:
+            assert doc.page_count == 2
+        assert queue.get_backend().get_stats()['completed'] == 1
+    
+    def test_async_export(self, monkeypatch):
+        app, queue = self._app(monkeypatch)
+        payload = {'slides': [{'content': {'title': f'Slide {i}'}} for i in range(30)]}
+        
+        async def export():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                task_id = (await client.post('/api/export/pdf/async', json=payload)).json()['taskId']
+                for _ in range(200):
+                    status = (await client.get(f'/api/task/{task_id}')).json()
+                    if status['status'] in (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value):
+                        break
+                    await asyncio.sleep(0.05)
+                return status, await client.get(f'/api/task/{task_id}/download')
+        
+        status, download = asyncio.run(export())
+        assert status['status'] == TaskStatus.COMPLETED.value
+        assert download.headers['content-type'] == 'application/pdf'
+        assert 'presentacion.pdf' in download.headers['content-disposition']
+        with fitz.open(stream=download.content, filetype='pdf') as doc:
+            assert doc.page_count == 30
+    
+    def _upload(self, app, payload):
+        async def export():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                files = {'template': ('plantilla.pptx', b'PK\x03\x04 not a deck'), 'data': (None, json.dumps(payload))}
+                return await client.post('/api/export/pdf', files=files)
+        return asyncio.run(export())
+    
+    def test_uploaded_template_is_removed(self, monkeypatch, tmp_path):
+        app, queue = self._app(monkeypatch)
+        monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+        payload = {'slides': [{'preview': to_data_url(*_preview('jpeg'))}]}
+        
+        def templates():
+            return [name for name in os.listdir(tmp_path) if name.endswith('.pptx')]
+        
+        # PPTX generation fails on the broken template: the previews are exported instead
+        response = self._upload(app, payload)
+        assert response.status_code == 200
+        assert templates() == []
+        
+        # No slot and no room in the queue: the request is rejected before the task runs
+        monkeypatch.setattr(core.offload, 'offloader', Offloader(max_concurrent=0, max_queued=0, queue=queue))
+        assert self._upload(app, payload).status_code == 429
+        assert templates() == []
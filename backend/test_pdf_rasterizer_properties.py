@@ -0,0 +1,106 @@
+"""
+Property-Based Tests for the parallel PDF rasterizer
+
+Properties tested:
+1. Chunking: split_pages covers every page once, in order, in contiguous balanced chunks
+2. Equivalence: the process pool produces exactly the same images as a serial run
+3. Progress: the callback sees 1..N pages converted regardless of chunk completion order
+4. Options: the DPI sets the pixel size and the encoding sets the format and MIME type
+5. Binary transport: (bytes, MIME) pairs carry exactly the data of the data URLs
+"""
+
+import base64
+import io
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import fitz
+import pytest
+from PIL import Image
+
+import pdf_rasterizer
+from pdf_rasterizer import rasterize_pdf, split_pages
+from preview_encoding import PreviewEncoding, to_data_url
+
+COLORS = [(1, 0, 0), (0, 1, 0), (0, 0, 1), (1, 1, 0), (0, 1, 1), (1, 0, 1)]
+
+
+def _write_pdf(path, pages):
+    doc = fitz.open()
+    for index in range(pages):
+        page = doc.new_page(width=72, height=36)
+        color = COLORS[index % len(COLORS)]
+        page.draw_rect(page.rect, color=color, fill=color)
+        page.insert_text((4, 20), str(index), fontsize=12)
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def _decode(data_url):
+    header, payload = data_url.split(',', 1)
+    return header[5:].split(';')[0], Image.open(io.BytesIO(base64.b64decode(payload)))
+
+
+@pytest.fixture(scope='module')
+def pdf_path(tmp_path_factory):
+    return _write_pdf(tmp_path_factory.mktemp('pdf') / 'doc.pdf', 12)
+
+
+@pytest.fixture(scope='module')
+def always_parallel():
+    # Uses the process pool even for short page lists
+    patch = pytest.MonkeyPatch()
+    patch.setattr(pdf_rasterizer, 'PDF_RASTER_PARALLEL_MIN_PAGES', 1)
+    yield
+    patch.undo()
+    pdf_rasterizer.shutdown()
+
+
+class TestPdfRasterizer:
+
+    @given(pages=st.lists(st.integers(0, 500), max_size=60, unique=True), parts=st.integers(1, 16))
+    def test_split_pages_is_a_balanced_partition(self, pages, parts):
+        pages = sorted(pages)
+        chunks = split_pages(pages, parts)
+        assert [p for chunk in chunks for p in chunk] == pages
+        assert len(chunks) == max(1, min(parts, len(pages)))
+        if pages:
+            assert max(map(len, chunks)) - min(map(len, chunks)) <= 1
+    
+    @given(pages=st.one_of(st.none(), st.lists(st.integers(-2, 14), max_size=14)))
+    @settings(max_examples=10, deadline=None)
+    def test_parallel_matches_serial(self, pdf_path, always_parallel, pages):
+        progress = []
+        parallel = rasterize_pdf(pdf_path, pages=pages, dpi=36, workers=2,
+                                 progress_callback=lambda done, total: progress.append((done, total)))
+        serial = rasterize_pdf(pdf_path, pages=pages, dpi=36, workers=1)
+        assert pdf_rasterizer._executor is not None or not parallel
+        
+        expected = list(range(12)) if pages is None else [p for p in sorted(set(pages)) if 0 <= p < 12]
+        assert parallel == serial
+        assert len(parallel) == len(expected)
+        assert progress == [(n, len(expected)) for n in range(1, len(expected) + 1)]
+    
+    @pytest.mark.parametrize('image_format,mime,pil_format', [
+        ('png', 'image/png', 'PNG'),
+        ('jpeg', 'image/jpeg', 'JPEG'),
+        ('webp', 'image/webp', 'WEBP'),
+    ])
+    def test_format_and_dpi(self, pdf_path, image_format, mime, pil_format):
+        images = rasterize_pdf(pdf_path, pages=[0, 1], dpi=144, encoding=PreviewEncoding(image_format, quality=60))
+        
+        for data_url in images:
+            image_mime, image = _decode(data_url)
+            assert image_mime == mime
+            assert image.format == pil_format
+            assert image.size == (144, 72)
+    
+    def test_binary_matches_data_urls(self, pdf_path):
+        binary = rasterize_pdf(pdf_path, pages=[2, 3], dpi=72, binary=True)
+        assert [to_data_url(*image) for image in binary] == rasterize_pdf(pdf_path, pages=[2, 3], dpi=72)
+
@@ -0,0 +1,169 @@
+"""
+Property-Based Tests for PreviewCache
+
+Properties tested:
+1. Round trip: a stored preview comes back byte-identical with its MIME type
+2. Bounded size: total bytes on disk never exceed max_bytes; the least recently used go first
+3. Persistence: a new cache instance on the same directory sees the previews and their LRU order
+4. Atomic writes: no temporary files are left behind
+5. find_slides: serves the renderer with the most cached slides, never mixing renderers
+6. Shared directory: instances in different workers see each other's previews and
+   enforce max_bytes over everything on disk
+7. analyze_presentation: a second analysis of the same file serves slideImages from the cache
+"""
+
+import os
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings, HealthCheck
+from pptx import Presentation
+
+import pptx_analyzer
+from preview_cache import PreviewCache, PreviewKey
+from preview_encoding import split_data_url, to_data_url
+
+HASH = 'ab' * 32
+
+keys = st.builds(
+    PreviewKey,
+    fingerprint=st.sampled_from([HASH, 'cd' * 32, 'ef' * 32]),
+    renderer=st.sampled_from(['uno', 'libreoffice', 'full']),
+    resolution=st.sampled_from(['1920x1080', 'pdf-3x']),
+)
+
+
+def _files(root):
+    return [os.path.join(d, f) for d, _, files in os.walk(root) for f in files]
+
+
+class TestPreviewCache:
+
+    @given(key=keys, data=st.binary(min_size=1, max_size=5000),
+           mime=st.sampled_from(['image/png', 'image/jpeg', 'image/webp']))
+    @settings(max_examples=50, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_round_trip(self, tmp_path, key, data, mime):
+        cache = PreviewCache(str(tmp_path / 'previews'))
+        
+        assert cache.put(key, data, mime) is True
+        assert cache.get(key) == (data, mime)
+        assert split_data_url(to_data_url(data, mime)) == (data, mime)
+        assert not [f for f in _files(cache.root) if f.endswith('.part')]
+    
+    @given(sizes=st.lists(st.integers(1, 400), min_size=1, max_size=30), max_bytes=st.integers(400, 2000))
+    @settings(max_examples=30, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_size_is_bounded(self, tmp_path_factory, sizes, max_bytes):
+        cache = PreviewCache(str(tmp_path_factory.mktemp('previews')), max_bytes=max_bytes)
+        
+        for index, size in enumerate(sizes):
+            cache.put(PreviewKey(f'{index:064x}', 'uno', '1920x1080'), b'x' * size)
+            # The newest preview always survives
+            assert cache.get(PreviewKey(f'{index:064x}', 'uno', '1920x1080')) is not None
+            stats = cache.get_stats()
+            assert stats['totalBytes'] <= max_bytes
+            assert stats['totalBytes'] == sum(os.path.getsize(f) for f in _files(cache.root))
+    
+    def test_lru_keeps_recently_used(self, tmp_path):
+        cache = PreviewCache(str(tmp_path / 'previews'), max_bytes=300)
+        first, second, third = (PreviewKey(f'{i:064x}', 'uno', '1920x1080') for i in range(3))
+        
+        cache.put(first, b'a' * 100)
+        cache.put(second, b'b' * 100)
+        cache.put(third, b'c' * 100)
+        cache.get(first)
+        cache.put(PreviewKey(f'{3:064x}', 'uno', '1920x1080'), b'd' * 100)
+        
+        assert cache.get(first) is not None
+        assert cache.get(second) is None
+        assert cache.get_stats()['evictions'] == 1
+    
+    def test_persists_across_instances(self, tmp_path):
+        root = str(tmp_path / 'previews')
+        cache = PreviewCache(root, max_bytes=300)
+        first, second, third = (PreviewKey(f'{i:064x}', 'uno', '1920x1080') for i in range(3))
+        cache.put(first, b'a' * 100)
+        cache.put(second, b'b' * 100)
+        cache.put(third, b'c' * 100)
+        time.sleep(0.01)
+        cache.get(first)
+        
+        reopened = PreviewCache(root, max_bytes=300)
+        reopened.put(PreviewKey(f'{3:064x}', 'uno', '1920x1080'), b'd' * 100)
+        
+        assert reopened.get(first) == (b'a' * 100, 'image/png')
+        assert reopened.get(second) is None
+    
+    @given(writes=st.lists(st.tuples(st.booleans(), st.integers(1, 300)), min_size=1, max_size=30),
+           rescan_writes=st.integers(1, 5))
+    @settings(max_examples=30, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_shared_directory(self, tmp_path_factory, writes, rescan_writes):
+        root = str(tmp_path_factory.mktemp('previews'))
+        max_bytes = 1000
+        # Both workers open their index before the other one writes anything
+        workers = [PreviewCache(root, max_bytes=max_bytes, rescan_writes=rescan_writes) for _ in range(2)]
+        for worker in workers:
+            worker.get_stats()
+        
+        for index, (second, size) in enumerate(writes):
+            workers[second].put(PreviewKey(f'{index:064x}', 'uno', '1920x1080'), b'x' * size)
+            # Each worker rescans the disk at least every rescan_writes writes
+            on_disk = sum(os.path.getsize(f) for f in _files(root))
+            assert on_disk <= max_bytes + len(workers) * rescan_writes * 300
+        
+        # Once a worker rescans, its evictions count every worker's files
+        last = PreviewKey(f'{len(writes):064x}', 'uno', '1920x1080')
+        for _ in range(rescan_writes):
+            workers[0].put(last, b'y' * 300)
+        workers[0].put(last, b'y' * 300, 'image/webp')
+        assert sum(os.path.getsize(f) for f in _files(root)) <= max_bytes
+        # The other worker serves it without reopening its index
+        assert workers[1].get(last) == (b'y' * 300, 'image/webp')
+        assert workers[1].find_slides([last.fingerprint], [('uno', '1920x1080')])[1] == 'uno'
+    
+    def test_find_slides_prefers_most_complete_renderer(self, tmp_path):
+        cache = PreviewCache(str(tmp_path / 'previews'))
+        fingerprints = [f'{i:064x}' for i in range(3)]
+        images = [(bytes([i]) * 10, 'image/png') for i in range(3)]
+        
+        assert cache.put_slides(fingerprints, 'uno', '1920x1080', {0: images[0]}) == 1
+        assert cache.put_slides(fingerprints, 'libreoffice', 'pdf-3x', dict(enumerate(images[:2]))) == 2
+        renderers = [('uno', '1920x1080'), ('libreoffice', 'pdf-3x')]
+        
+        assert cache.find_slides(fingerprints, renderers) == ({0: images[0], 1: images[1]}, 'libreoffice')
+        assert cache.find_slides(fingerprints, renderers[:1]) == ({0: images[0]}, 'uno')
+        assert cache.find_slides(fingerprints[2:], renderers) == ({}, None)
+        
+        assert cache.invalidate(fingerprints[0]) == 2
+        assert cache.find_slides(fingerprints, renderers) == ({1: images[1]}, 'libreoffice')
+
+
+class TestAnalyzeUsesPreviewCache:
+
+    def test_second_analysis_skips_rendering(self, tmp_path, monkeypatch):
+        prs = Presentation()
+        for index in range(2):
+            prs.slides.add_slide(prs.slide_layouts[5]).shapes.title.text = f'Slide {index}'
+        deck = str(tmp_path / 'deck.pptx')
+        prs.save(deck)
+        
+        renders = []
+        
+        def fake_convert(path, progress_callback=None, slide_indices=None, binary=False):
+            renders.append(path)
+            return [(f'slide {i}'.encode(), 'image/png') for i in range(2)]
+        
+        monkeypatch.setattr(pptx_analyzer, 'preview_cache', PreviewCache(str(tmp_path / 'previews')))
+        monkeypatch.setattr(pptx_analyzer, 'UNO_AVAILABLE', False)
+        monkeypatch.setattr(pptx_analyzer, 'LIBREOFFICE_AVAILABLE', True)
+        monkeypatch.setattr(pptx_analyzer, 'convert_pptx_to_images', fake_convert, raising=False)
+        monkeypatch.setattr(pptx_analyzer, 'extract_dominant_color_from_preview', lambda image: '#FFFFFF')
+        
+        first = pptx_analyzer.analyze_presentation(deck)
+        second = pptx_analyzer.analyze_presentation(deck)
+        
+        assert renders == [deck]
+        assert second['slideImages'] == first['slideImages']
+        assert [s['preview'] for s in second['slides']] == first['slideImages']
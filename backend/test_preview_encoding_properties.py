@@ -0,0 +1,134 @@
+"""
+Property-Based Tests for PreviewEncoding
+
+Properties tested:
+1. Formats: every encoding produces an image of its format, size and MIME type; 'jpg' is an alias
+2. Transparency: JPEG flattens alpha onto white while PNG and WebP keep it
+3. PNG optimize: lossless, and smaller than the default PNG on flat slide content
+4. Transcode: data already in the target format is passed through untouched
+5. Binary transport: (bytes, MIME) and data URLs carry the same image
+6. analyze_presentation: previewTransport=url returns /api/previews URLs instead of base64
+"""
+
+import io
+import os
+import random
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import pytest
+from PIL import Image
+from pptx import Presentation
+
+import pptx_analyzer
+from preview_cache import PreviewCache
+from preview_encoding import (FORMAT_MIME_TYPES, PreviewEncoding, split_data_url, to_binary,
+                              to_data_url)
+
+PIL_FORMATS = {'png': 'PNG', 'jpeg': 'JPEG', 'webp': 'WEBP'}
+
+
+def _image(width, height, mode='RGB', seed=0):
+    rng = random.Random(seed)
+    channels = len(mode)
+    return Image.frombytes(mode, (width, height), bytes(rng.getrandbits(8) for _ in range(width * height * channels)))
+
+
+def _open(data):
+    return Image.open(io.BytesIO(data))
+
+
+class TestPreviewEncoding:
+
+    @given(image_format=st.sampled_from(['png', 'jpeg', 'jpg', 'webp', 'PNG', 'WebP']),
+           width=st.integers(1, 64), height=st.integers(1, 64),
+           mode=st.sampled_from(['RGB', 'RGBA', 'L', 'P']))
+    @settings(max_examples=40, deadline=None)
+    def test_formats(self, image_format, width, height, mode):
+        encoding = PreviewEncoding(image_format, quality=70)
+        data = encoding.encode(_image(width, height, 'RGB').convert(mode))
+        
+        assert encoding.format in FORMAT_MIME_TYPES
+        assert encoding.mime_type == FORMAT_MIME_TYPES[encoding.format]
+        image = _open(data)
+        assert image.format == PIL_FORMATS[encoding.format]
+        assert image.size == (width, height)
+    
+    def test_unknown_format_is_rejected(self):
+        with pytest.raises(ValueError):
+            PreviewEncoding('tiff')
+    
+    def test_transparency(self):
+        transparent = Image.new('RGBA', (8, 8), (255, 0, 0, 0))
+        
+        jpeg = _open(PreviewEncoding('jpeg', quality=95).encode(transparent)).convert('RGB')
+        assert all(c > 245 for c in jpeg.getpixel((4, 4)))
+        for image_format in ('png', 'webp'):
+            image = _open(PreviewEncoding(image_format).encode(transparent))
+            assert image.mode == 'RGBA'
+            assert image.getpixel((4, 4))[3] == 0
+    
+    @given(seed=st.integers(0, 1000), size=st.integers(8, 96))
+    @settings(max_examples=15, deadline=None)
+    def test_png_optimize_is_lossless(self, seed, size):
+        img = _image(size, size, seed=seed)
+        img.paste((30, 60, 90), (0, 0, size, size // 2))
+        optimized = PreviewEncoding('png', optimize=True).encode(img)
+        assert list(_open(optimized).convert('RGB').getdata()) == list(img.getdata())
+    
+    def test_png_optimize_shrinks_flat_content(self):
+        img = Image.new('RGB', (640, 360), 'white')
+        img.paste((30, 60, 90), (40, 40, 600, 120))
+        plain = PreviewEncoding('png').encode(img)
+        assert len(PreviewEncoding('png', optimize=True).encode(img)) < len(plain)
+    
+    def test_transcode(self):
+        png = PreviewEncoding('png').encode(_image(16, 9))
+        
+        assert PreviewEncoding('png').transcode(png, 'image/png') is png
+        webp = PreviewEncoding('webp').transcode(png, 'image/png')
+        assert _open(webp).format == 'WEBP'
+        assert _open(webp).size == (16, 9)
+    
+    @given(image_format=st.sampled_from(['png', 'jpeg', 'webp']), seed=st.integers(0, 100))
+    @settings(max_examples=15, deadline=None)
+    def test_binary_and_data_url_agree(self, image_format, seed):
+        encoding = PreviewEncoding(image_format)
+        data = encoding.encode(_image(12, 7, seed=seed))
+        
+        binary = encoding.output(data, binary=True)
+        data_url = encoding.output(data)
+        assert binary == (data, encoding.mime_type)
+        assert data_url == to_data_url(*binary)
+        assert split_data_url(data_url) == binary == to_binary(data_url) == to_binary(binary)
+
+
+class TestPreviewTransport:
+
+    def test_url_transport(self, tmp_path, monkeypatch):
+        def fake_convert(path, progress_callback=None, slide_indices=None, binary=False):
+            indices = range(2) if slide_indices is None else slide_indices
+            return [(PreviewEncoding('png').encode(_image(64, 36, seed=i)), 'image/png') for i in indices]
+        
+        monkeypatch.setattr(pptx_analyzer, 'preview_cache', PreviewCache(str(tmp_path / 'previews')))
+        monkeypatch.setattr(pptx_analyzer, 'UNO_AVAILABLE', False)
+        monkeypatch.setattr(pptx_analyzer, 'LIBREOFFICE_AVAILABLE', True)
+        monkeypatch.setattr(pptx_analyzer, 'convert_pptx_to_images', fake_convert, raising=False)
+        monkeypatch.setattr(pptx_analyzer, 'extract_dominant_color_from_preview', lambda image: '#FFFFFF')
+        
+        prs = Presentation()
+        for index in range(2):
+            prs.slides.add_slide(prs.slide_layouts[5]).shapes.title.text = f'Transport {index}'
+        deck = str(tmp_path / 'deck.pptx')
+        prs.save(deck)
+        
+        inline = pptx_analyzer.analyze_presentation(deck)
+        linked = pptx_analyzer.analyze_presentation(deck, preview_tier='thumb', preview_transport='url')
+        
+        assert all(image.startswith('data:image/png;base64,') for image in inline['slideImages'])
+        assert linked['previewTransport'] == 'url'
+        assert linked['slideImages'] == [f"/api/previews/{s['fingerprint']}?tier=thumb" for s in linked['slides']]
+        assert [s['preview'] for s in linked['slides']] == linked['slideImages']
@@ -0,0 +1,193 @@
+"""
+Property-Based Tests for preview tiers
+
+Properties tested:
+1. derive_tiers: every tier fits its width, keeps the aspect ratio and never upscales
+2. get_tier: smaller tiers are derived once from the cached full raster and then served from cache
+3. analyze_presentation: previewTier=thumb returns thumbnails plus each slide's fingerprint,
+   and the thumbnails are an order of magnitude smaller than the full previews
+4. GET /api/previews/{fingerprint}: serves any tier, honours If-None-Match and rejects bad input
+5. analyze_pdf: the pdf2image fallback honours previewTier like the PyMuPDF path and reports
+   the same previewTier/previewTransport keys
+"""
+
+import asyncio
+import base64
+import io
+import os
+import random
+import sys
+import types
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import fitz
+import httpx
+from fastapi import FastAPI
+from PIL import Image
+from pptx import Presentation
+
+import pptx_analyzer
+import routes.analysis
+from preview_cache import PreviewCache, PreviewKey
+from preview_encoding import to_data_url
+from preview_tiers import PREVIEW_TIERS, derive_tiers, get_tier
+
+FINGERPRINT = 'ab' * 32
+
+
+def _png(width, height, seed=0):
+    # Noisy content so PNG sizes scale with the pixel count
+    rng = random.Random(seed)
+    img = Image.frombytes('RGB', (width, height), bytes(rng.getrandbits(8) for _ in range(width * height * 3)))
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _size(data):
+    return Image.open(io.BytesIO(data)).size
+
+
+class TestDeriveTiers:
+
+    @given(width=st.integers(1, 2000), height=st.integers(1, 1200))
+    @settings(max_examples=20, deadline=None)
+    def test_tiers_fit_and_keep_aspect(self, width, height):
+        img = Image.new('RGB', (width, height), 'navy')
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        
+        tiers = derive_tiers(buffer.getvalue())
+        
+        assert set(tiers) == {t for t, w in PREVIEW_TIERS.items() if w}
+        for tier, (data, mime) in tiers.items():
+            tier_width, tier_height = _size(data)
+            assert mime == 'image/png'
+            assert tier_width == min(width, PREVIEW_TIERS[tier])
+            assert abs(tier_height - height * tier_width / width) <= 1
+    
+    def test_get_tier_derives_once(self, tmp_path):
+        cache = PreviewCache(str(tmp_path / 'previews'))
+        cache.put(PreviewKey(FINGERPRINT, 'uno', '1920x1080'), _png(1920, 1080))
+        
+        thumb = get_tier(cache, PreviewKey(FINGERPRINT, 'uno', '1920x1080', 'thumb'))
+        writes = cache.get_stats()['writes']
+        medium = get_tier(cache, PreviewKey(FINGERPRINT, 'uno', '1920x1080', 'medium'))
+        
+        assert _size(thumb[0]) == (320, 180)
+        assert _size(medium[0]) == (960, 540)
+        # Both tiers were stored by the first call
+        assert cache.get_stats()['writes'] == writes == 3
+        assert get_tier(cache, PreviewKey('cd' * 32, 'uno', '1920x1080', 'thumb')) is None
+
+
+class TestPreviewTierApi:
+
+    def _setup(self, tmp_path, monkeypatch):
+        cache = PreviewCache(str(tmp_path / 'previews'))
+        
+        def fake_convert(path, progress_callback=None, slide_indices=None, binary=False):
+            indices = range(2) if slide_indices is None else slide_indices
+            return [(_png(1920, 1080, seed=i), 'image/png') for i in indices]
+        
+        monkeypatch.setattr(pptx_analyzer, 'preview_cache', cache)
+        monkeypatch.setattr(routes.analysis, 'preview_cache', cache)
+        monkeypatch.setattr(pptx_analyzer, 'UNO_AVAILABLE', False)
+        monkeypatch.setattr(pptx_analyzer, 'LIBREOFFICE_AVAILABLE', True)
+        monkeypatch.setattr(pptx_analyzer, 'convert_pptx_to_images', fake_convert, raising=False)
+        monkeypatch.setattr(pptx_analyzer, 'extract_dominant_color_from_preview', lambda image: '#FFFFFF')
+        
+        prs = Presentation()
+        for index in range(2):
+            prs.slides.add_slide(prs.slide_layouts[5]).shapes.title.text = f'Tier {index}'
+        deck = str(tmp_path / 'deck.pptx')
+        prs.save(deck)
+        return deck
+    
+    def _get(self, url, headers=None):
+        app = FastAPI()
+        app.include_router(routes.analysis.router)
+        
+        async def fetch():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                return await client.get(url, headers=headers)
+        
+        return asyncio.run(fetch())
+    
+    def test_thumb_analysis_and_tier_endpoint(self, tmp_path, monkeypatch):
+        deck = self._setup(tmp_path, monkeypatch)
+        
+        full = pptx_analyzer.analyze_presentation(deck)
+        thumb = pptx_analyzer.analyze_presentation(deck, preview_tier='thumb')
+        
+        assert thumb['previewTier'] == 'thumb'
+        assert sum(map(len, thumb['slideImages'])) * 10 < sum(map(len, full['slideImages']))
+        assert [s['preview'] for s in thumb['slides']] == thumb['slideImages']
+        
+        fingerprint = thumb['slides'][1]['fingerprint']
+        response = self._get(f'/api/previews/{fingerprint}?tier=medium')
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'image/png'
+        assert _size(response.content) == (960, 540)
+        assert 'immutable' in response.headers['cache-control']
+        
+        response = self._get(f'/api/previews/{fingerprint}?tier=thumb')
+        assert to_data_url(response.content, 'image/png') == thumb['slideImages'][1]
+        
+        again = self._get(f'/api/previews/{fingerprint}?tier=thumb', headers={'If-None-Match': response.headers['etag']})
+        assert again.status_code == 304
+        
+        full_preview = self._get(f'/api/previews/{fingerprint}')
+        assert base64.b64encode(full_preview.content).decode() == full['slideImages'][1].split(',', 1)[1]
+    
+    def test_bad_requests(self, tmp_path, monkeypatch):
+        self._setup(tmp_path, monkeypatch)
+        
+        assert self._get(f'/api/previews/{FINGERPRINT}?tier=huge').status_code == 400
+        assert self._get('/api/previews/not-a-fingerprint').status_code == 400
+        assert self._get(f'/api/previews/{FINGERPRINT}?tier=thumb').status_code == 404
+
+
+
+class TestPdfPreviewTiers:
+
+    def _pdf(self, tmp_path, pages=2):
+        path = str(tmp_path / 'deck.pdf')
+        with fitz.open() as doc:
+            for index in range(pages):
+                doc.new_page(width=960, height=540).insert_text((72, 72), f'Page {index + 1}', fontsize=48)
+            doc.save(path)
+        return path
+    
+    def _without_pymupdf(self, monkeypatch):
+        renders = []
+        
+        def convert_from_path(pdf_path, dpi=200):
+            renders.append(dpi)
+            with fitz.open(pdf_path) as doc:
+                return [Image.open(io.BytesIO(page.get_pixmap(dpi=dpi).tobytes('png'))) for page in doc]
+        
+        monkeypatch.setitem(sys.modules, 'fitz', None)
+        monkeypatch.setitem(sys.modules, 'pdf2image', types.SimpleNamespace(convert_from_path=convert_from_path))
+        return renders
+    
+    def test_fallback_honours_tier(self, tmp_path, monkeypatch):
+        pdf = self._pdf(tmp_path)
+        pymupdf = routes.analysis.analyze_pdf(pdf, preview_tier='thumb')
+        renders = self._without_pymupdf(monkeypatch)
+        
+        full = routes.analysis.analyze_pdf(pdf)
+        thumb = routes.analysis.analyze_pdf(pdf, preview_tier='thumb')
+        assert renders == [150, 150]
+        assert set(thumb) == set(pymupdf)
+        assert (thumb['previewTier'], thumb['previewTransport']) == ('thumb', 'inline')
+        assert full['previewTier'] == 'full'
+        assert [s['preview'] for s in thumb['slides']] == thumb['slideImages']
+        for preview in thumb['slideImages']:
+            header, data = preview.split(',', 1)
+            assert header == 'data:image/png;base64'
+            assert _size(base64.b64decode(data))[0] == PREVIEW_TIERS['thumb']
+        assert sum(map(len, thumb['slideImages'])) < sum(map(len, full['slideImages']))
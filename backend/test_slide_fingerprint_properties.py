@@ -0,0 +1,181 @@
+"""
+Property-Based Tests for per-slide fingerprints
+
+Properties tested:
+1. Canonicalization: attribute order and namespace declarations do not change the hash
+2. Stability: saving and reopening a deck keeps every fingerprint
+3. Locality: editing a slide changes only its fingerprint; editing a layout changes
+   only the slides that use it; replacing an image changes the slides that show it
+4. SlideAnalysisCache: bounded by bytes, and every get returns an independent copy
+5. analyze_presentation: after editing one slide only that slide is rendered and analysed
+6. A renderer that returns fewer images than slides falls back to placeholders and
+   caches nothing, instead of shifting previews onto other slides
+"""
+
+import io
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+
+import pptx_analyzer
+from preview_cache import PreviewCache
+from slide_fingerprint import SlideAnalysisCache, canonical_xml, fingerprint_slides
+
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer
+
+
+def _deck(texts, layouts=None):
+    prs = Presentation()
+    for index, text in enumerate(texts):
+        layout = prs.slide_layouts[layouts[index] if layouts else 5]
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = text
+    return prs
+
+
+def _reload(prs):
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    buffer.seek(0)
+    return Presentation(buffer)
+
+
+texts = st.lists(st.text(st.characters(whitelist_categories=('L', 'N')), min_size=1, max_size=12),
+                 min_size=1, max_size=5)
+
+
+class TestSlideFingerprint:
+
+    def test_canonical_xml_ignores_serialization_details(self):
+        first = b'<a:r xmlns:a="urn:a" x="1" y="2"><a:t>hola</a:t></a:r>'
+        second = b'<?xml version="1.0"?>\n<a:r  y="2" x="1" xmlns:a="urn:a"><a:t>hola</a:t></a:r>'
+        assert canonical_xml(first) == canonical_xml(second)
+        assert canonical_xml(first) != canonical_xml(first.replace(b'hola', b'chao'))
+    
+    @given(texts=texts)
+    @settings(max_examples=15, deadline=None)
+    def test_stable_across_save(self, texts):
+        prs = _deck(texts)
+        assert fingerprint_slides(_reload(prs)) == fingerprint_slides(prs)
+    
+    @given(texts=texts, data=st.data())
+    @settings(max_examples=15, deadline=None)
+    def test_editing_a_slide_changes_only_its_fingerprint(self, texts, data):
+        prs = _reload(_deck(texts))
+        before = fingerprint_slides(prs)
+        edited = data.draw(st.integers(0, len(texts) - 1))
+        
+        prs.slides[edited].shapes.title.text = texts[edited] + ' editado'
+        after = fingerprint_slides(_reload(prs))
+        
+        assert [i for i in range(len(texts)) if before[i] != after[i]] == [edited]
+    
+    def test_editing_a_layout_changes_its_slides(self):
+        prs = _reload(_deck(['a', 'b', 'c'], layouts=[5, 1, 5]))
+        before = fingerprint_slides(prs)
+        
+        prs.slide_layouts[5].name = 'Solo título editado'
+        after = fingerprint_slides(_reload(prs))
+        
+        assert [before[i] != after[i] for i in range(3)] == [True, False, True]
+    
+    def test_replacing_an_image_changes_its_slide(self):
+        def build(color):
+            prs = _deck(['a', 'b'])
+            prs.slides[1].shapes.add_picture(_png(color), Inches(1), Inches(1))
+            return _reload(prs)
+        
+        red, blue = fingerprint_slides(build('red')), fingerprint_slides(build('blue'))
+        assert red[0] == blue[0]
+        assert red[1] != blue[1]
+
+
+class TestSlideAnalysisCache:
+
+    @given(sizes=st.lists(st.integers(0, 300), min_size=1, max_size=20), max_bytes=st.integers(350, 1500))
+    def test_size_is_bounded(self, sizes, max_bytes):
+        cache = SlideAnalysisCache(max_bytes=max_bytes)
+        for index, size in enumerate(sizes):
+            assert cache.put(f'fp{index}', {'text': 'x' * size}) is True
+            assert cache.get(f'fp{index}') == {'text': 'x' * size}
+            assert cache.get_stats()['totalBytes'] <= max_bytes
+    
+    def test_get_returns_a_copy(self):
+        cache = SlideAnalysisCache()
+        cache.put('fp', {'textAreas': [{'text': 'hola'}]})
+        cache.get('fp')['textAreas'].append({'text': 'mutado'})
+        assert cache.get('fp') == {'textAreas': [{'text': 'hola'}]}
+
+
+class TestIncrementalAnalysis:
+
+    def test_only_edited_slide_is_rerendered(self, tmp_path, monkeypatch):
+        renders = []
+        
+        def fake_convert(path, progress_callback=None, slide_indices=None, binary=False):
+            renders.append(slide_indices)
+            indices = range(3) if slide_indices is None else slide_indices
+            return [(f'{os.path.basename(path)} {i}'.encode(), 'image/png') for i in indices]
+        
+        analysis_cache = SlideAnalysisCache()
+        monkeypatch.setattr(pptx_analyzer, 'preview_cache', PreviewCache(str(tmp_path / 'previews')))
+        monkeypatch.setattr(pptx_analyzer, 'slide_analysis_cache', analysis_cache)
+        monkeypatch.setattr(pptx_analyzer, 'UNO_AVAILABLE', False)
+        monkeypatch.setattr(pptx_analyzer, 'LIBREOFFICE_AVAILABLE', True)
+        monkeypatch.setattr(pptx_analyzer, 'convert_pptx_to_images', fake_convert, raising=False)
+        monkeypatch.setattr(pptx_analyzer, 'extract_dominant_color_from_preview', lambda image: '#FFFFFF')
+        
+        prs = _deck(['uno', 'dos', 'tres'])
+        prs.save(str(tmp_path / 'v1.pptx'))
+        prs.slides[1].shapes.title.text = 'dos editado'
+        prs.save(str(tmp_path / 'v2.pptx'))
+        
+        first = pptx_analyzer.analyze_presentation(str(tmp_path / 'v1.pptx'))
+        second = pptx_analyzer.analyze_presentation(str(tmp_path / 'v2.pptx'))
+        
+        assert renders == [None, [1]]
+        assert second['slideImages'][0] == first['slideImages'][0]
+        assert second['slideImages'][2] == first['slideImages'][2]
+        assert second['slideImages'][1] != first['slideImages'][1]
+        assert analysis_cache.get_stats()['hits'] == 2
+        assert [s['number'] for s in second['slides']] == [1, 2, 3]
+        assert second['slides'][0]['isCover'] is True
+        assert [s['preview'] for s in second['slides']] == second['slideImages']
+        assert second['slides'][1]['textAreas'][0]['text'] == 'dos editado'
+        for index in (0, 2):
+            assert second['slides'][index]['textAreas'] == first['slides'][index]['textAreas']
+    
+    def test_short_render_is_not_cached(self, tmp_path, monkeypatch):
+        # E.g. LibreOffice leaving a hidden slide out of the PDF
+        def fake_convert(path, progress_callback=None, slide_indices=None, binary=False):
+            return [(f'slide {i}'.encode(), 'image/png') for i in (0, 2)]
+        
+        cache = PreviewCache(str(tmp_path / 'previews'))
+        monkeypatch.setattr(pptx_analyzer, 'preview_cache', cache)
+        monkeypatch.setattr(pptx_analyzer, 'UNO_AVAILABLE', False)
+        monkeypatch.setattr(pptx_analyzer, 'LIBREOFFICE_AVAILABLE', True)
+        monkeypatch.setattr(pptx_analyzer, 'FULL_RENDERER_AVAILABLE', False)
+        monkeypatch.setattr(pptx_analyzer, 'convert_pptx_to_images', fake_convert, raising=False)
+        
+        prs = _deck(['uno', 'dos', 'tres'])
+        path = str(tmp_path / 'deck.pptx')
+        prs.save(path)
+        prs = Presentation(path)
+        fingerprints = fingerprint_slides(prs)
+        
+        images, renderers = pptx_analyzer.render_slide_previews(path, prs, fingerprints)
+        assert renderers == [None, None, None]
+        assert all(not data.startswith(b'slide') for data, _ in images)
+        assert cache.find_slides(fingerprints, [('libreoffice', pptx_analyzer.PREVIEW_RESOLUTIONS['libreoffice'])]) == ({}, None)
@@ -0,0 +1,169 @@
+"""
+Property-Based Tests for slide-range rendering
+
+Properties tested:
+1. page_range: the LibreOffice PageRange string covers exactly the requested slides
+2. PDF rasterization: only the requested pages are rendered, in ascending order
+3. Headless path: the PageRange filter option reaches LibreOffice and, if it is
+   ignored (whole deck exported), the requested pages are still the only ones rendered
+4. Filter options are passed to `--convert-to` in its JSON syntax
+5. Hidden slides are exported too, so PDF page N is slide N; a PDF that still
+   leaves them out is discarded instead of shifting slides onto the wrong pages
+"""
+
+import base64
+import io
+import json
+import os
+import stat
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import fitz
+import pytest
+from PIL import Image
+from pptx import Presentation
+
+import pptx_to_images
+from libreoffice_pool import LibreOfficePool
+from pptx_to_images import convert_pdf_to_images, page_range
+
+# Distinct page colours, so a rendered image identifies its page
+COLORS = [(1, 0, 0), (0, 1, 0), (0, 0, 1), (1, 1, 0), (0, 1, 1), (1, 0, 1)]
+
+
+def _parse_range(value):
+    pages = set()
+    for part in value.split(','):
+        start, _, end = part.partition('-')
+        pages.update(range(int(start), int(end or start) + 1))
+    return pages
+
+
+def _write_pdf(path, page_indices):
+    doc = fitz.open()
+    for index in page_indices:
+        page = doc.new_page(width=80, height=60)
+        page.draw_rect(page.rect, color=COLORS[index], fill=COLORS[index])
+    doc.save(path)
+    doc.close()
+
+
+def _page_color(data_url):
+    img = Image.open(io.BytesIO(base64.b64decode(data_url.split(',')[1]))).convert('RGB')
+    return tuple(round(c / 255) for c in img.getpixel((img.width // 2, img.height // 2)))
+
+
+def _deck(path, slides):
+    prs = Presentation()
+    for _ in range(slides):
+        prs.slides.add_slide(prs.slide_layouts[6])
+    prs.save(path)
+    return str(path)
+
+
+class FakePool:
+    """Stands in for the LibreOffice pool: writes one PDF page per exported slide."""
+    
+    def __init__(self, slides, honour_page_range, hidden=(), honour_hidden=True):
+        self.slides = slides
+        self.honour_page_range = honour_page_range
+        self.hidden = set(hidden)
+        self.honour_hidden = honour_hidden
+        self.calls = []
+    
+    def convert(self, input_path, target_format='pdf', out_dir=None, timeout=None, filter_options=None):
+        self.calls.append(filter_options)
+        pages = range(self.slides)
+        if 'PageRange' in filter_options and self.honour_page_range:
+            pages = sorted(p - 1 for p in _parse_range(filter_options['PageRange']))
+        if not (filter_options.get('ExportHiddenSlides') and self.honour_hidden):
+            pages = [p for p in pages if p not in self.hidden]
+        output = os.path.join(out_dir, 'deck.pdf')
+        _write_pdf(output, pages)
+        return output
+
+
+class TestSlideRange:
+
+    @given(indices=st.lists(st.integers(0, 200), min_size=1, max_size=30))
+    def test_page_range_round_trips(self, indices):
+        assert _parse_range(page_range(indices)) == {i + 1 for i in indices}
+    
+    @given(pages=st.lists(st.integers(-2, 8), max_size=8))
+    @settings(max_examples=20, deadline=None)
+    def test_pdf_only_requested_pages(self, tmp_path_factory, pages):
+        pdf = str(tmp_path_factory.mktemp('pdf') / 'doc.pdf')
+        _write_pdf(pdf, range(len(COLORS)))
+        progress = []
+        
+        images = convert_pdf_to_images(pdf, progress_callback=lambda d, t: progress.append((d, t)), pages=pages)
+        
+        expected = [p for p in sorted(set(pages)) if 0 <= p < len(COLORS)]
+        assert [_page_color(image) for image in images] == [COLORS[p] for p in expected]
+        assert progress == [(n, len(expected)) for n in range(1, len(expected) + 1)]
+    
+    @pytest.mark.parametrize('honour_page_range', [True, False])
+    def test_headless_renders_requested_slides(self, tmp_path, monkeypatch, honour_page_range):
+        pool = FakePool(slides=5, honour_page_range=honour_page_range)
+        monkeypatch.setattr(pptx_to_images, 'libreoffice_pool', pool)
+        monkeypatch.setattr(pptx_to_images, 'LIBREOFFICE_PATH', 'soffice')
+        deck = _deck(tmp_path / 'deck.pptx', 5)
+        
+        images = pptx_to_images.convert_pptx_to_images(deck, slide_indices=[3, 1, 3, 9])
+        
+        assert pool.calls == [{'ExportHiddenSlides': True, 'PageRange': '2,4'}]
+        assert [_page_color(image) for image in images] == [COLORS[1], COLORS[3]]
+    
+    def test_out_of_range_slides_skip_libreoffice(self, tmp_path, monkeypatch):
+        pool = FakePool(slides=2, honour_page_range=True)
+        monkeypatch.setattr(pptx_to_images, 'libreoffice_pool', pool)
+        monkeypatch.setattr(pptx_to_images, 'LIBREOFFICE_PATH', 'soffice')
+        
+        assert pptx_to_images.convert_pptx_to_images(_deck(tmp_path / 'deck.pptx', 2), slide_indices=[5]) == []
+        assert pool.calls == []
+    
+    @pytest.mark.parametrize('slide_indices', [None, [1, 2]])
+    def test_hidden_slide_keeps_page_order(self, tmp_path, monkeypatch, slide_indices):
+        pool = FakePool(slides=4, honour_page_range=True, hidden={1})
+        monkeypatch.setattr(pptx_to_images, 'libreoffice_pool', pool)
+        monkeypatch.setattr(pptx_to_images, 'LIBREOFFICE_PATH', 'soffice')
+        deck = _deck(tmp_path / 'deck.pptx', 4)
+        
+        images = pptx_to_images.convert_pptx_to_images(deck, slide_indices=slide_indices)
+        expected = slide_indices if slide_indices is not None else range(4)
+        assert [_page_color(image) for image in images] == [COLORS[i] for i in expected]
+        
+        # A LibreOffice that ignores ExportHiddenSlides: nothing rather than wrong slides
+        pool.honour_hidden = False
+        assert pptx_to_images.convert_pptx_to_images(deck, slide_indices=slide_indices) == []
+    
+    def test_filter_options_reach_convert_to(self, tmp_path):
+        log = tmp_path / 'args.json'
+        script = tmp_path / 'soffice'
+        script.write_text(
+            f"#!{sys.executable}\n"
+            "import json, os, sys\n"
+            f"json.dump(sys.argv[1:], open({str(log)!r}, 'w'))\n"
+            "out_dir = sys.argv[sys.argv.index('--outdir') + 1]\n"
+            "open(os.path.join(out_dir, 'deck.pdf'), 'w').close()\n"
+        )
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        pool = LibreOfficePool(size=1, soffice_path=str(script), profile_root=str(tmp_path / 'profiles'), use_uno=False)
+        deck = tmp_path / 'deck.pptx'
+        deck.write_bytes(b'PK')
+        
+        pool.convert(str(deck), 'pdf', filter_options={'PageRange': '1-2', 'ExportNotes': False})
+        pool.shutdown()
+        
+        args = json.loads(log.read_text())
+        convert_to = args[args.index('--convert-to') + 1]
+        fmt, filter_name, options = convert_to.split(':', 2)
+        assert (fmt, filter_name) == ('pdf', 'impress_pdf_Export')
+        assert json.loads(options) == {
+            'PageRange': {'type': 'string', 'value': '1-2'},
+            'ExportNotes': {'type': 'boolean', 'value': 'false'},
+        }
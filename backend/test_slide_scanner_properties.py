@@ -0,0 +1,198 @@
+"""
+Property-Based Tests for the single-pass slide scanner
+
+Properties tested:
+1. Equivalence: shape ids, placeholders, positions, font sizes and runs from scan_slide
+   match the descendant lookups the cloner used to run per shape
+2. Preservation features (timing, transition, gradients, shadows, 3D, SmartArt,
+   shapes, tables) are detected in one traversal
+3. The tree is walked once before and once after modifying a slide, and lost
+   elements are still reported by the verification
+"""
+
+import os
+import sys
+import zipfile
+from io import BytesIO
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+from lxml import etree
+from pptx import Presentation
+from pptx.util import Inches, Pt
+
+import pptx_xml_cloner
+import slide_scanner
+from pptx_xml_cloner import NAMESPACES, PPTXXMLCloner
+from slide_scanner import scan_slide
+
+NS_P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+NS_A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+NS_DGM = '{http://schemas.openxmlformats.org/drawingml/2006/diagram}'
+
+
+def _slide_roots(prs):
+    buffer = BytesIO()
+    prs.save(buffer)
+    with zipfile.ZipFile(buffer) as zf:
+        names = sorted(n for n in zf.namelist() if pptx_xml_cloner.SLIDE_PART_RE.match(n))
+        return [etree.fromstring(zf.read(n)) for n in names]
+
+
+def _reference_shape(shape):
+    """The per-shape descendant lookups the cloner ran before the scanner."""
+    ph_type = None
+    ph = shape.find('.//p:nvSpPr/p:nvPr/p:ph', NAMESPACES)
+    if ph is not None:
+        ph_type = ph.get('type', '')
+    off = shape.find('.//p:spPr/a:xfrm/a:off', NAMESPACES)
+    font_size = None
+    run = shape.find('.//p:txBody/a:p/a:r', NAMESPACES)
+    first_para = shape.find('.//p:txBody/a:p', NAMESPACES)
+    if run is not None and run.getparent() is first_para:
+        rPr = run.find('.//a:rPr', NAMESPACES)
+        font_size = rPr.get('sz') if rPr is not None else None
+    runs = []
+    txBody = shape.find('.//p:txBody', NAMESPACES)
+    if txBody is not None:
+        for para_idx, para in enumerate(txBody.findall('.//a:p', NAMESPACES)):
+            for run_idx, r in enumerate(para.findall('.//a:r', NAMESPACES)):
+                runs.append((para_idx, run_idx, r.find('.//a:t', NAMESPACES)))
+    return {
+        'id': int(shape.find('.//p:nvSpPr/p:cNvPr', NAMESPACES).get('id')),
+        'ph': ph_type,
+        'y': int(off.get('y')) if off is not None else None,
+        'sz': font_size,
+        'runs': runs,
+    }
+
+
+slides_strategy = st.lists(
+    st.tuples(
+        st.sampled_from([0, 1, 5, 6]),
+        st.lists(st.tuples(st.integers(0, 6), st.integers(8, 40), st.integers(1, 3)), max_size=3)
+    ),
+    min_size=1, max_size=4
+)
+
+
+class TestEquivalence:
+
+    @given(slides=slides_strategy)
+    @settings(max_examples=25, deadline=None)
+    def test_matches_descendant_lookups(self, slides):
+        prs = Presentation()
+        for layout, boxes in slides:
+            slide = prs.slides.add_slide(prs.slide_layouts[layout])
+            for top, size, paragraphs in boxes:
+                frame = slide.shapes.add_textbox(Inches(1), Inches(top), Inches(6), Inches(1)).text_frame
+                frame.text = 'Texto'
+                frame.paragraphs[0].runs[0].font.size = Pt(size)
+                for extra in range(1, paragraphs):
+                    frame.add_paragraph().text = f'Línea {extra}'
+        roots = _slide_roots(prs)
+        
+        for root in roots:
+            index = scan_slide(root)
+            shapes = root.findall('.//p:sp', NAMESPACES)
+            assert [s.element for s in index.shapes] == shapes
+            for shape in index.shapes:
+                expected = _reference_shape(shape.element)
+                assert shape.shape_id == expected['id']
+                assert shape.placeholder_type == expected['ph']
+                assert shape.y_pos == expected['y']
+                assert shape.font_size == expected['sz']
+                assert [(r.para_idx, r.run_idx, r.text) for r in shape.runs] == expected['runs']
+    
+    def test_detected_text_types(self, tmp_path):
+        prs = Presentation()
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = 'Título'
+        slide.placeholders[1].text = 'Cuerpo'
+        low = slide.shapes.add_textbox(Inches(1), Inches(6), Inches(4), Inches(1)).text_frame
+        low.text = 'Grande'
+        low.paragraphs[0].runs[0].font.size = Pt(20)
+        path = str(tmp_path / 'deck.pptx')
+        prs.save(path)
+        
+        cloner = PPTXXMLCloner(path, use_cache=False)
+        assert [t.text_type for t in cloner.text_map[0]] == ['title', 'body', 'subtitle']
+        assert [t.original_text for t in cloner.text_map[0]] == ['Título', 'Cuerpo', 'Grande']
+
+
+class TestPreservationFeatures:
+
+    def _root(self):
+        prs = Presentation()
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = 'Título'
+        slide.shapes.add_table(2, 2, Inches(1), Inches(3), Inches(4), Inches(1))
+        roots = _slide_roots(prs)
+        return roots[0]
+    
+    @given(features=st.sets(st.sampled_from(['timing', 'transition', 'gradFill', 'outerShdw', 'sp3d', 'dgm'])))
+    @settings(max_examples=30, deadline=None)
+    def test_features_detected(self, features):
+        root = self._root()
+        sp_pr = root.find('.//p:sp/p:spPr', NAMESPACES)
+        for feature in features:
+            if feature in ('timing', 'transition'):
+                etree.SubElement(root, f'{NS_P}{feature}')
+            elif feature == 'dgm':
+                etree.SubElement(sp_pr, f'{NS_DGM}relIds')
+            else:
+                etree.SubElement(sp_pr, f'{NS_A}{feature}')
+        
+        state = scan_slide(root).preservation_state()
+        assert state['has_timing'] == ('timing' in features)
+        assert state['has_transition'] == ('transition' in features)
+        assert state['has_gradient'] == ('gradFill' in features)
+        assert state['has_shadow'] == ('outerShdw' in features)
+        assert state['has_3d'] == ('sp3d' in features)
+        assert state['has_smartart'] == ('dgm' in features)
+        assert state['shape_count'] == len(root.findall('.//p:sp', NAMESPACES))
+        assert len(scan_slide(root).tables) == 1
+
+
+class TestClonerUsesIndex:
+
+    def test_one_scan_before_and_after(self, monkeypatch, tmp_path):
+        prs = Presentation()
+        for _ in range(2):
+            slide = prs.slides.add_slide(prs.slide_layouts[1])
+            slide.shapes.title.text = 'Título plantilla'
+            slide.placeholders[1].text = 'Agregar texto'
+        path = str(tmp_path / 'deck.pptx')
+        prs.save(path)
+        cloner = PPTXXMLCloner(path, use_cache=False)
+        
+        scans = []
+        original = slide_scanner.scan_slide
+        
+        def counting(root):
+            scans.append(root)
+            return original(root)
+        
+        monkeypatch.setattr(pptx_xml_cloner, 'scan_slide', counting)
+        output = BytesIO()
+        cloner.clone_to_stream([{'title': 'Nuevo', 'bullets': ['Uno']}] * 2, output=output)
+        assert len(scans) == 4
+        
+        output.seek(0)
+        titles = [s.shapes.title.text for s in Presentation(output).slides]
+        assert titles == ['Nuevo', 'Nuevo']
+    
+    def test_lost_elements_are_reported(self):
+        cloner = PPTXXMLCloner.__new__(PPTXXMLCloner)
+        root = etree.fromstring(
+            f'<p:sld xmlns:p="{NS_P[1:-1]}" xmlns:a="{NS_A[1:-1]}"><p:cSld><p:spTree>'
+            '<p:sp><p:spPr><a:gradFill/></p:spPr></p:sp></p:spTree></p:cSld><p:timing/></p:sld>'
+        )
+        before = cloner._capture_preservation_state(scan_slide(root), 0)
+        assert cloner._verify_preservation(scan_slide(root), before, 0)
+        
+        root.remove(root.find('p:timing', NAMESPACES))
+        root.find('.//p:sp', NAMESPACES).getparent().remove(root.find('.//p:sp', NAMESPACES))
+        assert not cloner._verify_preservation(scan_slide(root), before, 0)
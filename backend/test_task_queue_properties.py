@@ -0,0 +1,145 @@
+"""
+Property-Based Tests for TaskQueue executor backends
+
+Properties tested:
+1. Results: any task returns the same value on the thread and process backends
+2. Keyword arguments are forwarded to the task function
+3. Process workers are recycled after max_tasks_per_child tasks
+4. get_queue_status reports utilization per backend
+5. Progress: per-slide progress reaches the task store on both backends
+"""
+
+import asyncio
+import operator
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import pytest
+
+from core.task_queue import TaskQueue, TaskStatus, ThreadBackend, ProcessBackend, TaskProgress
+from core.task_store import MemoryTaskStore
+from pptx_xml_cloner import clone_pptx_preserving_all
+from test_xml_cloner_streaming import build_template
+
+
+class RecordingStore(MemoryTaskStore):
+    """Memory store that remembers every progress update."""
+    
+    def __init__(self):
+        super().__init__()
+        self.progress_updates = []
+    
+    def set_progress(self, task_id, progress):
+        self.progress_updates.append(progress)
+        super().set_progress(task_id, progress)
+
+
+def run_task(queue: TaskQueue, func, *args, **kwargs):
+    task = queue.create_task()
+    asyncio.run(queue.run_in_background(task.id, func, *args, **kwargs))
+    return task
+
+
+@pytest.fixture(scope='module')
+def process_queue():
+    queue = TaskQueue(max_concurrent=2, backend=ProcessBackend(max_workers=2, preload_modules=()))
+    queue.register_backend(ThreadBackend(max_workers=2))
+    yield queue
+    queue.shutdown()
+
+
+class TestExecutorBackends:
+
+    @given(a=st.integers(), b=st.integers())
+    @settings(max_examples=10, deadline=None)
+    def test_backends_agree(self, process_queue, a, b):
+        """The same task gives the same result on both backends."""
+        on_process = run_task(process_queue, operator.add, a, b)
+        on_thread = run_task(process_queue, operator.add, a, b, backend='thread')
+        
+        assert on_process.status == TaskStatus.COMPLETED
+        assert on_process.result == on_thread.result == a + b
+    
+    def test_process_backend_runs_out_of_process(self, process_queue):
+        task = run_task(process_queue, os.getpid)
+        assert task.status == TaskStatus.COMPLETED
+        assert task.result != os.getpid()
+    
+    def test_kwargs_forwarded(self, process_queue):
+        task = run_task(process_queue, int, '7f', base=16)
+        assert task.result == 0x7f
+    
+    def test_failures_are_reported(self, process_queue):
+        task = run_task(process_queue, int, 'not a number')
+        assert task.status == TaskStatus.FAILED
+        assert 'not a number' in task.error
+    
+    def test_queue_status_per_backend(self, process_queue):
+        status = process_queue.get_queue_status()
+        
+        assert status['default_backend'] == 'process'
+        assert set(status['backends']) == {'process', 'thread'}
+        for stats in status['backends'].values():
+            assert stats['active'] == 0
+            assert 0 <= stats['utilization'] <= 1
+            assert stats['completed'] + stats['failed'] == stats['submitted']
+
+
+class TestWorkerRecycling:
+
+    def test_workers_recycled_after_max_tasks(self):
+        """With max_tasks_per_child=1 every task runs in a fresh process."""
+        queue = TaskQueue(max_concurrent=1,
+                          backend=ProcessBackend(max_workers=1, max_tasks_per_child=1, preload_modules=()))
+        try:
+            pids = [run_task(queue, os.getpid).result for _ in range(3)]
+            assert len(set(pids)) == 3
+        finally:
+            queue.shutdown()
+    
+    def test_warm_up_spawns_workers(self):
+        backend = ProcessBackend(max_workers=2, preload_modules=('json',))
+        try:
+            backend.warm_up()
+            assert len(backend.executor._processes) == 2
+        finally:
+            backend.shutdown()
+
+
+class TestProgressReporting:
+
+    @given(total=st.integers(min_value=1, max_value=200))
+    @settings(max_examples=50)
+    def test_progress_is_monotonic_and_below_100(self, total):
+        updates = []
+        progress = TaskProgress('t1', lambda task_id, percent: updates.append(percent))
+        for current in range(1, total + 1):
+            progress(current, total)
+        
+        assert updates == sorted(set(updates))
+        assert all(0 <= percent <= 99 for percent in updates)
+    
+    @pytest.mark.parametrize('backend_factory', [
+        lambda: ThreadBackend(max_workers=1),
+        lambda: ProcessBackend(max_workers=1, preload_modules=()),
+    ], ids=['thread', 'process'])
+    def test_clone_progress_reaches_store(self, tmp_path, backend_factory):
+        """Each cloned slide reports progress, then completion sets 100."""
+        path = build_template(str(tmp_path / 'template.pptx'), slide_count=4)
+        store = RecordingStore()
+        queue = TaskQueue(max_concurrent=1, backend=backend_factory(), store=store)
+        task = None
+        try:
+            task = run_task(queue, clone_pptx_preserving_all, path, [{'title': 'Uno'}])
+            
+            assert task.status == TaskStatus.COMPLETED
+            assert store.progress_updates == [25, 50, 75, 99]
+            assert queue.get_task(task.id).progress == 100
+        finally:
+            queue.shutdown()
+            if task and task.result and os.path.exists(task.result):
+                os.unlink(task.result)
@@ -0,0 +1,208 @@
+"""
+Property-Based Tests for the durable SQLite task store
+
+Properties tested:
+1. Exactly-once claims: concurrent workers never claim the same task twice
+2. Cross-worker visibility: a task submitted on one queue is run by another
+   and its result is readable from both
+3. Restart safety: tasks left running by a dead worker are requeued, and
+   failed after TASK_MAX_ATTEMPTS claims
+4. Round trip: Task fields survive save/get
+5. A failed task keeps the last progress it reported
+6. Heartbeats keep flowing while the event loop is blocked
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings, HealthCheck
+import pytest
+
+from core.task_queue import TaskQueue, ThreadBackend, callable_path, resolve_callable
+from core.task_store import SQLiteTaskStore, Task, TaskStatus
+
+
+def make_queue(db_path: str) -> TaskQueue:
+    return TaskQueue(max_concurrent=2, backend=ThreadBackend(max_workers=2),
+                     store=SQLiteTaskStore(db_path))
+
+
+class TestClaims:
+
+    @given(task_count=st.integers(min_value=1, max_value=30),
+           worker_count=st.integers(min_value=1, max_value=6))
+    @settings(max_examples=20, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_each_task_claimed_once(self, tmp_path_factory, task_count, worker_count):
+        """However many workers race, every task is claimed exactly once."""
+        db_path = str(tmp_path_factory.mktemp('claims') / 'tasks.db')
+        store = SQLiteTaskStore(db_path)
+        for idx in range(task_count):
+            store.add(Task(id=f'task{idx}'), 'operator:add', (idx, 1))
+        
+        claimed = []
+        lock = threading.Lock()
+        
+        def worker(name):
+            worker_store = SQLiteTaskStore(db_path)
+            while True:
+                item = worker_store.claim_next(name)
+                if item is None:
+                    return
+                with lock:
+                    claimed.append(item[0].id)
+        
+        threads = [threading.Thread(target=worker, args=(f'w{n}',)) for n in range(worker_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert sorted(claimed) == sorted(f'task{idx}' for idx in range(task_count))
+    
+    def test_claim_returns_call(self, tmp_path):
+        store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+        store.add(Task(id='t1'), 'builtins:int', ('7f',), {'base': 16}, 'thread')
+        
+        task, func_path, args, kwargs, backend = store.claim_next('w1')
+        
+        assert task.status == TaskStatus.RUNNING
+        assert resolve_callable(func_path)(*args, **kwargs) == 0x7f
+        assert backend == 'thread'
+        assert store.claim_next('w2') is None
+
+
+class TestDurableQueue:
+
+    def test_submitted_task_runs_on_another_worker(self, tmp_path):
+        db_path = str(tmp_path / 'tasks.db')
+        api_worker = make_queue(db_path)
+        other_worker = make_queue(db_path)
+        
+        async def scenario():
+            task = api_worker.submit(divmod, 17, 5)
+            await other_worker.start()
+            try:
+                for _ in range(100):
+                    result = api_worker.get_task(task.id)
+                    if result.status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+                        return result
+                    await asyncio.sleep(0.05)
+            finally:
+                await other_worker.stop()
+        
+        result = asyncio.run(scenario())
+        
+        assert result.status == TaskStatus.COMPLETED
+        assert result.result == [3, 2]
+        assert other_worker.get_task(result.id).result == [3, 2]
+        assert api_worker.get_queue_status()['completed'] == 1
+    
+    def test_lambdas_rejected(self):
+        with pytest.raises(ValueError):
+            callable_path(lambda: None)
+
+
+class TestRestartSafety:
+
+    def mark_stale(self, store: SQLiteTaskStore, task_id: str):
+        stale = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+        store._connect().execute('UPDATE tasks SET heartbeat_at = ? WHERE id = ?', (stale, task_id))
+    
+    def test_dead_worker_tasks_requeued(self, tmp_path):
+        store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+        store.add(Task(id='t1'), 'operator:add', (1, 2))
+        store.claim_next('dead-worker')
+        self.mark_stale(store, 't1')
+        
+        assert store.requeue_stale(stale_seconds=60, max_attempts=3) == 1
+        assert store.get('t1').status == TaskStatus.PENDING
+        assert store.claim_next('new-worker')[0].id == 't1'
+    
+    def test_task_failed_after_max_attempts(self, tmp_path):
+        store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+        store.add(Task(id='t1'), 'operator:add', (1, 2))
+        
+        for _ in range(2):
+            store.claim_next('dead-worker')
+            self.mark_stale(store, 't1')
+            store.requeue_stale(stale_seconds=60, max_attempts=2)
+        
+        task = store.get('t1')
+        assert task.status == TaskStatus.FAILED
+        assert task.error
+    
+    def test_live_worker_tasks_kept(self, tmp_path):
+        store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+        store.add(Task(id='t1'), 'operator:add', (1, 2))
+        store.claim_next('live-worker')
+        store.heartbeat('live-worker')
+        
+        assert store.requeue_stale(stale_seconds=60) == 0
+        assert store.get('t1').status == TaskStatus.RUNNING
+
+
+def fail_after(done, total, progress_callback=None):
+    progress_callback(done, total)
+    raise RuntimeError('render failed')
+
+
+class TestFailureAndHeartbeat:
+
+    @given(done=st.integers(min_value=1, max_value=9))
+    @settings(max_examples=10, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_failed_task_keeps_progress(self, tmp_path_factory, done):
+        queue = make_queue(str(tmp_path_factory.mktemp('progress') / 'tasks.db'))
+        task = Task(id='t1')
+        queue.store.add(task)
+        
+        asyncio.run(queue.run_in_background(task.id, fail_after, done, 10))
+        
+        failed = queue.get_task(task.id)
+        assert failed.status == TaskStatus.FAILED
+        assert failed.error == 'render failed'
+        assert failed.progress == done * 10
+    
+    def test_heartbeat_survives_blocked_loop(self, tmp_path, monkeypatch):
+        # core re-exports the task_queue singleton under the module's name
+        monkeypatch.setattr(sys.modules['core.task_queue'], 'TASK_HEARTBEAT_INTERVAL', 0.05)
+        queue = make_queue(str(tmp_path / 'tasks.db'))
+        store = queue.store
+        store.add(Task(id='t1'), 'operator:add', (1, 2))
+        store.claim_next(queue.worker_id)
+        
+        async def scenario():
+            await queue.start()
+            try:
+                TestRestartSafety().mark_stale(store, 't1')
+                # A CPU-bound handler holding the event loop
+                time.sleep(0.3)
+                return store.requeue_stale(stale_seconds=1)
+            finally:
+                await queue.stop()
+        
+        assert asyncio.run(scenario()) == 0
+        assert store.get('t1').status == TaskStatus.RUNNING
+
+
+class TestRoundTrip:
+
+    @given(progress=st.integers(min_value=0, max_value=100),
+           result=st.one_of(st.none(), st.text(max_size=50)),
+           error=st.one_of(st.none(), st.text(max_size=50)))
+    @settings(max_examples=30, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_task_fields_round_trip(self, tmp_path, progress, result, error):
+        store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+        task = Task(id=os.urandom(4).hex(), status=TaskStatus.COMPLETED, result=result,
+                    error=error, progress=progress, started_at=datetime.utcnow(),
+                    completed_at=datetime.utcnow())
+        store.add(task)
+        store.save(task)
+        
+        assert store.get(task.id) == task
@@ -0,0 +1,323 @@
+"""
+Property-Based Tests for batch template analysis
+
+Properties tested:
+1. Per-slide persistence: every element keeps its slide index and each slide gets its own
+   shape mapping; databases created before slide_index are migrated in place
+2. Single transaction: a failing write leaves the previous mapping untouched
+3. POST /api/analyze-template/batch renders all slides once, analyzes them concurrently
+   (never more than `concurrency` at once) and matches shapes per slide
+4. A failing slide is reported in failedSlides without failing the others;
+   a second upload of the same template is served from the cache
+5. Layout dedup: one vision call per layout group, fanned out to every slide of the group
+6. Re-analysis keeps user corrections; slides without detections count as cached and
+   only missing slides are analyzed again
+7. /api/analyze-template reads only slide 0 from a batch-analyzed template
+8. Both endpoints store the analyzed template off the event loop
+9. Both endpoints open the deck and render slides off the event loop
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import HealthCheck, given, strategies as st, settings
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from pptx import Presentation
+from pptx.util import Inches
+
+import routes.templates
+import services.gemini_vision as gemini_vision
+from mapping_cache import MappingCache
+from services.template_store import TemplateStore
+
+
+def _element(element_id, element_type='TITLE', slide_index=0, shape_id=None):
+    return {
+        'id': element_id,
+        'type': element_type,
+        'shapeId': shape_id,
+        'coordinates': {'top': 10, 'left': 10, 'width': 100, 'height': 50},
+        'slideIndex': slide_index
+    }
+
+
+def _deck(path, slide_count, layouts=None):
+    prs = Presentation()
+    for index in range(slide_count):
+        slide = prs.slides.add_slide(prs.slide_layouts[layouts[index] if layouts else 6])
+        box = slide.shapes.add_textbox(Inches(1), Inches(0.5), Inches(8), Inches(1))
+        box.text_frame.text = f'Slide {index + 1}'
+    prs.save(path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class TestSlideMappings:
+
+    @given(elements_per_slide=st.lists(st.integers(1, 4), min_size=1, max_size=5))
+    @settings(max_examples=20, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_slide_index_round_trip(self, tmp_path, elements_per_slide):
+        cache = MappingCache(str(tmp_path / 'mappings.db'))
+        elements = [
+            _element(f'slide{s + 1}_element_{e}', 'TITLE' if e == 0 else 'BODY', s, shape_id=100 * s + e + 1)
+            for s, count in enumerate(elements_per_slide) for e in range(count)
+        ]
+        cache.save_mapping('a' * 64, {'elements': elements}, replace=True)
+        
+        cached = cache.get_cached_mapping('a' * 64)
+        assert [(e['id'], e['slideIndex']) for e in cached['elements']] == [(e['id'], e['slideIndex']) for e in elements]
+        assert sorted(cached['slideMappings']) == list(range(len(elements_per_slide)))
+        for s in range(len(elements_per_slide)):
+            assert cached['slideMappings'][s]['TITLE'] == 100 * s + 1
+        assert cached['shapeMapping'] == cached['slideMappings'][0]
+    
+    def test_replace_drops_stale_elements(self, tmp_path):
+        cache = MappingCache(str(tmp_path / 'mappings.db'))
+        cache.save_mapping('b' * 64, {'elements': [_element('element_1'), _element('element_2', 'BODY')]})
+        cache.save_mapping('b' * 64, {'elements': [_element('slide1_element_1')]}, replace=True)
+        assert [e['id'] for e in cache.get_cached_mapping('b' * 64)['elements']] == ['slide1_element_1']
+    
+    def test_failed_write_is_rolled_back(self, tmp_path):
+        cache = MappingCache(str(tmp_path / 'mappings.db'))
+        cache.save_mapping('c' * 64, {'elements': [_element('element_1')]})
+        
+        # purpose is NOT NULL: the last row fails and nothing of the batch is kept
+        broken = [_element('slide1_element_1'), {**_element('slide2_element_1', slide_index=1), 'type': None}]
+        with pytest.raises(sqlite3.IntegrityError):
+            cache.save_mapping('c' * 64, {'elements': broken}, replace=True)
+        assert [e['id'] for e in cache.get_cached_mapping('c' * 64)['elements']] == ['element_1']
+    
+    def test_old_schema_is_migrated(self, tmp_path):
+        db_path = str(tmp_path / 'old.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE template_mappings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                template_hash TEXT NOT NULL,
+                element_id TEXT NOT NULL,
+                shape_id INTEGER,
+                purpose TEXT NOT NULL,
+                coordinates TEXT,
+                original_style TEXT,
+                user_corrected BOOLEAN DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(template_hash, element_id)
+            )
+        ''')
+        conn.execute("INSERT INTO template_mappings (template_hash, element_id, shape_id, purpose) "
+                     "VALUES (?, 'element_1', 7, 'TITLE')", ('d' * 64,))
+        conn.commit()
+        conn.close()
+        
+        cache = MappingCache(db_path)
+        cache.register_template_file('d' * 64, '/tmp/d.pptx')
+        cached = cache.get_cached_mapping('d' * 64)
+        assert cached['elements'][0]['slideIndex'] == 0
+        assert cached['slideMappings'] == {0: {'TITLE': 7}}
+
+
+class TestAnalyzeTemplateBatch:
+
+    def _app(self, monkeypatch, tmp_path, fail_slides=(), empty_slides=()):
+        calls = {'renders': [], 'in_flight': 0, 'peak': 0, 'fail': set(fail_slides), 'empty': set(empty_slides)}
+        
+        def render(pptx_path, slide_indices):
+            calls['renders'].append(list(slide_indices))
+            return [f'data:image/png;base64,slide{i}' for i in slide_indices]
+        
+        async def analyze(image, max_retries=2):
+            calls['in_flight'] += 1
+            calls['peak'] = max(calls['peak'], calls['in_flight'])
+            await asyncio.sleep(0.02)
+            calls['in_flight'] -= 1
+            index = int(image.rsplit('slide', 1)[1])
+            if index in calls['fail']:
+                raise HTTPException(status_code=500, detail=f'Gemini failed on {index}')
+            if index in calls['empty']:
+                return {'elements': []}
+            return {'elements': [{
+                'id': 'element_1', 'type': 'TITLE', 'shapeId': None,
+                'coordinates': {'top': 50, 'left': 100, 'width': 800, 'height': 130},
+                'style': {'color': '#000000', 'align': 'left'}, 'confidence': 0.9
+            }]}
+        
+        monkeypatch.setattr(routes.templates, 'convert_slides_to_images', render)
+        monkeypatch.setattr(routes.templates, 'convert_slide_to_image', lambda path, index: render(path, [index])[0])
+        monkeypatch.setattr(gemini_vision, 'analyze_with_retry', analyze)
+        monkeypatch.setattr(routes.templates, 'analyze_with_retry', analyze)
+        monkeypatch.setattr(routes.templates, 'mapping_cache', MappingCache(os.path.join(tmp_path, 'mappings.db')))
+        monkeypatch.setattr(routes.templates, 'template_store', TemplateStore(os.path.join(tmp_path, 'store')))
+        app = FastAPI()
+        app.include_router(routes.templates.router)
+        return app, calls
+    
+    def _post(self, app, content, query='', path='/api/analyze-template/batch'):
+        async def post():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                files = {'file': ('template.pptx', content)}
+                return await client.post(f'{path}{query}', files=files)
+        return asyncio.run(post())
+    
+    @given(slide_count=st.integers(1, 8), concurrency=st.integers(1, 4))
+    @settings(max_examples=10, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_all_slides_analyzed_concurrently(self, monkeypatch, tmp_path, slide_count, concurrency):
+        deck = _deck(str(tmp_path / 'deck.pptx'), slide_count)
+        with tempfile.TemporaryDirectory() as db_dir:
+            app, calls = self._app(monkeypatch, db_dir)
+            response = self._post(app, deck, f'?concurrency={concurrency}&dedupeLayouts=false')
+            body = response.json()
+            cached = routes.templates.mapping_cache.get_cached_mapping(body['templateHash'])
+        
+        assert response.status_code == 200
+        assert calls['renders'] == [list(range(slide_count))]
+        assert calls['peak'] == min(concurrency, slide_count)
+        assert [s['slideIndex'] for s in body['slides']] == list(range(slide_count))
+        assert all(s['shapeMapping'].get('TITLE') for s in body['slides'])
+        assert len({e['id'] for e in body['elements']}) == slide_count
+        assert sorted(cached['slideMappings']) == list(range(slide_count))
+    
+    def test_failed_slide_and_cache(self, monkeypatch, tmp_path):
+        deck = _deck(str(tmp_path / 'deck.pptx'), 3)
+        app, calls = self._app(monkeypatch, str(tmp_path), fail_slides={1})
+        
+        body = self._post(app, deck, '?dedupeLayouts=false').json()
+        assert [s['slideIndex'] for s in body['slides']] == [0, 2]
+        assert body['failedSlides'] == [{'slideIndex': 1, 'error': 'Gemini failed on 1'}]
+        
+        # Slide 1 is missing from the cache, so only slide 1 is analyzed again
+        calls['fail'].clear()
+        body = self._post(app, deck, '?dedupeLayouts=false').json()
+        assert body['source'] == 'vision' and not body['failedSlides']
+        assert calls['renders'][1] == [1]
+        assert [s['slideIndex'] for s in body['slides']] == [0, 1, 2]
+        
+        body = self._post(app, deck).json()
+        assert body['source'] == 'cache'
+        assert len(calls['renders']) == 2
+        assert [len(s['elements']) for s in body['slides']] == [1, 1, 1]
+    
+    def test_invalid_requests(self, monkeypatch, tmp_path):
+        app, _ = self._app(monkeypatch, str(tmp_path))
+        deck = _deck(str(tmp_path / 'deck.pptx'), 1)
+        assert self._post(app, deck, '?concurrency=0').status_code == 400
+        assert self._post(app, b'not a pptx').status_code == 400
+    
+    def test_one_vision_call_per_layout(self, monkeypatch, tmp_path):
+        # Title, Title and Content x3, Blank x2
+        layouts = [0, 1, 1, 1, 6, 6]
+        deck = _deck(str(tmp_path / 'deck.pptx'), len(layouts), layouts)
+        app, calls = self._app(monkeypatch, str(tmp_path))
+        
+        body = self._post(app, deck).json()
+        assert calls['renders'] == [[0, 1, 4]]
+        assert [s['slideIndex'] for s in body['slides']] == list(range(len(layouts)))
+        assert len({e['id'] for e in body['elements']}) == len(layouts)
+        assert [e['slideIndex'] for e in body['elements']] == list(range(len(layouts)))
+        
+        stats = body['layoutIndex']
+        assert (stats['slides'], stats['layouts']) == (6, 3)
+        assert stats['reuseRatio'] == 0.5
+        assert stats['work']['vision'] == {'computed': 3, 'reused': 3, 'reuseRatio': 0.5}
+    
+    def test_user_corrections_survive_reanalysis(self, monkeypatch, tmp_path):
+        deck = _deck(str(tmp_path / 'deck.pptx'), 2)
+        app, calls = self._app(monkeypatch, str(tmp_path), fail_slides={1})
+        cache = routes.templates.mapping_cache
+        
+        template_hash = self._post(app, deck, '?dedupeLayouts=false').json()['templateHash']
+        assert cache.update_element_type(template_hash, 'slide1_element_1', 'SUBTITLE')
+        
+        # Slide 1 failed: the next call re-analyzes it and saves with replace=True
+        calls['fail'].clear()
+        self._post(app, deck, '?dedupeLayouts=false')
+        cache.save_mapping(template_hash, {'elements': [_element('slide1_element_1', 'BODY')]},
+                           replace=True, slides=[0])
+        
+        elements = {e['id']: e for e in cache.get_cached_mapping(template_hash)['elements']}
+        assert elements['slide1_element_1']['type'] == 'SUBTITLE'
+        assert elements['slide1_element_1']['userCorrected'] is True
+        assert 'slide2_element_1' in elements
+    
+    def test_slides_without_detections_are_cached(self, monkeypatch, tmp_path):
+        deck = _deck(str(tmp_path / 'deck.pptx'), 3)
+        app, calls = self._app(monkeypatch, str(tmp_path), empty_slides={1})
+        
+        first = self._post(app, deck, '?dedupeLayouts=false').json()
+        second = self._post(app, deck, '?dedupeLayouts=false').json()
+        assert second['source'] == 'cache'
+        assert len(calls['renders']) == 1
+        assert second['slides'][1] == {'slideIndex': 1, 'elements': [], 'shapeMapping': first['slides'][1]['shapeMapping']}
+    
+    def test_single_slide_endpoint_reads_slide_zero(self, monkeypatch, tmp_path):
+        deck = _deck(str(tmp_path / 'deck.pptx'), 3)
+        app, calls = self._app(monkeypatch, str(tmp_path))
+        self._post(app, deck, '?dedupeLayouts=false')
+        
+        body = self._post(app, deck, path='/api/analyze-template').json()
+        assert body['source'] == 'cache'
+        assert [e['id'] for e in body['elements']] == ['slide1_element_1']
+        assert body['shapeMapping'] == routes.templates.mapping_cache.get_cached_mapping(body['templateHash'])['slideMappings'][0]
+    
+    def test_single_slide_endpoint_ignores_other_slides(self, monkeypatch, tmp_path):
+        deck = _deck(str(tmp_path / 'deck.pptx'), 2)
+        app, calls = self._app(monkeypatch, str(tmp_path), fail_slides={0})
+        batch = self._post(app, deck, '?dedupeLayouts=false').json()
+        assert batch['shapeMapping'] == {}
+        
+        # Slide 0 failed in the batch: its mapping is not taken from slide 1
+        calls['fail'].clear()
+        body = self._post(app, deck, path='/api/analyze-template').json()
+        assert body['source'] == 'vision'
+        assert calls['renders'][-1] == [0]
+        assert all(not e['id'].startswith('slide2_') for e in body['elements'])
+    
+    @pytest.mark.parametrize('path', ['/api/analyze-template', '/api/analyze-template/batch'])
+    def test_template_is_stored_off_the_event_loop(self, monkeypatch, tmp_path, path):
+        deck = _deck(str(tmp_path / 'deck.pptx'), 2)
+        app, calls = self._app(monkeypatch, str(tmp_path))
+        store = routes.templates.template_store
+        threads = []
+        
+        def save_bytes(content):
+            threads.append(threading.get_ident())
+            return TemplateStore.save_bytes(store, content)
+        
+        monkeypatch.setattr(store, 'save_bytes', save_bytes)
+        body = self._post(app, deck, path=path).json()
+        assert body['success']
+        assert threads and threading.get_ident() not in threads
+        assert store.get_path(body['templateHash'])
+    
+    @pytest.mark.parametrize('path', ['/api/analyze-template', '/api/analyze-template/batch'])
+    def test_deck_is_opened_and_rendered_off_the_event_loop(self, monkeypatch, tmp_path, path):
+        deck = _deck(str(tmp_path / 'deck.pptx'), 2)
+        app, calls = self._app(monkeypatch, str(tmp_path))
+        threads = {'open': [], 'render': []}
+        
+        def open_deck(pptx_path):
+            threads['open'].append(threading.get_ident())
+            return Presentation(pptx_path)
+        
+        def render_slide(pptx_path, index):
+            threads['render'].append(threading.get_ident())
+            return f'data:image/png;base64,slide{index}'
+        
+        def render_slides(pptx_path, slide_indices):
+            return [render_slide(pptx_path, index) for index in slide_indices]
+        
+        monkeypatch.setattr(routes.templates, 'Presentation', open_deck)
+        monkeypatch.setattr(routes.templates, 'convert_slide_to_image', render_slide)
+        monkeypatch.setattr(routes.templates, 'convert_slides_to_images', render_slides)
+        assert self._post(app, deck, path=path).json()['success']
+        assert threads['open'] and threading.get_ident() not in threads['open']
+        assert threads['render'] and threading.get_ident() not in threads['render']
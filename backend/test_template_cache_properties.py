@@ -0,0 +1,142 @@
+"""
+Property-Based Tests for TemplateCache
+
+Properties tested:
+1. Hash compatibility: hash_template_file == MappingCache.generate_template_hash
+2. Byte bound: total retained bytes never exceed max_bytes
+3. LRU order: the least recently used entry is evicted first
+4. Repeat clones of the same template skip _analyze_template
+5. Each slide is parsed once per template: clones work on deep copies of the
+   cached pristine trees, which are never modified
+"""
+
+import os
+import sys
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+import pytest
+from lxml import etree
+from pptx import Presentation
+
+from mapping_cache import MappingCache
+from template_cache import TemplateCache, CachedTemplate, hash_template_file, template_cache
+import pptx_xml_cloner
+from pptx_xml_cloner import PPTXXMLCloner
+from test_xml_cloner_streaming import build_template
+
+
+def make_entry(template_hash: str, xml_size: int) -> CachedTemplate:
+    return CachedTemplate(
+        template_hash=template_hash,
+        slide_count=1,
+        text_map=[[]],
+        fonts_used=frozenset(),
+        vba_project_data=None,
+        slide_xml={0: b'x' * xml_size}
+    )
+
+
+class TestTemplateHash:
+
+    @given(content=st.binary(min_size=1, max_size=50000))
+    @settings(max_examples=50)
+    def test_hash_matches_mapping_cache(self, content):
+        """Streaming file hash equals MappingCache.generate_template_hash."""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pptx') as tmp:
+            tmp.write(content)
+            path = tmp.name
+        try:
+            expected = MappingCache.generate_template_hash(None, content)
+            assert hash_template_file(path) == expected
+        finally:
+            os.unlink(path)
+
+
+class TestTemplateCacheEviction:
+
+    @given(sizes=st.lists(st.integers(min_value=1, max_value=4000), min_size=1, max_size=30),
+           max_bytes=st.integers(min_value=1000, max_value=20000))
+    @settings(max_examples=100)
+    def test_total_bytes_bounded(self, sizes, max_bytes):
+        """Retained bytes never exceed the configured limit."""
+        cache = TemplateCache(max_bytes=max_bytes)
+        for idx, size in enumerate(sizes):
+            cache.put(make_entry(f'hash_{idx}', size))
+            stats = cache.get_stats()
+            assert stats['totalBytes'] <= max_bytes
+
+    def test_least_recently_used_evicted_first(self):
+        """Reading an entry protects it from the next eviction."""
+        cache = TemplateCache(max_bytes=3000)
+        cache.put(make_entry('a', 1000))
+        cache.put(make_entry('b', 1000))
+        assert cache.get('a') is not None
+
+        cache.put(make_entry('c', 1500))
+
+        assert cache.get('a') is not None
+        assert cache.get('b') is None
+        assert cache.get('c') is not None
+
+    def test_oversized_entry_rejected(self):
+        cache = TemplateCache(max_bytes=100)
+        assert cache.put(make_entry('big', 1000)) is False
+        assert cache.get_stats()['entries'] == 0
+
+
+class TestClonerUsesCache:
+
+    def test_repeat_clone_skips_analysis(self, tmp_path):
+        """A second cloner for the same template is built from the cache."""
+        template_cache.clear()
+        path = build_template(str(tmp_path / 'template.pptx'))
+
+        first = PPTXXMLCloner(path)
+
+        with patch.object(PPTXXMLCloner, '_analyze_template') as analyze:
+            second = PPTXXMLCloner(path)
+            analyze.assert_not_called()
+
+        assert second.slide_count == first.slide_count
+        assert second.get_fonts_used() == first.get_fonts_used()
+        assert [len(t) for t in second.text_map] == [len(t) for t in first.text_map]
+        assert second.slide_xml == first.slide_xml
+
+    def test_slides_parsed_once_per_template(self, tmp_path, monkeypatch):
+        """Exports reuse the trees parsed during analysis and never touch them."""
+        template_cache.clear()
+        path = build_template(str(tmp_path / 'template.pptx'), slide_count=3)
+
+        parses = []
+        original = pptx_xml_cloner.parse_slide_xml
+
+        def counting(slide_xml):
+            parses.append(slide_xml)
+            return original(slide_xml)
+
+        monkeypatch.setattr(pptx_xml_cloner, 'parse_slide_xml', counting)
+
+        first = PPTXXMLCloner(path)
+        pristine = {idx: etree.tostring(tree) for idx, tree in first.slide_trees.items()}
+        assert len(parses) == 3
+
+        outputs = []
+        for title in ('Primero', 'Segundo'):
+            for legacy in (False, True):
+                cloner = PPTXXMLCloner(path)
+                output = cloner.clone_with_content([{'title': title}] * 3, streaming=not legacy)
+                with open(output, 'rb') as f:
+                    outputs.append(Presentation(BytesIO(f.read())))
+                os.unlink(output)
+
+        assert len(parses) == 3
+        assert {idx: etree.tostring(tree) for idx, tree in first.slide_trees.items()} == pristine
+        titles = [[s.shapes.title.text for s in prs.slides] for prs in outputs]
+        assert titles == [['Primero'] * 3] * 2 + [['Segundo'] * 3] * 2
+        assert template_cache.get(first.template_hash).size_bytes > sum(len(x) for x in first.slide_xml.values())
@@ -0,0 +1,204 @@
+"""
+Property-Based Tests for TemplateStore
+
+Properties tested:
+1. Content addressing: the stored hash equals MappingCache.generate_template_hash
+2. Idempotence: storing the same bytes twice keeps a single file
+3. Round trip: the stored file holds exactly the uploaded bytes
+4. Registration: MappingCache keeps the stored file path across save_mapping
+5. POST /api/template/upload stores only .pptx ZIP payloads (anything else is a 400)
+   and copies the upload off the event loop thread
+6. POST /api/export/pptx uses a stored template referenced by templateHash and removes
+   an uploaded template once the export is done
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+import zipfile
+from io import BytesIO
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings, HealthCheck
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import routes.export
+import routes.templates
+from core.task_queue import TaskQueue, ThreadBackend
+from core.task_store import MemoryTaskStore
+from mapping_cache import MappingCache
+from services.template_store import TemplateStore, is_valid_template_hash
+
+
+def _zip_bytes(payload):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr('[Content_Types].xml', payload)
+    return buffer.getvalue()
+
+
+class TestTemplateStore:
+
+    @given(content=st.binary(min_size=1, max_size=50000))
+    @settings(max_examples=50, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_store_is_content_addressed(self, tmp_path, content):
+        """The store key is the SHA-256 of the content and the file round-trips."""
+        store = TemplateStore(str(tmp_path / 'store'))
+        
+        template_hash, path, already_stored = store.save_bytes(content)
+        
+        assert is_valid_template_hash(template_hash)
+        assert template_hash == MappingCache.generate_template_hash(None, content)
+        assert store.get_path(template_hash) == path
+        with open(path, 'rb') as f:
+            assert f.read() == content
+        
+        again_hash, again_path, again_stored = store.save_bytes(content)
+        assert again_hash == template_hash
+        assert again_path == path
+        assert again_stored is True
+    
+    def test_store_leaves_no_partial_files(self, tmp_path):
+        store = TemplateStore(str(tmp_path / 'store'))
+        store.save_bytes(b'PK' + b'\x00' * 1000)
+        store.save_bytes(b'PK' + b'\x00' * 1000)
+        
+        leftovers = [name for name in os.listdir(store.root) if name.endswith('.part')]
+        assert leftovers == []
+    
+    def test_unknown_or_invalid_hash(self, tmp_path):
+        store = TemplateStore(str(tmp_path / 'store'))
+        assert store.get_path('0' * 64) is None
+        assert store.get_path('../../etc/passwd') is None
+        assert store.exists('not-a-hash') is False
+        with pytest.raises(ValueError):
+            store.path_for('../evil')
+
+
+class TestTemplateRegistration:
+
+    def test_file_path_survives_save_mapping(self, tmp_path):
+        """Re-analyzing a template must not drop the stored file path."""
+        cache = MappingCache(db_path=str(tmp_path / 'test.db'))
+        template_hash = 'a' * 64
+        
+        cache.register_template_file(template_hash, '/store/aa/template.pptx', 'Template')
+        cache.save_mapping(template_hash, {'elements': []}, template_name='Template')
+        
+        assert cache.get_template_file_path(template_hash) == '/store/aa/template.pptx'
+        assert cache.get_cached_mapping(template_hash)['filePath'] == '/store/aa/template.pptx'
+    
+    def test_register_unknown_template(self, tmp_path):
+        cache = MappingCache(db_path=str(tmp_path / 'test.db'))
+        assert cache.get_template_file_path('b' * 64) is None
+        
+        cache.register_template_file('b' * 64, '/store/bb/template.pptx')
+        
+        assert cache.template_exists('b' * 64)
+        assert cache.get_template_file_path('b' * 64) == '/store/bb/template.pptx'
+
+
+class TestUploadRoute:
+
+    def _app(self, monkeypatch, tmp_path):
+        store = TemplateStore(str(tmp_path / 'store'))
+        threads = []
+        save_stream = store.save_stream
+        
+        def recording_save_stream(source):
+            threads.append(threading.current_thread())
+            return save_stream(source)
+        
+        monkeypatch.setattr(store, 'save_stream', recording_save_stream)
+        monkeypatch.setattr(routes.templates, 'template_store', store)
+        monkeypatch.setattr(routes.templates, 'mapping_cache', MappingCache(str(tmp_path / 'mappings.db')))
+        app = FastAPI()
+        app.include_router(routes.templates.router)
+        return app, store, threads
+    
+    def _upload(self, app, filename, content):
+        async def post():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                return await client.post('/api/template/upload', files={'file': (filename, content)})
+        return asyncio.run(post())
+    
+    @given(payload=st.binary(max_size=2000))
+    @settings(max_examples=20, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_only_zip_payloads_are_stored(self, monkeypatch, tmp_path, payload):
+        app, store, threads = self._app(monkeypatch, tmp_path)
+        
+        response = self._upload(app, 'deck.pptx', _zip_bytes(payload))
+        assert response.status_code == 200
+        body = response.json()
+        with open(store.get_path(body['templateHash']), 'rb') as f:
+            assert f.read() == _zip_bytes(payload)
+        # The copy ran on a worker thread, not on the event loop
+        assert threads and threads[-1] is not threading.main_thread()
+        
+        if not zipfile.is_zipfile(BytesIO(payload)):
+            assert self._upload(app, 'deck.pptx', payload).status_code == 400
+    
+    def test_rejects_other_extensions(self, monkeypatch, tmp_path):
+        app, store, threads = self._app(monkeypatch, tmp_path)
+        
+        for filename in ('deck.ppt', 'deck.pdf', 'deck'):
+            assert self._upload(app, filename, _zip_bytes(b'x')).status_code == 400
+        assert self._upload(app, 'DECK.PPTX', _zip_bytes(b'x')).status_code == 200
+        assert len(threads) == 1
+
+
+class TestExportTemplate:
+
+    def _app(self, monkeypatch, tmp_path):
+        store = TemplateStore(str(tmp_path / 'store'))
+        calls = []
+        
+        def generate(template_path, ai_content, text_areas_by_slide=None, template_hash=None):
+            calls.append((template_path, template_hash, os.path.exists(template_path)))
+            output_path = str(tmp_path / 'output.pptx')
+            with open(output_path, 'wb') as f:
+                f.write(b'PK\x03\x04')
+            return output_path
+        
+        queue = TaskQueue(max_concurrent=1, backend=ThreadBackend(max_workers=1), store=MemoryTaskStore())
+        monkeypatch.setattr(routes.export.offloader, '_queue', queue)
+        monkeypatch.setattr(routes.export, 'template_store', store)
+        monkeypatch.setattr(routes.export, 'generate_presentation', generate)
+        app = FastAPI()
+        app.include_router(routes.export.router)
+        return app, store, calls
+    
+    def _export(self, app, files):
+        async def post():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://t') as client:
+                return await client.post('/api/export/pptx', files=files)
+        return asyncio.run(post())
+    
+    def test_stored_and_uploaded_templates(self, monkeypatch, tmp_path):
+        app, store, calls = self._app(monkeypatch, tmp_path)
+        stored = _zip_bytes(b'stored')
+        template_hash, stored_path, _ = store.save_bytes(stored)
+        data = (None, json.dumps({'slides': [{'content': {'title': 'Hola'}}]}))
+        
+        # A stored template is referenced by hash and kept
+        response = self._export(app, {'data': data, 'templateHash': (None, template_hash)})
+        assert response.status_code == 200
+        assert calls[-1] == (stored_path, template_hash, True)
+        assert os.path.exists(stored_path)
+        
+        # An uploaded template is passed with its hash and removed afterwards
+        uploaded = _zip_bytes(b'uploaded')
+        response = self._export(app, {'data': data, 'template': ('plantilla.pptx', uploaded)})
+        assert response.status_code == 200
+        upload_path, upload_hash, existed = calls[-1]
+        assert upload_hash == hashlib.sha256(uploaded).hexdigest()
+        assert existed and not os.path.exists(upload_path)
+        
+        assert self._export(app, {'data': data, 'templateHash': (None, 'c' * 64)}).status_code == 404
@@ -0,0 +1,128 @@
+"""
+Property-Based Tests for ThemeResolver
+
+Properties tested:
+1. Resolution order: slide background, then layout, master and theme colors
+2. Each theme is parsed once per presentation, however many slides and passes read it
+   (analysis, asset extraction and the full renderer share one resolver)
+3. Inherited backgrounds are resolved once per layout and handed out as copies
+4. PPTXRenderer renders the inherited layout background through the resolver
+"""
+
+import os
+import sys
+from io import BytesIO
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from PIL import Image
+
+import theme_resolver
+from pptx_analyzer import LayoutIndex, extract_all_assets, extract_background, get_theme_colors
+from pptx_full_renderer import render_pptx_complete
+from preview_encoding import PreviewEncoding
+from theme_resolver import ThemeResolver
+
+
+def _fill(owner, color):
+    fill = owner.background.fill
+    fill.solid()
+    fill.fore_color.rgb = RGBColor.from_string(color)
+
+
+def _deck(layouts, slide_colors=None):
+    prs = Presentation()
+    for index, layout in enumerate(layouts):
+        slide = prs.slides.add_slide(prs.slide_layouts[layout])
+        if slide_colors and slide_colors[index]:
+            _fill(slide, slide_colors[index])
+    return prs
+
+
+class CountingParser:
+    """Wraps parse_theme_colors to count theme parses."""
+    
+    def __init__(self, monkeypatch):
+        self.calls = 0
+        original = theme_resolver.parse_theme_colors
+        
+        def parse(theme_xml):
+            self.calls += 1
+            return original(theme_xml)
+        
+        monkeypatch.setattr(theme_resolver, 'parse_theme_colors', parse)
+
+
+class TestResolutionOrder:
+
+    def test_slide_layout_master_theme(self):
+        prs = _deck([6, 6, 1, 1], [None, '00FF00', None, None])
+        _fill(prs.slide_layouts[1], 'FF0000')
+        slides = list(prs.slides)
+        
+        assert extract_background(slides[1]) == {"type": "solid", "color": "#00FF00", "source": "slide"}
+        assert extract_background(slides[2]) == {"type": "solid", "color": "#FF0000", "source": "layout"}
+        # Default template: no layout / master background, lt1 of the theme
+        theme_colors = get_theme_colors(slides[0])
+        assert extract_background(slides[0]) == {"type": "solid", "color": theme_colors['lt1'], "source": "theme_lt1"}
+        
+        _fill(prs.slide_master, '0000FF')
+        assert extract_background(slides[0]) == {"type": "solid", "color": "#0000FF", "source": "master"}
+        assert extract_background(slides[3])['source'] == "layout"
+
+
+class TestMemoization:
+
+    @given(layouts=st.lists(st.sampled_from([0, 1, 5, 6]), min_size=1, max_size=12))
+    @settings(max_examples=20, deadline=None)
+    def test_theme_parsed_once(self, layouts):
+        prs = _deck(layouts)
+        themes = ThemeResolver()
+        
+        for slide in prs.slides:
+            extract_background(slide, themes)
+            get_theme_colors(slide, themes)
+        extract_all_assets(prs, layout_index=LayoutIndex(prs, themes))
+        
+        assert themes.stats['themesParsed'] == 1
+        assert themes.stats['inheritedResolved'] == len(set(layouts))
+    
+    def test_shared_with_renderer(self, monkeypatch, tmp_path):
+        parser = CountingParser(monkeypatch)
+        prs = _deck([0, 1, 1, 6])
+        path = str(tmp_path / 'deck.pptx')
+        prs.save(path)
+        
+        prs = Presentation(path)
+        themes = ThemeResolver()
+        index = LayoutIndex(prs, themes)
+        extract_all_assets(prs, layout_index=index)
+        render_pptx_complete(path, encoding=PreviewEncoding('jpeg'), binary=True, themes=themes)
+        
+        assert parser.calls == 1
+        assert index.get_stats()['themes']['themesParsed'] == 1
+    
+    def test_inherited_background_is_a_copy(self):
+        prs = _deck([6, 6])
+        themes = ThemeResolver()
+        first, second = prs.slides
+        themes.inherited_background(first)['color'] = '#123456'
+        assert themes.inherited_background(second)['color'] != '#123456'
+        assert themes.stats['inheritedResolved'] == 1
+
+
+class TestRenderer:
+
+    def test_layout_background_is_rendered(self, tmp_path):
+        prs = _deck([1])
+        _fill(prs.slide_layouts[1], 'FF0000')
+        path = str(tmp_path / 'deck.pptx')
+        prs.save(path)
+        
+        data, _ = render_pptx_complete(path, encoding=PreviewEncoding('png'), binary=True)[0]
+        with Image.open(BytesIO(data)) as img:
+            assert img.convert('RGB').getpixel((2, 2)) == (255, 0, 0)
@@ -0,0 +1,124 @@
+"""
+Property-Based Tests for PPTXXMLCloner streaming mode
+
+Properties tested:
+1. Streaming clone produces the same slide text as the legacy extract/repack clone
+2. Untouched parts (media, layouts, rels) are copied byte-for-byte
+3. Output can be written straight to a BytesIO without touching disk
+4. progress_callback is called once per slide in both modes
+"""
+
+import os
+import sys
+import zipfile
+from io import BytesIO
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hypothesis import given, strategies as st, settings, HealthCheck
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+
+from pptx_xml_cloner import PPTXXMLCloner, SLIDE_PART_RE
+
+
+def build_template(path: str, slide_count: int = 2) -> str:
+    """Create a small PPTX template with a title, body text and a picture per slide."""
+    prs = Presentation()
+
+    image_buffer = BytesIO()
+    Image.new('RGB', (64, 64), color=(200, 30, 30)).save(image_buffer, format='PNG')
+
+    for idx in range(slide_count):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Título plantilla {idx + 1}"
+        slide.placeholders[1].text = "Agregar texto"
+        image_buffer.seek(0)
+        slide.shapes.add_picture(image_buffer, Inches(8), Inches(6), Inches(1), Inches(1))
+
+    prs.save(path)
+    return path
+
+
+def slide_texts(pptx_source) -> list:
+    """Return the text of every shape, slide by slide."""
+    prs = Presentation(pptx_source)
+    return [
+        [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+        for slide in prs.slides
+    ]
+
+
+text_strategy = st.text(
+    alphabet=st.characters(whitelist_categories=('Lu', 'Ll', 'Nd', 'Zs')),
+    min_size=1,
+    max_size=40
+).filter(lambda t: t.strip())
+
+content_strategy = st.fixed_dictionaries({
+    'title': text_strategy,
+    'bullets': st.lists(text_strategy, min_size=0, max_size=3)
+})
+
+
+@pytest.fixture(scope='module')
+def template_path(tmp_path_factory):
+    return build_template(str(tmp_path_factory.mktemp('templates') / 'template.pptx'))
+
+
+class TestStreamingClone:
+
+    @given(content=st.lists(content_strategy, min_size=1, max_size=2))
+    @settings(max_examples=20, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+    def test_streaming_matches_legacy_clone(self, template_path, content):
+        """Streaming and legacy clones must yield the same slide text."""
+        cloner = PPTXXMLCloner(template_path)
+
+        legacy_path = cloner.clone_with_content(content, streaming=False)
+        streaming_path = cloner.clone_with_content(content, streaming=True)
+
+        try:
+            assert slide_texts(streaming_path) == slide_texts(legacy_path)
+        finally:
+            os.unlink(legacy_path)
+            os.unlink(streaming_path)
+
+    def test_untouched_parts_copied_unchanged(self, template_path):
+        """Every part except the slide XML must be identical to the template."""
+        cloner = PPTXXMLCloner(template_path)
+        output = cloner.clone_to_stream([{'title': 'Nuevo título'}], output=BytesIO())
+        output.seek(0)
+
+        with zipfile.ZipFile(template_path) as original, zipfile.ZipFile(output) as cloned:
+            assert cloned.namelist() == original.namelist()
+
+            for info in original.infolist():
+                if SLIDE_PART_RE.match(info.filename):
+                    continue
+                assert cloned.read(info.filename) == original.read(info.filename)
+                assert cloned.getinfo(info.filename).compress_type == info.compress_type
+
+    def test_bytesio_output_is_valid_pptx(self, template_path):
+        """The streamed output opens with python-pptx and contains the new title."""
+        cloner = PPTXXMLCloner(template_path)
+        output = cloner.clone_to_stream([{'title': 'Título streaming'}], output=BytesIO())
+        output.seek(0)
+
+        texts = slide_texts(output)
+        assert len(texts) == 2
+        assert 'Título streaming' in texts[0]
+    
+    @pytest.mark.parametrize('streaming', [True, False])
+    def test_progress_callback_per_slide(self, template_path, streaming):
+        calls = []
+        cloner = PPTXXMLCloner(template_path)
+        output_path = cloner.clone_with_content(
+            [{'title': 'Uno'}], streaming=streaming,
+            progress_callback=lambda current, total: calls.append((current, total))
+        )
+        os.unlink(output_path)
+        
+        assert calls == [(1, 2), (2, 2)]
@@ -0,0 +1,232 @@
+"""
+ThemeResolver - Colores del tema y fondos heredados, resueltos una vez por presentación
+
+Antes cada slide volvía a subir hasta su master, leer el blob del tema y
+parsearlo con etree.fromstring, y lo mismo con el XML del layout y del
+master para buscar el fondo; extract_all_assets repetía todo el trabajo
+para los mismos slides.
+
+Un ThemeResolver por presentación guarda, por nombre de parte:
+
+- los colores de cada tema (un parseo por tema)
+- el <p:bg> de cada slide, layout y master (leído del árbol XML que
+  python-pptx ya tiene cargado, sin serializarlo ni volver a parsearlo)
+- el fondo heredado (layout -> master -> tema) de cada layout
+
+analyze_presentation lo comparte con extract_all_assets (a través del
+LayoutIndex) y con PPTXRenderer.
+"""
+
+from typing import Any, Dict, Optional
+
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+
+NAMESPACES = {
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+}
+
+# Nombres legibles de los colores del tema
+THEME_COLOR_NAMES = {
+    'bg1': 'Fondo 1',
+    'bg2': 'Fondo 2',
+    'tx1': 'Texto 1',
+    'tx2': 'Texto 2',
+    'lt1': 'Claro 1',
+    'lt2': 'Claro 2',
+    'dk1': 'Oscuro 1',
+    'dk2': 'Oscuro 2',
+    'accent1': 'Acento 1',
+    'accent2': 'Acento 2',
+    'accent3': 'Acento 3',
+    'accent4': 'Acento 4',
+    'accent5': 'Acento 5',
+    'accent6': 'Acento 6',
+}
+
+# Colores de Office por defecto para los que el tema no define
+DEFAULT_SCHEME_COLORS = {
+    'bg1': '#FFFFFF',
+    'bg2': '#F2F2F2',
+    'tx1': '#000000',
+    'tx2': '#1F1F1F',
+    'accent1': '#4472C4',
+    'accent2': '#ED7D31',
+    'accent3': '#A5A5A5',
+    'accent4': '#FFC000',
+    'accent5': '#5B9BD5',
+    'accent6': '#70AD47',
+    'dk1': '#000000',
+    'lt1': '#FFFFFF',
+    'dk2': '#1F1F1F',
+    'lt2': '#EEECE1'
+}
+
+
+def parse_theme_colors(theme_xml: bytes) -> Dict[str, str]:
+    """Colores del esquema (a:clrScheme) de un tema"""
+    theme_root = etree.fromstring(theme_xml)
+    color_scheme = theme_root.find('.//a:clrScheme', NAMESPACES)
+    
+    if color_scheme is None:
+        return {}
+    
+    theme_colors = {}
+    for color_elem in color_scheme:
+        color_name = color_elem.tag.split('}')[-1]
+        
+        # Buscar el valor del color
+        srgb = color_elem.find('.//a:srgbClr', NAMESPACES)
+        sys_clr = color_elem.find('.//a:sysClr', NAMESPACES)
+        
+        if srgb is not None:
+            theme_colors[color_name] = f"#{srgb.get('val')}"
+        elif sys_clr is not None:
+            color_val = sys_clr.get('lastClr')
+            if color_val:
+                theme_colors[color_name] = f"#{color_val}"
+    
+    return theme_colors
+
+
+def theme_color_background(scheme_val: str, theme_colors: Dict[str, str], source_name: str) -> Dict[str, Any]:
+    """Fondo con un color del tema (o el de Office por defecto si el tema no lo define)"""
+    color_name = THEME_COLOR_NAMES.get(scheme_val, scheme_val)
+    if scheme_val in theme_colors:
+        background = {"type": "solid", "color": theme_colors[scheme_val], "source": source_name}
+        print(f"   ✅ Color del tema ({color_name}) aplicado desde {source_name}: {background['color']}")
+    else:
+        background = {
+            "type": "solid",
+            "color": DEFAULT_SCHEME_COLORS.get(scheme_val, '#FFFFFF'),
+            "source": f"{source_name}_default"
+        }
+        print(f"   ⚠️ Color por defecto ({color_name}) aplicado: {background['color']}")
+    return background
+
+
+def solid_background(bg_element, theme_colors: Dict[str, str], source_name: str) -> Optional[Dict[str, Any]]:
+    """Fondo de un <p:bg> con relleno sólido (RGB o del tema); None si no lo tiene"""
+    solid_fill = bg_element.find('.//a:solidFill/a:srgbClr', NAMESPACES)
+    if solid_fill is not None:
+        color_val = solid_fill.get('val')
+        if color_val:
+            print(f"   ✅ Color de fondo extraído del {source_name}: #{color_val}")
+            return {"type": "solid", "color": f"#{color_val}", "source": source_name}
+    
+    scheme_fill = bg_element.find('.//a:solidFill/a:schemeClr', NAMESPACES)
+    if scheme_fill is not None:
+        return theme_color_background(scheme_fill.get('val'), theme_colors, source_name)
+    
+    return None
+
+
+def _master_of(owner):
+    """Slide master de un slide, un layout o el propio master"""
+    if hasattr(owner, 'slide_layout'):
+        owner = owner.slide_layout
+    if hasattr(owner, 'slide_master'):
+        owner = owner.slide_master
+    return owner
+
+
+class ThemeResolver:
+    """
+    Memoiza por nombre de parte los temas, los <p:bg> y los fondos heredados
+    de una presentación. Los valores devueltos se comparten: no modificarlos
+    (inherited_background devuelve una copia).
+    """
+    
+    def __init__(self):
+        self._themes: Dict[str, Dict[str, str]] = {}
+        self._backgrounds: Dict[str, Any] = {}
+        self._inherited: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"themesParsed": 0, "backgroundsRead": 0, "inheritedResolved": 0, "hits": 0}
+    
+    def theme_colors(self, owner) -> Dict[str, str]:
+        """Colores del tema del master de `owner` (slide, layout o master); {} si falla"""
+        try:
+            theme_part = _master_of(owner).part.part_related_by(RT.THEME)
+        except Exception as e:
+            print(f"   ⚠️ Error extrayendo colores del tema: {e}")
+            return {}
+        
+        key = str(theme_part.partname)
+        if key in self._themes:
+            self.stats["hits"] += 1
+            return self._themes[key]
+        
+        try:
+            theme_colors = parse_theme_colors(theme_part.blob)
+        except Exception as e:
+            print(f"   ⚠️ Error extrayendo colores del tema: {e}")
+            theme_colors = {}
+        self.stats["themesParsed"] += 1
+        self._themes[key] = theme_colors
+        return theme_colors
+    
+    def background_element(self, owner):
+        """<p:bg> de un slide, layout o master (None si no define fondo)"""
+        key = str(owner.part.partname)
+        if key in self._backgrounds:
+            self.stats["hits"] += 1
+            return self._backgrounds[key]
+        
+        self.stats["backgroundsRead"] += 1
+        bg_element = owner.element.find('./p:cSld/p:bg', NAMESPACES)
+        self._backgrounds[key] = bg_element
+        return bg_element
+    
+    def inherited_background(self, slide) -> Dict[str, Any]:
+        """
+        Fondo que hereda un slide sin fondo propio: el del layout, si no el
+        del master, si no un color del tema (lt1, bg1 o el primero) y si no
+        blanco. Se resuelve una vez por layout.
+        """
+        layout = slide.slide_layout
+        key = str(layout.part.partname)
+        if key in self._inherited:
+            self.stats["hits"] += 1
+        else:
+            self.stats["inheritedResolved"] += 1
+            self._inherited[key] = self._resolve_inherited(layout)
+        return dict(self._inherited[key])
+    
+    def _resolve_inherited(self, layout) -> Dict[str, Any]:
+        theme_colors = self.theme_colors(layout)
+        
+        # ===== Layout =====
+        bg_element = self.background_element(layout)
+        if bg_element is not None:
+            background = solid_background(bg_element, theme_colors, "layout")
+            if background:
+                return background
+        
+        # ===== Slide master =====
+        print(f"   ℹ️ No se encontró fondo en el layout, buscando en master...")
+        try:
+            bg_element = self.background_element(layout.slide_master)
+            if bg_element is not None:
+                background = solid_background(bg_element, theme_colors, "master")
+                if background:
+                    return background
+        except Exception as master_error:
+            print(f"   ⚠️ Error buscando en master: {master_error}")
+        
+        # ===== Color del tema =====
+        print(f"   ℹ️ No se encontró fondo explícito, usando color del tema...")
+        
+        # Preferir lt1 (usual para fondos claros) o bg1
+        for name in ('lt1', 'bg1'):
+            if name in theme_colors:
+                print(f"   ✅ Color del tema ({name}) aplicado: {theme_colors[name]}")
+                return {"type": "solid", "color": theme_colors[name], "source": f"theme_{name}"}
+        if theme_colors:
+            first_color = list(theme_colors.values())[0]
+            print(f"   ✅ Primer color del tema aplicado: {first_color}")
+            return {"type": "solid", "color": first_color, "source": "theme_first"}
+        
+        print(f"   ℹ️ No se pudo detectar color de fondo, usando blanco por defecto")
+        return {"type": "solid", "color": "#FFFFFF", "source": "default_white"}
@@ -0,0 +1,18 @@
+"""
+HTTP caching helpers for content-addressed responses (assets, slide previews).
+"""
+from fastapi import Request
+
+# Content-addressed URLs never change, so clients may cache them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against a strong ETag (weak comparison, as for GET)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return etag in candidates
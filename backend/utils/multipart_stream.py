@@ -0,0 +1,213 @@
+"""
+Streaming multipart/form-data reader.
+
+Parses the request body chunk by chunk as it arrives instead of buffering
+it with `await request.body()`. File parts are written straight to a temp
+file on disk (hashed on the way), other fields go to a size-capped
+SpooledTemporaryFile, so peak memory does not grow with the upload size.
+The parser (and with it every disk write) runs on a worker thread, one
+chunk at a time, so large uploads do not block the event loop.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+# Fields smaller than this stay in memory; larger ones spill to disk
+MULTIPART_SPOOL_MAX_SIZE = int(os.environ.get('MULTIPART_SPOOL_MAX_SIZE', 1024 * 1024))
+
+# Hard limit per part (bytes)
+MULTIPART_MAX_PART_SIZE = int(os.environ.get('MULTIPART_MAX_PART_SIZE', 200 * 1024 * 1024))
+
+
+class MultipartError(ValueError):
+    """Malformed multipart body."""
+
+
+class PartTooLargeError(MultipartError):
+    """A part exceeded MULTIPART_MAX_PART_SIZE."""
+
+
+class StreamedPart:
+    """
+    A single form part spooled while the request streamed in.
+    
+    File parts (those with a filename) live in a named temp file so callers
+    can hand `path` to code that needs a real file; call `detach()` to take
+    ownership of it, otherwise `close()` removes it.
+    """
+    
+    def __init__(self, name: str, filename: Optional[str] = None):
+        self.name = name
+        self.filename = filename
+        self.size = 0
+        self.path: Optional[str] = None
+        self._digest = hashlib.sha256() if filename is not None else None
+        
+        if filename is not None:
+            fd, self.path = tempfile.mkstemp(suffix=os.path.splitext(filename)[1] or '.part')
+            self.file = os.fdopen(fd, 'w+b')
+        else:
+            self.file = tempfile.SpooledTemporaryFile(max_size=MULTIPART_SPOOL_MAX_SIZE)
+    
+    @property
+    def sha256(self) -> Optional[str]:
+        """SHA-256 of a file part, computed while it streamed in."""
+        return self._digest.hexdigest() if self._digest else None
+    
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > MULTIPART_MAX_PART_SIZE:
+            raise PartTooLargeError(f"Part '{self.name}' exceeds {MULTIPART_MAX_PART_SIZE} bytes")
+        if self._digest:
+            self._digest.update(data)
+        self.file.write(data)
+    
+    def finish(self) -> None:
+        self.file.flush()
+        self.file.seek(0)
+    
+    def read_text(self, encoding: str = 'utf-8') -> str:
+        self.file.seek(0)
+        return self.file.read().decode(encoding)
+    
+    def load_json(self) -> Any:
+        """Decode the part as JSON directly from the spool."""
+        self.file.seek(0)
+        return json.load(self.file)
+    
+    def detach(self) -> str:
+        """Close the file part and hand its path over to the caller."""
+        path = self.path
+        self.file.close()
+        self.path = None
+        return path
+    
+    def close(self) -> None:
+        if not self.file.closed:
+            self.file.close()
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+        self.path = None
+
+
+class StreamedForm:
+    """Parts of a streamed multipart body, keyed by field name."""
+    
+    def __init__(self):
+        self.parts: Dict[str, StreamedPart] = {}
+    
+    def get(self, name: str) -> Optional[StreamedPart]:
+        return self.parts.get(name)
+    
+    def text(self, name: str) -> Optional[str]:
+        part = self.parts.get(name)
+        return part.read_text() if part else None
+    
+    def close(self) -> None:
+        for part in self.parts.values():
+            part.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def get_boundary(content_type: str) -> bytes:
+    """Extract the boundary from a multipart Content-Type header."""
+    _, params = parse_options_header(content_type)
+    boundary = params.get(b'boundary')
+    if not boundary:
+        raise MultipartError("Invalid multipart boundary")
+    return boundary.strip(b'"')
+
+
+async def read_multipart_stream(
+    content_type: str,
+    chunks: AsyncIterator[bytes],
+    fields: Optional[Iterable[str]] = None
+) -> StreamedForm:
+    """
+    Parse a multipart body from an async iterator of chunks.
+    
+    Args:
+        content_type: Request Content-Type header (carries the boundary)
+        chunks: Body chunks, e.g. `request.stream()`
+        fields: Field names to keep; other parts are read and discarded
+    
+    Returns:
+        StreamedForm with one StreamedPart per kept field (last one wins)
+    """
+    boundary = get_boundary(content_type)
+    wanted = set(fields) if fields is not None else None
+    form = StreamedForm()
+    
+    state = {'part': None, 'header_field': b'', 'header_value': b'', 'headers': {}}
+    
+    def on_part_begin():
+        state['headers'] = {}
+    
+    def on_header_field(data, start, end):
+        state['header_field'] += data[start:end]
+    
+    def on_header_value(data, start, end):
+        state['header_value'] += data[start:end]
+    
+    def on_header_end():
+        state['headers'][state['header_field'].lower()] = state['header_value']
+        state['header_field'] = b''
+        state['header_value'] = b''
+    
+    def on_headers_finished():
+        _, options = parse_options_header(state['headers'].get(b'content-disposition', b''))
+        name = options.get(b'name', b'').decode('utf-8')
+        filename = options.get(b'filename')
+        
+        if wanted is not None and name not in wanted:
+            state['part'] = None
+            return
+        
+        if name in form.parts:
+            form.parts.pop(name).close()
+        part = StreamedPart(name, filename.decode('utf-8') if filename is not None else None)
+        form.parts[name] = part
+        state['part'] = part
+    
+    def on_part_data(data, start, end):
+        if state['part'] is not None:
+            state['part'].write(data[start:end])
+    
+    def on_part_end():
+        if state['part'] is not None:
+            state['part'].finish()
+        state['part'] = None
+    
+    parser = MultipartParser(boundary, {
+        'on_part_begin': on_part_begin,
+        'on_header_field': on_header_field,
+        'on_header_value': on_header_value,
+        'on_header_end': on_header_end,
+        'on_headers_finished': on_headers_finished,
+        'on_part_data': on_part_data,
+        'on_part_end': on_part_end,
+    })
+    
+    try:
+        async for chunk in chunks:
+            if chunk:
+                await asyncio.to_thread(parser.write, chunk)
+        await asyncio.to_thread(parser.finalize)
+    except PartTooLargeError:
+        form.close()
+        raise
+    except Exception as e:
+        form.close()
+        raise MultipartError(f"Malformed multipart body: {e}") from e
+    
+    return form